@@ -0,0 +1,467 @@
+"""
+JSON接口服务 - 不经过Streamlit页面，直接以JSON提供比赛、赔率、历史数据、联赛数据和预测
+
+其他服务原来只能抓取页面拿数据。本服务基于aiohttp.web，与页面共用同一套爬虫和缓存（文件缓存、比赛归档、
+联赛数据服务、后台即时比分轮询），不依赖Streamlit。每个接口的结果在内存中缓存一段时间，
+缓存时就序列化好JSON、计算ETag并预先压缩，命中缓存的请求只是查字典和写字节；
+同一个资源的并发请求合并为一次加载，客户端带If-None-Match时返回304。
+
+用法：python api_server.py [--host 0.0.0.0] [--port 8080] [--track-odds 300]
+
+接口：
+  GET /api/matches                      即时比分（后台轮询的共享比赛列表）
+  GET /api/matches?date=YYYY-MM-DD      指定日期的比赛（已完整归档的日期直接读取归档）
+  GET /api/matches/{fid}/odds[?at=时间]  赔率，指定at时由赔率快照重建该时刻的赔率
+  GET /api/matches/{fid}/history        双方数据（历史交战、近期战绩）
+  GET /api/matches/{fid}/prediction[?markets=1]  预测结果，markets=1时包含全部玩法概率
+  GET /api/leagues/{sid}                联赛数据（平均数据和积分榜）
+  GET /api/stream[?league=英超,西甲][&jingcai=1][&types=match,odds]
+                                        比分和赔率变化推送（Server-Sent Events）
+  GET /healthz                          服务状态
+  GET /metrics                          Prometheus格式的监控指标
+
+推送接口：新连接先收到hello事件（当前序号），之后收到match事件（新增、移除、比分状态变化，ID为变化流序号）
+和odds事件（赔率变化）；断线重连时带Last-Event-ID补发期间的比赛变化。收到resync事件时表示积压太多
+或无法补发，客户端应重新请求/api/matches。赔率变化来自本进程保存的赔率快照，
+可以用--track-odds定时抓取即时比分中未开赛的竞彩赛事的赔率。
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from history_crawler import fetch_match_history, has_history_data
+from jingcai_manager import update_matches_with_jingcai
+from league_data import get_league_data
+from live_diff import global_live_feed
+from live_stream import LiveEventBroadcaster, StreamFilter, Subscriber, format_sse
+from live_poller import ensure_live_poller_started, get_live_poller_status, global_live_poller
+from logger import get_logger
+from match_archive import archive_matches, get_archived_matches, global_match_archive, infer_match_date
+from match_crawler import MatchCrawlError, crawl_matches_by_date, is_production, normalize_match_status
+from metrics import ACTIVE_SESSIONS, CONTENT_TYPE, CRAWL_QUEUE_DEPTH, observe_cache, render_metrics
+from odds_crawler import fetch_all_odds_data
+from odds_history import capture_odds, get_odds_at, record_odds_snapshot
+from prediction import build_match_input, predict_match
+from team_index import get_match_history
+
+log = get_logger(__name__)
+
+# 各接口结果在内存中的缓存时间（秒）
+LIVE_TTL = 5
+DATE_TTL = 60
+# 已完整归档的日期赛果不会再变化
+ARCHIVED_TTL = 3600
+ODDS_TTL = 300
+HISTORY_TTL = 1800
+LEAGUE_TTL = 600
+PREDICTION_TTL = 600
+
+# 小于该大小的响应不压缩
+GZIP_MIN_SIZE = 1024
+
+# 推送连接没有事件时发送心跳的间隔（秒），避免代理断开空闲连接
+HEARTBEAT_SECONDS = 15
+
+
+class ApiError(Exception):
+    """返回给客户端的错误（HTTP状态码和提示信息）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """序列化好的响应：JSON正文、压缩后的正文（太小时为None）和ETag"""
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    expires_at: float
+
+    @classmethod
+    def encode(cls, data, ttl):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return cls(body, gzipped, etag, time.time() + ttl)
+
+
+class ResponseCache:
+    """接口结果缓存（只在事件循环线程中使用）：过期前直接返回，同一个键的并发加载合并为一次"""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key, loader):
+        """
+        获取缓存的响应，过期或没有缓存时调用loader加载
+        :param key: 缓存键
+        :param loader: 无参数的协程函数，返回(数据, 缓存时间)；抛出的异常不会被缓存
+        :return: CachedResponse
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            self.hits += 1
+            observe_cache('api', True)
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        observe_cache('api', False)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # 客户端断开时不取消共享的加载，其他等待的请求仍然需要结果
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        data, ttl = await loader()
+        entry = CachedResponse.encode(data, ttl)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+
+
+def etag_matches(request, etag):
+    """If-None-Match中是否包含当前ETag（忽略弱校验前缀）"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+def cached_json_response(request, entry):
+    """把缓存的响应写给客户端：ETag一致时返回304，客户端支持时返回压缩后的正文"""
+    headers = {
+        'ETag': entry.etag,
+        'Cache-Control': f'max-age={max(0, int(entry.expires_at - time.time()))}',
+        'Vary': 'Accept-Encoding'
+    }
+    if etag_matches(request, entry.etag):
+        return web.Response(status=304, headers=headers)
+    body = entry.body
+    if entry.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = entry.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return web.Response(body=body, content_type='application/json', charset='utf-8', headers=headers)
+
+
+def parse_date_param(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ApiError(400, f'日期格式应为YYYY-MM-DD: {value}')
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    """把爬取失败和参数错误转换为JSON错误响应"""
+    try:
+        return await handler(request)
+    except ApiError as e:
+        return web.json_response({'error': e.message}, status=e.status)
+    except MatchCrawlError as e:
+        return web.json_response({'error': e.message}, status=502)
+    except web.HTTPException:
+        raise
+    except Exception:
+        log.exception('接口处理失败', path=request.path_qs)
+        return web.json_response({'error': '服务器内部错误'}, status=500)
+
+
+class ApiServer:
+    """接口服务：所有请求共用一个aiohttp会话和一份结果缓存"""
+
+    def __init__(self, cache=None, track_odds_interval=0):
+        self.cache = cache or ResponseCache()
+        self.session = None
+        self.started_at = time.time()
+        self.broadcaster = LiveEventBroadcaster()
+        self.track_odds_interval = track_odds_interval
+        CRAWL_QUEUE_DEPTH.set_function(lambda: len(self.cache.inflight), queue='api')
+        ACTIVE_SESSIONS.set_function(lambda: len(self.broadcaster.subscribers), kind='sse')
+
+    async def _session_context(self, app):
+        # 所有爬取请求共用一个会话（连接复用），SSL配置与单次爬取一致
+        connector = aiohttp.TCPConnector(ssl=False) if not is_production() else aiohttp.TCPConnector()
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self.session = session
+            yield
+            self.session = None
+
+    async def _broadcast_context(self, app):
+        self.broadcaster.start()
+        tracker = asyncio.create_task(self.track_odds()) if self.track_odds_interval > 0 else None
+        yield
+        if tracker is not None:
+            tracker.cancel()
+            await asyncio.gather(tracker, return_exceptions=True)
+        self.broadcaster.stop()
+
+    def create_app(self):
+        app = web.Application(middlewares=[error_middleware])
+        app.cleanup_ctx.append(self._session_context)
+        app.cleanup_ctx.append(self._broadcast_context)
+        app.router.add_get('/api/matches', self.handle_matches)
+        app.router.add_get(r'/api/matches/{fid:\d+}/odds', self.handle_odds)
+        app.router.add_get(r'/api/matches/{fid:\d+}/history', self.handle_history)
+        app.router.add_get(r'/api/matches/{fid:\d+}/prediction', self.handle_prediction)
+        app.router.add_get(r'/api/leagues/{sid:\d+}', self.handle_league)
+        app.router.add_get('/api/stream', self.handle_stream)
+        app.router.add_get('/healthz', self.handle_health)
+        app.router.add_get('/metrics', self.handle_metrics)
+        return app
+
+    async def respond(self, request, key, loader):
+        return cached_json_response(request, await self.cache.get(key, loader))
+
+    # ------------------------------------------------------------------
+    # 比赛列表
+    # ------------------------------------------------------------------
+
+    async def handle_matches(self, request):
+        date_param = request.query.get('date')
+        if date_param:
+            date_str = parse_date_param(date_param)
+            return await self.respond(request, ('matches', date_str), lambda: self.load_date_matches(date_str))
+        # 即时比分由后台轮询维持，每次请求都让轮询知道仍有使用方
+        ensure_live_poller_started()
+        return await self.respond(request, ('matches', 'live'), self.load_live_matches)
+
+    async def load_live_matches(self):
+        if not global_live_poller.is_fresh():
+            # 轮询刚启动或上一次失败时爬取一次（后台轮询正在爬取时等待它的结果），失败时继续使用共享的旧数据
+            await global_live_poller.poll_once(self.session)
+        sequence, matches = global_live_feed.current()
+        if not matches:
+            raise MatchCrawlError(global_live_poller.last_error or '暂时没有即时比分数据')
+        # 正文只包含变化流序号和比赛，没有变化时ETag不变
+        return {'sequence': sequence, 'matches': matches}, LIVE_TTL
+
+    async def load_date_matches(self, date_str):
+        archived = await asyncio.to_thread(get_archived_matches, date_str)
+        if archived is not None:
+            return {'date': date_str, 'archived': True, 'matches': archived}, ARCHIVED_TTL
+        matches = normalize_match_status(await crawl_matches_by_date(date_str, self.session, delay=False))
+        # 竞彩标识使用已经抓取到的数据，不为接口请求单独抓取
+        matches = update_matches_with_jingcai(matches)
+        await asyncio.to_thread(archive_matches, matches, date_str)
+        return {'date': date_str, 'archived': False, 'matches': matches}, DATE_TTL
+
+    # ------------------------------------------------------------------
+    # 单场比赛的详细数据
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def find_match(fid):
+        """在即时比分和比赛归档中查找比赛，找不到时返回None"""
+        _, matches = global_live_feed.current()
+        for match in matches:
+            if match.get('fid') == fid:
+                return match
+        return global_match_archive.get_match(fid)
+
+    async def handle_odds(self, request):
+        fid = request.match_info['fid']
+        at = request.query.get('at')
+        if at:
+            return await self.respond(request, ('odds', fid, at), lambda: self.load_odds_at(fid, at))
+        return await self.respond(request, ('odds', fid), lambda: self.load_odds(fid))
+
+    async def load_odds(self, fid):
+        odds_data = await asyncio.to_thread(fetch_all_odds_data, fid)
+        if not odds_data or not any(odds_data.values()):
+            raise ApiError(502, f'获取比赛{fid}的赔率失败')
+        # 与页面一样保存赔率快照（只记录变化的赔率）
+        await asyncio.to_thread(record_odds_snapshot, fid, odds_data)
+        return {'fid': fid, 'odds': odds_data}, ODDS_TTL
+
+    async def load_odds_at(self, fid, at):
+        try:
+            odds_data = await asyncio.to_thread(get_odds_at, fid, at)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if odds_data is None:
+            raise ApiError(404, f'比赛{fid}在{at}之前没有赔率快照')
+        return {'fid': fid, 'at': at, 'odds': odds_data}, ODDS_TTL
+
+    async def handle_history(self, request):
+        fid = request.match_info['fid']
+        return await self.respond(request, ('history', fid), lambda: self.load_history(fid))
+
+    async def load_history(self, fid):
+        match = await asyncio.to_thread(self.find_match, fid)
+        # 知道比赛双方时优先使用本地归档生成的数据，否则请求shuju页面
+        if match is not None:
+            history_data = await asyncio.to_thread(get_match_history, match)
+        else:
+            history_data = await asyncio.to_thread(fetch_match_history, fid)
+        # 请求失败时返回的是字段齐全的空结构，不能缓存，否则在有效期内一直返回空数据
+        if not has_history_data(history_data):
+            raise ApiError(502, f'获取比赛{fid}的双方数据失败')
+        return {'fid': fid, 'history': history_data}, HISTORY_TTL
+
+    async def handle_prediction(self, request):
+        fid = request.match_info['fid']
+        include_markets = request.query.get('markets') in ('1', 'true')
+        return await self.respond(request, ('prediction', fid, include_markets),
+                                  lambda: self.load_prediction(fid, include_markets))
+
+    async def load_prediction(self, fid, include_markets):
+        match = await asyncio.to_thread(self.find_match, fid)
+        if match is None:
+            raise ApiError(404, f'没有找到比赛{fid}（请先在即时比分或按日期的比赛中获取该比赛）')
+        # 预测只需要主客场战绩，本地有这些数据时不请求shuju页面
+        history_data = await asyncio.to_thread(get_match_history, match, True)
+        league_data = None
+        if match.get('sid'):
+            match_date = match.get('match_date') or infer_match_date(match.get('time', ''))
+            league_data = await asyncio.to_thread(get_league_data, match['sid'], match_date)
+        match_input = build_match_input(match, history_data, league_data)
+        # 没有主队主场或客队客场战绩时进攻力和防守力参数都是0，预测没有意义
+        if match_input is None or not (match_input.home_at_home.total and match_input.away_at_away.total):
+            raise ApiError(404, f'比赛{fid}缺少主客场战绩数据，无法预测')
+        # 联赛场均进球是计算参数的基准，缺少时（没有联赛数据或显示“暂无”）同样无法预测
+        if not (match_input.league_home_avg_goals > 0 and match_input.league_away_avg_goals > 0):
+            raise ApiError(404, f'比赛{fid}缺少联赛场均进球数据，无法预测')
+        prediction = await asyncio.to_thread(predict_match, match_input)
+        if prediction is None:
+            raise ApiError(404, f'比赛{fid}的数据不足，无法预测')
+        return {'fid': fid, 'prediction': prediction.to_dict(include_markets)}, PREDICTION_TTL
+
+    # ------------------------------------------------------------------
+    # 变化推送
+    # ------------------------------------------------------------------
+
+    async def handle_stream(self, request):
+        stream_filter = StreamFilter.from_query(request.query)
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        ensure_live_poller_started()
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream; charset=utf-8',
+            'Cache-Control': 'no-cache',
+            # 禁止反向代理缓冲推送内容
+            'X-Accel-Buffering': 'no'
+        })
+        await response.prepare(request)
+        subscriber = self.broadcaster.subscribe(stream_filter)
+        try:
+            # 断线后3秒重连
+            await response.write(b'retry: 3000\n\n')
+            if last_event_id.isdigit():
+                backlog = self.broadcaster.backlog(subscriber, int(last_event_id))
+                if backlog is None:
+                    await response.write(self.resync_event())
+                for payload in backlog or []:
+                    await response.write(payload)
+            else:
+                # 新连接从当前序号开始接收，完整的比赛列表由/api/matches获取
+                sequence = global_live_feed.sequence
+                subscriber.start_after = sequence
+                await response.write(format_sse('hello', {'sequence': sequence}, sequence))
+
+            while True:
+                item = await subscriber.next(HEARTBEAT_SECONDS)
+                if item is None:
+                    # 有推送连接时保持后台轮询运行
+                    ensure_live_poller_started()
+                    await response.write(b': ping\n\n')
+                elif item is Subscriber.RESYNC:
+                    await response.write(self.resync_event())
+                else:
+                    await response.write(item)
+        except ConnectionResetError:
+            # 客户端断开
+            pass
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
+        return response
+
+    @staticmethod
+    def resync_event():
+        return format_sse('resync', {'sequence': global_live_feed.sequence})
+
+    async def track_odds(self):
+        """定时抓取即时比分中未开赛的竞彩赛事的赔率，赔率变化经推送接口发给订阅者"""
+        while True:
+            _, matches = global_live_feed.current()
+            fids = [match['fid'] for match in matches
+                    if match.get('fid') and match.get('jingcai_id') and str(match.get('status')) == '0']
+            for fid in fids:
+                try:
+                    await asyncio.to_thread(capture_odds, fid)
+                except Exception as e:
+                    log.warning('抓取赔率快照失败', fid=fid, error=e)
+            await asyncio.sleep(self.track_odds_interval)
+
+    # ------------------------------------------------------------------
+    # 联赛数据和服务状态
+    # ------------------------------------------------------------------
+
+    async def handle_league(self, request):
+        sid = request.match_info['sid']
+        return await self.respond(request, ('league', sid), lambda: self.load_league(sid))
+
+    async def load_league(self, sid):
+        league_data = await asyncio.to_thread(get_league_data, sid)
+        return {'sid': sid, 'league': league_data}, LEAGUE_TTL
+
+    async def handle_health(self, request):
+        return web.json_response({
+            'uptime': round(time.time() - self.started_at, 1),
+            'cache': {'entries': len(self.cache.entries), 'hits': self.cache.hits, 'misses': self.cache.misses},
+            'stream': {'subscribers': len(self.broadcaster.subscribers), 'published': self.broadcaster.published,
+                       'dropped': sum(subscriber.dropped for subscriber in self.broadcaster.subscribers)},
+            'live_poller': get_live_poller_status()
+        })
+
+
+    async def handle_metrics(self, request):
+        return web.Response(body=render_metrics().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+
+def create_app(track_odds_interval=0):
+    """创建接口服务的aiohttp应用"""
+    return ApiServer(track_odds_interval=track_odds_interval).create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比赛数据JSON接口服务')
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口')
+    parser.add_argument('--track-odds', type=float, default=0,
+                        help='定时抓取未开赛竞彩赛事赔率的间隔（秒），赔率变化经推送接口发出；0表示不抓取')
+    args = parser.parse_args()
+    # 高并发时逐条输出访问日志的开销比处理缓存命中的请求还大，不输出访问日志
+    web.run_app(create_app(args.track_odds), host=args.host, port=args.port, access_log=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
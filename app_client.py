@@ -0,0 +1,373 @@
+"""
+页面会话客户端 - 在子进程中启动真实的Streamlit服务，通过websocket模拟浏览器会话
+
+基准测试和负载测试要测量的是真实服务中的重跑：AppTest在测试进程中运行脚本，控件交互总是整页重跑，
+不会像浏览器那样只重跑控件所在的fragment；多个AppTest也不能在同一进程中同时运行。本模块用streamlit run
+启动服务，按浏览器前端的协议与服务通信：
+- 每次重跑发送BackMsg.rerun_script，包含本会话设置过的控件值；fragment中的控件交互带上该fragment的ID，
+  服务只重跑这个fragment（与浏览器中相同）
+- 接收ForwardMsg，按delta_path记录页面上的控件和可展开区域（expander）；脚本结束时像前端一样
+  清除本次重跑应该输出但没有再输出的旧元素，查找控件时只会找到页面上当前显示的控件
+- 收到脚本结束的消息时返回本次重跑的耗时（从发送到结束）
+
+只使用streamlit.proto中的消息定义和服务公开的websocket接口（/_stcore/stream），不修改Streamlit的内部对象。
+"""
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+# 单条消息的默认等待时间（秒）
+DEFAULT_TIMEOUT = 120
+
+# 控件类型 -> WidgetState中保存值的字段
+VALUE_FIELDS = {
+    'checkbox': 'bool_value',
+    'expander': 'bool_value',
+    'selectbox': 'string_value',
+    'number_input': 'double_value',
+    'button': 'trigger_value',
+}
+
+# 控件ID的格式为$$ID-<哈希>-<key>，没有key时为None
+WIDGET_ID_PATTERN = re.compile(r'^\$\$ID-[0-9a-f]+-(.*)$')
+
+
+def free_port(host='127.0.0.1'):
+    """找一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+@dataclass(frozen=True)
+class ProcessStats:
+    """进程的CPU时间（秒）、当前和峰值常驻内存（字节）；没有/proc时都为0"""
+    cpu: float = 0.0
+    rss: int = 0
+    peak_rss: int = 0
+
+
+def process_stats(pid) -> ProcessStats:
+    """从/proc读取进程的CPU时间和内存（只支持Linux）"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # 进程名可能包含空格，从最后一个')'之后开始按字段解析
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return ProcessStats()
+    ticks = os.sysconf('SC_CLK_TCK')
+    # utime和stime是stat的第14、15个字段
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+
+    def kilobytes(name):
+        return int(status.get(name, '0 kB').split()[0]) * 1024
+
+    return ProcessStats(cpu=cpu, rss=kilobytes('VmRSS'), peak_rss=kilobytes('VmHWM'))
+
+
+def fetch_counter(metrics_url, name):
+    """
+    读取/metrics中一个只有一个标签的计数器
+    :return: 标签值 -> 计数，服务没有导出该指标时返回空字典
+    """
+    with urllib.request.urlopen(metrics_url, timeout=10) as response:
+        text = response.read().decode('utf-8')
+    pattern = re.compile(rf'^{re.escape(name)}\{{\w+="([^"]*)"\}} (\S+)$', re.M)
+    return {label: float(value) for label, value in pattern.findall(text)}
+
+
+class StreamlitServer:
+    """在子进程中运行streamlit run，输出写入工作目录中的streamlit.log"""
+
+    def __init__(self, app_path, cwd, env=None, port=None, host='127.0.0.1'):
+        self.app_path = os.path.abspath(app_path)
+        self.cwd = cwd
+        self.env = dict(os.environ, **(env or {}))
+        self.host = host
+        self.port = port or free_port(host)
+        self.process = None
+        self.log_path = os.path.join(cwd, 'streamlit.log')
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def ws_url(self):
+        return f'ws://{self.host}:{self.port}/_stcore/stream'
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def start(self, timeout=60):
+        """启动服务并等待健康检查通过"""
+        command = [sys.executable, '-m', 'streamlit', 'run', self.app_path,
+                   '--server.headless', 'true', '--server.address', self.host, '--server.port', str(self.port),
+                   '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+        with open(self.log_path, 'w') as log_file:
+            self.process = subprocess.Popen(command, cwd=self.cwd, env=self.env, stdout=log_file,
+                                            stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(f'{self.url}/_stcore/health', timeout=5) as response:
+                    if response.status == 200:
+                        return self
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f'Streamlit服务没有启动（退出码 {self.process.returncode}）:\n{self.log_tail()}')
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def stats(self) -> ProcessStats:
+        return process_stats(self.pid)
+
+    def log_tail(self, limit=2000):
+        try:
+            with open(self.log_path, encoding='utf-8', errors='replace') as f:
+                return f.read()[-limit:]
+        except OSError:
+            return ''
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        return False
+
+
+@dataclass(frozen=True)
+class Widget:
+    """页面上的一个控件或可展开区域"""
+    id: str
+    # 元素类型：selectbox、checkbox（包括toggle）、button、number_input、expander等
+    kind: str
+    label: str
+    # 控件的key，没有设置key时为空字符串
+    key: str
+    # 控件所在的fragment，不在fragment中时为空字符串
+    fragment_id: str
+    proto: Any
+
+    @property
+    def options(self) -> List[str]:
+        """选择框的选项（页面上显示的文本，也就是发送给服务的值）"""
+        return list(getattr(self.proto, 'options', []))
+
+    @property
+    def disabled(self) -> bool:
+        return bool(getattr(self.proto, 'disabled', False))
+
+
+@dataclass
+class _Node:
+    """按delta_path记录的元素：控件或容器（容器用于清除其中的旧元素）"""
+    run_id: str
+    fragment_id: str
+    widget: Optional[Widget] = None
+
+
+def _widget_key(widget_id):
+    match = WIDGET_ID_PATTERN.match(widget_id)
+    key = match.group(1) if match else ''
+    return '' if key == 'None' else key
+
+
+class ScriptError(Exception):
+    """脚本编译失败"""
+
+
+class AppSession:
+    """一个模拟的浏览器会话：async with AppSession(server.ws_url) as session: await session.rerun()"""
+
+    def __init__(self, ws_url, timeout=DEFAULT_TIMEOUT):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.http = None
+        self.ws = None
+        # 控件ID -> (WidgetState字段, 值)，每次重跑都发送（与前端一样）
+        self.values: Dict[str, Tuple[str, Any]] = {}
+        # 下次重跑发送一次的按钮点击
+        self.triggers: List[str] = []
+        self.nodes: Dict[Tuple[int, ...], _Node] = {}
+        # 最近一次重跑中页面显示的异常
+        self.exceptions: List[str] = []
+
+    async def connect(self):
+        self.http = aiohttp.ClientSession()
+        self.ws = await self.http.ws_connect(self.ws_url, protocols=('streamlit',), max_msg_size=0)
+        return self
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.http is not None:
+            await self.http.close()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+        return False
+
+    def find_all(self, kind=None, key=None, label=None, key_prefix=None) -> List[Widget]:
+        """页面上当前显示的控件，按页面中的位置排列"""
+        widgets = []
+        for path in sorted(self.nodes):
+            widget = self.nodes[path].widget
+            if widget is None:
+                continue
+            if ((kind is None or widget.kind == kind) and (key is None or widget.key == key)
+                    and (label is None or widget.label == label)
+                    and (key_prefix is None or widget.key.startswith(key_prefix))):
+                widgets.append(widget)
+        return widgets
+
+    def find(self, kind=None, key=None, label=None) -> Optional[Widget]:
+        widgets = self.find_all(kind, key, label)
+        return widgets[0] if widgets else None
+
+    def set_value(self, widget, value):
+        """设置控件的值（下次重跑时发送），选择框的值为选项文本"""
+        field = VALUE_FIELDS.get(widget.kind)
+        if field is None or field == 'trigger_value':
+            raise ValueError(f'不支持设置{widget.kind}控件的值')
+        self.values[widget.id] = (field, value)
+
+    def click(self, widget):
+        """点击按钮（下次重跑时发送）"""
+        self.triggers.append(widget.id)
+
+    async def interact(self, widget, value=None):
+        """
+        与一个控件交互并重跑：按钮为点击，其他控件设置为value；
+        控件在fragment中时只重跑该fragment（服务端回调仍然可以改为重跑其他fragment或整页）
+        :return: 重跑耗时（秒）
+        """
+        if widget.kind == 'button':
+            self.click(widget)
+        else:
+            self.set_value(widget, value)
+        return await self.rerun(widget.fragment_id)
+
+    async def rerun(self, fragment_id=''):
+        """
+        发送一次重跑请求并等待脚本结束
+        :param fragment_id: 只重跑该fragment，为空时整页重跑
+        :return: 重跑耗时（秒）
+        """
+        message = BackMsg()
+        state = message.rerun_script
+        state.query_string = ''
+        state.fragment_id = fragment_id
+        for widget_id, (field, value) in self.values.items():
+            widget_state = state.widget_states.widgets.add()
+            widget_state.id = widget_id
+            setattr(widget_state, field, value)
+        for widget_id in self.triggers:
+            widget_state = state.widget_states.widgets.add()
+            widget_state.id = widget_id
+            widget_state.trigger_value = True
+        self.triggers = []
+        self.exceptions = []
+
+        started = time.perf_counter()
+        await self.ws.send_bytes(message.SerializeToString())
+        await self._receive_until_finished()
+        return time.perf_counter() - started
+
+    async def _receive_until_finished(self):
+        run_id, fragment_ids = '', set()
+        while True:
+            message = await self.ws.receive(timeout=self.timeout)
+            if message.type != aiohttp.WSMsgType.BINARY:
+                raise ConnectionError(f'与Streamlit服务的连接已断开: {message.type.name}')
+            forward = ForwardMsg()
+            forward.ParseFromString(message.data)
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                run_id = forward.new_session.script_run_id
+                fragment_ids = set(forward.new_session.fragment_ids_this_run)
+            elif kind == 'delta':
+                self._apply_delta(run_id, forward)
+            elif kind == 'script_finished':
+                status = forward.script_finished
+                if status == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # 回调或脚本中调用了st.rerun，服务紧接着开始下一次运行
+                    continue
+                self._clear_stale(run_id, fragment_ids)
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise ScriptError('页面脚本编译失败')
+                return
+
+    def _apply_delta(self, run_id, forward):
+        path = tuple(forward.metadata.delta_path)
+        delta = forward.delta
+        # 新元素替换该位置原有的元素和其中的全部子元素
+        for node_path in [node_path for node_path in self.nodes if node_path[:len(path)] == path]:
+            del self.nodes[node_path]
+
+        delta_type = delta.WhichOneof('type')
+        widget = None
+        if delta_type == 'add_block':
+            block = delta.add_block
+            if block.WhichOneof('type') == 'expandable' and block.expandable.id:
+                expandable = block.expandable
+                widget = Widget(expandable.id, 'expander', expandable.label, _widget_key(expandable.id),
+                                delta.fragment_id, expandable)
+        elif delta_type == 'new_element':
+            element = delta.new_element
+            element_type = element.WhichOneof('type')
+            proto = getattr(element, element_type) if element_type else None
+            if element_type == 'exception':
+                self.exceptions.append(f'{proto.type}: {proto.message}')
+                return
+            widget_id = getattr(proto, 'id', '') if proto is not None and 'id' in proto.DESCRIPTOR.fields_by_name else ''
+            if not widget_id:
+                return
+            widget = Widget(widget_id, element_type, getattr(proto, 'label', ''), _widget_key(widget_id),
+                            delta.fragment_id, proto)
+            if getattr(proto, 'set_value', False):
+                # 脚本通过会话状态修改了控件的值，以服务端的值为准
+                self.values.pop(widget_id, None)
+        else:
+            return
+        self.nodes[path] = _Node(run_id, delta.fragment_id, widget)
+
+    def _clear_stale(self, run_id, fragment_ids):
+        """
+        清除本次重跑中没有再输出的元素：整页重跑时为所有旧元素，
+        fragment重跑时为这些fragment中的旧元素（以及其中的全部子元素）
+        """
+        stale = [path for path, node in self.nodes.items()
+                 if node.run_id != run_id and (not fragment_ids or node.fragment_id in fragment_ids)]
+        for root in stale:
+            for path in [path for path in self.nodes if path[:len(root)] == root]:
+                del self.nodes[path]
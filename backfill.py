@@ -0,0 +1,295 @@
+"""
+历史比赛批量回填
+
+DateManager可以选择过去6年的日期，但只能在页面上逐日查看。本脚本按日期范围并发爬取wanchang.php，
+所有请求共用一个速率预算（令牌桶），结果写入比赛归档（match_archive），以后在页面上查看这些日期直接读取归档。
+可选地同时拉取每场比赛的赔率（--with-odds）和历史数据（--with-history），保存在归档的match_details表中。
+
+进度保存在检查点文件中，中断后再次运行同样的命令会跳过已完成的日期，失败的日期会重新爬取；
+已保存过的赔率和历史数据不会重复拉取。运行过程中定期输出吞吐量（页面/秒、比赛/秒）和预计剩余时间。
+
+用法：python backfill.py --start 2020-01-01 [--end 2020-12-31] [--concurrency 4] [--rate 2]
+                        [--with-odds] [--with-history] [--checkpoint cache/backfill_checkpoint.json] [--restart]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import aiohttp
+
+from history_crawler import fetch_match_history, has_history_data
+from match_archive import archive_matches, get_archived_matches, global_match_archive, is_past_date
+from match_crawler import MatchCrawlError, crawl_matches_by_date, is_production, normalize_match_status
+from odds_crawler import fetch_all_odds_data, has_odds_data
+
+DEFAULT_CHECKPOINT = os.path.join('cache', 'backfill_checkpoint.json')
+
+# 每种请求消耗的令牌数：赔率需要请求欧赔、亚盘、大小球三个页面
+PAGE_COST = 1
+ODDS_COST = 3
+HISTORY_COST = 1
+
+# 赔率和历史数据的每个页面只请求一次：爬虫内部的重试和等待不经过令牌桶，会超出速率预算；
+# 失败的比赛使所在日期失败，下次运行时重新拉取
+DETAIL_RETRIES = 1
+
+
+class RateLimiter:
+    """异步令牌桶：所有请求共用的速率预算（每秒rate个请求，最多积攒burst个）"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        """等待直到有足够的令牌（超过桶容量的请求按桶容量计算，避免永远等不到）"""
+        tokens = min(float(tokens), self.burst)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """回填进度：已完成的日期和失败的日期，每完成一个日期原子地写入一次文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = set()
+        self.failed = {}  # 日期 -> 失败原因
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.completed = set(data.get('completed', []))
+            self.failed = dict(data.get('failed', {}))
+        except (OSError, ValueError) as e:
+            print(f"读取检查点失败，将从头开始: {self.path}, 错误={e}")
+        return self
+
+    def mark_completed(self, date_str):
+        self.completed.add(date_str)
+        self.failed.pop(date_str, None)
+        self.save()
+
+    def mark_failed(self, date_str, reason):
+        self.failed[date_str] = reason
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        data = {
+            'completed': sorted(self.completed),
+            'failed': dict(sorted(self.failed.items())),
+            'updated_at': datetime.now().isoformat(timespec='seconds')
+        }
+        # 先写临时文件再替换，中断时不会留下写了一半的检查点
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class Progress:
+    """吞吐量统计"""
+
+    def __init__(self, total_dates):
+        self.total_dates = total_dates
+        self.started = time.monotonic()
+        self.dates_done = 0
+        self.dates_failed = 0
+        self.pages = 0
+        self.local_pages = 0
+        self.matches = 0
+        self.odds = 0
+        self.histories = 0
+        self.detail_failures = 0
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        finished = self.dates_done + self.dates_failed
+        remaining = self.total_dates - finished
+        eta = time.strftime('%H:%M:%S', time.gmtime(elapsed / finished * remaining)) if finished else '--:--:--'
+        return (f"日期 {finished}/{self.total_dates}  "
+                f"页面 {self.pages} ({self.pages / elapsed:.2f}/秒, 归档读取 {self.local_pages})  "
+                f"比赛 {self.matches} ({self.matches / elapsed:.1f}/秒)  "
+                f"赔率 {self.odds}  历史 {self.histories}  "
+                f"失败 {self.dates_failed}日/{self.detail_failures}场  "
+                f"预计剩余 {eta}")
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'日期格式应为YYYY-MM-DD: {value}')
+
+
+def date_range(start, end):
+    """[start, end]之间的所有日期字符串（按时间顺序）"""
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+async def fetch_detail(fid, kind, limiter, progress):
+    """在线程中拉取一场比赛的赔率或历史数据（同步的requests爬虫），成功时保存到归档"""
+    if global_match_archive.has_detail(fid, kind):
+        return True
+    if kind == 'odds':
+        await limiter.acquire(ODDS_COST)
+        data = await asyncio.to_thread(fetch_all_odds_data, fid, retries=DETAIL_RETRIES)
+        # 三个页面都失败时视为失败
+        ok = has_odds_data(data)
+    else:
+        await limiter.acquire(HISTORY_COST)
+        data = await asyncio.to_thread(fetch_match_history, fid, retries=DETAIL_RETRIES, delay=False)
+        # 请求失败时返回的是字段齐全的空结构，不能保存为已获取，否则以后不会再拉取
+        ok = has_history_data(data)
+    if not ok:
+        progress.detail_failures += 1
+        return False
+    global_match_archive.save_detail(fid, kind, data)
+    if kind == 'odds':
+        progress.odds += 1
+    else:
+        progress.histories += 1
+    return True
+
+
+async def backfill_date(date_str, session, limiter, args, progress):
+    """
+    回填一个日期
+    :return: 失败原因，成功时返回None
+    """
+    # 已完整归档的日期直接读取归档，只补充缺少的详细数据
+    matches = get_archived_matches(date_str)
+    if matches is not None:
+        progress.local_pages += 1
+    else:
+        await limiter.acquire(PAGE_COST)
+        matches = normalize_match_status(await crawl_matches_by_date(date_str, session, delay=False))
+        progress.pages += 1
+        if not matches and is_past_date(date_str):
+            # 空页面或被限流时的页面，不归档，下次运行重新爬取
+            return '页面没有比赛'
+        archive_matches(matches, date_str)
+    progress.matches += len(matches)
+
+    kinds = [kind for kind, enabled in (('odds', args.with_odds), ('history', args.with_history)) if enabled]
+    if not kinds:
+        return None
+    fids = [match['fid'] for match in matches if match.get('fid')]
+    results = await asyncio.gather(*(fetch_detail(fid, kind, limiter, progress) for fid in fids for kind in kinds))
+    failures = results.count(False)
+    return f'{failures}项详细数据获取失败' if failures else None
+
+
+async def worker(queue, session, limiter, args, checkpoint, progress):
+    while True:
+        date_str = await queue.get()
+        try:
+            reason = await backfill_date(date_str, session, limiter, args, progress)
+        except MatchCrawlError as e:
+            reason = e.message
+        except Exception as e:
+            reason = f'回填失败: {e}'
+        finally:
+            queue.task_done()
+
+        if reason:
+            progress.dates_failed += 1
+            checkpoint.mark_failed(date_str, reason)
+            print(f"[失败] {date_str}: {reason}")
+        else:
+            progress.dates_done += 1
+            checkpoint.mark_completed(date_str)
+
+
+async def report_progress(progress, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(f"[进度] {progress.line()}")
+
+
+async def run(args):
+    checkpoint = Checkpoint(args.checkpoint)
+    if not args.restart:
+        checkpoint.load()
+    pending = [date_str for date_str in date_range(args.start, args.end) if date_str not in checkpoint.completed]
+    skipped = (args.end - args.start).days + 1 - len(pending)
+    print(f"回填 {args.start} ~ {args.end}：待处理 {len(pending)} 天，检查点中已完成 {skipped} 天，"
+          f"并发 {args.concurrency}，速率 {args.rate} 请求/秒"
+          f"{'，含赔率' if args.with_odds else ''}{'，含历史数据' if args.with_history else ''}")
+    if not pending:
+        return 0
+
+    progress = Progress(len(pending))
+    limiter = RateLimiter(args.rate)
+    queue = asyncio.Queue()
+    for date_str in pending:
+        queue.put_nowait(date_str)
+
+    # 所有页面请求共用一个会话（连接复用），SSL配置与单次爬取一致
+    connector = aiohttp.TCPConnector(ssl=False, limit=args.concurrency) if not is_production() \
+        else aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        workers = [asyncio.create_task(worker(queue, session, limiter, args, checkpoint, progress))
+                   for _ in range(min(args.concurrency, len(pending)))]
+        reporter = asyncio.create_task(report_progress(progress, args.report_interval))
+        try:
+            await queue.join()
+        finally:
+            for task in workers + [reporter]:
+                task.cancel()
+            await asyncio.gather(*workers, reporter, return_exceptions=True)
+
+    print(f"[完成] {progress.line()}")
+    if checkpoint.failed:
+        print(f"共有 {len(checkpoint.failed)} 个日期失败，再次运行同样的命令会重新爬取")
+    return 1 if progress.dates_failed else 0
+
+
+def main():
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description='按日期范围批量回填历史比赛到本地归档')
+    parser.add_argument('--start', type=parse_date, required=True, help='开始日期（YYYY-MM-DD）')
+    parser.add_argument('--end', type=parse_date, default=yesterday, help='结束日期（含），默认为昨天')
+    parser.add_argument('--concurrency', type=int, default=4, help='同时处理的日期数')
+    parser.add_argument('--rate', type=float, default=2.0, help='所有请求共用的速率上限（请求/秒）')
+    parser.add_argument('--with-odds', action='store_true', help='同时拉取每场比赛的赔率')
+    parser.add_argument('--with-history', action='store_true', help='同时拉取每场比赛的历史数据')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='检查点文件路径')
+    parser.add_argument('--restart', action='store_true', help='忽略已有的检查点，从头开始')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='输出进度的间隔（秒）')
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        parser.error('开始日期不能晚于结束日期')
+    if args.concurrency < 1 or args.rate <= 0:
+        parser.error('并发数和速率必须大于0')
+
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print(f"已中断，进度已保存到 {args.checkpoint}，再次运行同样的命令即可继续")
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+爬虫端到端基准测试
+
+在本进程中启动离线回放服务（replay_server.py），把所有爬虫的上游地址指向它，按设定的并发数
+分别运行即时比分、完场/赛程、竞彩标识、赔率（欧赔+亚盘+大小球）、双方数据和联赛数据的爬取，
+报告每种爬取的成功数、吞吐量和延迟分布（中位数、p90、p99、最大值），以及回放服务的故障注入统计和爬虫的重试次数。
+
+每次爬取使用不同的比赛ID，文件缓存使用临时目录，不会命中缓存。耗时包括爬虫本身的防封随机等待
+（双方数据、竞彩标识）和失败重试的等待，与页面上实际的等待一致。
+页面需要先录制：python replay_server.py record --fid 1234567 --sid 36 --date 2024-05-01
+
+用法：python bench_crawlers.py [--requests 50] [--concurrency 8] [--crawlers live,odds,history]
+                              [--latency 0.05] [--jitter 0.1] [--error-rate 0.02] [--truncate-rate 0.01] ...
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from data_cache import global_cache
+from history_crawler import fetch_match_history
+from jingcai_manager import JingcaiManager
+from league_data import fetch_league_data
+from match_crawler import MatchCrawlError, crawl_matches, crawl_matches_by_date
+from metrics import CRAWL_RETRIES
+from odds_crawler import fetch_all_odds_data
+from replay_server import DEFAULT_PAGES_DIR, ReplayServer, add_fault_arguments, faults_from_args
+from upstream import set_upstream
+
+CRAWLERS = ('live', 'date', 'jingcai', 'odds', 'history', 'league')
+
+# 每次爬取使用不同的ID，避免命中缓存
+BASE_FID = 9000000
+BASE_SID = 9000
+
+
+async def crawl_once(name, i, session):
+    """
+    运行一次爬取
+    :return: 是否得到有效数据
+    """
+    if name == 'live':
+        return bool(await crawl_matches(session, delay=False))
+    if name == 'date':
+        return bool(await crawl_matches_by_date('2024-05-01', session, delay=False))
+    if name == 'jingcai':
+        return bool(await JingcaiManager().crawl_jingcai_ids())
+    if name == 'odds':
+        odds = await asyncio.to_thread(fetch_all_odds_data, str(BASE_FID + i), False)
+        return all(odds.values())
+    if name == 'history':
+        history = await asyncio.to_thread(fetch_match_history, str(BASE_FID + i))
+        return bool(history.get('match_info') or history.get('matches'))
+    if name == 'league':
+        league = await asyncio.to_thread(fetch_league_data, str(BASE_SID + i))
+        return bool(league.get('average_data') or league.get('standings'))
+    raise ValueError(f'未知的爬取类型: {name}')
+
+
+async def bench_crawler(name, requests, concurrency, session):
+    """
+    按并发数运行requests次爬取
+    :return: (成功数, 总耗时, 每次爬取的耗时列表)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    ok = 0
+
+    async def run(i):
+        nonlocal ok
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                success = await crawl_once(name, i, session)
+            except MatchCrawlError:
+                success = False
+            timings.append(time.perf_counter() - started)
+            ok += success
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(requests)))
+    return ok, time.perf_counter() - started, timings
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * fraction)) - 1))]
+
+
+def report(name, ok, elapsed, timings):
+    """打印一种爬取的吞吐量和延迟分布"""
+    ordered = sorted(timings)
+    ms = [value * 1000 for value in ordered]
+    print(f"{name:<8} 成功 {ok:>4}/{len(ordered):<4} 吞吐 {len(ordered) / elapsed:7.1f} 次/秒    "
+          f"中位数 {statistics.median(ms):8.1f} ms  p90 {percentile(ms, 0.9):8.1f} ms  "
+          f"p99 {percentile(ms, 0.99):8.1f} ms  最大 {ms[-1]:8.1f} ms")
+
+
+def start_replay_server(server, host='127.0.0.1'):
+    """在后台线程的事件循环中启动回放服务，返回服务地址"""
+    ready = threading.Event()
+    address = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(server.create_app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, 0)
+        loop.run_until_complete(site.start())
+        address['url'] = f"http://{host}:{runner.addresses[0][1]}"
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name='replay-server', daemon=True).start()
+    ready.wait()
+    return address['url']
+
+
+async def run_benchmark(args, crawlers):
+    async with aiohttp.ClientSession() as session:
+        for name in crawlers:
+            report(name, *await bench_crawler(name, args.requests, args.concurrency, session))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫端到端基准测试（离线回放服务）')
+    parser.add_argument('--pages', default=DEFAULT_PAGES_DIR, help='录制页面目录')
+    parser.add_argument('--requests', type=int, default=50, help='每种爬取的次数')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发数')
+    parser.add_argument('--crawlers', default=','.join(CRAWLERS), help=f"要测试的爬取，逗号分隔：{','.join(CRAWLERS)}")
+    parser.add_argument('--seed', type=int, help='故障注入的随机种子')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    crawlers = [name.strip() for name in args.crawlers.split(',') if name.strip()]
+    unknown = [name for name in crawlers if name not in CRAWLERS]
+    if unknown:
+        parser.error(f"未知的爬取类型: {', '.join(unknown)}")
+
+    server = ReplayServer(args.pages, faults_from_args(args), args.seed)
+    set_upstream(start_replay_server(server))
+    global_cache.cache_dir = tempfile.mkdtemp(prefix='bench_cache_')
+    print(f"回放页面: {args.pages}，每种 {args.requests} 次，并发 {args.concurrency}，故障注入: {server.faults}")
+
+    asyncio.run(run_benchmark(args, crawlers))
+
+    print('回放服务统计:')
+    for kind, counts in sorted(server.stats.items()):
+        print(f"  {kind:<8} " + '  '.join(f'{outcome} {count}' for outcome, count in sorted(counts.items())))
+    missing = [kind for kind, counts in server.stats.items() if counts.get('missing')]
+    if missing:
+        print(f"缺少录制的页面: {', '.join(sorted(missing))}（先运行 python replay_server.py record）")
+    retries = {key: child[0] for key, child in CRAWL_RETRIES.children.items()}
+    if retries:
+        print('爬虫重试: ' + '  '.join(f'{source}/{exception} {count:.0f}' for (source, exception), count in sorted(retries.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+页面重跑延迟基准测试
+
+用streamlit run启动真实的页面服务（app_client.py），通过websocket模拟一个浏览器会话，所有网络请求通过
+CRAWLER_UPSTREAM指向离线回放服务（replay_server.py）。测量以下几种交互的重跑耗时：
+- 整页重跑：不在fragment中的交互（如日期选择、刷新）的开销
+- 卡片详情重跑：展开一张比赛卡片后，来回收起、展开该卡片（控件在卡片的详细数据fragment中）
+- 筛选重跑：切换侧边栏的“只显示竞彩赛事”（控件在侧边栏筛选fragment中，回调再重跑比赛列表fragment）
+
+每种交互前后读取服务的/metrics中各部分的执行次数（app_script_runs_total），确认没有重跑预期之外的部分：
+卡片详情重跑只执行该卡片的fragment，筛选重跑只执行侧边栏和比赛列表（以及列表中的卡片）。
+可以用 --app 指定旧版本的app.py（例如 git show <commit>:app.py > app_before.py）对比优化前后的耗时；
+没有导出执行次数的旧版本只报告耗时。页面需要先录制：python replay_server.py record --fid 1234567
+
+用法：python bench_rerun.py [--repeat 10] [--pages cache/replay] [--app app.py]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+from app_client import AppSession, StreamlitServer, fetch_counter, free_port
+from bench_crawlers import start_replay_server
+from metrics import METRICS_PORT_ENV
+from replay_server import DEFAULT_PAGES_DIR, ReplayServer
+from upstream import UPSTREAM_ENV
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 页面各部分的执行次数指标
+SCRIPT_RUNS_METRIC = 'app_script_runs_total'
+
+# 比赛卡片详细数据区域的expander的key前缀
+DETAIL_EXPANDER_PREFIX = 'detail_expander_'
+
+
+class RunCounter:
+    """读取页面服务中各部分（整页和各fragment）的执行次数，检查一组交互是否只重跑了预期的部分"""
+
+    def __init__(self, metrics_url):
+        self.metrics_url = metrics_url
+        self.before = {}
+        try:
+            self.available = bool(self.read())
+        except OSError:
+            # 旧版本的页面没有启动指标服务
+            self.available = False
+
+    def read(self):
+        return fetch_counter(self.metrics_url, SCRIPT_RUNS_METRIC)
+
+    def start(self):
+        if self.available:
+            self.before = self.read()
+
+    def check(self, name, expected):
+        """
+        :param expected: 部分 -> 预期的执行次数，没有列出的部分预期为0
+        """
+        if not self.available:
+            return
+        after = self.read()
+        actual = {part: int(after[part] - self.before.get(part, 0)) for part in after}
+        actual = {part: count for part, count in actual.items() if count}
+        expected = {part: count for part, count in expected.items() if count}
+        if actual != expected:
+            raise AssertionError(f'{name}执行了预期之外的部分：实际 {actual}，预期 {expected}')
+
+
+def detail_cards(session):
+    """当前页显示的比赛卡片数（每张卡片一个详细数据fragment）"""
+    return len(session.find_all(kind='expander', key_prefix=DETAIL_EXPANDER_PREFIX))
+
+
+async def bench_full(session, counter, repeat):
+    """整页重跑：不改变任何控件，直接重跑整个脚本"""
+    timings = []
+    cards = 0
+    counter.start()
+    for _ in range(repeat):
+        timings.append(await session.rerun())
+        cards += detail_cards(session)
+    counter.check('整页重跑', {'script': repeat, 'filter_sidebar': repeat, 'match_list': repeat, 'match_detail': cards})
+    return timings
+
+
+async def open_detail(session, counter):
+    """展开第一张比赛卡片（只重跑该卡片的fragment，首次展开会获取赔率、联赛和双方数据）"""
+    expander = session.find_all(kind='expander', key_prefix=DETAIL_EXPANDER_PREFIX)[0]
+    counter.start()
+    elapsed = await session.interact(expander, True)
+    counter.check('展开详细数据', {'match_detail': 1})
+    return expander.key, elapsed
+
+
+async def bench_card(session, counter, expander_key, repeat):
+    """卡片详情重跑：来回收起、展开同一张卡片，只统计展开（渲染五个标签页）的耗时"""
+    timings = []
+    counter.start()
+    for _ in range(repeat):
+        await session.interact(session.find(kind='expander', key=expander_key), False)
+        timings.append(await session.interact(session.find(kind='expander', key=expander_key), True))
+    counter.check('卡片详情重跑', {'match_detail': 2 * repeat})
+    return timings
+
+
+async def bench_filter(session, counter, repeat):
+    """筛选重跑：来回切换侧边栏的“只显示竞彩赛事”复选框"""
+    timings = []
+    cards = 0
+    counter.start()
+    for i in range(repeat):
+        checkbox = session.find(kind='checkbox', key='filter_jingcai')
+        timings.append(await session.interact(checkbox, i % 2 == 0))
+        cards += detail_cards(session)
+    counter.check('筛选重跑', {'filter_sidebar': repeat, 'match_list': repeat, 'match_detail': cards})
+    return timings
+
+
+def report(name, timings):
+    """打印一组耗时的中位数和p95"""
+    ordered = sorted(value * 1000 for value in timings)
+    p95 = ordered[min(len(ordered) - 1, int(round(len(ordered) * 0.95)) - 1)]
+    median = statistics.median(ordered)
+    print(f"{name:<12} 中位数 {median:8.1f} ms    p95 {p95:8.1f} ms    ({len(ordered)}次)")
+    return median
+
+
+async def run_benchmark(server, metrics_url, repeat, timeout):
+    async with AppSession(server.ws_url, timeout) as session:
+        # 打开页面：爬取即时比分和竞彩标识
+        await session.rerun()
+        if session.exceptions:
+            raise RuntimeError(f'页面出错: {session.exceptions[0]}')
+        if not detail_cards(session):
+            raise RuntimeError('页面上没有比赛，检查录制的即时比分页面')
+        counter = RunCounter(metrics_url)
+        if not counter.available:
+            print('服务没有导出页面执行次数，只报告耗时')
+
+        full = report('整页重跑', await bench_full(session, counter, repeat))
+
+        expander_key, elapsed = await open_detail(session, counter)
+        print(f"首次展开详细数据 {elapsed * 1000:8.1f} ms")
+        card = report('卡片详情重跑', await bench_card(session, counter, expander_key, repeat))
+        print(f"卡片详情重跑相对整页重跑: {full / card:.1f}x")
+
+        filtered = report('筛选重跑', await bench_filter(session, counter, repeat))
+        print(f"筛选重跑相对整页重跑: {full / filtered:.1f}x")
+        if counter.available:
+            print('执行次数检查通过：卡片和筛选交互没有重跑其他部分')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面重跑延迟基准测试（真实页面服务，离线回放）')
+    parser.add_argument('--repeat', type=int, default=10, help='每种交互的重复次数')
+    parser.add_argument('--app', default=os.path.join(BASE_DIR, 'app.py'), help='要测试的app.py路径')
+    parser.add_argument('--pages', default=DEFAULT_PAGES_DIR, help='录制页面目录')
+    parser.add_argument('--timeout', type=float, default=120, help='单次重跑的超时时间（秒）')
+    args = parser.parse_args()
+
+    upstream = start_replay_server(ReplayServer(os.path.abspath(args.pages)))
+    metrics_port = free_port()
+    # 临时工作目录：文件缓存、归档和赔率快照都从空开始
+    workdir = tempfile.mkdtemp(prefix='bench_rerun_')
+    env = {UPSTREAM_ENV: upstream, METRICS_PORT_ENV: str(metrics_port), 'CRAWL_EVENT_LOG': 'off'}
+    print(f"测试文件: {args.app}，回放页面: {args.pages}，重复: {args.repeat} 次")
+    try:
+        with StreamlitServer(args.app, workdir, env) as server:
+            try:
+                asyncio.run(run_benchmark(server, f'http://127.0.0.1:{metrics_port}/metrics', args.repeat, args.timeout))
+            except Exception:
+                print(server.log_tail(), file=sys.stderr)
+                raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,691 @@
+"""
+卡片模板模块 - 预编译比赛卡片、赔率、积分榜和战绩表格的HTML模板，并缓存渲染结果
+
+同一场比赛的比分、状态、赔率等输入不变时，重跑页面只需要一次字典查找即可拿到HTML，
+不再重复进行字符串拼接、箭头清理和盘口转换。
+比赛卡片以全部输入（几个简单值）为键；详细数据（赔率、积分榜、历史交战、近期战绩）以比赛fid等为键，
+以数据对象本身为版本：各存储更新数据时都换成新对象、不会原地修改，所以判断是否命中只需要比较对象是否相同，
+不需要序列化或哈希整份数据。
+"""
+import re
+import threading
+from collections import OrderedDict
+from string import Template
+
+
+# 亚盘汉字到数字的映射
+def hanzi_to_handicap(hanzi_str):
+    # 移除升降二字
+    clean_hanzi = hanzi_str.replace('升', '').replace('降', '').strip()
+
+    # 扩展到10球的亚盘汉字到数字的映射
+    hanzi_map = {
+        # 基础盘口
+        '平手': 0,
+        '平半': 0.25,
+        '半球': 0.5,
+        '半/一': 0.75,
+        '一球': 1,
+        '一/球半': 1.25,
+        '球半': 1.5,
+        '球半/两': 1.75,
+        '两球': 2,
+        '两球/两球半': 2.25,
+        '两球半': 2.5,
+        '两球半/三': 2.75,
+        '三球': 3,
+        '三球/三球半': 3.25,
+        '三球半': 3.5,
+        '三球半/四': 3.75,
+        '四球': 4,
+        '四球/四球半': 4.25,
+        '四球半': 4.5,
+        '四球半/五': 4.75,
+        '五球': 5,
+        '五球/五球半': 5.25,
+        '五球半': 5.5,
+        '五球半/六': 5.75,
+        '六球': 6,
+        '六球/六球半': 6.25,
+        '六球半': 6.5,
+        '六球半/七': 6.75,
+        '七球': 7,
+        '七球/七球半': 7.25,
+        '七球半': 7.5,
+        '七球半/八': 7.75,
+        '八球': 8,
+        '八球/八球半': 8.25,
+        '八球半': 8.5,
+        '八球半/九': 8.75,
+        '九球': 9,
+        '九球/九球半': 9.25,
+        '九球半': 9.5,
+        '九球半/十': 9.75,
+        '十球': 10,
+        # 完整写法
+        '平手/半球': 0.25,
+        '半球/一球': 0.75,
+        '一球/球半': 1.25,
+        '球半/两球': 1.75,
+        '两球/两球半': 2.25,
+        '两球半/三球': 2.75,
+        '三球/三球半': 3.25,
+        '三球半/四球': 3.75,
+        '四球/四球半': 4.25,
+        '四球半/五球': 4.75,
+        '五球/五球半': 5.25,
+        '五球半/六球': 5.75,
+        '六球/六球半': 6.25,
+        '六球半/七球': 6.75,
+        '七球/七球半': 7.25,
+        '七球半/八球': 7.75,
+        '八球/八球半': 8.25,
+        '八球半/九球': 8.75,
+        '九球/九球半': 9.25,
+        '九球半/十球': 9.75,
+        # 简化写法
+        '半一': 0.75,
+        '一/半': 1.25,
+        '球/半': 1.5,
+        '两/两球半': 2.25,
+        '两球半/三': 2.75,
+        '三/三球半': 3.25,
+        '三球半/四': 3.75,
+        '四/四球半': 4.25,
+        '四球半/五': 4.75,
+        '五/五球半': 5.25,
+        '五球半/六': 5.75,
+        '六/六球半': 6.25,
+        '六球半/七': 6.75,
+        '七/七球半': 7.25,
+        '七球半/八': 7.75,
+        '八/八球半': 8.25,
+        '八球半/九': 8.75,
+        '九/九球半': 9.25,
+        '九球半/十': 9.75
+    }
+
+    # 处理受字情况
+    is_negative = False  # 默认主队减号
+    if '受' in clean_hanzi:
+        is_negative = True
+        # 移除受字
+        clean_hanzi = clean_hanzi.replace('受', '').strip()
+
+    # 获取数字盘口
+    if clean_hanzi in hanzi_map:
+        handicap_value = hanzi_map[clean_hanzi]
+        # 应用符号：有受字是主队加号（正数），没有受字是主队减号（负数）
+        return f"{'+' if is_negative else '-'}{handicap_value}"
+    return hanzi_str
+
+
+# 盘口转换函数：处理数字盘口和汉字盘口，删除所有箭头
+def convert_handicap(handicap_str):
+    if not handicap_str:
+        return handicap_str
+    try:
+        # 移除箭头符号（↑或↓）
+        clean_handicap = handicap_str.replace('↑', '').replace('↓', '').strip()
+
+        # 检查是否为汉字盘口
+        if any(hanzi in clean_handicap for hanzi in ['平手', '平半', '半球', '半/一', '一球', '一/球半', '球半', '两球', '受']):
+            return hanzi_to_handicap(clean_handicap)
+
+        # 处理数字盘口（如1.5/2）
+        if '/' in clean_handicap:
+            parts = clean_handicap.split('/')
+            if len(parts) == 2:
+                value1 = float(parts[0])
+                value2 = float(parts[1])
+                avg = (value1 + value2) / 2
+                return str(avg)
+
+        return clean_handicap
+    except (ValueError, TypeError):
+        return handicap_str
+
+
+# 辅助函数：移除字符串中的箭头符号
+def remove_arrows(text):
+    if not text:
+        return text
+    return text.replace('↑', '').replace('↓', '').strip()
+
+
+# ---------------------------------------------------------------------------
+# 预编译的HTML模板（模块加载时编译一次，渲染时只做占位符替换）
+# ---------------------------------------------------------------------------
+
+# 比赛卡片主体
+CARD_TEMPLATE = Template(
+    '<div class="match-card-inner">'
+    '<div class="header-info">'
+    '<div style="display:flex;gap:8px;align-items:center;">'
+    '<div class="match-league" style="background-color:${league_color};color:white;padding:2px 8px;border-radius:4px;">${league}</div>'
+    '${jingcai_badge}'
+    '</div>'
+    '<div class="match-time">${round} | ${time}</div>'
+    '</div>'
+    '<div style="display:flex;justify-content:space-between;align-items:center;">'
+    '<div style="display:flex;flex-direction:column;align-items:center;gap:4px;flex:1;min-width:120px;">'
+    '${home_logo}'
+    '<div class="team-name" style="text-align:center;font-size:0.9rem;">${home_team}</div>'
+    '</div>'
+    '<div style="text-align:center;flex:0 0 auto;width:100px;">'
+    '<div class="match-score">${score}</div>'
+    '${half_score}'
+    '<div class="match-status">${match_status}</div>'
+    '</div>'
+    '<div style="display:flex;flex-direction:column;align-items:center;gap:4px;flex:1;min-width:120px;">'
+    '${away_logo}'
+    '<div class="team-name" style="text-align:center;font-size:0.9rem;">${away_team}</div>'
+    '</div>'
+    '</div>'
+    '</div>'
+)
+
+HALF_SCORE_TEMPLATE = Template('<div style="font-size:0.75em;color:#64748b;">(${half_score})</div>')
+
+TEAM_LOGO_TEMPLATE = Template(
+    '<img src="https://odds.500.com/static/soccerdata/images/TeamPic/teamsignnew_${team_id}.png" '
+    'alt="${team_name}" width="48" height="48" style="border-radius:50%;" />'
+)
+
+# 赔率表格（欧赔、亚盘、大小球共用）
+ODDS_TABLE_TEMPLATE = Template(
+    "<div class='odds-title'>${title}</div>"
+    "<table class='odds-table'><tr><th>公司</th><th colspan='3'>初盘</th><th colspan='3'>即时盘</th></tr>"
+    "${rows}"
+    "</table>"
+)
+
+ODDS_ROW_TEMPLATE = Template(
+    "<tr class='odds-row'>"
+    "<td class='company-name'>${company}</td>"
+    "<td>${initial_0}</td><td>${initial_1}</td><td>${initial_2}</td>"
+    "<td>${instant_0}</td><td>${instant_1}</td><td>${instant_2}</td>"
+    "</tr>"
+)
+
+NO_ODDS_HTML = "<p style='color:#64748b;font-size:0.85em;'>暂无赔率数据</p>"
+
+# 联赛积分榜
+LEAGUE_STANDINGS_TEMPLATE = Template("""
+<div style='overflow-x: auto;'>
+    <table style='border-collapse: collapse; width: 100%; font-size: 14px; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
+        <thead style='background-color: #f0f2f6;'>
+            <tr>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>排名</th>
+                <th style='padding: 12px 8px; text-align: left; border-bottom: 2px solid #e6e8eb;'>队伍</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>赛</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>胜</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>平</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>负</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>积分</th>
+            </tr>
+        </thead>
+        <tbody>
+${rows}
+        </tbody>
+    </table>
+</div>
+""")
+
+LEAGUE_STANDINGS_ROW_TEMPLATE = Template("""
+            <tr style='background-color: ${bg_color}; transition: background-color 0.2s ease;'>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; font-weight: bold;'>${rank}</td>
+                <td style='padding: 10px 8px; text-align: left; border-bottom: 1px solid #e6e8eb; ${team_style}'>${team_name}${team_label}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${matches}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #28a745;'>${wins}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #ffc107;'>${draws}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #dc3545;'>${losses}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; font-weight: bold; color: #17a2b8;'>${points}</td>
+            </tr>""")
+
+# 赛前积分排名（双方数据标签页）
+PRE_MATCH_STANDINGS_TEMPLATE = Template("""
+<div style='overflow-x: auto;'>
+    <table style='border-collapse: collapse; width: 100%; font-size: 14px; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
+        <thead style='background-color: #f0f2f6;'>
+            <tr>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 150px;'>球队</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>比赛</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>胜</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>平</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>负</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>进</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>失</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 50px;'>净</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>积分</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>排名</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 70px;'>胜率</th>
+            </tr>
+        </thead>
+        <tbody>
+${rows}
+        </tbody>
+    </table>
+</div>
+""")
+
+PRE_MATCH_TEAM_ROW_TEMPLATE = Template("""
+            <tr style='background-color: ${bg_color}; transition: background-color 0.2s ease;'>
+                <td style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; font-weight: bold; font-size: 16px; color: ${color};' colspan='11'>${name} [${rank}]</td>
+            </tr>""")
+
+PRE_MATCH_STATS_ROW_TEMPLATE = Template("""
+            <tr style='background-color: ${bg_color}; transition: background-color 0.2s ease;'>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; font-weight: bold;'>${stats_type}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${matches}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #28a745;'>${wins}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #ffc107;'>${draws}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; color: #dc3545;'>${losses}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${goals_for}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${goals_against}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${goal_diff}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb; font-weight: bold;'>${points}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${rank}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${win_rate}</td>
+            </tr>""")
+
+
+# 比分高亮（历史交战和近期战绩表格）
+SCORE_PATTERN = re.compile(r'(\d+:\d+)')
+SCORE_HIGHLIGHT = r'<span style="color: #ef4444; font-weight: bold; font-size: 1.1em;">\1</span>'
+
+# 历史交战记录（双方数据标签页）
+HEAD_TO_HEAD_TEMPLATE = Template("""
+<div style='overflow-x: auto;'>
+    <table style='border-collapse: collapse; width: 100%; font-size: 14px; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
+        <thead style='background-color: #f0f2f6;'>
+            <tr>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 80px;'>赛事</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 100px;'>比赛日期</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 200px;'>对阵</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>半场</th>
+                <th style='padding: 12px 8px; text-align: center; border-bottom: 2px solid #e6e8eb; width: 60px;'>赛果</th>
+            </tr>
+        </thead>
+        <tbody>
+${rows}
+        </tbody>
+    </table>
+</div>
+""")
+
+HEAD_TO_HEAD_ROW_TEMPLATE = Template("""
+            <tr style='background-color: ${bg_color}; transition: background-color 0.2s ease;'>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${league}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${date}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${teams}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${half_score}</td>
+                <td style='padding: 10px 8px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${result}</td>
+            </tr>""")
+
+# 近期战绩（不区分主客场的主客队战绩，以及双方的主场、客场战绩）
+RECENT_RECORDS_TEMPLATE = Template("""
+<div style='overflow-x: auto;${margin}'>
+    <table style='border-collapse: collapse; width: 100%; font-size: 12px; background-color: white; border-radius: 6px; overflow: hidden; box-shadow: 0 1px 4px rgba(0,0,0,0.1);'>
+        <thead style='background-color: #f0f2f6;'>
+            <tr>
+                <th style='padding: 8px 4px; text-align: center; border-bottom: 2px solid #e6e8eb;'>赛事</th>
+                <th style='padding: 8px 4px; text-align: center; border-bottom: 2px solid #e6e8eb;'>日期</th>
+                <th style='padding: 8px 4px; text-align: center; border-bottom: 2px solid #e6e8eb;'>对阵</th>
+                <th style='padding: 8px 4px; text-align: center; border-bottom: 2px solid #e6e8eb;'>半场</th>
+                <th style='padding: 8px 4px; text-align: center; border-bottom: 2px solid #e6e8eb;'>赛果</th>
+            </tr>
+        </thead>
+        <tbody>
+${rows}
+        </tbody>
+    </table>
+</div>
+""")
+
+RECENT_RECORDS_ROW_TEMPLATE = Template("""
+            <tr style='background-color: ${bg_color};'>
+                <td style='padding: 6px 4px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${league}</td>
+                <td style='padding: 6px 4px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${date}</td>
+                <td style='padding: 6px 4px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${teams}</td>
+                <td style='padding: 6px 4px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${half_score}</td>
+                <td style='padding: 6px 4px; text-align: center; border-bottom: 1px solid #e6e8eb;'>${result}</td>
+            </tr>""")
+
+NO_RECENT_RECORDS_TEMPLATE = Template("<div style='text-align: center; padding: 20px;'>${team_label}暂无近期战绩数据</div>")
+
+
+# ---------------------------------------------------------------------------
+# 渲染结果缓存
+# ---------------------------------------------------------------------------
+
+class HTMLCache:
+    """HTML渲染结果缓存：以模板类型和调用方给出的键（输入的简单值或比赛fid等）为键，超过容量时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size=2000):
+        """
+        初始化缓存
+        :param max_size: 最多缓存的HTML片段数量
+        """
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, kind, key, inputs, render_func, source=None):
+        """
+        获取缓存的HTML，未命中时调用render_func(inputs)渲染并写入缓存
+        :param kind: 模板类型，如card、odds
+        :param key: 缓存键，必须可哈希：比赛卡片为全部输入的元组，详细数据为比赛fid等（同一个键只保留最近一次的结果）
+        :param inputs: 渲染所需的全部输入
+        :param render_func: 渲染函数
+        :param source: 渲染所用的数据对象，作为数据的版本：缓存的结果只有在数据还是同一个对象时才使用；
+                       为None时键本身包含了全部输入
+        :return: HTML字符串
+        """
+        key = (kind, key)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] is source:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        html = render_func(inputs)
+
+        with self.lock:
+            self.cache[key] = (source, html)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return html
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """获取缓存统计信息"""
+        with self.lock:
+            return {'size': len(self.cache), 'hits': self.hits, 'misses': self.misses}
+
+
+# 创建全局HTML缓存实例
+global_html_cache = HTMLCache()
+
+
+# ---------------------------------------------------------------------------
+# 渲染函数
+# ---------------------------------------------------------------------------
+
+def _build_card_html(inputs):
+    """根据比赛数据生成卡片HTML"""
+    # 确保未来赛事和历史赛事使用相同的UI结构
+    # 检查数据是否存在问题，进行特殊处理
+    home_team = inputs['home_team']
+    away_team = inputs['away_team']
+    score = inputs['score']
+    match_status = inputs['match_status']
+
+    # 特殊处理：如果主队和客队显示有问题，尝试从属性中提取
+    if (not home_team or home_team == '-') and (not away_team or away_team == '-'):
+        # 检查score字段是否包含球队名称（错误地将主队映射到了比分字段）
+        if 'U15' in str(score) or '[' in str(score):
+            home_team = str(score)
+            score = ''
+
+        # 检查match_status字段是否包含球队名称（错误地将客队映射到了比赛状态字段）
+        if 'U15' in str(match_status) or '[' in str(match_status):
+            away_team = str(match_status)
+            match_status = ''
+
+    # 清理球队名称
+    home_team = re.sub(r'\[[^\]]+\]', '', str(home_team)).strip()
+    away_team = re.sub(r'\[[^\]]+\]', '', str(away_team)).strip()
+
+    # 只使用已有的球队ID来显示logo
+    home_logo = TEAM_LOGO_TEMPLATE.substitute(team_id=inputs['home_team_id'], team_name=home_team) if inputs['home_team_id'] else ''
+    away_logo = TEAM_LOGO_TEMPLATE.substitute(team_id=inputs['away_team_id'], team_name=away_team) if inputs['away_team_id'] else ''
+    half_score = HALF_SCORE_TEMPLATE.substitute(half_score=inputs['half_score']) if inputs['half_score'] else ''
+
+    return CARD_TEMPLATE.substitute(
+        league_color=inputs['league_color'],
+        league=inputs['league'],
+        jingcai_badge=inputs['jingcai_badge'],
+        round=inputs['round'],
+        time=inputs['time'],
+        home_logo=home_logo,
+        home_team=home_team,
+        score=score,
+        half_score=half_score,
+        match_status=match_status,
+        away_logo=away_logo,
+        away_team=away_team
+    )
+
+
+def render_card_html(row, match_status, jingcai_badge=''):
+    """
+    获取比赛卡片HTML，比分、状态等输入未变化时直接返回缓存结果
+    :param row: 比赛数据（字典或DataFrame行）
+    :param match_status: 显示用的比赛状态
+    :param jingcai_badge: 竞彩标识徽章HTML
+    :return: 卡片HTML
+    """
+    inputs = {
+        'league': row['league'],
+        'league_color': row['league_color'],
+        'round': row['round'],
+        'time': row['time'],
+        'home_team': row['home_team'],
+        'home_team_id': row['home_team_id'],
+        'away_team': row['away_team'],
+        'away_team_id': row['away_team_id'],
+        'score': row['score'],
+        'half_score': row['half_score'],
+        'match_status': match_status,
+        'jingcai_badge': jingcai_badge
+    }
+    # 字典按固定顺序构建，值的元组就能唯一表示全部输入
+    return global_html_cache.get_or_render('card', tuple(inputs.values()), inputs, _build_card_html)
+
+
+def _build_odds_table(title, odds, convert_middle):
+    """生成一种赔率的表格，convert_middle为True时中间一列按盘口转换"""
+    rows = []
+    for company, data in odds.items():
+        initial_1 = convert_handicap(data['initial'][1]) if convert_middle else remove_arrows(data['initial'][1])
+        instant_1 = convert_handicap(data['instant'][1]) if convert_middle else remove_arrows(data['instant'][1])
+        rows.append(ODDS_ROW_TEMPLATE.substitute(
+            company=company,
+            initial_0=remove_arrows(data['initial'][0]),
+            initial_1=initial_1,
+            initial_2=remove_arrows(data['initial'][2]),
+            instant_0=remove_arrows(data['instant'][0]),
+            instant_1=instant_1,
+            instant_2=remove_arrows(data['instant'][2])
+        ))
+    return ODDS_TABLE_TEMPLATE.substitute(title=title, rows=''.join(rows))
+
+
+def _build_odds_html(odds):
+    """根据赔率数据生成欧赔、亚盘和大小球表格HTML"""
+    tables = []
+    # 欧赔数据
+    if odds.get('oupei'):
+        tables.append(_build_odds_table('欧赔数据', odds['oupei'], False))
+    # 亚盘数据（盘口需要转换）
+    if odds.get('yapan'):
+        tables.append(_build_odds_table('亚盘数据', odds['yapan'], True))
+    # 大小球数据（盘口需要转换）
+    if odds.get('daxiao'):
+        tables.append(_build_odds_table('大小球数据', odds['daxiao'], True))
+    return '<br>'.join(tables) or NO_ODDS_HTML
+
+
+def render_odds_html(fid, odds):
+    """
+    获取赔率表格HTML，赔率数据未变化时直接返回缓存结果
+    :param fid: 比赛fid
+    :param odds: fetch_all_odds_data返回的赔率数据，可以为None
+    :return: 赔率HTML
+    """
+    if not odds:
+        return NO_ODDS_HTML
+    return global_html_cache.get_or_render('odds', fid, odds, _build_odds_html, source=odds)
+
+
+def _build_league_standings_html(inputs):
+    """生成联赛积分榜HTML，主客队所在行高亮显示"""
+    rows = []
+    for i, team in enumerate(inputs['standings']):
+        # 交替行背景色
+        bg_color = '#ffffff' if i % 2 == 0 else '#fafbfc'
+
+        # 从队伍链接中提取球队id
+        team_id = None
+        if 'team/' in team['team']['link']:
+            team_id_match = re.search(r'/team/(\d+)/', team['team']['link'])
+            if team_id_match:
+                team_id = team_id_match.group(1)
+
+        # 设置球队标签
+        team_label = ''
+        team_style = 'color: #1f77b4;'
+        if team_id:
+            if team_id == inputs['home_team_id']:
+                team_label = ' 🟢主队'
+                team_style = 'color: #28a745; font-weight: bold; background-color: #d4edda;'
+            elif team_id == inputs['away_team_id']:
+                team_label = ' 🔴客队'
+                team_style = 'color: #dc3545; font-weight: bold; background-color: #f8d7da;'
+
+        rows.append(LEAGUE_STANDINGS_ROW_TEMPLATE.substitute(
+            bg_color=bg_color,
+            rank=team['rank'],
+            team_style=team_style,
+            team_name=team['team']['name'],
+            team_label=team_label,
+            matches=team['matches'],
+            wins=team['wins'],
+            draws=team['draws'],
+            losses=team['losses'],
+            points=team['points']
+        ))
+    return LEAGUE_STANDINGS_TEMPLATE.substitute(rows=''.join(rows))
+
+
+def render_league_standings_html(sid, standings, home_team_id=None, away_team_id=None):
+    """
+    获取联赛积分榜HTML，积分榜和主客队未变化时直接返回缓存结果
+    :param sid: 联赛ID
+    :param standings: get_league_data返回的积分榜列表
+    :param home_team_id: 主队ID（用于高亮）
+    :param away_team_id: 客队ID（用于高亮）
+    :return: 积分榜HTML
+    """
+    inputs = {'standings': standings, 'home_team_id': home_team_id, 'away_team_id': away_team_id}
+    return global_html_cache.get_or_render('league_standings', (sid, home_team_id, away_team_id), inputs,
+                                           _build_league_standings_html, source=standings)
+
+
+def _build_pre_match_standings_html(pre_match):
+    """生成赛前积分排名HTML：每支球队一行标题，加总成绩、主场、客场三行数据"""
+    rows = []
+    for team_key, title_bg, title_color in (('team_a', '#e8f5e8', '#28a745'), ('team_b', '#e3f2fd', '#007bff')):
+        team = pre_match[team_key]
+        rows.append(PRE_MATCH_TEAM_ROW_TEMPLATE.substitute(
+            bg_color=title_bg, color=title_color, name=team['name'], rank=team['rank']))
+        for stats_type, bg_color in (('总成绩', '#ffffff'), ('主场', '#fafbfc'), ('客场', '#ffffff')):
+            stats = team['stats'].get(stats_type, {})
+            rows.append(PRE_MATCH_STATS_ROW_TEMPLATE.substitute(
+                bg_color=bg_color,
+                stats_type=stats_type,
+                matches=stats.get('比赛', ''),
+                wins=stats.get('胜', ''),
+                draws=stats.get('平', ''),
+                losses=stats.get('负', ''),
+                goals_for=stats.get('进', ''),
+                goals_against=stats.get('失', ''),
+                goal_diff=stats.get('净', ''),
+                points=stats.get('积分', ''),
+                rank=stats.get('排名', ''),
+                win_rate=stats.get('胜率', '')
+            ))
+    return PRE_MATCH_STANDINGS_TEMPLATE.substitute(rows=''.join(rows))
+
+
+def render_pre_match_standings_html(fid, pre_match):
+    """
+    获取赛前积分排名HTML，数据未变化时直接返回缓存结果
+    :param fid: 比赛fid
+    :param pre_match: fetch_match_history返回的pre_match_standings
+    :return: 积分排名HTML
+    """
+    return global_html_cache.get_or_render('pre_match_standings', fid, pre_match, _build_pre_match_standings_html,
+                                           source=pre_match)
+
+
+def _build_head_to_head_html(matches):
+    """生成历史交战记录表格HTML，对阵中的全场比分标红"""
+    rows = []
+    for i, match in enumerate(matches):
+        rows.append(HEAD_TO_HEAD_ROW_TEMPLATE.substitute(
+            # 交替行背景色
+            bg_color='#ffffff' if i % 2 == 0 else '#fafbfc',
+            league=match['league'],
+            date=match['date'],
+            teams=SCORE_PATTERN.sub(rf' {SCORE_HIGHLIGHT} ', match['teams']),
+            half_score=match['half_score'],
+            result=match['result']
+        ))
+    return HEAD_TO_HEAD_TEMPLATE.substitute(rows=''.join(rows))
+
+
+def render_head_to_head_html(fid, matches):
+    """
+    获取历史交战记录表格HTML，数据未变化时直接返回缓存结果
+    :param fid: 比赛fid
+    :param matches: 历史数据中的matches列表
+    :return: 表格HTML
+    """
+    return global_html_cache.get_or_render('head_to_head', fid, matches, _build_head_to_head_html, source=matches)
+
+
+def _build_recent_records_html(inputs):
+    """生成近期战绩表格HTML，对阵和半场中的比分标红；没有战绩时显示提示"""
+    records = inputs['records']
+    if not records:
+        return NO_RECENT_RECORDS_TEMPLATE.substitute(team_label=inputs['team_label'])
+    rows = []
+    for i, record in enumerate(records):
+        rows.append(RECENT_RECORDS_ROW_TEMPLATE.substitute(
+            bg_color='#ffffff' if i % 2 == 0 else '#fafbfc',
+            league=record['league'],
+            date=record['date'],
+            teams=SCORE_PATTERN.sub(SCORE_HIGHLIGHT, record['teams']),
+            half_score=SCORE_PATTERN.sub(SCORE_HIGHLIGHT, record['half_score']),
+            result=record['result']
+        ))
+    return RECENT_RECORDS_TEMPLATE.substitute(margin=' margin-bottom: 15px;' if inputs['spaced'] else '',
+                                              rows=''.join(rows))
+
+
+def render_recent_records_html(fid, part, records, team_label='', spaced=True):
+    """
+    获取近期战绩表格HTML，数据未变化时直接返回缓存结果
+    :param fid: 比赛fid
+    :param part: 哪一份战绩，如home、away、team_a_home（同一场比赛的几份战绩分别缓存）
+    :param records: 战绩列表
+    :param team_label: 没有战绩时提示中的球队（主队、客队）
+    :param spaced: 表格下方是否留出间距（同一列中后面还有表格时）
+    :return: 表格HTML
+    """
+    inputs = {'records': records, 'team_label': team_label, 'spaced': spaced}
+    return global_html_cache.get_or_render('recent_records', (fid, part), inputs, _build_recent_records_html,
+                                           source=records)
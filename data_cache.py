@@ -6,6 +6,12 @@ import json
 import os
 from typing import Dict, Any, Optional
 
+from logger import get_logger
+from metrics import observe_cache
+from profiler import CACHE, timed
+
+log = get_logger(__name__)
+
 class DataCache:
     def __init__(self, cache_dir: str = "cache"):
         self.cache_dir = cache_dir
@@ -30,22 +36,27 @@ class DataCache:
         file_age = time.time() - os.path.getmtime(cache_path)
         return file_age < self.cache_duration
     
+    @timed(CACHE, '读取缓存')
     def get(self, cache_key: str) -> Optional[Any]:
         """从缓存获取数据"""
         cache_path = self._get_cache_path(cache_key)
         
         if not self._is_cache_valid(cache_path):
+            observe_cache('file', False)
             return None
         
         try:
             with open(cache_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                print(f"从缓存加载数据: {cache_key}")
+                observe_cache('file', True)
+                log.debug('从缓存加载数据', key=cache_key)
                 return data
         except (IOError, json.JSONDecodeError) as e:
-            print(f"缓存读取失败: {e}")
+            observe_cache('file', False)
+            log.warning('缓存读取失败', key=cache_key, error=e)
             return None
     
+    @timed(CACHE, '写入缓存')
     def set(self, cache_key: str, data: Any) -> None:
         """保存数据到缓存"""
         cache_path = self._get_cache_path(cache_key)
@@ -53,9 +64,9 @@ class DataCache:
         try:
             with open(cache_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
-                print(f"数据已缓存: {cache_key}")
+                log.debug('数据已缓存', key=cache_key)
         except (IOError, TypeError) as e:
-            print(f"缓存保存失败: {e}")
+            log.warning('缓存保存失败', key=cache_key, error=e)
     
     def clear(self) -> None:
         """清空所有缓存"""
@@ -63,9 +74,9 @@ class DataCache:
             for filename in os.listdir(self.cache_dir):
                 if filename.endswith('.json'):
                     os.remove(os.path.join(self.cache_dir, filename))
-            print("缓存已清空")
+            log.info('缓存已清空')
         except IOError as e:
-            print(f"清空缓存失败: {e}")
+            log.error('清空缓存失败', error=e)
     
     def clear_old_cache(self) -> None:
         """清理过期缓存"""
@@ -76,9 +87,9 @@ class DataCache:
                     cache_path = os.path.join(self.cache_dir, filename)
                     if current_time - os.path.getmtime(cache_path) > self.cache_duration:
                         os.remove(cache_path)
-                        print(f"清理过期缓存: {filename}")
+                        log.debug('清理过期缓存', file=filename)
         except IOError as e:
-            print(f"清理缓存失败: {e}")
+            log.error('清理缓存失败', error=e)
 
 # 全局缓存实例
 global_cache = DataCache()
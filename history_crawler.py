@@ -5,6 +5,10 @@ import re
 import time
 import traceback
 from data_cache import global_cache, get_cache_key
+from logger import get_logger, log_crawl
+from metrics import PARSE_DURATION, observe_retry, track_request
+from profiler import NETWORK, PARSE, add_bytes, timed
+from upstream import site_url
 
 # 配置参数
 MAX_RETRIES = 8
@@ -20,10 +24,14 @@ user_agents = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 ]
 
+log = get_logger(__name__)
+
+@timed(NETWORK, '请求')
 def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECONDS, timeout=15):
     """
     带有重试机制的同步请求函数，优化生产环境部署。
     """
+    started = time.perf_counter()
     for attempt in range(retries):
         try:
             # 使用随机User-Agent和更完善的请求头
@@ -57,8 +65,12 @@ def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECOND
                 verify = False
                 timeout = 15
                 
-            response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
-            response.raise_for_status()
+            with track_request('history', url) as tracked:
+                response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
+                response.raise_for_status()
+                tracked.add_bytes(len(response.content))
+            add_bytes(len(response.content))
+            log_crawl('history', url, started, True, len(response.content), attempt + 1, status=response.status_code)
             
             # 处理编码问题
             try:
@@ -72,46 +84,69 @@ def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECOND
             
         except requests.exceptions.SSLError as e:
             if attempt < retries - 1:
-                print(f"SSL错误 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('history', 'SSLError')
+                log.warning('SSL错误，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay * 2, error=e)
                 time.sleep(delay * 2)  # SSL错误时延长等待时间
             else:
-                print(f"SSL连接失败: {str(e)}")
+                log.error('SSL连接失败', url=url, error=e)
+                log_crawl('history', url, started, False, attempts=retries, error=e)
                 return None
         except requests.exceptions.Timeout as e:
             if attempt < retries - 1:
-                print(f"请求超时 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('history', 'Timeout')
+                log.warning('请求超时，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay, error=e)
                 time.sleep(delay)
             else:
-                print(f"请求超时: {str(e)}")
+                log.error('请求超时', url=url, error=e)
+                log_crawl('history', url, started, False, attempts=retries, error=e)
                 return None
         except requests.RequestException as e:
             if attempt < retries - 1:
-                print(f"请求失败 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('history', 'RequestException')
+                log.warning('请求失败，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay, error=e)
                 time.sleep(delay + random.uniform(0, 1))  # 添加随机延迟
             else:
-                print(f"所有尝试都失败: {str(e)}")
+                log.error('所有尝试都失败', url=url, error=e)
+                log_crawl('history', url, started, False, attempts=retries, error=e)
     return None
 
-def fetch_match_history(fid):
-    """根据比赛ID抓取双方历史交战记录，带缓存机制"""
+def has_history_data(history_data):
+    """
+    判断双方数据是否获取成功：请求失败或页面暂无数据时fetch_match_history返回字段齐全的空结构，
+    其中没有历史交战记录，也没有任何近期战绩
+    """
+    if not history_data:
+        return False
+    home_away = history_data.get('recent_records_home_away') or {}
+    return bool(history_data.get('matches') or history_data.get('recent_records_all') or any(home_away.values()))
+
+
+@timed(PARSE, '解析双方数据')
+def fetch_match_history(fid, retries=MAX_RETRIES, delay=True):
+    """
+    根据比赛ID抓取双方历史交战记录，带缓存机制
+    :param retries: 请求的最多尝试次数
+    :param delay: 是否在请求前随机等待（防封IP，批量回填时由调用方控制请求速率）
+    """
     # 检查缓存
     cache_key = get_cache_key("history", fid)
     cached_data = global_cache.get(cache_key)
     if cached_data:
         return cached_data
     
-    url = f'https://odds.500.com/fenxi/shuju-{fid}.shtml'
+    url = site_url(f'https://odds.500.com/fenxi/shuju-{fid}.shtml')
     
-    print(f"开始获取双方数据: URL={url}, ID={fid}")
+    log.debug('开始获取双方数据', url=url, fid=fid)
     
     # 防封IP处理：添加随机延迟
-    time.sleep(random.uniform(0.3, 1.0))
+    if delay:
+        time.sleep(random.uniform(0.3, 1.0))
     
     # 发送请求
-    html = make_request_with_retries(url, timeout=20)
+    html = make_request_with_retries(url, retries, timeout=20)
     
     if not html:
-        print(f"获取双方数据失败: 所有请求尝试都失败, URL={url}")
+        log.error('获取双方数据失败', url=url, fid=fid)
         # 返回空数据结构
         return {
             'match_info': '',
@@ -169,16 +204,18 @@ def fetch_match_history(fid):
             }
         }
     
-    print(f"请求成功: URL={url}")
-    print(f"HTML解析成功: URL={url}")
-        
+    with PARSE_DURATION.time(parser='history'):
+        return parse_match_history(html, url, cache_key)
+
+
+def parse_match_history(html, url, cache_key):
+    """解析双方数据页面（历史交战、平均数据、近期战绩、赛前积分排名），结果写入缓存"""
     # 解析HTML
     soup = BeautifulSoup(html, 'html.parser')
-    print(f"HTML解析成功: URL={url}")
             
     # 检查页面是否返回"暂无该场比赛的数据"
     if "暂无该场比赛的数据" in html:
-        print(f"页面返回暂无数据: {url}")
+        log.info('页面返回暂无数据', url=url)
         # 返回空数据结构
         return {
             'match_info': '',
@@ -299,7 +336,7 @@ def fetch_match_history(fid):
         # 尝试查找其他可能的两队交战史区域
         team_jiaozhan = soup.find('div', class_='history')
         if not team_jiaozhan:
-            print(f"未找到两队交战史区域: {url}")
+            log.warning('未找到两队交战史区域', url=url)
             # 即使是空数据也缓存，避免重复请求
             global_cache.set(cache_key, history_data)
             return history_data
@@ -320,7 +357,7 @@ def fetch_match_history(fid):
         # 尝试查找其他可能的表格
         table = team_jiaozhan.find('table')
         if not table:
-            print(f"未找到历史比赛表格: {url}")
+            log.warning('未找到历史比赛表格', url=url)
             # 不提前返回，继续解析其他数据
                 
     if table:
@@ -329,7 +366,7 @@ def fetch_match_history(fid):
             tbody = table  # 有些表格可能没有tbody
                     
         rows = tbody.find_all('tr')
-        print(f"找到{len(rows)}行数据")
+        log.debug('找到交战史表格', url=url, rows=len(rows))
                     
         for row in rows:
             # 提取所有单元格，包括th和td
@@ -345,7 +382,7 @@ def fetch_match_history(fid):
                         
             # 确保至少有5个单元格
             if len(cells) < 5:
-                print(f"行数据不足5个单元格: {len(cells)}个")
+                log.debug('交战史行数据不足5个单元格', url=url, cells=len(cells))
                 continue
                         
             # 提取赛事信息
@@ -409,10 +446,10 @@ def fetch_match_history(fid):
             }
                         
             history_data['matches'].append(match_data)
-            print(f"添加了一场比赛数据: {match_data['teams']}")
+            log.debug('添加交战史比赛', teams=match_data['teams'])
                 
     # 提取平均数据
-    print(f"开始提取平均数据: {url}")
+    log.debug('开始提取平均数据', url=url)
                 
     # 查找平均数据区域
     integral_div = None
@@ -423,13 +460,13 @@ def fetch_match_history(fid):
         h4 = div.find('h4')
         if h4 and '平均数据' in h4.text:
             integral_div = div
-            print(f"通过包含平均数据标题的h4找到div")
+            log.debug('通过h4标题找到平均数据区域')
             # 向上查找父级M_box div
             parent = div.parent
             while parent:
                 if 'M_box' in parent.get('class', []):
                     integral_div = parent
-                    print(f"找到父级M_box div")
+                    log.debug('找到父级M_box div')
                     break
                 parent = parent.parent
     
@@ -437,40 +474,40 @@ def fetch_match_history(fid):
     if not integral_div:
         integral_div = soup.select_one('div.M_box.integral')
         if integral_div:
-            print(f"通过CSS选择器div.M_box.integral找到平均数据区域")
+            log.debug('通过CSS选择器找到平均数据区域')
                 
         # 3. 如果仍然找不到，尝试查找所有带有M_box类的div
         if not integral_div:
             all_m_boxes = soup.find_all('div', class_='M_box')
-            print(f"找到{len(all_m_boxes)}个M_box类的div")
+            log.debug('查找M_box区域', count=len(all_m_boxes))
             for div in all_m_boxes:
                 h4 = div.find('h4')
                 if h4 and '平均数据' in h4.text:
                     integral_div = div
-                    print(f"通过M_box类和平均数据标题找到平均数据区域")
+                    log.debug('通过M_box类找到平均数据区域')
                     break
                 
         # 4. 如果仍然找不到，尝试查找所有带有integral类的div
         if not integral_div:
             all_integral_divs = soup.find_all('div', class_='integral')
-            print(f"找到{len(all_integral_divs)}个integral类的div")
+            log.debug('查找integral区域', count=len(all_integral_divs))
             for div in all_integral_divs:
                 h4 = div.find('h4')
                 if h4 and '平均数据' in h4.text:
                     integral_div = div
-                    print(f"通过integral类和平均数据标题找到平均数据区域")
+                    log.debug('通过integral类找到平均数据区域')
                     break
                 
-        # 打印调试信息
-        if integral_div:
-            print(f"integral_div内容（前1000字符）: {str(integral_div)[:1000]}")
-        else:
-            print(f"未找到平均数据区域")
+        # 调试信息：HTML片段只在开启调试日志时生成
+        if not integral_div:
+            log.debug('未找到平均数据区域', url=url)
+        elif log.is_debug():
+            log.debug('平均数据区域HTML', url=url, html=str(integral_div)[:1000])
                 
         # 直接查找关键元素作为备选方案
         all_team_names = soup.find_all('div', class_='team_name')
         all_pub_tables = soup.find_all('table', class_='pub_table')
-        print(f"直接找到{len(all_team_names)}个team_name类的div和{len(all_pub_tables)}个pub_table类的table")
+        log.debug('直接查找平均数据元素', team_names=len(all_team_names), pub_tables=len(all_pub_tables))
                 
         # 开始提取平均数据
         team_a_name = ''
@@ -554,7 +591,7 @@ def fetch_match_history(fid):
             team_b_table = all_pub_tables[1]
                 
         # 添加调试信息
-        print(f"平均数据表格查找结果: team_a_table={team_a_table is not None}, team_b_table={team_b_table is not None}")
+        log.debug('平均数据表格查找结果', team_a_table=team_a_table is not None, team_b_table=team_b_table is not None)
                 
         # 处理主队数据表格
         if team_a_table:
@@ -588,27 +625,21 @@ def fetch_match_history(fid):
                         history_data['average_data']['team_b']['average_conceded_home'] = tds[2].text.strip()
                         history_data['average_data']['team_b']['average_conceded_away'] = tds[3].text.strip()
                 
-        print(f"平均数据提取完成")
+        log.debug('平均数据提取完成', url=url)
                 
         # 提取近期战绩（不区分主客场）
-        print(f"开始提取近期战绩（不区分主客场）")
+        log.debug('开始提取近期战绩（不区分主客场）', url=url)
                 
         # 查找近期战绩（不区分主客场）区域
         recent_records_all_div = soup.find('div', class_='M_box record')
         if recent_records_all_div:
-            # 添加调试信息，输出整个近期战绩区域的HTML结构
-            print(f"找到近期战绩区域，开始提取内容")
-            print(f"近期战绩区域包含的子元素数量: {len(recent_records_all_div.find_all(recursive=False))}")
-                    
-            # 查找所有p标签，看看是否有包含"近10场战绩"的
-            all_p_in_record = recent_records_all_div.find_all('p')
-            print(f"近期战绩区域内找到{len(all_p_in_record)}个p标签")
-            for i, p_tag in enumerate(all_p_in_record):
-                p_text = p_tag.text.strip()
-                if p_text:
-                    print(f"p标签{i}内容: {p_text}")
-                    if '近10场战绩' in p_text:
-                        print(f"找到包含'近10场战绩'的p标签！")
+            # 调试信息：近期战绩区域的结构和p标签内容只在开启调试日志时生成
+            if log.is_debug():
+                log.debug('找到近期战绩区域', url=url, children=len(recent_records_all_div.find_all(recursive=False)))
+                for i, p_tag in enumerate(recent_records_all_div.find_all('p')):
+                    p_text = p_tag.text.strip()
+                    if p_text:
+                        log.debug('近期战绩区域p标签', index=i, text=p_text)
                     
             # 近期战绩包含两个部分：主队(team_a)和客队(team_b)
             team_a_div = recent_records_all_div.find('div', class_='team_a')
@@ -617,7 +648,7 @@ def fetch_match_history(fid):
             # 定义函数来解析单个队伍的近期战绩表格
             def parse_team_recent_records(team_div, team_name):
                 if not team_div:
-                    print(f"未找到{team_name}的近期战绩区域")
+                    log.debug('未找到近期战绩区域', url=url, team=team_name)
                     return
                         
                 # 提取近期战绩 summary 信息（如：7胜0平3负 进18球失13球）
@@ -627,7 +658,7 @@ def fetch_match_history(fid):
                     p_text = p_tag.text.strip()
                     if '近10场战绩' in p_text:
                         summary_text = p_text
-                        print(f"{team_name}近期战绩 summary: {summary_text}")
+                        log.debug('近期战绩summary', team=team_name, summary=summary_text)
                         # 存储 summary 信息到 history_data
                         if team_name == "主队":
                             history_data['recent_records_summary_team_a'] = summary_text
@@ -642,7 +673,7 @@ def fetch_match_history(fid):
                         span_text = span.text.strip()
                         if '近10场' in span_text:
                             summary_text = span_text
-                            print(f"{team_name}近期战绩 summary (从span标签): {summary_text}")
+                            log.debug('近期战绩summary（span标签）', team=team_name, summary=summary_text)
                             # 存储 summary 信息到 history_data
                             if team_name == "主队":
                                 history_data['recent_records_summary_team_a'] = summary_text
@@ -658,7 +689,7 @@ def fetch_match_history(fid):
                         child_text = child.text.strip()
                         if '近10场战绩' in child_text:
                             summary_text = child_text
-                            print(f"{team_name}近期战绩 summary (从直接子元素): {summary_text}")
+                            log.debug('近期战绩summary（直接子元素）', team=team_name, summary=summary_text)
                             # 存储 summary 信息到 history_data
                             if team_name == "主队":
                                 history_data['recent_records_summary_team_a'] = summary_text
@@ -669,7 +700,7 @@ def fetch_match_history(fid):
                 # 找到队伍的表格
                 table = team_div.find('table', class_='pub_table')
                 if not table:
-                    print(f"未找到{team_name}的近期战绩表格")
+                    log.debug('未找到近期战绩表格', url=url, team=team_name)
                     return
                         
                 tbody = table.find('tbody')
@@ -677,7 +708,7 @@ def fetch_match_history(fid):
                     tbody = table  # 有些表格可能没有tbody
                         
                 rows = tbody.find_all('tr')
-                print(f"{team_name}近期战绩找到{len(rows)}行数据")
+                log.debug('找到近期战绩表格', team=team_name, rows=len(rows))
                         
                 # 数据行计数器，用于跳过第一行（当前比赛）
                 data_row_count = 0
@@ -692,7 +723,7 @@ def fetch_match_history(fid):
                             
                     # 确保至少有6个单元格
                     if len(cells) < 6:
-                        print(f"{team_name}近期战绩行数据不足6个单元格: {len(cells)}个")
+                        log.debug('近期战绩行数据不足6个单元格', team=team_name, cells=len(cells))
                         continue
                             
                     # 跳过第一行数据（当前比赛）
@@ -765,16 +796,16 @@ def fetch_match_history(fid):
                     }
                             
                     history_data['recent_records_all'].append(match_data)
-                    print(f"添加了{team_name}一场近期战绩（不区分主客场）数据: {match_data['teams']}")
+                    log.debug('添加近期战绩（不区分主客场）', team=team_name, teams=match_data['teams'])
                     
             # 解析主队和客队的近期战绩
             parse_team_recent_records(team_a_div, "主队")
             parse_team_recent_records(team_b_div, "客队")
         else:
-            print(f"未找到近期战绩（不区分主客场）区域")
+            log.debug('未找到近期战绩（不区分主客场）区域', url=url)
                 
         # 提取近期战绩（区分主客场）
-        print(f"开始提取近期战绩（区分主客场）")
+        log.debug('开始提取近期战绩（区分主客场）', url=url)
                 
         # 定义一个辅助函数来提取区分主客场的战绩
         def extract_home_away_records(div_id):
@@ -788,7 +819,7 @@ def fetch_match_history(fid):
                         tbody = table  # 有些表格可能没有tbody
                     
                     rows = tbody.find_all('tr')
-                    print(f"近期战绩（区分主客场）{div_id}找到{len(rows)}行数据")
+                    log.debug('找到近期战绩（区分主客场）表格', div=div_id, rows=len(rows))
                     
                     # 数据行计数器，用于跳过第一行（当前比赛）
                     data_row_count = 0
@@ -803,7 +834,7 @@ def fetch_match_history(fid):
                                 
                         # 确保至少有6个单元格
                         if len(cells) < 6:
-                            print(f"近期战绩（区分主客场）{div_id}行数据不足6个单元格: {len(cells)}个")
+                            log.debug('近期战绩（区分主客场）行数据不足6个单元格', div=div_id, cells=len(cells))
                             continue
                                 
                         # 跳过第一行数据（当前比赛）
@@ -876,7 +907,7 @@ def fetch_match_history(fid):
                                 
                         records.append(match_data)
             else:
-                print(f"近期战绩（区分主客场）{div_id}未找到div")
+                log.debug('未找到近期战绩（区分主客场）区域', url=url, div=div_id)
             return records
                 
         # 提取主队主场战绩（team_zhanji2_1）
@@ -891,10 +922,10 @@ def fetch_match_history(fid):
         # 提取主队客场战绩（team_zhanji2_2）
         history_data['recent_records_home_away']['team_a_away'] = extract_home_away_records('team_zhanji2_2')
                 
-        print(f"近期战绩（区分主客场）提取完成")
+        log.debug('近期战绩（区分主客场）提取完成', url=url)
                 
         # 提取赛前联赛积分排名
-        print(f"开始提取赛前联赛积分排名")
+        log.debug('开始提取赛前联赛积分排名', url=url)
                 
         # 查找赛前联赛积分排名区域
         pre_match_div = None
@@ -905,7 +936,7 @@ def fetch_match_history(fid):
             h4 = div.find('h4')
             if h4 and ('赛前联赛积分排名' in h4.text or '赛前杯赛积分排名' in h4.text):
                 pre_match_div = div
-                print(f"找到赛前积分排名区域")
+                log.debug('找到赛前积分排名区域')
                 break
                 
         if pre_match_div:
@@ -984,7 +1015,7 @@ def fetch_match_history(fid):
                 history_data['pre_match_standings']['team_a']['stats'] = parse_standings_table(team_a_div)
                 history_data['pre_match_standings']['team_b']['stats'] = parse_standings_table(team_b_div)
                 
-        print(f"赛前联赛积分排名提取完成")
+        log.debug('赛前联赛积分排名提取完成', url=url)
         
         # 缓存数据
         global_cache.set(cache_key, history_data)
@@ -1,20 +1,30 @@
 import asyncio
 import aiohttp
 import random
+import time
 from bs4 import BeautifulSoup
 
+from logger import get_logger, log_crawl
+from metrics import track_request
+from profiler import NETWORK, PARSE, span, timed
+from upstream import site_url
+
 # 禁用aiohttp的SSL警告
 import ssl
 ssl._create_default_https_context = ssl._create_unverified_context
 
+log = get_logger(__name__)
+
 class JingcaiManager:
     """竞彩标识管理器，负责竞彩标识的抓取、处理和渲染"""
     
     def __init__(self):
         self.jingcai_matches = {}  # 存储竞彩标识数据，key为match_id，value为竞彩标识
     
+    @timed(PARSE, '解析竞彩标识')
     async def crawl_jingcai_ids(self, url='https://live.500.com/'):
         """从目标URL异步抓取竞彩标识数据"""
+        url = site_url(url)
         # 防封IP处理：使用随机User-Agent池
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -37,61 +47,66 @@ class JingcaiManager:
         # 防封IP处理：添加随机延迟（优化为更短时间）
         await asyncio.sleep(random.uniform(0.2, 0.8))
         
+        started = time.perf_counter()
         try:
             # 创建aiohttp会话
             async with aiohttp.ClientSession() as session:
                 # 发送请求
-                async with session.get(url, headers=headers, timeout=15, ssl=False) as response:
-                    # 读取响应内容
-                    content = await response.read()
-                    
-                    # 处理编码问题
+                with span(NETWORK, url) as request_span, track_request('jingcai', url) as tracked:
+                    async with session.get(url, headers=headers, timeout=15, ssl=False) as response:
+                        # 读取响应内容
+                        content = await response.read()
+                    request_span.add_bytes(len(content))
+                    tracked.add_bytes(len(content))
+                log_crawl('jingcai', url, started, True, len(content), status=response.status)
+                
+                # 处理编码问题
+                try:
+                    html = content.decode('gbk')
+                except UnicodeDecodeError:
                     try:
-                        html = content.decode('gbk')
+                        html = content.decode('gb2312')
                     except UnicodeDecodeError:
-                        try:
-                            html = content.decode('gb2312')
-                        except UnicodeDecodeError:
-                            html = content.decode('utf-8')
-                    
-                    # 解析HTML
-                    soup = BeautifulSoup(html, 'html.parser')
+                        html = content.decode('utf-8')
+                
+                # 解析HTML
+                soup = BeautifulSoup(html, 'html.parser')
+                
+                # 找到所有比赛行
+                match_rows = soup.find_all('tr', attrs={'id': lambda x: x and x.startswith('a')})
+                
+                jingcai_data = {}
+                
+                for row in match_rows:
+                    match_id = row.get('id')
+                    if not match_id:
+                        continue
                     
-                    # 找到所有比赛行
-                    match_rows = soup.find_all('tr', attrs={'id': lambda x: x and x.startswith('a')})
-                    
-                    jingcai_data = {}
-                    
-                    for row in match_rows:
-                        match_id = row.get('id')
-                        if not match_id:
-                            continue
+                    # 提取竞彩标识（来自第一列的文本，例如"周二011"）
+                    tds = row.find_all('td')
+                    if len(tds) > 0:
+                        first_td = tds[0]
+                        # 提取td中的文本，过滤掉复选框相关内容
+                        jingcai_id = first_td.text.strip()
+                        # 移除可能的空格和特殊字符
+                        jingcai_id = jingcai_id.replace('\n', '').replace('\r', '').replace(' ', '')
                         
-                        # 提取竞彩标识（来自第一列的文本，例如"周二011"）
-                        tds = row.find_all('td')
-                        if len(tds) > 0:
-                            first_td = tds[0]
-                            # 提取td中的文本，过滤掉复选框相关内容
-                            jingcai_id = first_td.text.strip()
-                            # 移除可能的空格和特殊字符
-                            jingcai_id = jingcai_id.replace('\n', '').replace('\r', '').replace(' ', '')
-                            
-                            if jingcai_id:
-                                jingcai_data[match_id] = jingcai_id
-                    
-                    self.jingcai_matches = jingcai_data
-                    return jingcai_data
-                    
+                        if jingcai_id:
+                            jingcai_data[match_id] = jingcai_id
+                
+                self.jingcai_matches = jingcai_data
+                return jingcai_data
+                
         except asyncio.TimeoutError:
-            print('请求超时，请稍后重试')
+            log.warning('竞彩标识请求超时', url=url)
+            log_crawl('jingcai', url, started, False, error='timeout')
             return {}
         except aiohttp.ClientError as e:
-            print(f'网络请求失败: {e}')
+            log.warning('竞彩标识网络请求失败', url=url, error=e)
+            log_crawl('jingcai', url, started, False, error=e)
             return {}
-        except Exception as e:
-            print(f'抓取竞彩标识失败: {e}')
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            log.exception('抓取竞彩标识失败', url=url)
             return {}
     
     def get_jingcai_id(self, match_id):
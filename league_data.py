@@ -1,50 +1,215 @@
+"""
+联赛数据模块 - 获取联赛平均数据和积分榜
+
+联赛数据由进程内共享的LeagueDataService提供：所有会话共用同一份缓存，每个sid（500网的sid对应一个联赛赛季）
+每个比赛日最多刷新一次；同一联赛的并发请求合并为一次网络请求；请求带有超时，刷新失败时继续使用旧数据。
+"""
+import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, Optional
+
 import requests
 from bs4 import BeautifulSoup
-import re
 
-def get_league_data(sid):
+from logger import get_logger, log_crawl
+from metrics import CRAWL_QUEUE_DEPTH, PARSE_DURATION, observe_cache, track_request
+from profiler import NETWORK, PARSE, span, timed
+from upstream import site_url
+
+log = get_logger(__name__)
+
+# 请求超时（连接, 读取），避免一个卡住的连接让页面重跑一直等待
+REQUEST_TIMEOUT = (5, 15)
+
+# 获取失败的结果只缓存一小段时间，之后允许重试
+FAILURE_RETRY_SECONDS = 300
+
+
+def empty_league_data():
+    return {
+        'average_data': None,
+        'standings': None
+    }
+
+
+@timed(PARSE, '解析联赛数据')
+def fetch_league_data(sid, timeout=REQUEST_TIMEOUT):
     """
-    获取联赛数据，包括平均数据和积分榜
+    请求联赛页面，获取联赛数据，包括平均数据和积分榜
     :param sid: 联赛ID
+    :param timeout: 请求超时（秒），可以是(连接, 读取)
     :return: 包含平均数据和积分榜的字典
     """
-    url = f"https://liansai.500.com/zuqiu-{sid}/"
+    url = site_url(f"https://liansai.500.com/zuqiu-{sid}/")
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    started = time.perf_counter()
     try:
-        print(f"正在请求URL: {url}")
-        response = requests.get(url, headers=headers)
+        log.debug('请求联赛页面', url=url)
+        with span(NETWORK, url) as request_span, track_request('league', url) as tracked:
+            response = requests.get(url, headers=headers, timeout=timeout)
+            request_span.add_bytes(len(response.content))
+            tracked.add_bytes(len(response.content))
+            if response.status_code != 200:
+                tracked.fail()
+        log_crawl('league', url, started, response.status_code == 200, len(response.content), status=response.status_code)
         # 尝试使用GBK编码（500彩票网常用GBK编码）
         response.encoding = 'gbk'
         
         # 检查响应状态
         if response.status_code != 200:
-            print(f"请求失败，状态码: {response.status_code}")
-            return {
-                'average_data': None,
-                'standings': None
-            }
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 获取联赛平均数据
-        average_data = get_average_data(soup)
+            log.warning('联赛页面请求失败', url=url, status=response.status_code)
+            return empty_league_data()
         
-        # 获取联赛积分榜
-        standings = get_standings(soup)
+        with PARSE_DURATION.time(parser='league'):
+            soup = BeautifulSoup(response.text, 'html.parser')
+            
+            # 获取联赛平均数据
+            average_data = get_average_data(soup)
+            
+            # 获取联赛积分榜
+            standings = get_standings(soup)
         
         return {
             'average_data': average_data,
             'standings': standings
         }
-    except Exception as e:
-        print(f"获取联赛数据失败: {e}")
-        return {
-            'average_data': None,
-            'standings': None
-        }
+    except requests.RequestException as e:
+        log.error('获取联赛数据失败', url=url, error=e)
+        log_crawl('league', url, started, False, error=e)
+        return empty_league_data()
+    except Exception:
+        log.exception('获取联赛数据失败', url=url)
+        return empty_league_data()
+
+
+@dataclass(frozen=True)
+class LeagueDataEntry:
+    """一个联赛的缓存数据"""
+    data: dict
+    # 获取数据的日期（YYYY-MM-DD）
+    fetched_day: str
+    # 在该时间之前不再重新请求（获取失败后的重试间隔）
+    retry_at: float = 0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.data.get('average_data') or self.data.get('standings'))
+
+
+class LeagueDataService:
+    """联赛数据服务：跨会话缓存、每个比赛日最多刷新一次、合并并发请求"""
+
+    def __init__(self, fetcher=fetch_league_data, timeout=REQUEST_TIMEOUT):
+        self.fetcher = fetcher
+        self.timeout = timeout
+        self.entries: Dict[str, LeagueDataEntry] = {}
+        # 正在请求的联赛：sid -> Future，同一联赛的其他请求等待这次结果
+        self.inflight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _is_fresh(entry: Optional[LeagueDataEntry], match_day) -> bool:
+        if entry is None:
+            return False
+        # 在比赛日（未来的比赛日按今天算）当天或之后获取的数据不需要刷新
+        if entry.ok and entry.fetched_day >= min(match_day, time.strftime('%Y-%m-%d')):
+            return True
+        return time.time() < entry.retry_at
+
+    def is_fresh(self, sid, match_date=None) -> bool:
+        """缓存中是否有不需要刷新的数据（用于决定是否显示加载提示）"""
+        with self.lock:
+            return self._is_fresh(self.entries.get(str(sid)), match_date or time.strftime('%Y-%m-%d'))
+
+    def get(self, sid, match_date=None) -> dict:
+        """
+        获取联赛数据
+        :param sid: 联赛ID
+        :param match_date: 比赛日（YYYY-MM-DD），默认为今天；缓存数据在该比赛日或之后获取的直接使用
+        :return: 包含平均数据和积分榜的字典
+        """
+        key = str(sid)
+        match_day = match_date or time.strftime('%Y-%m-%d')
+        with self.lock:
+            entry = self.entries.get(key)
+            if self._is_fresh(entry, match_day):
+                observe_cache('league', True)
+                return entry.data
+            future = self.inflight.get(key)
+            owner = future is None
+            # 等待其他会话正在进行的请求也算命中，不会多发请求
+            observe_cache('league', not owner)
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+
+        if not owner:
+            # 合并并发请求：等待正在进行的请求，等待时间不超过请求超时
+            wait = sum(self.timeout) if isinstance(self.timeout, tuple) else self.timeout
+            try:
+                return future.result(timeout=wait + 5)
+            except FutureTimeoutError:
+                return entry.data if entry else empty_league_data()
+
+        try:
+            data = self.fetcher(key, self.timeout)
+            fetched = LeagueDataEntry(data=data, fetched_day=time.strftime('%Y-%m-%d'))
+            if not fetched.ok:
+                retry_at = time.time() + FAILURE_RETRY_SECONDS
+                # 刷新失败时继续使用旧的有效数据，过一段时间再重试
+                if entry is not None and entry.ok:
+                    fetched = LeagueDataEntry(data=entry.data, fetched_day=entry.fetched_day, retry_at=retry_at)
+                else:
+                    fetched = LeagueDataEntry(data=data, fetched_day=fetched.fetched_day, retry_at=retry_at)
+            with self.lock:
+                self.entries[key] = fetched
+            future.set_result(fetched.data)
+            return fetched.data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def put(self, sid, data):
+        """直接写入一个联赛的数据（预先加载或模拟数据），视为今天获取"""
+        entry = LeagueDataEntry(data=data, fetched_day=time.strftime('%Y-%m-%d'))
+        if not entry.ok:
+            entry = LeagueDataEntry(data=data, fetched_day=entry.fetched_day, retry_at=time.time() + FAILURE_RETRY_SECONDS)
+        with self.lock:
+            self.entries[str(sid)] = entry
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+
+
+# 创建全局联赛数据服务实例
+global_league_data_service = LeagueDataService()
+CRAWL_QUEUE_DEPTH.set_function(lambda: len(global_league_data_service.inflight), queue='league')
+
+
+def get_league_data(sid, match_date=None):
+    """
+    获取联赛数据，包括平均数据和积分榜（所有会话共用缓存）
+    :param sid: 联赛ID
+    :param match_date: 比赛日（YYYY-MM-DD），默认为今天
+    :return: 包含平均数据和积分榜的字典
+    """
+    return global_league_data_service.get(sid, match_date)
+
+
+def league_data_is_fresh(sid, match_date=None):
+    """便捷函数：联赛数据是否已经缓存且不需要刷新"""
+    return global_league_data_service.is_fresh(sid, match_date)
 
 def get_average_data(soup):
     """
@@ -54,20 +219,20 @@ def get_average_data(soup):
         # 定位联赛数据统计表格（类名为lchart）
         stats_table = soup.find('table', class_='lchart')
         if not stats_table:
-            print("未找到联赛数据统计表格")
+            log.warning('未找到联赛数据统计表格')
             return None
         
         # 获取表格内容
         rows = stats_table.find_all('tr')
         if len(rows) < 2:
-            print("联赛数据统计表格行数不足")
+            log.warning('联赛数据统计表格行数不足', rows=len(rows))
             return None
         
         # 获取第二行数据（第一行是表头）
         data_row = rows[1]
         cells = data_row.find_all('td')
         if len(cells) < 2:
-            print("联赛数据统计表格列数不足")
+            log.warning('联赛数据统计表格列数不足', cells=len(cells))
             return None
         
         # 提取赛果分布情况（第一列）
@@ -171,10 +336,8 @@ def get_average_data(soup):
             'total_average_goals': total_goal,
             'home_away_average_goals': home_away_goal
         }
-    except Exception as e:
-        print(f"解析联赛平均数据失败: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log.exception('解析联赛平均数据失败')
         return None
 
 def get_standings(soup):
@@ -191,11 +354,10 @@ def get_standings(soup):
                 standings_table = soup.find('table', class_='ljifen_top_list_s')
         
         if not standings_table:
-            # 调试: 打印页面中的表格信息
-            all_tables = soup.find_all('table')
-            print(f"未找到联赛积分榜表格，页面中共有 {len(all_tables)} 个表格")
-            for i, table in enumerate(all_tables):
-                print(f"表格{i+1}类名: {table.get('class')}")
+            log.warning('未找到联赛积分榜表格')
+            if log.is_debug():
+                # 调试: 页面中所有表格的类名
+                log.debug('页面中的表格', classes=[table.get('class') for table in soup.find_all('table')])
             return None
         
         standings = []
@@ -243,8 +405,6 @@ def get_standings(soup):
                 })
         
         return standings if standings else None
-    except Exception as e:
-        print(f"解析联赛积分榜失败: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log.exception('解析联赛积分榜失败')
         return None
\ No newline at end of file
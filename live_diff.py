@@ -0,0 +1,187 @@
+"""
+即时比分增量刷新模块 - 按match_id比较前后两次爬取结果，生成新增、移除和变化事件
+
+刷新时不再整体替换比赛列表：没有变化的比赛沿用原来的字典对象（按对象缓存的统计和卡片不会失效），
+比赛存储只更新变化比赛的索引。变化事件同时写入进程内共享的变化流（global_live_feed），
+其他使用方（后台轮询、推送接口等）可以按序号读取或订阅。
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# 比赛进行中经常变化的字段，变化事件的摘要只统计这些字段
+LIVE_FIELDS = ('score', 'half_score', 'status', 'match_status', 'time')
+
+
+@dataclass(frozen=True)
+class MatchChange:
+    """一场比赛的变化事件"""
+    # 'added'、'removed'或'changed'
+    kind: str
+    match_id: str
+    # 新的比赛数据（移除事件为原来的比赛数据）
+    match: dict
+    # 在新比赛列表中的位置（移除事件为原来列表中的位置）
+    position: int
+    # 变化的字段：字段 -> (原值, 新值)
+    changes: Dict[str, Tuple[object, object]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'match_id': self.match_id,
+            'match': self.match,
+            'changes': {name: list(values) for name, values in self.changes.items()}
+        }
+
+
+@dataclass
+class MatchDiff:
+    """两次爬取结果的差异"""
+    # 合并后的比赛列表：顺序与新结果一致，没有变化的比赛沿用原来的字典对象
+    matches: List[dict]
+    added: List[MatchChange] = field(default_factory=list)
+    removed: List[MatchChange] = field(default_factory=list)
+    changed: List[MatchChange] = field(default_factory=list)
+    # 新旧列表中比赛的顺序是否一致（一致时比赛存储可以增量更新索引）
+    same_order: bool = True
+
+    @property
+    def events(self) -> List[MatchChange]:
+        return self.added + self.removed + self.changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        """变化摘要，如'新增2场，移除1场，比分变化3场，状态变化1场'"""
+        parts = []
+        if self.added:
+            parts.append(f'新增{len(self.added)}场')
+        if self.removed:
+            parts.append(f'移除{len(self.removed)}场')
+        score_changes = sum(1 for change in self.changed if 'score' in change.changes or 'half_score' in change.changes)
+        status_changes = sum(1 for change in self.changed if 'status' in change.changes or 'match_status' in change.changes)
+        if score_changes:
+            parts.append(f'比分变化{score_changes}场')
+        if status_changes:
+            parts.append(f'状态变化{status_changes}场')
+        other_changes = sum(1 for change in self.changed if not set(change.changes) & set(LIVE_FIELDS))
+        if other_changes:
+            parts.append(f'其他变化{other_changes}场')
+        return '，'.join(parts) if parts else '没有变化'
+
+
+def diff_matches(old_matches, new_matches) -> MatchDiff:
+    """
+    按match_id比较两次爬取结果
+    :param old_matches: 原来的比赛列表
+    :param new_matches: 新爬取的比赛列表
+    :return: MatchDiff
+    """
+    old_matches = old_matches or []
+    new_matches = new_matches or []
+    old_by_id = {match['match_id']: (position, match) for position, match in enumerate(old_matches)}
+    new_ids = set()
+
+    diff = MatchDiff(matches=[])
+    for position, match in enumerate(new_matches):
+        match_id = match['match_id']
+        new_ids.add(match_id)
+        previous = old_by_id.get(match_id)
+        if previous is None:
+            diff.matches.append(match)
+            diff.added.append(MatchChange('added', match_id, match, position))
+            continue
+
+        old_position, old_match = previous
+        if old_position != position:
+            diff.same_order = False
+        changes = {name: (old_match.get(name), match.get(name))
+                   for name in old_match.keys() | match.keys() if old_match.get(name) != match.get(name)}
+        if changes:
+            diff.matches.append(match)
+            diff.changed.append(MatchChange('changed', match_id, match, position, changes))
+        else:
+            # 没有变化的比赛沿用原来的对象
+            diff.matches.append(old_match)
+
+    for position, match in enumerate(old_matches):
+        if match['match_id'] not in new_ids:
+            diff.removed.append(MatchChange('removed', match['match_id'], match, position))
+    if diff.added or diff.removed:
+        diff.same_order = False
+    return diff
+
+
+class LiveChangeFeed:
+    """进程内共享的即时比分变化流：保存最近的变化事件，按序号读取或订阅"""
+
+    def __init__(self, max_events=2000):
+        self.lock = threading.Lock()
+        self.snapshot = []
+        self.sequence = 0
+        self.events = deque(maxlen=max_events)
+        self.subscribers = []
+
+    def publish(self, matches) -> MatchDiff:
+        """
+        与上一次的比赛列表比较，把变化事件写入变化流并通知订阅者
+        :param matches: 最新的比赛列表（crawl_matches的输出）
+        :return: MatchDiff
+        """
+        with self.lock:
+            diff = diff_matches(self.snapshot, matches)
+            self.snapshot = diff.matches
+            now = time.time()
+            events = []
+            for change in diff.events:
+                self.sequence += 1
+                event = dict(change.to_dict(), seq=self.sequence, at=now)
+                self.events.append(event)
+                events.append(event)
+            subscribers = list(self.subscribers)
+
+        if events:
+            for callback in subscribers:
+                try:
+                    callback(events)
+                except Exception:
+                    log.exception('比分变化订阅者处理失败')
+        return diff
+
+    def events_since(self, sequence):
+        """
+        读取序号之后的变化事件
+        :param sequence: 已经读取到的序号（0表示从头读取）
+        :return: (最新序号, 事件列表)；序号太旧、事件已经被丢弃时事件列表为None，需要用current()重新同步
+        """
+        with self.lock:
+            if self.events and sequence < self.events[0]['seq'] - 1:
+                return self.sequence, None
+            return self.sequence, [event for event in self.events if event['seq'] > sequence]
+
+    def current(self):
+        """(最新序号, 当前比赛列表)"""
+        with self.lock:
+            return self.sequence, list(self.snapshot)
+
+    def subscribe(self, callback):
+        """订阅变化事件：每次发布时以事件列表调用callback（在发布线程中执行）"""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+
+# 创建全局变化流实例
+global_live_feed = LiveChangeFeed()
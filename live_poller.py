@@ -0,0 +1,265 @@
+"""
+即时比分后台轮询模块 - 在后台线程中定时爬取2h1.php，结果发布到共享的变化流
+
+以前每个用户按一次刷新就完整爬取一次即时比分页面和竞彩标识。开启实时模式后由本模块统一轮询：
+所有会话共用一个后台线程和一个aiohttp会话，爬取结果经global_live_feed按match_id做增量比较，
+页面上的会话只读取共享的比赛列表并应用变化，不再各自请求网络。
+
+轮询间隔按比赛情况自适应：有进行中的比赛时快速轮询，有比赛即将开赛时适中，
+没有进行中的比赛时慢速轮询；请求失败时按指数退避。一段时间内没有会话使用实时模式时线程自动退出。
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import aiohttp
+
+from jingcai_manager import async_crawl_jingcai_ids, update_matches_with_jingcai
+from live_diff import global_live_feed
+from logger import get_logger
+from match_archive import archive_matches, infer_match_date
+from match_crawler import MatchCrawlError, crawl_matches, is_production, normalize_match_status
+
+log = get_logger(__name__)
+
+# 有进行中的比赛时的轮询间隔（秒）
+FAST_INTERVAL = 15
+# 有比赛即将开赛（KICKOFF_WINDOW秒内）时的轮询间隔
+KICKOFF_INTERVAL = 30
+KICKOFF_WINDOW = 15 * 60
+# 没有进行中的比赛时的轮询间隔
+SLOW_INTERVAL = 120
+# 请求失败时的退避上限
+MAX_BACKOFF = 600
+# 竞彩标识变化很少，每隔一段时间（或出现新比赛时）才重新抓取
+JINGCAI_REFRESH_SECONDS = 600
+# 超过该时间没有会话使用实时模式时停止轮询
+IDLE_TIMEOUT = 300
+
+# 进行中的比赛状态：上半场、中场、下半场
+LIVE_STATUSES = ('1', '2', '3')
+
+
+def kickoff_timestamp(match):
+    """比赛的开赛时间戳（time字段为'MM-DD HH:MM'），无法解析时返回None"""
+    match_time = match.get('time') or ''
+    try:
+        clock = match_time.split()[1]
+        return datetime.strptime(f"{infer_match_date(match_time)} {clock}", '%Y-%m-%d %H:%M').timestamp()
+    except (IndexError, ValueError):
+        return None
+
+
+def next_interval(matches, now=None):
+    """
+    根据比赛情况选择下一次轮询的间隔
+    :param matches: 最近一次爬取的比赛列表
+    :return: 间隔（秒）
+    """
+    now = now or time.time()
+    if any(str(match.get('status')) in LIVE_STATUSES for match in matches):
+        return FAST_INTERVAL
+    for match in matches:
+        if str(match.get('status')) != '0':
+            continue
+        kickoff = kickoff_timestamp(match)
+        if kickoff is not None and -KICKOFF_WINDOW < kickoff - now <= KICKOFF_WINDOW:
+            return KICKOFF_INTERVAL
+    return SLOW_INTERVAL
+
+
+def backoff_interval(failures):
+    """连续失败failures次后的等待时间：从快速间隔开始翻倍，不超过MAX_BACKOFF"""
+    return min(MAX_BACKOFF, FAST_INTERVAL * 2 ** max(0, failures - 1))
+
+
+class LivePoller:
+    """即时比分后台轮询器：一个进程只需要一个实例，由需要实时数据的会话启动"""
+
+    def __init__(self, feed=None):
+        self.feed = feed or global_live_feed
+        self.lock = threading.Lock()
+        self.thread = None
+        self.loop = None
+        self.wake = None
+        self.stopping = False
+        # 最近一次有会话需要实时数据的时间
+        self.last_demand = 0.0
+        # 轮询状态
+        self.interval = FAST_INTERVAL
+        self.failures = 0
+        self.polls = 0
+        self.last_poll_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.live_count = 0
+        # 竞彩标识最近一次抓取的时间和当时的比赛
+        self.jingcai_at = 0.0
+        self.jingcai_ids = frozenset()
+        # 正在进行的轮询（轮询线程和接口服务在不同的事件循环中都可能发起轮询），其他调用方等待这次结果
+        self.inflight = None
+
+    @property
+    def running(self):
+        thread = self.thread
+        return thread is not None and thread.is_alive()
+
+    def touch(self):
+        """会话仍在使用实时数据（长时间没有调用时轮询线程自动退出）"""
+        self.last_demand = time.time()
+
+    def start(self):
+        """启动后台轮询（已在运行时只更新使用时间），返回是否新启动了线程"""
+        self.touch()
+        with self.lock:
+            if self.running:
+                return False
+            self.stopping = False
+            self.thread = threading.Thread(target=self._thread_main, name='live-poller', daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        """停止后台轮询"""
+        with self.lock:
+            self.stopping = True
+            self._wake_up()
+
+    def poll_now(self):
+        """立即进行下一次轮询（不等待当前间隔结束）"""
+        with self.lock:
+            self._wake_up()
+
+    def _wake_up(self):
+        """唤醒轮询线程（调用方持有锁）"""
+        if self.loop is not None and self.wake is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    def is_fresh(self, max_age=None):
+        """共享的比赛列表是否足够新：轮询正在运行且最近一次成功在两个轮询间隔之内"""
+        if not self.running or self.last_success_at is None:
+            return False
+        max_age = max_age or max(self.interval, FAST_INTERVAL) * 2
+        return time.time() - self.last_success_at <= max_age
+
+    def status(self):
+        """轮询状态（用于页面显示）"""
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'failures': self.failures,
+            'polls': self.polls,
+            'live_count': self.live_count,
+            'last_poll_at': self.last_poll_at,
+            'last_success_at': self.last_success_at,
+            'last_error': self.last_error,
+            'sequence': self.feed.sequence
+        }
+
+    def _thread_main(self):
+        try:
+            asyncio.run(self._run())
+        except Exception:
+            log.exception('即时比分轮询线程异常退出')
+
+    async def _run(self):
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            self.wake = asyncio.Event()
+        # 所有轮询共用一个会话（连接复用），SSL配置与单次爬取一致
+        connector = aiohttp.TCPConnector(ssl=False) if not is_production() else aiohttp.TCPConnector()
+        try:
+            async with aiohttp.ClientSession(connector=connector) as session:
+                while not self.stopping:
+                    if time.time() - self.last_demand > IDLE_TIMEOUT:
+                        log.info('没有会话使用实时模式，停止轮询即时比分')
+                        break
+                    await self.poll_once(session)
+                    self.wake.clear()
+                    try:
+                        await asyncio.wait_for(self.wake.wait(), timeout=self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            with self.lock:
+                self.loop = None
+                self.wake = None
+
+    async def poll_once(self, session=None):
+        """
+        爬取一次即时比分并发布到变化流；已经有轮询在进行时（可能在其他线程的事件循环中）等待它的结果，
+        不会同时爬取，轮询状态只由一个调用方更新，变化流也按爬取顺序发布
+        :return: MatchDiff，爬取失败时返回None
+        """
+        with self.lock:
+            inflight = self.inflight
+            owner = inflight is None
+            if owner:
+                inflight = self.inflight = Future()
+        if not owner:
+            return await asyncio.wrap_future(inflight)
+
+        try:
+            diff = await self._poll(session)
+            inflight.set_result(diff)
+            return diff
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight = None
+
+    async def _poll(self, session):
+        """爬取一次即时比分并发布到变化流（同一时间只有一个调用方）"""
+        self.polls += 1
+        self.last_poll_at = time.time()
+        try:
+            matches = normalize_match_status(await crawl_matches(session, delay=False))
+            # 页面没有解析出比赛多半是页面异常，不能当作所有比赛都被移除
+            if not matches:
+                raise MatchCrawlError('即时比分页面没有比赛数据')
+        except MatchCrawlError as e:
+            self.failures += 1
+            self.last_error = e.message
+            self.interval = backoff_interval(self.failures)
+            log.warning('轮询即时比分失败', failures=self.failures, retry_in=self.interval, error=e.message)
+            return None
+
+        await self._refresh_jingcai(matches)
+        matches = update_matches_with_jingcai(matches)
+        await asyncio.to_thread(archive_matches, matches, None)
+        diff = self.feed.publish(matches)
+
+        self.failures = 0
+        self.last_error = None
+        self.last_success_at = time.time()
+        self.live_count = sum(1 for match in matches if str(match.get('status')) in LIVE_STATUSES)
+        self.interval = next_interval(matches, self.last_success_at)
+        return diff
+
+    async def _refresh_jingcai(self, matches):
+        """竞彩标识到期或页面上出现新比赛时重新抓取"""
+        match_ids = frozenset(match['match_id'] for match in matches)
+        if time.time() - self.jingcai_at < JINGCAI_REFRESH_SECONDS and match_ids <= self.jingcai_ids:
+            return
+        # 抓取失败时竞彩标识管理器保留原来的数据，到期后再试
+        await async_crawl_jingcai_ids()
+        self.jingcai_at = time.time()
+        self.jingcai_ids = match_ids
+
+
+# 创建全局轮询器实例
+global_live_poller = LivePoller()
+
+
+def ensure_live_poller_started():
+    """便捷函数：确保后台轮询正在运行（会话每次读取实时数据时调用）"""
+    return global_live_poller.start()
+
+
+def get_live_poller_status():
+    """便捷函数：获取后台轮询状态"""
+    return global_live_poller.status()
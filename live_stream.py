@@ -0,0 +1,192 @@
+"""
+比分和赔率变化推送模块 - 把变化流中的事件分发给Server-Sent Events订阅者
+
+轮询/api/matches的客户端为了找到两三个变化的比分，每次都要重新下载整个比赛列表。
+本模块订阅即时比分变化流（global_live_feed）和赔率快照（global_odds_history）的变化，
+在事件循环线程中把每个事件序列化一次，按订阅者的筛选条件（联赛、只看竞彩）放入各自的队列。
+
+每个订阅者的队列有上限：消费太慢、队列满时丢弃积压的事件，改为发送一个resync事件，
+客户端收到后重新请求完整的比赛列表，再从其中的序号继续接收，服务端内存不会因为慢客户端无限增长。
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import FrozenSet
+
+from live_diff import global_live_feed
+from odds_history import global_odds_history
+
+# 每个订阅者最多积压的事件数
+DEFAULT_BUFFER_SIZE = 256
+
+# 事件类型：比赛变化（新增、移除、比分状态变化）和赔率变化
+EVENT_KINDS = ('match', 'odds')
+
+
+def format_sse(event, data, event_id=None):
+    """按Server-Sent Events格式编码一个事件"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+@dataclass(frozen=True)
+class StreamFilter:
+    """订阅者的筛选条件"""
+    # 只接收这些联赛的事件，为空时不限联赛
+    leagues: FrozenSet[str] = frozenset()
+    # 只接收竞彩赛事的事件
+    jingcai_only: bool = False
+    # 接收的事件类型
+    kinds: FrozenSet[str] = frozenset(EVENT_KINDS)
+
+    @classmethod
+    def from_query(cls, query):
+        """
+        由请求参数构建筛选条件
+        league可以重复或用逗号分隔；jingcai=1只看竞彩；types=match,odds选择事件类型
+        """
+        leagues = frozenset(name.strip() for value in query.getall('league', []) for name in value.split(',') if name.strip())
+        kinds = frozenset(kind.strip() for value in query.getall('types', []) for kind in value.split(',')
+                          if kind.strip() in EVENT_KINDS)
+        return cls(leagues=leagues, jingcai_only=query.get('jingcai') in ('1', 'true'),
+                   kinds=kinds or frozenset(EVENT_KINDS))
+
+    def accepts(self, kind, match):
+        """是否接收一个事件（match为事件对应的比赛，赔率事件找不到比赛时为None）"""
+        if kind not in self.kinds:
+            return False
+        if not self.leagues and not self.jingcai_only:
+            return True
+        if match is None:
+            return False
+        if self.leagues and match.get('league') not in self.leagues:
+            return False
+        return not self.jingcai_only or bool(match.get('jingcai_id'))
+
+
+class Subscriber:
+    """一个推送连接：有上限的事件队列，满时改为等待重新同步"""
+
+    # 队列中的重新同步标记
+    RESYNC = object()
+
+    def __init__(self, stream_filter, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.filter = stream_filter
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.resyncing = False
+        self.dropped = 0
+        # 已经发送（或补发）到的比赛变化序号，之后分发的重复事件跳过
+        self.start_after = 0
+
+    def offer(self, payload):
+        """放入一个已编码的事件，队列满时丢弃积压的事件并安排重新同步"""
+        if self.resyncing:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.RESYNC)
+            self.resyncing = True
+
+    async def next(self, timeout):
+        """
+        等待下一个事件
+        :return: 已编码的事件、RESYNC，超时时返回None
+        """
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if item is self.RESYNC:
+            self.resyncing = False
+        return item
+
+
+class LiveEventBroadcaster:
+    """把比分和赔率变化分发给所有订阅者（订阅者只在事件循环线程中访问）"""
+
+    def __init__(self, feed=None, odds_history=None):
+        self.feed = feed or global_live_feed
+        self.odds_history = odds_history or global_odds_history
+        self.loop = None
+        self.subscribers = set()
+        self.published = 0
+
+    def start(self, loop=None):
+        """在事件循环中开始接收变化（变化由轮询线程或保存赔率的线程产生）"""
+        self.loop = loop or asyncio.get_running_loop()
+        self.feed.subscribe(self._on_match_events)
+        self.odds_history.subscribe(self._on_odds_changes)
+
+    def stop(self):
+        self.feed.unsubscribe(self._on_match_events)
+        self.odds_history.unsubscribe(self._on_odds_changes)
+        self.loop = None
+
+    def _call_in_loop(self, callback, *args):
+        loop = self.loop
+        if loop is None or not self.subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 事件循环已经关闭
+            pass
+
+    def _on_match_events(self, events):
+        self._call_in_loop(self.dispatch_match_events, events)
+
+    def _on_odds_changes(self, changes):
+        self._call_in_loop(self.dispatch_odds_changes, changes)
+
+    def subscribe(self, stream_filter, buffer_size=DEFAULT_BUFFER_SIZE):
+        subscriber = Subscriber(stream_filter, buffer_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def _broadcast(self, kind, match, payload, seq=0):
+        for subscriber in self.subscribers:
+            if seq and seq <= subscriber.start_after:
+                continue
+            if subscriber.filter.accepts(kind, match):
+                subscriber.offer(payload)
+        self.published += 1
+
+    def dispatch_match_events(self, events):
+        """分发比赛变化事件（live_diff变化流的事件，序号作为事件ID，客户端可以用Last-Event-ID续传）"""
+        for event in events:
+            self._broadcast('match', event['match'], format_sse('match', event, event['seq']), event['seq'])
+
+    def dispatch_odds_changes(self, changes):
+        """分发赔率变化，附带比赛的联赛和竞彩标识"""
+        _, matches = self.feed.current()
+        matches_by_fid = {match.get('fid'): match for match in matches}
+        for change in changes:
+            match = matches_by_fid.get(change['fid'])
+            data = dict(change, match_id=match.get('match_id') if match else None,
+                        league=match.get('league') if match else None,
+                        jingcai_id=match.get('jingcai_id') if match else None)
+            self._broadcast('odds', match, format_sse('odds', data))
+
+    def backlog(self, subscriber, last_event_id):
+        """
+        断线重连时补发Last-Event-ID之后的比赛变化
+        :return: 已编码的事件列表；事件已经被丢弃、无法补发时返回None（需要重新同步）
+        """
+        sequence, events = self.feed.events_since(last_event_id)
+        subscriber.start_after = sequence
+        if events is None:
+            return None
+        return [format_sse('match', event, event['seq']) for event in events
+                if subscriber.filter.accepts('match', event['match'])]
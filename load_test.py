@@ -0,0 +1,228 @@
+"""
+多会话并发负载测试
+
+在本进程中启动离线回放服务（replay_server.py），对每个并发数N用streamlit run启动一个新的页面服务
+（app_client.py，临时工作目录中的文件缓存、归档和赔率快照都从空开始），通过websocket同时模拟N个浏览器会话，
+所有网络请求通过CRAWLER_UPSTREAM指向回放服务。每个会话按真实用户的操作顺序运行：
+- 打开页面（爬取即时比分和竞彩标识）
+- 切换联赛筛选、翻页（控件在fragment中，与浏览器中一样只重跑该fragment）
+- 展开一场比赛的详细数据（赔率、联赛、双方数据、预测分析五个标签页）
+- 选择一个过去的日期查看赛果，再点刷新回到即时比分
+
+报告每种操作的重跑延迟分布（中位数、p90、p99、最大值），以及服务进程的CPU占用和内存（RSS），
+比较并发数增加时单个实例能承受多少会话。起始RSS在服务启动后、第一个会话打开页面之前读取，
+增长部分包括第一次运行时导入页面模块；同一并发数内的会话共用服务中的缓存，与一个长期运行的实例相同。
+页面需要先录制：python replay_server.py record --fid 1234567 --sid 36 --date 2024-05-01
+
+用法：python load_test.py [--sessions 1,2,4,8] [--iterations 3] [--latency 0.05] [--jitter 0.1] ...
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app_client import AppSession, StreamlitServer
+from bench_crawlers import percentile, start_replay_server
+from replay_server import DEFAULT_PAGES_DIR, ReplayServer, add_fault_arguments, faults_from_args
+from upstream import UPSTREAM_ENV
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 会话中的操作，按报告中的显示顺序
+STEPS = ('load', 'filter', 'page', 'detail', 'date', 'refresh')
+STEP_NAMES = {
+    'load': '打开页面', 'filter': '联赛筛选', 'page': '翻页',
+    'detail': '展开详细数据', 'date': '选择日期', 'refresh': '刷新',
+}
+
+# 比赛卡片详细数据区域的expander的key前缀
+DETAIL_EXPANDER_PREFIX = 'detail_expander_'
+
+MB = 1024 * 1024
+
+
+class SessionRecorder:
+    """收集所有会话的重跑耗时和错误"""
+
+    def __init__(self):
+        self.timings = {step: [] for step in STEPS}
+        self.errors = []
+
+    async def run(self, session, step, rerun):
+        """
+        执行一次交互并记录耗时，页面显示异常时记为错误
+        :param rerun: 发送重跑请求的协程，返回重跑耗时
+        """
+        try:
+            elapsed = await rerun
+        except Exception as e:
+            # 超时、连接断开等，会话无法继续
+            self.add_error(step, f'{type(e).__name__}: {e}')
+            raise
+        self.timings[step].append(elapsed)
+        for exception in session.exceptions:
+            self.add_error(step, exception)
+
+    def add_error(self, step, message):
+        self.errors.append(f'{step}: {message}')
+
+
+async def run_session(ws_url, index, iterations, timeout, recorder):
+    """
+    运行一个会话：打开页面后重复iterations轮筛选、翻页、展开详细数据、选择日期和刷新
+    :param index: 会话序号，用于让不同会话选择不同的联赛、比赛和日期
+    """
+    async with AppSession(ws_url, timeout) as session:
+        await recorder.run(session, 'load', session.rerun())
+        for i in range(iterations):
+            turn = index + i * 7
+
+            league = session.find(kind='selectbox', key='filter_league')
+            if league is not None and len(league.options) > 1:
+                option = league.options[1 + turn % (len(league.options) - 1)]
+                await recorder.run(session, 'filter', session.interact(league, option))
+
+            next_page = session.find(kind='button', key='page_next')
+            if next_page is not None and not next_page.disabled:
+                await recorder.run(session, 'page', session.interact(next_page))
+
+            expanders = session.find_all(kind='expander', key_prefix=DETAIL_EXPANDER_PREFIX)
+            if expanders:
+                expander = expanders[turn % len(expanders)]
+                await recorder.run(session, 'detail', session.interact(expander, True))
+
+            # 过去28天中的一天，查看赛果（选择框的值为选项文本）
+            day = date.today() - timedelta(days=1 + turn % 28)
+            for key, value in (('year_selector', day.year), ('month_selector', day.month), ('day_selector', day.day)):
+                session.set_value(session.find(kind='selectbox', key=key), str(value))
+            await recorder.run(session, 'date', session.interact(session.find(kind='button', key='date_search_button')))
+
+            await recorder.run(session, 'refresh', session.interact(session.find(kind='button', label='刷新')))
+
+
+async def run_sessions(ws_url, sessions, iterations, timeout, recorder):
+    """同时运行sessions个会话，一个会话失败不影响其他会话"""
+
+    async def run(index):
+        try:
+            await run_session(ws_url, index, iterations, timeout, recorder)
+        except Exception as e:
+            recorder.add_error('session', f'{type(e).__name__}: {e}')
+
+    await asyncio.gather(*(run(index) for index in range(sessions)))
+
+
+def run_level(args, sessions, upstream):
+    """在新的页面服务和临时工作目录中运行一个并发数，返回结果；服务启动失败时返回None"""
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    env = {UPSTREAM_ENV: upstream, 'CRAWL_EVENT_LOG': os.environ.get('CRAWL_EVENT_LOG', 'off')}
+    recorder = SessionRecorder()
+    try:
+        with StreamlitServer(args.app, workdir, env) as server:
+            before = server.stats()
+            started = time.perf_counter()
+            asyncio.run(run_sessions(server.ws_url, sessions, args.iterations, args.timeout, recorder))
+            wall = time.perf_counter() - started
+            after = server.stats()
+            if recorder.errors:
+                print(f"并发 {sessions} 个会话的页面服务日志:\n{server.log_tail()}")
+    except RuntimeError as e:
+        print(f"并发 {sessions} 个会话的页面服务启动失败: {e}")
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'sessions': sessions,
+        'wall': wall,
+        'cpu': after.cpu - before.cpu,
+        'rss_start': before.rss,
+        'rss_end': after.rss,
+        'rss_peak': after.peak_rss,
+        'timings': recorder.timings,
+        'errors': recorder.errors,
+    }
+
+
+def report_level(result):
+    """打印一个并发数的各操作重跑延迟、CPU和内存"""
+    sessions = result['sessions']
+    reruns = sum(len(timings) for timings in result['timings'].values())
+    rss_growth = max(0, result['rss_peak'] - result['rss_start'])
+    print(f"\n并发 {sessions} 个会话：重跑 {reruns} 次，错误 {len(result['errors'])} 个，耗时 {result['wall']:.1f} 秒，"
+          f"CPU {result['cpu']:.1f} 秒（平均 {result['cpu'] / result['wall']:.2f} 核）")
+    print(f"  RSS 起始 {result['rss_start'] / MB:.0f} MB  结束 {result['rss_end'] / MB:.0f} MB  "
+          f"峰值 {result['rss_peak'] / MB:.0f} MB（每会话 {rss_growth / sessions / MB:.1f} MB）")
+    for step in STEPS:
+        timings = result['timings'][step]
+        if timings:
+            print('  ' + format_timings(STEP_NAMES[step], timings))
+    for error in result['errors'][:5]:
+        print(f"  错误 {error}")
+
+
+def format_timings(name, timings):
+    ms = sorted(value * 1000 for value in timings)
+    # 操作名称都是中文，每个字占两列
+    return (f"{name}{' ' * (12 - 2 * len(name))} {len(ms):>5}次  中位数 {statistics.median(ms):8.1f} ms  p90 {percentile(ms, 0.9):8.1f} ms  "
+            f"p99 {percentile(ms, 0.99):8.1f} ms  最大 {ms[-1]:8.1f} ms")
+
+
+def report_summary(results):
+    """打印并发数增加时全部重跑的延迟、吞吐量、CPU和内存的变化"""
+    print('\n汇总（全部操作）:')
+    print(f"  {'会话':>4} {'重跑/秒':>8} {'中位数ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'CPU核':>7} {'峰值RSS MB':>11} {'错误':>5}")
+    for result in results:
+        ms = sorted(value * 1000 for timings in result['timings'].values() for value in timings)
+        if not ms:
+            continue
+        print(f"  {result['sessions']:>4} {len(ms) / result['wall']:>8.1f} {statistics.median(ms):>10.1f} "
+              f"{percentile(ms, 0.9):>10.1f} {percentile(ms, 0.99):>10.1f} {result['cpu'] / result['wall']:>7.2f} "
+              f"{result['rss_peak'] / MB:>11.0f} {len(result['errors']):>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多会话并发负载测试（离线回放服务）')
+    parser.add_argument('--sessions', default='1,2,4,8', help='并发会话数，逗号分隔，依次测试')
+    parser.add_argument('--iterations', type=int, default=3, help='每个会话重复操作的轮数')
+    parser.add_argument('--timeout', type=float, default=120, help='单次重跑的超时时间（秒）')
+    parser.add_argument('--app', default=os.path.join(BASE_DIR, 'app.py'), help='要测试的app.py路径')
+    parser.add_argument('--pages', default=DEFAULT_PAGES_DIR, help='录制页面目录')
+    parser.add_argument('--seed', type=int, help='故障注入的随机种子')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    args.app = os.path.abspath(args.app)
+
+    try:
+        levels = [int(value) for value in args.sessions.split(',') if value.strip()]
+    except ValueError:
+        parser.error(f'并发会话数必须是整数: {args.sessions}')
+    if not levels or min(levels) < 1:
+        parser.error('并发会话数必须大于0')
+
+    server = ReplayServer(os.path.abspath(args.pages), faults_from_args(args), args.seed)
+    upstream = start_replay_server(server)
+    print(f"测试文件: {args.app}，回放页面: {args.pages}，并发会话: {levels}，每个会话 {args.iterations} 轮，"
+          f"故障注入: {server.faults}")
+
+    results = []
+    for sessions in levels:
+        result = run_level(args, sessions, upstream)
+        if result is None:
+            return 1
+        report_level(result)
+        results.append(result)
+
+    report_summary(results)
+    missing = [kind for kind, counts in server.stats.items() if counts.get('missing')]
+    if missing:
+        print(f"缺少录制的页面: {', '.join(sorted(missing))}（先运行 python replay_server.py record）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+日志模块 - 分级、结构化、按消息限流的日志，以及机器可读的爬取事件日志
+
+以前爬虫和缓存在每次调用时都print，缓存命中、表格行数、HTML片段都写到标准输出，
+负载高时输出本身就成了热点，日志也淹没在重复信息里。本模块提供：
+- 分级日志：消息是固定的文字，变化的内容作为字段传入，如log.warning('请求失败', url=url, attempt=2)；
+  低于当前级别的日志在格式化之前就返回
+- 按消息限流：同一条消息在一个时间窗口内最多输出RATE_LIMIT_COUNT次，之后的省略，
+  下一个窗口第一次输出时带上suppressed字段说明省略了多少条
+- 调试开关：环境变量CRAWLER_DEBUG=1时输出DEBUG级别日志，HTML片段等调试信息只在开启时生成
+- 爬取事件日志：每次网络请求的结果（来源、URL、是否成功、字节数、耗时、尝试次数）
+  以JSON行写入CRAWL_EVENT_LOG（默认cache/crawl_events.jsonl），不限流
+
+日志经队列交给后台线程写出，调用方不会阻塞在终端或文件I/O上。
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 环境变量：日志级别、调试开关、爬取事件日志路径（设为空或off时不写事件日志）
+LOG_LEVEL_ENV = 'LOG_LEVEL'
+DEBUG_ENV = 'CRAWLER_DEBUG'
+EVENT_LOG_ENV = 'CRAWL_EVENT_LOG'
+DEFAULT_EVENT_LOG = os.path.join('cache', 'crawl_events.jsonl')
+
+# 同一条消息每个窗口（秒）最多输出的次数
+RATE_LIMIT_WINDOW = 60
+RATE_LIMIT_COUNT = 10
+
+# 事件日志单个文件的大小上限和保留的文件数
+EVENT_LOG_MAX_BYTES = 20 * 1024 * 1024
+EVENT_LOG_BACKUPS = 3
+
+# 本项目日志的根名称
+ROOT_LOGGER = 'football'
+EVENT_LOGGER = f'{ROOT_LOGGER}.events'
+
+
+class RateLimiter:
+    """按消息限流：每个键在一个窗口内最多放行limit次"""
+
+    def __init__(self, limit=RATE_LIMIT_COUNT, window=RATE_LIMIT_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        # 键 -> [窗口开始时间, 本窗口已放行次数, 省略次数]
+        self.counters = {}
+
+    def allow(self, key, now=None):
+        """
+        是否放行一条日志
+        :return: 放行时返回此前省略的条数（通常为0），不放行时返回None
+        """
+        now = now or time.monotonic()
+        with self.lock:
+            counter = self.counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                suppressed = counter[2] if counter else 0
+                self.counters[key] = [now, 1, 0]
+                return suppressed
+            if counter[1] < self.limit:
+                counter[1] += 1
+                return 0
+            counter[2] += 1
+            return None
+
+
+def _format_value(value):
+    text = value if isinstance(value, str) else str(value)
+    if not text or any(c.isspace() or c in '="' for c in text):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class StructuredFormatter(logging.Formatter):
+    """终端日志格式：时间 级别 模块: 消息 字段=值 ..."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s', '%H:%M:%S')
+
+    def formatMessage(self, record):
+        text = super().formatMessage(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text += ' ' + ' '.join(f'{name}={_format_value(value)}' for name, value in fields.items())
+        return text
+
+
+class JsonEventFormatter(logging.Formatter):
+    """事件日志格式：每个事件一行JSON"""
+
+    def format(self, record):
+        data = {'ts': round(record.created, 3), 'event': record.getMessage()}
+        data.update(getattr(record, 'fields', None) or {})
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class _LocalQueueHandler(QueueHandler):
+    """同一进程内的日志队列：记录原样放入队列，格式化在写出线程中进行"""
+
+    def prepare(self, record):
+        return record
+
+
+class StructuredLogger:
+    """带字段和限流的日志记录器，用get_logger(__name__)获取"""
+
+    def __init__(self, name, limiter):
+        self.logger = logging.getLogger(f'{ROOT_LOGGER}.{name}')
+        self.limiter = limiter
+
+    def is_debug(self):
+        """是否输出调试日志（生成代价高的调试信息前先检查）"""
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def debug(self, message, **fields):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message, **fields):
+        self._log(logging.ERROR, message, fields)
+
+    def exception(self, message, **fields):
+        """记录错误和当前异常的调用栈（在except块中调用）"""
+        self._log(logging.ERROR, message, fields, exc_info=True)
+
+    def _log(self, level, message, fields, exc_info=False):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self.limiter.allow((self.logger.name, level, message))
+        if suppressed is None:
+            return
+        if suppressed:
+            fields = dict(fields, suppressed=suppressed)
+        self.logger.log(level, message, extra={'fields': fields}, exc_info=exc_info)
+
+
+class _LogConfig:
+    """进程内的日志配置：一个队列和一个后台写出线程"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listener = None
+        self.limiter = RateLimiter()
+        self.event_logger = logging.getLogger(EVENT_LOGGER)
+
+    def configure(self, level=None, event_log=None, force=False):
+        with self.lock:
+            if self.listener is not None and not force:
+                return
+            self._stop()
+
+            if level is None:
+                level = 'DEBUG' if os.environ.get(DEBUG_ENV) in ('1', 'true') else os.environ.get(LOG_LEVEL_ENV, 'INFO')
+            if event_log is None:
+                event_log = os.environ.get(EVENT_LOG_ENV, DEFAULT_EVENT_LOG)
+
+            console = logging.StreamHandler()
+            console.setFormatter(StructuredFormatter())
+            handlers = [console]
+            self.event_logger.disabled = True
+            event_log_error = None
+            if event_log and event_log != 'off':
+                try:
+                    directory = os.path.dirname(event_log)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    event_handler = RotatingFileHandler(event_log, maxBytes=EVENT_LOG_MAX_BYTES,
+                                                        backupCount=EVENT_LOG_BACKUPS, encoding='utf-8', delay=True)
+                    event_handler.setFormatter(JsonEventFormatter())
+                    handlers.append(event_handler)
+                    self.event_logger.disabled = False
+                except OSError as e:
+                    event_log_error = e
+
+            # 终端只输出普通日志，事件日志文件只写事件
+            console.addFilter(lambda record: not record.name.startswith(EVENT_LOGGER))
+            for handler in handlers[1:]:
+                handler.addFilter(lambda record: record.name.startswith(EVENT_LOGGER))
+
+            records = queue.SimpleQueue()
+            root = logging.getLogger(ROOT_LOGGER)
+            root.handlers = [_LocalQueueHandler(records)]
+            root.setLevel(level.upper() if isinstance(level, str) else level)
+            root.propagate = False
+            # 事件不受日志级别影响
+            self.event_logger.setLevel(logging.INFO)
+            self.listener = QueueListener(records, *handlers)
+            self.listener.start()
+            if event_log_error is not None:
+                root.warning('无法创建爬取事件日志', extra={'fields': {'path': event_log, 'error': event_log_error}})
+
+    def _stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def shutdown(self):
+        """写出队列中剩余的日志（进程退出时调用）"""
+        with self.lock:
+            self._stop()
+
+
+_config = _LogConfig()
+atexit.register(_config.shutdown)
+
+
+def configure_logging(level=None, event_log=None):
+    """
+    重新配置日志（不调用时第一次get_logger按环境变量配置）
+    :param level: 日志级别，如'DEBUG'、'INFO'，默认按CRAWLER_DEBUG/LOG_LEVEL环境变量
+    :param event_log: 爬取事件日志路径，'off'表示不写，默认按CRAWL_EVENT_LOG环境变量
+    """
+    _config.configure(level, event_log, force=True)
+
+
+def get_logger(name):
+    """获取模块的日志记录器：log = get_logger(__name__)"""
+    _config.configure()
+    return StructuredLogger(name, _config.limiter)
+
+
+def log_event(event, **fields):
+    """
+    写一条机器可读的事件（不限流），如log_event('crawl', source='odds', url=url, ok=True, bytes=1024)
+    """
+    _config.configure()
+    event_logger = _config.event_logger
+    if not event_logger.disabled:
+        event_logger.info(event, extra={'fields': fields})
+
+
+def log_crawl(source, url, started, ok, nbytes=0, attempts=1, error=None, status=None):
+    """
+    记录一次爬取请求的结果
+    :param source: 数据来源，如'history'、'odds'、'live'
+    :param started: 请求开始时的time.perf_counter()
+    """
+    fields = {'source': source, 'url': url, 'ok': ok, 'bytes': nbytes,
+              'ms': round((time.perf_counter() - started) * 1000, 1), 'attempts': attempts}
+    if status is not None:
+        fields['status'] = status
+    if error is not None:
+        fields['error'] = str(error)
+    log_event('crawl', **fields)
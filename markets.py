@@ -0,0 +1,261 @@
+"""
+盘口模块 - 由一个比分概率矩阵推导所有玩法的概率
+
+胜平负、比分、总进球、各大小球盘口、各亚盘盘口（含四分之一盘）、双方进球和半场/半全场
+都通过对同一个矩阵做向量化掩码求和得到，不再分别循环进球数分布。
+矩阵的形状为(..., goal_cap + 1, goal_cap + 1)，可以是单场比赛，也可以是一整天比赛叠在一起的批量矩阵；
+最后一行/列为goal_cap球及以上的尾部概率，按goal_cap球参与计算。
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.special import comb
+
+from card_templates import convert_handicap
+
+# 默认计算的亚盘盘口（主队让球为负，受让为正），步长0.25包含四分之一盘
+HANDICAP_LINES = tuple(float(line) for line in np.arange(-3.5, 3.75, 0.25))
+
+# 默认计算的大小球盘口
+TOTAL_LINES = tuple(float(line) for line in np.arange(0.5, 6.75, 0.25))
+
+# 上半场进球占全场进球的比例（每个进球独立地以该概率发生在上半场）
+HALF_TIME_GOAL_SHARE = 0.45
+
+# 半全场玩法的结果名称，下标0/1/2分别为胜/平/负（主队视角）
+OUTCOME_NAMES = ('胜', '平', '负')
+
+
+@dataclass(frozen=True)
+class LineOutcome:
+    """单个盘口的结算概率：四分之一盘按两个半注平均，win/lose中包含赢半/输半的一半"""
+    win: float
+    push: float
+    lose: float
+
+    @property
+    def fair_odds(self) -> Optional[float]:
+        """不含抽水的公平赔率（欧赔口径，走水退还本金）"""
+        return (1 - self.push) / self.win if self.win > 0 else None
+
+    def to_dict(self) -> dict:
+        return {'win': float(self.win), 'push': float(self.push), 'lose': float(self.lose)}
+
+
+@dataclass(frozen=True, eq=False)
+class MarketSet:
+    """由一个比分矩阵推导出的全部玩法概率"""
+    # 推导所用的比分矩阵，用于计算默认盘口以外的盘口
+    matrix: np.ndarray = field(repr=False)
+    home_win: float
+    draw: float
+    away_win: float
+    # 比分概率，只包含双方进球数都小于goal_cap的精确比分
+    exact_scores: Dict[Tuple[int, int], float]
+    # 总进球数概率，键f'{goal_cap}+'为goal_cap球及以上
+    total_goals: Dict[object, float]
+    # 大小球：盘口 -> LineOutcome(win为大球, lose为小球)
+    over_under: Dict[float, LineOutcome]
+    # 亚盘（主队视角）：盘口 -> LineOutcome(win为主队赢盘, lose为客队赢盘)
+    asian_handicap: Dict[float, LineOutcome]
+    btts: float
+    half_time_home_win: float
+    half_time_draw: float
+    half_time_away_win: float
+    # 半全场：'胜胜'、'胜平'...，第一个字为半场结果，第二个字为全场结果
+    half_full: Dict[str, float]
+
+    @property
+    def goal_cap(self) -> int:
+        return _goal_cap(self.matrix)
+
+    def to_dict(self) -> dict:
+        """可以序列化为JSON的字典（不含比分矩阵），比分键为'主-客'，盘口键为盘口数值的字符串"""
+        return {
+            'home_win': float(self.home_win),
+            'draw': float(self.draw),
+            'away_win': float(self.away_win),
+            'exact_scores': {f'{home}-{away}': float(prob) for (home, away), prob in self.exact_scores.items()},
+            'total_goals': {str(goals): float(prob) for goals, prob in self.total_goals.items()},
+            'over_under': {str(line): outcome.to_dict() for line, outcome in self.over_under.items()},
+            'asian_handicap': {str(line): outcome.to_dict() for line, outcome in self.asian_handicap.items()},
+            'btts': float(self.btts),
+            'half_time_home_win': float(self.half_time_home_win),
+            'half_time_draw': float(self.half_time_draw),
+            'half_time_away_win': float(self.half_time_away_win),
+            'half_full': {name: float(prob) for name, prob in self.half_full.items()}
+        }
+
+    def handicap(self, line) -> Optional[LineOutcome]:
+        """获取指定亚盘盘口的概率，line可以是数字或爬取到的盘口文字（如'受半球'）"""
+        value = parse_line(line)
+        if value is None:
+            return None
+        if value not in self.asian_handicap:
+            return LineOutcome(*asian_handicap(self.matrix, (value,))[0])
+        return self.asian_handicap[value]
+
+    def total(self, line) -> Optional[LineOutcome]:
+        """获取指定大小球盘口的概率，line可以是数字或爬取到的盘口文字（如'2.5/3'）"""
+        value = parse_line(line)
+        if value is None:
+            return None
+        if value not in self.over_under:
+            return LineOutcome(*over_under(self.matrix, (value,))[0])
+        return self.over_under[value]
+
+
+def parse_line(line) -> Optional[float]:
+    """
+    把盘口转换为数字：数字直接返回，文字盘口（汉字盘口、'2.5/3'这样的分数盘口、带箭头的即时盘）
+    按赔率表格的盘口转换规则处理
+    :return: 盘口数值，无法识别时返回None
+    """
+    if isinstance(line, (int, float)):
+        return float(line)
+    if not line:
+        return None
+    try:
+        return float(convert_handicap(str(line)))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def score_grid(goal_cap):
+    """主客队进球数网格：(主队进球, 客队进球)，形状均为(goal_cap + 1, goal_cap + 1)"""
+    home_goals, away_goals = np.indices((goal_cap + 1, goal_cap + 1))
+    return home_goals, away_goals
+
+
+def _goal_cap(matrices):
+    return np.shape(matrices)[-1] - 1
+
+
+def _split_line(line):
+    """四分之一盘拆成相邻的两个半注盘口，其他盘口返回自身"""
+    if round(line * 4) % 2 == 1:
+        return line - 0.25, line + 0.25
+    return line, line
+
+
+def _line_probabilities(matrices, values, lines):
+    """
+    按盘口结算：values + 盘口 > 0 为赢，= 0 为走水，< 0 为输，四分之一盘两个半注平均
+    :param values: 每个比分对应的结算值（净胜球或总进球减盘口前的值），形状与矩阵最后两维一致
+    :return: 形状(..., len(lines), 3)的数组，最后一维为(赢, 走水, 输)
+    """
+    halves = np.array([_split_line(float(line)) for line in lines]).reshape(-1)
+    adjusted = values[None, :, :] + halves[:, None, None]
+    masks = np.stack([adjusted > 0, adjusted == 0, adjusted < 0], axis=1).astype(float)
+    probs = np.einsum('...ij,lkij->...lk', matrices, masks)
+    return probs.reshape(probs.shape[:-2] + (len(lines), 2, 3)).mean(axis=-2)
+
+
+def match_outcome(matrices):
+    """胜平负概率，返回形状(..., 3)的数组：(主胜, 平局, 客胜)"""
+    matrices = np.asarray(matrices)
+    home_win = np.tril(matrices, -1).sum(axis=(-2, -1))
+    draw = np.trace(matrices, axis1=-2, axis2=-1)
+    away_win = np.triu(matrices, 1).sum(axis=(-2, -1))
+    return np.stack([home_win, draw, away_win], axis=-1)
+
+
+def asian_handicap(matrices, lines=HANDICAP_LINES):
+    """亚盘（主队视角，主队让球为负）：返回形状(..., len(lines), 3)，最后一维为(主队赢盘, 走水, 客队赢盘)"""
+    home_goals, away_goals = score_grid(_goal_cap(matrices))
+    return _line_probabilities(np.asarray(matrices), home_goals - away_goals, lines)
+
+
+def over_under(matrices, lines=TOTAL_LINES):
+    """大小球：返回形状(..., len(lines), 3)，最后一维为(大球, 走水, 小球)"""
+    home_goals, away_goals = score_grid(_goal_cap(matrices))
+    # 总进球 - 盘口 > 0 为大球，按“值 + 盘口”的统一形式传入负盘口
+    return _line_probabilities(np.asarray(matrices), home_goals + away_goals, [-float(line) for line in lines])
+
+
+def total_goals(matrices):
+    """总进球数概率：返回形状(..., goal_cap + 1)，下标goal_cap为goal_cap球及以上"""
+    goal_cap = _goal_cap(matrices)
+    home_goals, away_goals = score_grid(goal_cap)
+    totals = np.minimum(home_goals + away_goals, goal_cap)
+    masks = (totals[None, :, :] == np.arange(goal_cap + 1)[:, None, None]).astype(float)
+    return np.einsum('...ij,tij->...t', np.asarray(matrices), masks)
+
+
+def both_teams_to_score(matrices):
+    """双方都进球的概率，返回形状(...)"""
+    matrices = np.asarray(matrices)
+    return matrices[..., 1:, 1:].sum(axis=(-2, -1))
+
+
+@lru_cache(maxsize=None)
+def _thinning_matrix(goal_cap, share):
+    """二项稀疏矩阵：thinning[i][h]为全场i球中有h球在上半场的概率"""
+    full, half = score_grid(goal_cap)
+    # half > full时组合数为0
+    return comb(full, half) * share ** half * (1 - share) ** np.maximum(full - half, 0)
+
+
+def half_full_matrices(matrices, share=HALF_TIME_GOAL_SHARE):
+    """
+    半场与全场比分的联合概率：joint[h][a][i][j]为半场h:a且全场i:j的概率
+    每个进球以share的概率发生在上半场（二项稀疏），返回形状(..., G+1, G+1, G+1, G+1)
+    """
+    thinning = _thinning_matrix(_goal_cap(matrices), share)
+    return np.einsum('...ij,ih,ja->...haij', np.asarray(matrices), thinning, thinning)
+
+
+def half_time_matrices(matrices, share=HALF_TIME_GOAL_SHARE):
+    """半场比分概率矩阵，形状与输入一致"""
+    thinning = _thinning_matrix(_goal_cap(matrices), share)
+    return np.einsum('...ij,ih,ja->...ha', np.asarray(matrices), thinning, thinning)
+
+
+def half_full(matrices, share=HALF_TIME_GOAL_SHARE):
+    """半全场概率：返回形状(..., 3, 3)，[半场结果][全场结果]，结果下标0/1/2为胜/平/负"""
+    goal_cap = _goal_cap(matrices)
+    home_goals, away_goals = score_grid(goal_cap)
+    # 每个比分对应的结果下标：主胜0，平局1，客胜2
+    outcome = 1 - np.sign(home_goals - away_goals)
+    masks = (outcome[None, :, :] == np.arange(3)[:, None, None]).astype(float)
+    joint = half_full_matrices(matrices, share)
+    return np.einsum('...haij,xha,yij->...xy', joint, masks, masks)
+
+
+def derive_markets(matrix, handicap_lines=HANDICAP_LINES, total_lines=TOTAL_LINES, share=HALF_TIME_GOAL_SHARE) -> MarketSet:
+    """
+    由单场比赛的比分矩阵推导全部玩法的概率
+    :param matrix: 形状(goal_cap + 1, goal_cap + 1)的比分概率矩阵
+    :param handicap_lines: 需要计算的亚盘盘口
+    :param total_lines: 需要计算的大小球盘口
+    :param share: 上半场进球占比
+    :return: MarketSet
+    """
+    matrix = np.asarray(matrix)
+    goal_cap = _goal_cap(matrix)
+    home_win, draw, away_win = match_outcome(matrix).tolist()
+    ht_home_win, ht_draw, ht_away_win = match_outcome(half_time_matrices(matrix, share)).tolist()
+
+    totals = total_goals(matrix).tolist()
+    total_probs = {goals: prob for goals, prob in enumerate(totals[:-1])}
+    total_probs[f'{goal_cap}+'] = totals[-1]
+
+    half_full_probs = half_full(matrix, share)
+    return MarketSet(
+        matrix=matrix,
+        home_win=home_win,
+        draw=draw,
+        away_win=away_win,
+        exact_scores={(i, j): float(matrix[i, j]) for i in range(goal_cap) for j in range(goal_cap)},
+        total_goals=total_probs,
+        over_under={float(line): LineOutcome(*probs) for line, probs in zip(total_lines, over_under(matrix, total_lines).tolist())},
+        asian_handicap={float(line): LineOutcome(*probs) for line, probs in zip(handicap_lines, asian_handicap(matrix, handicap_lines).tolist())},
+        btts=float(both_teams_to_score(matrix)),
+        half_time_home_win=ht_home_win,
+        half_time_draw=ht_draw,
+        half_time_away_win=ht_away_win,
+        half_full={OUTCOME_NAMES[x] + OUTCOME_NAMES[y]: float(half_full_probs[x, y]) for x in range(3) for y in range(3)}
+    )
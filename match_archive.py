@@ -0,0 +1,319 @@
+"""
+历史比赛归档模块 - 把爬取到的比赛保存到本地SQLite数据库
+
+已经结束的日期（今天之前）的赛果不会再变化，归档后再次查看直接从数据库读取，不再请求wanchang.php；
+今天和未来的日期仍然实时爬取，爬取结果同样写入归档。
+数据库按日期、联赛、球队ID和sid建立索引，可以按这些条件快速查询历史比赛。
+批量回填（backfill.py）拉取的赔率和历史交战数据按fid保存在match_details表中。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# 默认数据库路径（与文件缓存放在同一目录）
+DEFAULT_DB_PATH = os.path.join('cache', 'match_archive.db')
+
+# 归档的比赛字段，与crawl_matches/crawl_matches_by_date的输出保持一致
+MATCH_FIELDS = (
+    'match_id', 'status', 'gy', 'yy', 'lid', 'fid', 'sid', 'league', 'league_color', 'round', 'time',
+    'match_status', 'home_team', 'home_team_id', 'score', 'half_score', 'away_team', 'away_team_id', 'jingcai_id'
+)
+
+# 未开始和进行中的比赛状态（status字段），包含这些比赛的日期不标记为完整归档
+UNFINISHED_STATUSES = ('0', '1', '2', '3')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS matches (
+    {', '.join(f'{name} TEXT' for name in MATCH_FIELDS)},
+    match_date TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (match_id)
+);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (match_date, position);
+CREATE INDEX IF NOT EXISTS idx_matches_league ON matches (league, match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_home_team ON matches (home_team_id, match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_away_team ON matches (away_team_id, match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_sid ON matches (sid, match_date);
+CREATE INDEX IF NOT EXISTS idx_matches_fid ON matches (fid);
+CREATE INDEX IF NOT EXISTS idx_matches_updated ON matches (updated_at);
+CREATE TABLE IF NOT EXISTS archived_dates (
+    match_date TEXT PRIMARY KEY,
+    match_count INTEGER NOT NULL,
+    final INTEGER NOT NULL DEFAULT 0,
+    archived_at TEXT
+);
+CREATE TABLE IF NOT EXISTS match_details (
+    fid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at TEXT,
+    PRIMARY KEY (fid, kind)
+);
+"""
+
+# match_details表中的数据类型：赔率（fetch_all_odds_data）和历史数据（fetch_match_history）
+DETAIL_KINDS = ('odds', 'history')
+
+
+def is_past_date(date_str, today=None):
+    """
+    判断日期是否已经过去（赛果不会再变化）
+    :param date_str: 日期字符串，格式为YYYY-MM-DD
+    :param today: 当前日期（YYYY-MM-DD），默认为本地时间的今天
+    """
+    return date_str < (today or time.strftime('%Y-%m-%d'))
+
+
+def infer_match_date(match_time, reference=None):
+    """
+    根据比赛时间（'MM-DD HH:MM'，页面上不带年份）推断比赛日期
+    :param match_time: 比赛的time字段
+    :param reference: 参考日期（date），默认为今天；跨年时取离参考日期最近的年份
+    :return: YYYY-MM-DD，无法解析时返回参考日期
+    """
+    reference = reference or date.today()
+    try:
+        month, day = (int(part) for part in match_time.split()[0].split('-')[:2])
+        candidates = []
+        for year in (reference.year - 1, reference.year, reference.year + 1):
+            try:
+                candidates.append(date(year, month, day))
+            except ValueError:
+                continue
+        return min(candidates, key=lambda candidate: abs((candidate - reference).days)).isoformat()
+    except (ValueError, IndexError, AttributeError):
+        return reference.isoformat()
+
+
+class MatchArchive:
+    """比赛归档（SQLite），同一个实例可以在多个会话线程中共用"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            # WAL模式下读取不会被写入阻塞
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(SCHEMA)
+
+    def save_matches(self, matches, match_date=None, final=False):
+        """
+        保存一批比赛
+        :param matches: 比赛数据列表
+        :param match_date: 比赛所属日期（按日期爬取时为所选日期）；为None时按每场比赛的时间推断，
+                           且不会覆盖已归档比赛的日期
+        :param final: 该日期的赛果是否已经不会变化（过去的日期），为True时以后直接从归档读取
+        """
+        if not matches:
+            return 0
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for position, match in enumerate(matches):
+            row_date = match_date or infer_match_date(match.get('time', ''))
+            rows.append(tuple(str(match.get(name) or '') for name in MATCH_FIELDS) + (row_date, position, now))
+
+        columns = MATCH_FIELDS + ('match_date', 'position', 'updated_at')
+        # 推断出的日期不可靠，冲突时保留原有的日期和顺序
+        updated = [name for name in columns if match_date or name not in ('match_date', 'position')]
+        sql = (f"INSERT INTO matches ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT(match_id) DO UPDATE SET {', '.join(f'{name}=excluded.{name}' for name in updated if name != 'match_id')}")
+
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+            if match_date:
+                self.conn.execute(
+                    'INSERT INTO archived_dates (match_date, match_count, final, archived_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(match_date) DO UPDATE SET match_count=excluded.match_count, final=excluded.final, archived_at=excluded.archived_at',
+                    (match_date, len(matches), int(bool(final)), now)
+                )
+        return len(rows)
+
+    def is_archived(self, match_date):
+        """该日期是否已经完整归档且赛果不会再变化"""
+        with self.lock:
+            row = self.conn.execute('SELECT final FROM archived_dates WHERE match_date = ?', (match_date,)).fetchone()
+        return bool(row and row['final'])
+
+    def get_matches_by_date(self, match_date):
+        """
+        获取已完整归档日期的全部比赛（保持页面原有顺序）
+        :return: 比赛列表，该日期没有完整归档时返回None
+        """
+        if not self.is_archived(match_date):
+            return None
+        return self.query(match_date=match_date)
+
+    def query(self, match_date=None, date_from=None, date_to=None, league=None, team_id=None, sid=None, limit=None,
+              include_date=False, fid=None):
+        """
+        按条件查询归档的比赛
+        :param match_date: 比赛日期（YYYY-MM-DD）
+        :param date_from: 日期下限（含）
+        :param date_to: 日期上限（含）
+        :param league: 联赛名称
+        :param team_id: 球队ID（主队或客队）
+        :param sid: 赛季ID
+        :param limit: 最多返回的数量
+        :param include_date: 是否在结果中包含比赛所属日期（match_date字段）
+        :param fid: 比赛fid
+        :return: 比赛列表，按日期和页面顺序排列
+        """
+        conditions = []
+        params = []
+        if match_date:
+            conditions.append('match_date = ?')
+            params.append(match_date)
+        if date_from:
+            conditions.append('match_date >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('match_date <= ?')
+            params.append(date_to)
+        if league:
+            conditions.append('league = ?')
+            params.append(league)
+        if sid:
+            conditions.append('sid = ?')
+            params.append(str(sid))
+        if fid:
+            conditions.append('fid = ?')
+            params.append(str(fid))
+        if team_id:
+            # 主客队分别走各自的索引
+            conditions.append('(home_team_id = ? OR away_team_id = ?)')
+            params.extend([str(team_id), str(team_id)])
+
+        columns = MATCH_FIELDS + ('match_date',) if include_date else MATCH_FIELDS
+        sql = f"SELECT {', '.join(columns)} FROM matches"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY match_date, position'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_match(self, fid):
+        """按fid获取一场归档的比赛（包含match_date字段），没有归档时返回None"""
+        matches = self.query(fid=fid, include_date=True)
+        return matches[-1] if matches else None
+
+    def archived_dates(self):
+        """已完整归档的日期列表"""
+        with self.lock:
+            rows = self.conn.execute('SELECT match_date FROM archived_dates WHERE final = 1 ORDER BY match_date').fetchall()
+        return [row['match_date'] for row in rows]
+
+    def save_detail(self, fid, kind, data):
+        """
+        保存一场比赛的详细数据
+        :param fid: 比赛fid
+        :param kind: 数据类型，'odds'或'history'
+        :param data: 可以序列化为JSON的数据
+        """
+        if kind not in DETAIL_KINDS:
+            raise ValueError(f'未知的数据类型: {kind}')
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO match_details (fid, kind, payload, fetched_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(fid, kind) DO UPDATE SET payload=excluded.payload, fetched_at=excluded.fetched_at',
+                (str(fid), kind, json.dumps(data, ensure_ascii=False), now)
+            )
+
+    def get_detail(self, fid, kind):
+        """获取一场比赛的详细数据，没有保存过时返回None"""
+        with self.lock:
+            row = self.conn.execute('SELECT payload FROM match_details WHERE fid = ? AND kind = ?',
+                                    (str(fid), kind)).fetchone()
+        return json.loads(row['payload']) if row else None
+
+    def has_detail(self, fid, kind):
+        """是否已经保存过一场比赛的详细数据"""
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM match_details WHERE fid = ? AND kind = ?',
+                                    (str(fid), kind)).fetchone()
+        return row is not None
+
+    def iter_details(self, kind):
+        """
+        遍历保存了详细数据的比赛
+        :param kind: 数据类型，'odds'或'history'
+        :return: 生成(比赛数据, 详细数据)，按日期和页面顺序排列
+        """
+        columns = ', '.join(f'm.{name}' for name in MATCH_FIELDS)
+        with self.lock:
+            rows = self.conn.execute(
+                f'SELECT {columns}, m.match_date, d.payload FROM matches m JOIN match_details d ON d.fid = m.fid '
+                'WHERE d.kind = ? ORDER BY m.match_date, m.position', (kind,)).fetchall()
+        for row in rows:
+            match = {name: row[name] for name in MATCH_FIELDS + ('match_date',)}
+            yield match, json.loads(row['payload'])
+
+    def query_updated_since(self, since=None):
+        """
+        获取更新时间不早于since的比赛（包含match_date和updated_at字段），用于增量同步归档内容
+        :param since: 上次同步到的更新时间（ISO格式，精确到秒），None时返回全部比赛；
+                      同一秒内可能还有后写入的比赛，所以包含等于since的比赛，调用方需要按match_id去重
+        :return: 比赛列表，按更新时间排列
+        """
+        columns = ', '.join(MATCH_FIELDS + ('match_date', 'updated_at'))
+        with self.lock:
+            if since:
+                rows = self.conn.execute(f'SELECT {columns} FROM matches WHERE updated_at >= ? ORDER BY updated_at',
+                                         (since,)).fetchall()
+            else:
+                rows = self.conn.execute(f'SELECT {columns} FROM matches ORDER BY updated_at').fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self):
+        """归档的比赛总数"""
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# 创建全局归档实例
+global_match_archive = MatchArchive()
+
+
+def get_archived_matches(date_str):
+    """便捷函数：获取已完整归档日期的比赛，没有归档或读取失败时返回None"""
+    try:
+        return global_match_archive.get_matches_by_date(date_str)
+    except sqlite3.Error as e:
+        log.error('读取比赛归档失败', date=date_str, error=e)
+        return None
+
+
+def archive_matches(matches, date_str=None):
+    """
+    便捷函数：归档一批比赛
+    date_str为过去的日期且没有未开始或进行中的比赛时标记为完整归档，以后直接从归档读取
+    """
+    final = bool(date_str) and is_past_date(date_str) and not any(
+        str(match.get('status')) in UNFINISHED_STATUSES for match in matches)
+    try:
+        return global_match_archive.save_matches(matches, match_date=date_str, final=final)
+    except sqlite3.Error as e:
+        log.error('保存比赛归档失败', date=date_str, error=e)
+        return 0
@@ -0,0 +1,559 @@
+"""
+比赛列表爬虫模块 - 爬取500.com的即时比分页面和按日期的完场/赛程页面
+
+页面获取和HTML解析分开：解析函数只依赖HTML文本，可以单独用于回放或测试；
+获取函数可以传入共享的aiohttp会话，批量爬取（如backfill.py回填历史数据）时复用连接。
+"""
+import asyncio
+import os
+import random
+import re
+import time
+import traceback
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from logger import log_crawl
+from metrics import PARSE_DURATION, track_request
+from profiler import NETWORK, PARSE, span, timed
+from upstream import site_url
+
+# 即时比分页面（默认显示的比赛列表）
+LIVE_URL = 'https://live.500.com/2h1.php'
+# 按日期的完场/赛程页面，同时支持历史和未来日期
+DATE_URL = 'https://live.500.com/wanchang.php?e={date_str}'
+
+# 防封IP处理：使用随机User-Agent池
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.131 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/93.0.4577.63 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+]
+
+
+# 比赛状态映射：status字段值 -> 中文比赛状态
+MATCH_STATUS_MAP = {
+    '0': '未开始',
+    '1': '上半场',
+    '2': '中场',
+    '3': '下半场',
+    '4': '完场',
+    '5': '取消',
+    '6': '延期',
+    '7': '中断',
+    '8': '待定'
+}
+
+
+class MatchCrawlError(Exception):
+    """比赛列表爬取失败，message为给用户看的提示，details为详细错误信息"""
+
+    def __init__(self, message, details=''):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+def get_match_status_display(status_value):
+    """根据status字段值返回正确的中文比赛状态"""
+    return MATCH_STATUS_MAP.get(str(status_value), '')
+
+
+def normalize_match_status(matches):
+    """处理比赛状态，确保match_status字段使用status对应的状态值（原地修改并返回比赛列表）"""
+    for match in matches:
+        match['match_status'] = get_match_status_display(match['status']) if match['status'] else match['match_status']
+    return matches
+
+
+def build_headers():
+    """生成请求头（随机User-Agent）"""
+    return {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1'
+    }
+
+
+def is_production():
+    """生产环境检测"""
+    return os.environ.get('STREAMLIT_SERVER') is not None
+
+
+def decode_html(content):
+    """处理编码问题：依次尝试GBK、GB2312和UTF-8"""
+    try:
+        # 尝试GBK编码（常见于中文网站）
+        return content.decode('gbk')
+    except UnicodeDecodeError:
+        try:
+            # 尝试GB2312编码
+            return content.decode('gb2312')
+        except UnicodeDecodeError:
+            # 最后尝试UTF-8编码
+            return content.decode('utf-8')
+
+
+async def fetch_page(url, session=None, delay=True):
+    """
+    获取页面HTML
+    :param url: 页面地址
+    :param session: 共享的aiohttp会话，为None时创建一次性会话
+    :param delay: 是否在请求前随机等待（防封IP，批量爬取时由调用方控制请求速率）
+    :return: 解码后的HTML
+    :raises MatchCrawlError: 超时、网络请求失败或页面返回错误状态（被限流时的403、服务器错误等）
+    """
+    production = is_production()
+
+    # 生产环境优化：增加延迟避免被封
+    if delay:
+        await asyncio.sleep(random.uniform(1.0, 2.0) if production else random.uniform(0.3, 1.0))
+    timeout = aiohttp.ClientTimeout(total=30 if production else 15)  # 生产环境增加超时时间
+
+    started = time.perf_counter()
+    try:
+        with span(NETWORK, url) as request_span, track_request('live', url) as tracked:
+            if session is not None:
+                async with session.get(url, headers=build_headers(), timeout=timeout) as response:
+                    content = await response.read()
+            else:
+                # 创建aiohttp会话，优化SSL配置
+                connector = aiohttp.TCPConnector(ssl=False) if not production else aiohttp.TCPConnector()
+                async with aiohttp.ClientSession(connector=connector, timeout=timeout) as own_session:
+                    async with own_session.get(url, headers=build_headers()) as response:
+                        content = await response.read()
+            request_span.add_bytes(len(content))
+            tracked.add_bytes(len(content))
+        if response.status != 200:
+            # 错误页面解析出来是0场比赛，不能当作该日期没有比赛
+            log_crawl('live', url, started, False, len(content), status=response.status, error=f'HTTP {response.status}')
+            raise MatchCrawlError(f'页面返回错误状态: HTTP {response.status}')
+        log_crawl('live', url, started, True, len(content), status=response.status)
+        return decode_html(content)
+    except asyncio.TimeoutError:
+        log_crawl('live', url, started, False, error='timeout')
+        raise MatchCrawlError('请求超时，请稍后重试')
+    except aiohttp.ClientError as e:
+        log_crawl('live', url, started, False, error=e)
+        raise MatchCrawlError(f'网络请求失败: {e}')
+
+
+@timed(PARSE, '解析完场/赛程页面')
+def parse_date_page(html):
+    """
+    解析按日期的完场/赛程页面（wanchang.php）
+    :param html: 页面HTML
+    :return: 比赛数据列表
+    """
+    # 解析HTML
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # 找到所有比赛行
+    match_rows = soup.find_all('tr', attrs={'id': lambda x: x and x.startswith('a')})
+
+    matches = []
+
+    for row in match_rows:
+        # 提取属性
+        match_id = row.get('id')
+        status = row.get('status')
+        gy = row.get('gy')
+        yy = row.get('yy')
+        lid = row.get('lid')
+        fid = row.get('fid')
+        sid = row.get('sid')
+
+        # 提取联赛信息 - 参考页面中联赛在td[0]
+        league_td = row.find('td', class_='ssbox_01')
+        if league_td:
+            league = league_td.text.strip()
+            # 提取联赛的背景颜色
+            league_color = league_td.get('bgcolor', '#3b82f6')  # 默认使用蓝色
+        else:
+            league = ''
+            league_color = '#3b82f6'
+
+        # 提取轮次
+        tds = row.find_all('td')
+        if len(tds) < 9:
+            continue
+
+        # 参考页面的HTML结构固定，td索引如下：
+        # 0: 赛事, 1: 轮次, 2: 比赛时间, 3: 状态, 4: 主队, 5: 比分, 6: 客队, 7: 半场, 8: 直播, 9: 分析
+        round_info = tds[1].text.strip() if len(tds) > 1 else ''
+        match_time = tds[2].text.strip() if len(tds) > 2 else ''
+        match_status = tds[3].text.strip() if len(tds) > 3 else ''
+
+        # 提取主队 - 参考页面中主队在td[4]
+        home_td = tds[4]
+        home_team = ''
+        home_team_id = ''
+        if home_td:
+            # 优先提取a标签中的球队名称，避免包含红黄牌和排名
+            home_a = home_td.find('a')
+            if home_a:
+                # 优先提取span.mainName（如果存在）
+                main_name = home_a.find('span', class_='mainName')
+                if main_name:
+                    home_team = main_name.text.strip()
+                else:
+                    home_team = home_a.text.strip()
+                # 提取球队ID
+                href = home_a.get('href', '')
+                # 从href中提取球队ID，如 /team/3303/ 中的3303
+                id_match = re.search(r'/team/(\d+)/', href)
+                if id_match:
+                    home_team_id = id_match.group(1)
+            else:
+                # 如果没有a标签，再提取整个td的文本
+                home_team = home_td.text.strip()
+                # 移除方括号中的排名
+                home_team = re.sub(r'\[[^\]]+\]', '', home_team)
+                # 移除数字前缀
+                home_team = re.sub(r'^\d+', '', home_team)
+                home_team = home_team.strip()
+
+        # 提取比分信息 - 参考页面中比分在td[5]
+        score = ''
+        score_td = tds[5] if len(tds) > 5 else None
+        if score_td:
+            # 尝试从pk div提取比分（适用于有比分的比赛）
+            score_div = score_td.find('div', class_='pk')
+            if score_div:
+                # 提取主队比分
+                home_score_a = score_div.find('a', class_='clt1')
+                home_score = home_score_a.text.strip() if home_score_a else ''
+
+                # 提取客队比分
+                away_score_a = score_div.find('a', class_='clt3')
+                away_score = away_score_a.text.strip() if away_score_a else ''
+
+                # 组合全场比分
+                score = f"{home_score}-{away_score}" if home_score and away_score else ''
+            else:
+                # 直接从td中获取比分文本
+                score_text = score_td.text.strip()
+                if score_text and score_text != '-':
+                    score = score_text
+
+        # 提取客队 - 参考页面中客队在td[6]
+        away_td = tds[6] if len(tds) > 6 else None
+        away_team = ''
+        away_team_id = ''
+        if away_td:
+            # 优先提取a标签中的球队名称，避免包含红黄牌和排名
+            away_a = away_td.find('a')
+            if away_a:
+                # 优先提取span.mainName（如果存在）
+                main_name = away_a.find('span', class_='mainName')
+                if main_name:
+                    away_team = main_name.text.strip()
+                else:
+                    away_team = away_a.text.strip()
+                # 提取球队ID
+                href = away_a.get('href', '')
+                # 从href中提取球队ID，如 /team/3303/ 中的3303
+                id_match = re.search(r'/team/(\d+)/', href)
+                if id_match:
+                    away_team_id = id_match.group(1)
+            else:
+                # 如果没有a标签，再提取整个td的文本
+                away_team = away_td.text.strip()
+                # 移除方括号中的排名
+                away_team = re.sub(r'\[[^\]]+\]', '', away_team)
+                # 移除数字前缀
+                away_team = re.sub(r'^\d+', '', away_team)
+                away_team = away_team.strip()
+
+        # 提取半场比分 - 参考页面中半场在td[7]
+        half_score_td = tds[7] if len(tds) > 7 else None
+        half_score = half_score_td.text.strip() if half_score_td else ''
+
+        # 构建比赛字典
+        match = {
+            'match_id': match_id,
+            'status': status,
+            'gy': gy,
+            'yy': yy,
+            'lid': lid,
+            'fid': fid,
+            'sid': sid,
+            'league': league,
+            'league_color': league_color,
+            'round': round_info,
+            'time': match_time,
+            'match_status': match_status,
+            'home_team': home_team,
+            'home_team_id': home_team_id,
+            'score': score,
+            'half_score': half_score,
+            'away_team': away_team,
+            'away_team_id': away_team_id,
+            'jingcai_id': ''  # 初始化竞彩标识字段
+        }
+
+        matches.append(match)
+
+    return matches
+
+
+@timed(PARSE, '解析即时比分页面')
+def parse_live_page(html):
+    """
+    解析即时比分页面（2h1.php）
+    :param html: 页面HTML
+    :return: 比赛数据列表
+    """
+    # 解析HTML
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # 找到所有比赛行
+    match_rows = soup.find_all('tr', attrs={'id': lambda x: x and x.startswith('a')})
+
+    matches = []
+
+    for row in match_rows:
+        # 提取属性
+        match_id = row.get('id')
+        status = row.get('status')
+        gy = row.get('gy')
+        yy = row.get('yy')
+        lid = row.get('lid')
+        fid = row.get('fid')
+        sid = row.get('sid')
+
+        # 提取联赛信息
+        league_td = row.find('td', class_='ssbox_01')
+        if league_td:
+            league = league_td.text.strip()
+            # 提取联赛的背景颜色
+            league_color = league_td.get('bgcolor', '#3b82f6')  # 默认使用蓝色
+        else:
+            league = ''
+            league_color = '#3b82f6'
+
+        # 提取轮次
+        tds = row.find_all('td')
+        if len(tds) < 10:
+            continue
+
+        # 初始化所有字段
+        home_team = ''
+        away_team = ''
+        score = ''
+        half_score = ''
+        match_status = ''
+        home_team_id = ''
+        away_team_id = ''
+
+        # 1. 尝试从属性中获取球队信息（最可靠的方式）
+        teams = []
+        if gy:
+            teams = gy.split(',')
+        elif yy:
+            teams = yy.split(',')
+
+        # 从属性中提取联赛、主队、客队
+        league_from_attr = ''
+        if len(teams) >= 3:
+            league_from_attr, home_team, away_team = teams[:3]
+            home_team = home_team.strip()
+            away_team = away_team.strip()
+        elif len(teams) >= 2:
+            home_team, away_team = teams[:2]
+            home_team = home_team.strip()
+            away_team = away_team.strip()
+
+        # 2. 如果属性中没有，从td中提取
+        # 提取轮次和时间
+        round_info = tds[2].text.strip() if len(tds) > 2 else ''
+        match_time = tds[3].text.strip() if len(tds) > 3 else ''
+
+        # 提取比赛状态
+        match_status = tds[4].text.strip() if len(tds) > 4 else ''
+
+        # 提取比分（仅适用于有比分的赛事）
+        score_div = row.find('div', class_='pk')
+        if score_div:
+            # 提取主队比分
+            home_score_a = score_div.find('a', class_='clt1')
+            home_score = home_score_a.text.strip() if home_score_a else ''
+
+            # 提取客队比分
+            away_score_a = score_div.find('a', class_='clt3')
+            away_score = away_score_a.text.strip() if away_score_a else ''
+
+            # 组合全场比分
+            score = f"{home_score}-{away_score}" if home_score and away_score else ''
+
+        # 提取半场比分
+        half_score_td = tds[8] if len(tds) > 8 else None
+        half_score = half_score_td.text.strip() if half_score_td else ''
+
+        # 从td中提取主队信息（如果属性中没有）
+        if not home_team:
+            home_td = tds[5] if len(tds) > 5 else None
+            if home_td:
+                # 优先提取a标签中的球队名称
+                home_a = home_td.find('a')
+                if home_a:
+                    home_team = home_a.text.strip()
+                    # 提取球队ID
+                    href = home_a.get('href', '')
+                    id_match = re.search(r'/team/(\d+)/', href)
+                    if id_match:
+                        home_team_id = id_match.group(1)
+                else:
+                    home_team = home_td.text.strip()
+
+        # 从td中提取客队信息（如果属性中没有）
+        if not away_team:
+            away_td = tds[7] if len(tds) > 7 else None
+            if away_td:
+                # 优先提取a标签中的球队名称
+                away_a = away_td.find('a')
+                if away_a:
+                    away_team = away_a.text.strip()
+                    # 提取球队ID
+                    href = away_a.get('href', '')
+                    id_match = re.search(r'/team/(\d+)/', href)
+                    if id_match:
+                        away_team_id = id_match.group(1)
+                else:
+                    away_team = away_td.text.strip()
+
+        # 3. 清理球队名称
+        home_team = re.sub(r'\[[^\]]+\]', '', home_team).strip()
+        home_team = re.sub(r'^\d+', '', home_team).strip()
+        away_team = re.sub(r'\[[^\]]+\]', '', away_team).strip()
+        away_team = re.sub(r'^\d+', '', away_team).strip()
+
+        # 4. 尝试为从属性中提取的球队获取ID
+        # 对于从属性或特殊处理中获取的球队名称，尝试从td[5]和td[7]的a标签中提取ID
+        if (home_team and not home_team_id) or (away_team and not away_team_id):
+            # 检查主队的a标签（td[5]）
+            if home_team and not home_team_id:
+                home_td = tds[5] if len(tds) > 5 else None
+                if home_td:
+                    home_a = home_td.find('a')
+                    if home_a:
+                        href = home_a.get('href', '')
+                        id_match = re.search(r'/team/(\d+)/', href)
+                        if id_match:
+                            home_team_id = id_match.group(1)
+
+            # 检查客队的a标签（td[7]）
+            if away_team and not away_team_id:
+                away_td = tds[7] if len(tds) > 7 else None
+                if away_td:
+                    away_a = away_td.find('a')
+                    if away_a:
+                        href = away_a.get('href', '')
+                        id_match = re.search(r'/team/(\d+)/', href)
+                        if id_match:
+                            away_team_id = id_match.group(1)
+
+        # 5. 特殊情况处理：如果主队或客队仍然为空，尝试从其他td提取
+        if not home_team or not away_team:
+            # 检查td[5]和td[6]（可能是未来赛事的特殊结构）
+            if len(tds) > 6:
+                if not home_team:
+                    home_candidate = tds[5].text.strip()
+                    if home_candidate and home_candidate != '-':
+                        home_team = re.sub(r'\[[^\]]+\]', '', home_candidate).strip()
+                        home_team = re.sub(r'^\d+', '', home_team).strip()
+                        # 尝试提取球队ID
+                        home_a = tds[5].find('a')
+                        if home_a:
+                            href = home_a.get('href', '')
+                            id_match = re.search(r'/team/(\d+)/', href)
+                            if id_match:
+                                home_team_id = id_match.group(1)
+                if not away_team:
+                    away_candidate = tds[6].text.strip()
+                    if away_candidate and away_candidate != '-':
+                        away_team = re.sub(r'\[[^\]]+\]', '', away_candidate).strip()
+                        away_team = re.sub(r'^\d+', '', away_team).strip()
+                        # 尝试提取球队ID
+                        away_a = tds[6].find('a')
+                        if away_a:
+                            href = away_a.get('href', '')
+                            id_match = re.search(r'/team/(\d+)/', href)
+                            if id_match:
+                                away_team_id = id_match.group(1)
+
+        # 5. 确保比赛状态正确
+        if match_status in ['-', '']:
+            # 根据是否有比分判断比赛状态
+            if score:
+                match_status = '完'
+            else:
+                match_status = ''
+
+        # 构建比赛字典
+        match = {
+            'match_id': match_id,
+            'status': status,
+            'gy': gy,
+            'yy': yy,
+            'lid': lid,
+            'fid': fid,
+            'sid': sid,
+            'league': league,
+            'league_color': league_color,
+            'round': round_info,
+            'time': match_time,
+            'match_status': match_status,
+            'home_team': home_team,
+            'home_team_id': home_team_id,
+            'score': score,
+            'half_score': half_score,
+            'away_team': away_team,
+            'away_team_id': away_team_id,
+            'jingcai_id': ''  # 初始化竞彩标识字段
+        }
+
+        matches.append(match)
+
+    return matches
+
+async def crawl_matches_by_date(date_str, session=None, delay=True):
+    """
+    根据指定日期爬取比赛数据（支持历史和未来日期）
+    :param date_str: 日期，格式为YYYY-MM-DD
+    :param session: 共享的aiohttp会话
+    :param delay: 是否在请求前随机等待
+    :raises MatchCrawlError: 请求或解析失败
+    """
+    try:
+        html = await fetch_page(site_url(DATE_URL.format(date_str=date_str)), session, delay)
+        with PARSE_DURATION.time(parser='date_page'):
+            return parse_date_page(html)
+    except MatchCrawlError:
+        raise
+    except Exception as e:
+        raise MatchCrawlError(f'爬取失败: {e}', traceback.format_exc())
+
+
+async def crawl_matches(session=None, delay=True):
+    """
+    爬取即时比分页面的比赛数据
+    :param session: 共享的aiohttp会话
+    :param delay: 是否在请求前随机等待
+    :raises MatchCrawlError: 请求或解析失败
+    """
+    try:
+        html = await fetch_page(site_url(LIVE_URL), session, delay)
+        with PARSE_DURATION.time(parser='live_page'):
+            return parse_live_page(html)
+    except MatchCrawlError:
+        raise
+    except Exception as e:
+        raise MatchCrawlError(f'爬取失败: {e}', traceback.format_exc())
@@ -0,0 +1,683 @@
+"""
+比赛详细数据模块 - 渲染比赛卡片的详细数据区域（基本信息、赔率、联赛、双方数据、预测分析）
+"""
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+# 导入赔率爬虫模块
+from odds_crawler import fetch_all_odds_data, has_odds_data
+# 导入赔率快照模块
+from odds_history import get_odds_movement, record_odds_snapshot
+# 导入联赛数据模块
+from league_data import get_league_data, league_data_is_fresh
+# 导入历史交战记录爬虫模块
+from history_crawler import fetch_match_history, has_history_data
+# 导入预测模块
+from prediction import MAX_GOALS, build_match_input, collapse_goals_probs, predict_match
+# 导入球队统计模块
+from team_stats import get_team_stats
+# 导入球队索引模块
+from team_index import build_local_history
+# 导入性能分析模块
+from profiler import PREDICTION, resume_profile, span
+# 导入监控指标模块
+from metrics import observe_script_run
+# 导入会话数据存储模块
+from session_store import HISTORY, ODDS, get_session_data
+# 导入卡片模板模块
+from card_templates import (convert_handicap, render_odds_html, render_league_standings_html,
+                            render_pre_match_standings_html, render_head_to_head_html, render_recent_records_html)
+
+
+def render_odds_movement(fid, current_odds):
+    """
+    渲染本地赔率快照中的欧赔走势：取当前赔率表中第一家即时赔率变化过的公司
+    快照由odds_history.py定时抓取或每次获取赔率时写入，不会发起网络请求
+    """
+    companies = list(((current_odds or {}).get('oupei') or {}).keys())
+    changes_by_company = {}
+    for change in get_odds_movement(fid, 'oupei'):
+        if not change['instant']:
+            continue
+        try:
+            win, draw, lose = (float(value) for value in change['instant'][:3])
+        except ValueError:
+            continue
+        changes_by_company.setdefault(change['company'], []).append({
+            '时间': datetime.fromtimestamp(change['captured_at']), '主胜': win, '平局': draw, '客胜': lose
+        })
+
+    for company in companies:
+        changes = changes_by_company.get(company, [])
+        if len(changes) >= 2:
+            st.markdown(f'##### 欧赔走势（{company}，本地快照共{len(changes)}次变化）')
+            st.line_chart(pd.DataFrame(changes).set_index('时间'))
+            return
+
+
+def load_odds(session_data, fid):
+    """
+    获取一场比赛的赔率并保存到会话数据：获取成功时与其他会话共用并保存赔率快照，
+    三个页面都失败时只保存在本会话中，其他会话打开时会重新获取
+    """
+    current_odds = fetch_all_odds_data(fid)
+    if has_odds_data(current_odds):
+        session_data.put(ODDS, fid, current_odds)
+        # 保存赔率快照（只记录变化的赔率）
+        record_odds_snapshot(fid, current_odds)
+    else:
+        session_data.put(ODDS, fid, current_odds, share=False)
+    return current_odds
+
+
+def load_history(session_data, fid):
+    """
+    请求shuju页面获取双方数据，获取成功时保存到会话数据（与其他会话共用）
+    :return: 双方数据，请求失败或页面没有数据时返回None（不保存，由调用方决定显示的内容）
+    """
+    history_data = fetch_match_history(fid)
+    if not has_history_data(history_data):
+        return None
+    session_data.put(HISTORY, fid, history_data)
+    return history_data
+
+
+@st.fragment
+def render_match_detail(row, lazy_detail=True):
+    """
+    渲染单场比赛的详细数据区域。
+    作为独立的fragment运行：展开卡片或在标签页内交互时只重跑该卡片的详细数据，不会重跑整个页面
+    :param row: 比赛数据（字典或DataFrame行）
+    :param lazy_detail: 是否按需加载（只有展开卡片时才获取数据）
+    """
+    observe_script_run('match_detail')
+    # 局部重跑时耗时记到本会话最近一次整页重跑的性能分析中
+    resume_profile(st.session_state)
+
+    # 使用Streamlit expander作为详情部分；按需加载模式下expander会跟踪展开状态，
+    # 只有用户展开该卡片后才执行标签页内容并抓取数据，首屏渲染不会触发任何详细数据请求
+    detail_expander = st.expander(
+        "详细数据",
+        expanded=False,
+        key=f"detail_expander_{row['match_id']}",
+        on_change="rerun" if lazy_detail else "ignore"
+    )
+
+    # open为None表示未跟踪状态（关闭按需加载时），保持原来的全部渲染行为
+    if detail_expander.open is not False:
+        # 会话中只保存最近打开比赛的数据引用，数据本身由所有会话共用
+        session_data = get_session_data(st.session_state)
+        with detail_expander:
+            # 创建标签页，将详细数据、赔率数据、联赛数据和双方历史交战记录分开
+            tab1, tab2, tab3, tab4, tab5 = st.tabs(["基本信息", "赔率", "联（杯）赛", "双方数据", "预测分析"])
+
+            # 基本信息标签页
+            with tab1:
+                # 使用普通字符串拼接避免f-string问题
+                st.markdown('- Match ID: ' + row['match_id'] + '\n' +
+                           '- Status: ' + row['status'] + '\n' +
+                           '- LID: ' + row['lid'] + '\n' +
+                           '- FID: ' + row['fid'] + '\n' +
+                           '- SID: ' + row['sid'])
+
+            # 赔率标签页
+            with tab2:
+                # 只有当用户点击展开时，才检查并获取赔率数据（其他会话获取过的直接共用）
+                found, current_odds = session_data.lookup(ODDS, row['fid'])
+                if not found:
+                    # 获取赔率数据
+                    with st.spinner('正在获取比赛' + row['fid'] + '的赔率数据...'):
+                        try:
+                            current_odds = load_odds(session_data, row['fid'])
+                        except Exception as e:
+                            import traceback
+                            error_msg = f"获取赔率数据失败: {str(e)}\n详细错误:\n{traceback.format_exc()}"
+                            st.error(error_msg)
+                            current_odds = None
+                            session_data.put(ODDS, row['fid'], None, share=False)
+
+                # 渲染赔率数据（模板渲染结果按fid缓存，赔率数据未变化时直接使用）
+                st.html(render_odds_html(row['fid'], current_odds))
+
+                # 本地赔率快照中的欧赔走势
+                render_odds_movement(row['fid'], current_odds)
+
+            # 联（杯）赛标签页
+            with tab3:
+                # 使用SID获取联赛数据
+                sid = row['sid']
+
+                # 获取比赛的主客队id（与卡片logo使用的球队ID一致）
+                home_team_id = row['home_team_id'] or None
+                away_team_id = row['away_team_id'] or None
+                
+                # 联赛数据由所有会话共用的联赛数据服务缓存，每个比赛日最多刷新一次
+                if league_data_is_fresh(sid):
+                    league_data = get_league_data(sid)
+                else:
+                    with st.spinner(f'正在获取联赛{sid}的数据...'):
+                        league_data = get_league_data(sid)
+
+                # 显示联赛平均数据
+                if league_data['average_data']:
+                    avg_data = league_data['average_data']
+
+                    # 使用columns创建两列布局，优化排版
+                    col1, col2 = st.columns(2)
+
+                    # 第一列：赛果分布
+                    with col1:
+                        st.markdown('### 赛果分布')
+                        result_dist = avg_data.get('result_distribution', {})
+                        if result_dist:
+                            # 为每个赛果创建独立的行
+                            result_html = '<div style="margin-bottom: 10px;">' + ''.join([f'<div style="margin: 4px 0;">{key}: <strong>{value}</strong>场</div>' for key, value in result_dist.items()]) + '</div>'
+                            st.html(result_html)
+                        else:
+                            st.info('暂无赛果分布数据')
+
+                    # 第二列：场均进球
+                    with col2:
+                        st.markdown('### 场均进球')
+                        goal_html = '<div style="margin-bottom: 10px;">' 
+
+                        # 场均总进球
+                        total_goal = avg_data.get('total_average_goals')
+                        if total_goal:
+                            goal_html += f'<div style="margin: 4px 0;">总进球: <strong>{total_goal}</strong>个</div>'
+
+                        # 主场场均进球和客场场均进球
+                        home_away_goal = avg_data.get('home_away_average_goals', {})
+                        for key, value in home_away_goal.items():
+                            goal_html += f'<div style="margin: 4px 0;">{key}: <strong>{value}</strong>个</div>'
+
+
+
+                        goal_html += '</div>'
+
+                        if '暂无' not in goal_html:
+                            st.html(goal_html)
+                        else:
+                            st.info('暂无场均进球数据')
+
+                    # 删除分隔线
+
+                # 显示联赛积分榜
+                if league_data['standings']:
+                    st.subheader('联赛积分榜')
+
+                    # 积分榜HTML按联赛和主客队缓存（积分榜未变化时直接使用），主客队所在行高亮显示
+                    st.html(render_league_standings_html(sid, league_data['standings'], home_team_id, away_team_id))
+                else:
+                    st.markdown('暂无联赛数据')
+
+            # 双方数据标签页
+            with tab4:
+                # 使用FID获取双方历史交战记录
+                fid = row['fid']
+
+                # 检查本会话或其他会话是否已经获取过该比赛的历史数据
+                found, history_data = session_data.lookup(HISTORY, fid)
+                local_history = None
+                if not found:
+                    # 历史交战、近期战绩和主客场战绩优先由本地归档计算，双方主客场战绩都有时不请求shuju页面
+                    local_history = build_local_history(row)
+                    if all(local_history['recent_records_home_away'].values()):
+                        history_data = local_history
+                        session_data.put(HISTORY, fid, history_data)
+                    else:
+                        history_data = None
+                elif history_data.get('source') == 'local':
+                    local_history = history_data
+
+                # 本地数据没有赛前积分排名，只有打开时才请求shuju页面
+                if history_data is not None and history_data.get('source') == 'local':
+                    if st.toggle('显示赛前积分排名', key=f'pre_match_standings_{fid}', help='需要请求数据页面'):
+                        history_data = None
+
+                if history_data is None:
+                    with st.spinner(f'正在获取比赛{fid}的双方历史交战记录...'):
+                        try:
+                            history_data = load_history(session_data, fid)
+                            if history_data is None and local_history is not None:
+                                # 请求失败时仍然显示本地数据
+                                history_data = local_history
+                            elif history_data is None:
+                                # 返回一个空的历史数据结构
+                                history_data = {
+                                    'match_info': '',
+                                    'stats': '',
+                                    'matches': [],
+                                    'average_data': {},
+                                    'pre_match_standings': {
+                                        'title': '',
+                                        'team_a': {'name': '', 'stats': {}},
+                                        'team_b': {'name': '', 'stats': {}}
+                                    },
+                                    'recent_records': {'home': [], 'away': []},
+                                    'recent_records_all': [],
+                                    'recent_records_home_away': {
+                                        'team_a_home': [],
+                                        'team_a_away': [],
+                                        'team_b_home': [],
+                                        'team_b_away': []
+                                    }
+                                }
+                                # 空数据只保存在本会话中
+                                session_data.put(HISTORY, fid, history_data, share=False)
+                        except Exception as e:
+                            import traceback
+                            error_msg = f"获取历史数据失败: {str(e)}\n详细错误:\n{traceback.format_exc()}"
+                            st.error(error_msg)
+                            if local_history is not None:
+                                history_data = local_history
+                            else:
+                                # 返回一个空的历史数据结构（只保存在本会话中）
+                                history_data = {
+                                    'match_info': '',
+                                    'stats': '',
+                                    'matches': [],
+                                    'average_data': {},
+                                    'pre_match_standings': {
+                                        'title': '',
+                                        'team_a': {'name': '', 'stats': {}},
+                                        'team_b': {'name': '', 'stats': {}}
+                                    },
+                                    'recent_records': {'home': [], 'away': []}
+                                }
+                                session_data.put(HISTORY, fid, history_data, share=False)
+
+                # 显示平均数据
+                average_data = history_data.get('average_data', {})
+                team_a = average_data.get('team_a', {})
+                team_b = average_data.get('team_b', {})
+
+                # 检查是否有历史交战记录、平均数据、赛前积分排名或近期战绩
+                has_data = len(history_data['matches']) > 0 or (team_a.get('name') and team_b.get('name')) or history_data['pre_match_standings']['title'] or len(history_data.get('recent_records_all', [])) > 0 or bool(history_data.get('recent_records_home_away', {}))
+
+                if has_data:
+                    # 一次计算双方全部统计（按fid缓存）
+                    team_stats = get_team_stats(fid, history_data)
+
+                    # 显示赛前联赛积分排名
+                    pre_match = history_data['pre_match_standings']
+                    if pre_match['title'] and pre_match['team_a']['name'] and pre_match['team_b']['name']:
+                        st.markdown(f'### {pre_match["title"]}')
+
+                        # 渲染赛前积分排名表格（按fid缓存，数据未变化时直接使用）
+                        st.html(render_pre_match_standings_html(row['fid'], pre_match))
+                        # 删除分隔线
+
+                        # 显示历史比赛列表
+                    if history_data['matches']:
+                        st.markdown('### 历史交战记录')
+
+                        # 历史交战记录统计指标（球队统计按fid缓存，与预测分析标签页共用）
+                        h2h = team_stats.h2h
+                        team_a_name = team_stats.team_a_name
+                        team_b_name = team_stats.team_b_name
+                        team_a_win_rate, team_b_win_rate, draw_rate = h2h.team_a_win_rate, h2h.team_b_win_rate, h2h.draw_rate
+                        team_a_avg_goals, team_a_avg_conceded = h2h.team_a_avg_goals, h2h.team_a_avg_conceded
+                        team_b_avg_goals, team_b_avg_conceded = h2h.team_b_avg_goals, h2h.team_b_avg_conceded
+
+                        # 显示历史交战记录统计信息
+                        if history_data['stats']:
+                            # 构建增强的统计信息
+                            enhanced_stats = f"{history_data['stats']}，{team_a_name}胜率<span style='color: #22c55e;'>{team_a_win_rate}%</span>，{team_b_name}胜率<span style='color: #22c55e;'>{team_b_win_rate}%</span>，平率<span style='color: #eab308;'>{draw_rate}%</span>，{team_a_name}均进<span style='color: #22c55e;'>{team_a_avg_goals}球</span>，{team_a_name}均失<span style='color: #ef4444;'>{team_a_avg_conceded}球</span>，{team_b_name}均进<span style='color: #22c55e;'>{team_b_avg_goals}球</span>，{team_b_name}均失<span style='color: #ef4444;'>{team_b_avg_conceded}球</span>"
+                            st.markdown(f'**{enhanced_stats}**', unsafe_allow_html=True)
+                            # 删除分隔线
+
+                        # 渲染历史交战记录表格（按fid缓存，数据未变化时直接使用）
+                        st.html(render_head_to_head_html(row['fid'], history_data['matches']))
+                        # 删除分隔线
+
+                    # 显示平均数据
+                    if team_a and team_b and team_a.get('name') and team_b.get('name'):
+                        # 检查是否有实际的平均数据
+                        has_avg_data = any([
+                            team_a.get('average_goals'), team_a.get('average_conceded'),
+                            team_b.get('average_goals'), team_b.get('average_conceded')
+                        ])
+
+                        if has_avg_data:
+                            st.markdown('### 平均数据')
+
+                            # 使用Streamlit原生组件显示平均数据
+                            col1, col2 = st.columns(2)
+
+                            # 主队数据
+                            with col1:
+                                st.markdown(f"#### {team_a.get('name', '')}")
+
+                                # 创建数据字典
+                                team_a_data = {
+                                    '统计项': ['平均入球', '平均失球'],
+                                    '总平均数': [team_a.get('average_goals', ''), team_a.get('average_conceded', '')],
+                                    '主场': [team_a.get('average_goals_home', ''), team_a.get('average_conceded_home', '')],
+                                    '客场': [team_a.get('average_goals_away', ''), team_a.get('average_conceded_away', '')]
+                                }
+
+                                # 显示表格，隐藏索引列
+                                st.dataframe(team_a_data, hide_index=True)
+
+                            # 客队数据
+                            with col2:
+                                st.markdown(f"#### {team_b.get('name', '')}")
+
+                                # 创建数据字典
+                                team_b_data = {
+                                    '统计项': ['平均入球', '平均失球'],
+                                    '总平均数': [team_b.get('average_goals', ''), team_b.get('average_conceded', '')],
+                                    '主场': [team_b.get('average_goals_home', ''), team_b.get('average_conceded_home', '')],
+                                    '客场': [team_b.get('average_goals_away', ''), team_b.get('average_conceded_away', '')]
+                                }
+
+                                # 显示表格，隐藏索引列
+                                st.dataframe(team_b_data, hide_index=True)
+
+                    # 显示近期战绩（不区分主客场）
+                    recent_records_all = history_data.get('recent_records_all', [])
+                    if recent_records_all:
+                        st.markdown('### 近期战绩（不区分主客场）')
+
+                        # 分离主队和客队的战绩
+                        home_records = team_stats.recent_home_records
+                        away_records = team_stats.recent_away_records
+
+                        # 创建一个两列布局
+                        col1, col2 = st.columns(2)
+
+                        # 获取主队名称
+                        home_team_name = pre_match['team_a']['name'] if pre_match.get('team_a') else '主队'
+                        # 获取客队名称  
+                        away_team_name = pre_match['team_b']['name'] if pre_match.get('team_b') else '客队'
+
+                        # 计算主队统计
+                        home_wins, home_draws, home_losses, home_goals_for, home_goals_against, home_win_rate, home_draw_rate, home_loss_rate, home_avg_goals_for, home_avg_goals_against = team_stats.recent_home.summary()
+                        # 计算客队统计
+                        away_wins, away_draws, away_losses, away_goals_for, away_goals_against, away_win_rate, away_draw_rate, away_loss_rate, away_avg_goals_for, away_avg_goals_against = team_stats.recent_away.summary()
+
+                        # 在两列中分别显示主队和客队的战绩
+                        with col1:
+                            # 显示主队近期战绩 summary（计算得出）
+                            st.markdown(
+                                f"<p style='font-size: 12px;'><strong>{home_team_name}</strong>近10场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{home_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{home_draws}平</span><span style='color: #ef4444;'>{home_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{home_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{home_draw_rate}%</span>负率<span style='color: #ef4444;'>{home_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{home_goals_for}球</span>失<span style='color: #ef4444;'>{home_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{home_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{home_avg_goals_against}球</span></span></p>",
+                                unsafe_allow_html=True
+                            )
+                            st.html(render_recent_records_html(row['fid'], 'home', home_records, '主队'))
+
+                        with col2:
+                            # 显示客队近期战绩 summary（计算得出）
+                            st.markdown(
+                                f"<p style='font-size: 12px;'><strong>{away_team_name}</strong>近10场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{away_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{away_draws}平</span><span style='color: #ef4444;'>{away_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{away_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{away_draw_rate}%</span>负率<span style='color: #ef4444;'>{away_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{away_goals_for}球</span>失<span style='color: #ef4444;'>{away_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{away_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{away_avg_goals_against}球</span></span></p>",
+                                unsafe_allow_html=True
+                            )
+                            st.html(render_recent_records_html(row['fid'], 'away', away_records, '客队'))
+
+                    # 显示近期战绩（区分主客场）
+                    recent_records_home_away = history_data.get('recent_records_home_away', {})
+                    if recent_records_home_away:
+                        st.markdown('### 近期战绩（区分主客场）')
+
+                        # 获取主队和客队名称
+                        home_team_name = pre_match['team_a']['name'] if pre_match.get('team_a') else '主队'
+                        away_team_name = pre_match['team_b']['name'] if pre_match.get('team_b') else '客队'
+
+                        # 创建一个两列布局
+                        col1, col2 = st.columns(2)
+
+                        # 主队主场和客场数据
+                        with col1:
+                            # 主队主场数据
+                            team_a_home = recent_records_home_away.get('team_a_home', [])
+                            if team_a_home:
+                                # 计算主场统计
+                                home_wins, home_draws, home_losses, home_goals_for, home_goals_against, home_win_rate, home_draw_rate, home_loss_rate, home_avg_goals_for, home_avg_goals_against = team_stats.team_a_home.summary()
+                                # 显示主场战绩 summary
+                                st.markdown(
+                                    f"<p style='font-size: 12px;'><strong>{home_team_name}</strong>近{len(team_a_home)}场主场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{home_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{home_draws}平</span><span style='color: #ef4444;'>{home_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{home_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{home_draw_rate}%</span>负率<span style='color: #ef4444;'>{home_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{home_goals_for}球</span>失<span style='color: #ef4444;'>{home_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{home_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{home_avg_goals_against}球</span></span></p>",
+                                    unsafe_allow_html=True
+                                )
+                                st.html(render_recent_records_html(row['fid'], 'team_a_home', team_a_home))
+
+                            # 主队客场数据
+                            team_a_away = recent_records_home_away.get('team_a_away', [])
+                            if team_a_away:
+                                # 计算客场统计
+                                away_wins, away_draws, away_losses, away_goals_for, away_goals_against, away_win_rate, away_draw_rate, away_loss_rate, away_avg_goals_for, away_avg_goals_against = team_stats.team_a_away.summary()
+                                # 显示客场战绩 summary
+                                st.markdown(
+                                    f"<p style='font-size: 12px;'><strong>{home_team_name}</strong>近{len(team_a_away)}场客场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{away_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{away_draws}平</span><span style='color: #ef4444;'>{away_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{away_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{away_draw_rate}%</span>负率<span style='color: #ef4444;'>{away_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{away_goals_for}球</span>失<span style='color: #ef4444;'>{away_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{away_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{away_avg_goals_against}球</span></span></p>",
+                                    unsafe_allow_html=True
+                                )
+                                st.html(render_recent_records_html(row['fid'], 'team_a_away', team_a_away, spaced=False))
+
+                        # 客队主场和客场数据
+                        with col2:
+                            # 客队主场数据
+                            team_b_home = recent_records_home_away.get('team_b_home', [])
+                            if team_b_home:
+                                # 计算主场统计
+                                home_wins, home_draws, home_losses, home_goals_for, home_goals_against, home_win_rate, home_draw_rate, home_loss_rate, home_avg_goals_for, home_avg_goals_against = team_stats.team_b_home.summary()
+                                # 显示主场战绩 summary
+                                st.markdown(
+                                    f"<p style='font-size: 12px;'><strong>{away_team_name}</strong>近{len(team_b_home)}场主场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{home_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{home_draws}平</span><span style='color: #ef4444;'>{home_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{home_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{home_draw_rate}%</span>负率<span style='color: #ef4444;'>{home_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{home_goals_for}球</span>失<span style='color: #ef4444;'>{home_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{home_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{home_avg_goals_against}球</span></span></p>",
+                                    unsafe_allow_html=True
+                                )
+                                st.html(render_recent_records_html(row['fid'], 'team_b_home', team_b_home))
+
+                            # 客队客场数据
+                            team_b_away = recent_records_home_away.get('team_b_away', [])
+                            if team_b_away:
+                                # 计算客场统计
+                                away_wins, away_draws, away_losses, away_goals_for, away_goals_against, away_win_rate, away_draw_rate, away_loss_rate, away_avg_goals_for, away_avg_goals_against = team_stats.team_b_away.summary()
+                                # 显示客场战绩 summary
+                                st.markdown(
+                                    f"<p style='font-size: 12px;'><strong>{away_team_name}</strong>近{len(team_b_away)}场客场战绩<span style='margin-left: 20px;'><span style='color: #22c55e;'>{away_wins}胜</span><span style='color: #eab308; margin: 0 5px;'>{away_draws}平</span><span style='color: #ef4444;'>{away_losses}负</span></span><span style='margin-left: 20px;'>胜率<span style='color: #22c55e;'>{away_win_rate}%</span>平率<span style='color: #eab308; margin: 0 5px;'>{away_draw_rate}%</span>负率<span style='color: #ef4444;'>{away_loss_rate}%</span></span><span style='margin-left: 20px;'>进<span style='color: #22c55e;'>{away_goals_for}球</span>失<span style='color: #ef4444;'>{away_goals_against}球</span></span><span style='margin-left: 20px;'>场均进<span style='color: #22c55e;'>{away_avg_goals_for}球</span>场均失<span style='color: #ef4444;'>{away_avg_goals_against}球</span></span></p>",
+                                    unsafe_allow_html=True
+                                )
+                                st.html(render_recent_records_html(row['fid'], 'team_b_away', team_b_away, spaced=False))
+                else:
+                    # 没有数据时显示友好提示
+                    st.markdown('### 双方数据')
+                    st.info('暂无该场比赛的相关数据')
+
+            # 预测分析标签页
+            with tab5:
+                # st.markdown('### 预测分析')
+
+                # 获取联赛数据用于预测分析
+                sid = row['sid']
+
+                # 联赛数据由所有会话共用的联赛数据服务缓存，每个比赛日最多刷新一次
+                if league_data_is_fresh(sid):
+                    league_data = get_league_data(sid)
+                else:
+                    with st.spinner(f'正在获取联赛{sid}的数据...'):
+                        league_data = get_league_data(sid)
+
+                # 显示联赛场均进球数据
+                # if league_data['average_data']:
+                #     avg_data = league_data['average_data']
+                #     
+                #     st.markdown('#### 联赛场均进球')
+                #     
+                #     # 构建场均进球HTML
+                #     goal_html = '<div style="margin-bottom: 10px;">'
+                #     
+                #     # 场均总进球
+                #     total_goal = avg_data.get('total_average_goals')
+                #     if total_goal:
+                #         goal_html += f'<div style="margin: 4px 0;">总进球: <strong>{total_goal}</strong>个</div>'
+                #     
+                #     # 主场场均进球和客场场均进球
+                #     home_away_goal = avg_data.get('home_away_average_goals', {})
+                #     for key, value in home_away_goal.items():
+                #         goal_html += f'<div style="margin: 4px 0;">{key}: <strong>{value}</strong>个</div>'
+                #     
+                #     goal_html += '</div>'
+                #     
+                #     if '暂无' not in goal_html:
+                #         st.html(goal_html)
+                #     else:
+                #         st.info('暂无场均进球数据')
+
+                # 获取比赛的fid（固定比赛ID）
+                fid = row['fid']
+
+                # 检查本会话或其他会话是否已经获取过该比赛的历史数据
+                found, history_data = session_data.lookup(HISTORY, fid)
+                if not found:
+                    # 本地归档已有双方的主客场战绩时直接在本地计算（预测不需要积分排名），不请求shuju页面
+                    history_data = build_local_history(row)
+                    if not all(history_data['recent_records_home_away'].values()):
+                        # 本地数据不够，使用fetch_match_history函数获取数据
+                        with st.spinner(f'正在获取比赛{fid}的历史数据...'):
+                            try:
+                                # 获取比赛历史数据
+                                history_data = load_history(session_data, fid)
+                            except Exception as e:
+                                st.error(f'获取历史数据失败: {e}')
+                                history_data = None
+
+                # 预测计算由prediction模块完成，不依赖页面渲染，相同输入直接使用缓存结果
+                with span(PREDICTION, f"预测 {fid}"):
+                    match_input = build_match_input(row, history_data, league_data)
+                    prediction = predict_match(match_input) if match_input else None
+                if prediction:
+                    home_team_name = prediction.home_team
+                    away_team_name = prediction.away_team
+
+                    # 原始xG预测
+                    home_xg = prediction.original.home_xg
+                    away_xg = prediction.original.away_xg
+                    original_home_win_prob = prediction.original.home_win
+                    original_draw_prob = prediction.original.draw
+                    original_away_win_prob = prediction.original.away_win
+                    original_home_goals_probs = collapse_goals_probs(prediction.original.home_goals_probs)
+                    original_away_goals_probs = collapse_goals_probs(prediction.original.away_goals_probs)
+                    original_score_probs = prediction.original.score_probs
+
+                    # 贝叶斯修正xG预测
+                    corrected_home_xg = prediction.corrected.home_xg
+                    corrected_away_xg = prediction.corrected.away_xg
+                    corrected_home_win_prob = prediction.corrected.home_win
+                    corrected_draw_prob = prediction.corrected.draw
+                    corrected_away_win_prob = prediction.corrected.away_win
+                    corrected_home_goals_probs = collapse_goals_probs(prediction.corrected.home_goals_probs)
+                    corrected_away_goals_probs = collapse_goals_probs(prediction.corrected.away_goals_probs)
+                    corrected_score_probs = prediction.corrected.score_probs
+
+                    # 显示预期进球数（xG）
+                    st.markdown('#### 预期进球数（xG）')
+
+                    # 创建一个新的两列布局，专门用于显示预期进球数
+                    xg_col1, xg_col2 = st.columns(2)
+
+                    # 在两列中分别显示原始和修正后的预期进球数
+                    with xg_col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}</strong>原始预期进球：<span style='color: #22c55e; margin-left: 10px;'>{home_xg}</span></p>", unsafe_allow_html=True)
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}</strong>修正预期进球：<span style='color: #3b82f6; margin-left: 10px;'>{corrected_home_xg}</span></p>", unsafe_allow_html=True)
+
+                    with xg_col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}</strong>原始预期进球：<span style='color: #22c55e; margin-left: 10px;'>{away_xg}</span></p>", unsafe_allow_html=True)
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}</strong>修正预期进球：<span style='color: #3b82f6; margin-left: 10px;'>{corrected_away_xg}</span></p>", unsafe_allow_html=True)
+
+                    # 使用负二项分布进行预测
+                    st.markdown('#### 负二项分布预测')
+
+                    # 显示胜平负概率
+                    st.markdown('##### 胜平负概率')
+
+                    # 原始xG预测的胜平负概率
+                    st.markdown("<p style='font-size: 11px; color: #6b7280;'><strong>原始xG预测</strong></p>", unsafe_allow_html=True)
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}胜</strong>：<span style='color: #22c55e; margin-left: 10px;'>{round(original_home_win_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>平局</strong>：<span style='color: #f59e0b; margin-left: 10px;'>{round(original_draw_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col3:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}胜</strong>：<span style='color: #ef4444; margin-left: 10px;'>{round(original_away_win_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 修正后xG预测的胜平负概率
+                    st.markdown("<p style='font-size: 11px; color: #6b7280; margin-top: 15px;'><strong>贝叶斯修正xG预测</strong></p>", unsafe_allow_html=True)
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}胜</strong>：<span style='color: #3b82f6; margin-left: 10px;'>{round(corrected_home_win_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>平局</strong>：<span style='color: #f59e0b; margin-left: 10px;'>{round(corrected_draw_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col3:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}胜</strong>：<span style='color: #ef4444; margin-left: 10px;'>{round(corrected_away_win_prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 显示进球数概率分布
+                    st.markdown(f'##### 进球数概率分布（0-{MAX_GOALS - 1}球及{MAX_GOALS}+球）')
+
+                    # 原始xG预测的进球数概率分布
+                    st.markdown("<p style='font-size: 11px; color: #6b7280;'><strong>原始xG预测</strong></p>", unsafe_allow_html=True)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}进球概率</strong></p>", unsafe_allow_html=True)
+                        for x, prob in original_home_goals_probs.items():
+                            st.markdown(f"<p style='font-size: 11px; margin-left: 20px;'>{x}球：<span style='color: #22c55e; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}进球概率</strong></p>", unsafe_allow_html=True)
+                        for x, prob in original_away_goals_probs.items():
+                            st.markdown(f"<p style='font-size: 11px; margin-left: 20px;'>{x}球：<span style='color: #22c55e; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 修正后xG预测的进球数概率分布
+                    st.markdown("<p style='font-size: 11px; color: #6b7280; margin-top: 15px;'><strong>贝叶斯修正xG预测</strong></p>", unsafe_allow_html=True)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{home_team_name}进球概率</strong></p>", unsafe_allow_html=True)
+                        for x, prob in corrected_home_goals_probs.items():
+                            st.markdown(f"<p style='font-size: 11px; margin-left: 20px;'>{x}球：<span style='color: #3b82f6; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{away_team_name}进球概率</strong></p>", unsafe_allow_html=True)
+                        for x, prob in corrected_away_goals_probs.items():
+                            st.markdown(f"<p style='font-size: 11px; margin-left: 20px;'>{x}球：<span style='color: #3b82f6; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 显示常见比分概率
+                    st.markdown('##### 常见比分概率')
+
+                    # 原始xG预测的常见比分概率
+                    st.markdown("<p style='font-size: 11px; color: #6b7280;'><strong>原始xG预测</strong></p>", unsafe_allow_html=True)
+                    score_cols = st.columns(3)
+                    for i, (score, prob) in enumerate(original_score_probs.items()):
+                        col = score_cols[i % 3]
+                        col.markdown(f"<p style='font-size: 11px;'><strong>{score[0]}:{score[1]}</strong>：<span style='color: #22c55e; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 修正后xG预测的常见比分概率
+                    st.markdown("<p style='font-size: 11px; color: #6b7280; margin-top: 15px;'><strong>贝叶斯修正xG预测</strong></p>", unsafe_allow_html=True)
+                    score_cols = st.columns(3)
+                    for i, (score, prob) in enumerate(corrected_score_probs.items()):
+                        col = score_cols[i % 3]
+                        col.markdown(f"<p style='font-size: 11px;'><strong>{score[0]}:{score[1]}</strong>：<span style='color: #3b82f6; margin-left: 10px;'>{round(prob * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    # 显示由修正比分矩阵推导的其他玩法概率，盘口与赔率标签页爬取的即时盘一致
+                    markets = prediction.corrected.markets
+                    st.markdown('##### 玩法概率（贝叶斯修正xG）')
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>双方进球</strong>：<span style='color: #3b82f6; margin-left: 10px;'>{round(markets.btts * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f"<p style='font-size: 12px;'><strong>半场胜平负</strong>：<span style='color: #3b82f6; margin-left: 10px;'>{round(markets.half_time_home_win * 100, 1)}% / {round(markets.half_time_draw * 100, 1)}% / {round(markets.half_time_away_win * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                    with col3:
+                        best_half_full = max(markets.half_full, key=markets.half_full.get)
+                        st.markdown(f"<p style='font-size: 12px;'><strong>半全场最可能</strong>：<span style='color: #3b82f6; margin-left: 10px;'>{best_half_full} {round(markets.half_full[best_half_full] * 100, 1)}%</span></p>", unsafe_allow_html=True)
+
+                    current_odds = session_data.get(ODDS, fid)
+                    for odds_key, label, sides, market_line in (('yapan', '亚盘', ('主队赢盘', '客队赢盘'), markets.handicap),
+                                                                  ('daxiao', '大小球', ('大球', '小球'), markets.total)):
+                        company_odds = (current_odds or {}).get(odds_key)
+                        if not company_odds:
+                            continue
+                        company, company_data = next(iter(company_odds.items()))
+                        line_text = company_data['instant'][1]
+                        outcome = market_line(line_text)
+                        if outcome is None:
+                            continue
+                        st.markdown(f"<p style='font-size: 12px;'><strong>{label}即时盘 {convert_handicap(line_text)}</strong>（{company}）：{sides[0]}<span style='color: #22c55e; margin: 0 10px;'>{round(outcome.win * 100, 1)}%</span>走水<span style='color: #f59e0b; margin: 0 10px;'>{round(outcome.push * 100, 1)}%</span>{sides[1]}<span style='color: #ef4444; margin-left: 10px;'>{round(outcome.lose * 100, 1)}%</span></p>", unsafe_allow_html=True)
+                else:
+                    st.info('暂无足够数据计算进攻力和防守力参数')
+
+                st.info('更多预测功能正在开发中，敬请期待！')
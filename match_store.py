@@ -0,0 +1,157 @@
+"""
+比赛数据存储模块 - 每次爬取后构建一次倒排索引和筛选项统计，筛选时只做集合求交
+"""
+from bisect import bisect_left, bisect_right
+
+# 变化时需要重新构建全部索引的字段（联赛、球队和竞彩标识很少变化）；
+# 状态和开赛时间的变化只更新对应的索引
+REBUILD_FIELDS = ('league', 'home_team_id', 'away_team_id', 'jingcai_id')
+
+
+class MatchStore:
+    """比赛数据存储，按联赛、状态、竞彩标识、球队ID和开赛时间建立倒排索引"""
+
+    def __init__(self, matches=None):
+        """
+        初始化存储
+        :param matches: 比赛数据列表（crawl_matches的输出），为None时创建空存储
+        """
+        self.matches = []
+        self.by_league = {}      # 联赛名称 -> 比赛位置集合
+        self.by_status = {}      # 比赛状态 -> 比赛位置集合
+        self.by_team = {}        # 球队ID -> 比赛位置集合（主客队都计入）
+        self.by_kickoff = {}     # 开赛时间 -> 比赛位置集合
+        self.jingcai = set()     # 有竞彩标识的比赛位置
+        self.kickoff_times = []  # 排序后的开赛时间，用于按时间范围筛选
+        self.leagues = []        # 排序后的联赛列表
+        self.statuses = []       # 排序后的状态列表
+        self.league_counts = {}
+        self.status_counts = {}
+        if matches is not None:
+            self.build(matches)
+
+    def build(self, matches):
+        """根据比赛数据重新构建全部索引和筛选项统计"""
+        self.matches = matches
+        self.by_league = {}
+        self.by_status = {}
+        self.by_team = {}
+        self.by_kickoff = {}
+        self.jingcai = set()
+
+        for position, match in enumerate(matches):
+            self.by_league.setdefault(match.get('league', ''), set()).add(position)
+            self.by_status.setdefault(match.get('match_status', ''), set()).add(position)
+            self.by_kickoff.setdefault(match.get('time', ''), set()).add(position)
+            for team_key in ('home_team_id', 'away_team_id'):
+                team_id = match.get(team_key)
+                if team_id:
+                    self.by_team.setdefault(str(team_id), set()).add(position)
+            if match.get('jingcai_id'):
+                self.jingcai.add(position)
+
+        self._update_summaries()
+        return self
+
+    def _update_summaries(self):
+        # 预先计算筛选项和数量，侧边栏直接使用
+        self.kickoff_times = sorted(self.by_kickoff)
+        self.leagues = sorted(self.by_league)
+        self.statuses = sorted(self.by_status)
+        self.league_counts = {league: len(positions) for league, positions in self.by_league.items()}
+        self.status_counts = {status: len(positions) for status, positions in self.by_status.items()}
+
+    @staticmethod
+    def _move(index, old_key, new_key, position):
+        """把比赛位置从index[old_key]移到index[new_key]"""
+        positions = index.get(old_key)
+        if positions is not None:
+            positions.discard(position)
+            if not positions:
+                del index[old_key]
+        index.setdefault(new_key, set()).add(position)
+
+    def apply_diff(self, diff):
+        """
+        按增量刷新的结果（live_diff.MatchDiff）更新存储
+        比赛顺序不变且只有比分、状态、开赛时间等字段变化时，只更新变化比赛的状态和开赛时间索引；否则重新构建
+        """
+        if not diff.same_order or any(name in change.changes for change in diff.changed for name in REBUILD_FIELDS):
+            return self.build(diff.matches)
+
+        for change in diff.changed:
+            if 'match_status' in change.changes:
+                old_status, new_status = change.changes['match_status']
+                self._move(self.by_status, old_status or '', new_status or '', change.position)
+            if 'time' in change.changes:
+                old_time, new_time = change.changes['time']
+                self._move(self.by_kickoff, old_time or '', new_time or '', change.position)
+        self.matches = diff.matches
+        self._update_summaries()
+        return self
+
+    def __len__(self):
+        return len(self.matches)
+
+    @property
+    def jingcai_count(self):
+        """有竞彩标识的比赛数量"""
+        return len(self.jingcai)
+
+    def is_built_from(self, matches):
+        """检查存储是否由这份比赛数据构建（同一个列表对象即视为未变化）"""
+        return self.matches is matches
+
+    def _kickoff_positions(self, kickoff_from, kickoff_to):
+        """获取开赛时间在[kickoff_from, kickoff_to]范围内的比赛位置"""
+        start = bisect_left(self.kickoff_times, kickoff_from) if kickoff_from else 0
+        end = bisect_right(self.kickoff_times, kickoff_to) if kickoff_to else len(self.kickoff_times)
+        positions = set()
+        for kickoff in self.kickoff_times[start:end]:
+            positions |= self.by_kickoff[kickoff]
+        return positions
+
+    def filter(self, league=None, status=None, jingcai_only=False, team_id=None, kickoff_from=None, kickoff_to=None):
+        """
+        按条件筛选比赛，各条件对应的索引集合求交集
+        :param league: 联赛名称，None或'全部'表示不筛选
+        :param status: 比赛状态，None或'全部'表示不筛选
+        :param jingcai_only: 是否只保留竞彩赛事
+        :param team_id: 球队ID（主队或客队）
+        :param kickoff_from: 开赛时间下限（与time字段格式一致，如'10-19 12:00'）
+        :param kickoff_to: 开赛时间上限
+        :return: 符合条件的比赛列表，保持原有顺序
+        """
+        candidates = []
+        if league and league != '全部':
+            candidates.append(self.by_league.get(league, set()))
+        if status and status != '全部':
+            candidates.append(self.by_status.get(status, set()))
+        if jingcai_only:
+            candidates.append(self.jingcai)
+        if team_id:
+            candidates.append(self.by_team.get(str(team_id), set()))
+        if kickoff_from or kickoff_to:
+            candidates.append(self._kickoff_positions(kickoff_from, kickoff_to))
+
+        if not candidates:
+            return list(self.matches)
+
+        # 从最小的集合开始求交，减少比较次数
+        candidates.sort(key=len)
+        positions = candidates[0].intersection(*candidates[1:])
+        return [self.matches[position] for position in sorted(positions)]
+
+
+def get_match_store(session_state):
+    """
+    便捷函数：获取会话中的比赛存储，比赛数据变化（重新爬取）时才重新构建
+    :param session_state: st.session_state
+    :return: MatchStore实例
+    """
+    matches = session_state.get('matches') or []
+    store = session_state.get('match_store')
+    if store is None or not store.is_built_from(matches):
+        store = MatchStore(matches)
+        session_state['match_store'] = store
+    return store
@@ -0,0 +1,378 @@
+"""
+监控指标模块 - 进程内的计数器、仪表和直方图，以Prometheus文本格式导出
+
+生产环境需要按时间序列看请求量、延迟、重试和缓存命中率，而不是翻终端输出。本模块实现一个很小的指标注册表，
+不依赖prometheus_client：爬虫每次请求只是在字典中找到对应标签的子指标、加锁累加几个数，
+对请求本身的耗时可以忽略。
+
+导出方式：
+- 接口服务（api_server.py）的/metrics路由
+- 其他进程（如Streamlit页面）设置环境变量METRICS_PORT后，调用start_metrics_server()
+  在后台线程中启动一个只提供/metrics的HTTP服务
+
+Prometheus中计算缓存命中率：
+  sum by (cache) (rate(cache_lookups_total{result="hit"}[5m])) / sum by (cache) (rate(cache_lookups_total[5m]))
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 启动独立指标服务的端口环境变量
+METRICS_PORT_ENV = 'METRICS_PORT'
+
+# 网络请求和解析耗时的直方图分桶（秒）
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 统计活跃会话的时间窗口（秒）
+SESSION_WINDOW = 300
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """指标基类：按标签值保存子指标"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+        # 标签值 -> 读取时调用的函数（仪表）
+        self.functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f'{self.name}需要标签{self.labelnames}，实际为{tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _new_child(self):
+        return [0.0]
+
+    def _child(self, labels):
+        key = self._key(labels)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """[(后缀, 标签值, 额外标签, 值)]"""
+        with self.lock:
+            samples = [('', key, (), child[0]) for key, child in self.children.items()]
+        for key, function in list(self.functions.items()):
+            try:
+                samples.append(('', key, (), float(function())))
+            except Exception as e:
+                log.warning('读取指标失败', metric=self.name, error=e)
+        return samples
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, key, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        child = self._child(labels)
+        with self.lock:
+            child[0] += amount
+
+
+class Gauge(Metric):
+    """可增可减的仪表，也可以设置为读取时调用的函数"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        child = self._child(labels)
+        with self.lock:
+            child[0] = value
+
+    def inc(self, amount=1, **labels):
+        child = self._child(labels)
+        with self.lock:
+            child[0] += amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function, **labels):
+        """读取指标时调用function获取当前值（如队列长度）"""
+        self.functions[self._key(labels)] = function
+
+
+class Histogram(Metric):
+    """直方图：按分桶统计观测值的分布"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        # 各分桶（不累计）的计数、+Inf桶的计数、总和
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value, **labels):
+        child = self._child(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            child[index] += 1
+            child[-1] += value
+
+    def time(self, **labels):
+        """计时上下文管理器：with PARSE_DURATION.time(parser='oupei'): ..."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            children = [(key, list(child)) for key, child in self.children.items()]
+        for key, child in children:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child[:-1]):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', key, (), child[-1]))
+            samples.append(('_count', key, (), cumulative))
+        return samples
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f'指标{metric.name}已经注册')
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets: Sequence[float] = REQUEST_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """按Prometheus文本格式导出所有指标"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# 创建全局注册表实例
+global_registry = MetricsRegistry()
+
+# 爬虫请求
+CRAWL_REQUESTS = global_registry.counter(
+    'crawler_requests_total', '爬虫网络请求次数（每次尝试计一次）', ('host', 'source', 'outcome'))
+CRAWL_DURATION = global_registry.histogram(
+    'crawler_request_duration_seconds', '爬虫单次网络请求耗时', ('host',), REQUEST_BUCKETS)
+CRAWL_RETRIES = global_registry.counter(
+    'crawler_retries_total', '爬虫请求失败后重试的次数，按异常类型', ('source', 'exception'))
+CRAWL_BYTES = global_registry.counter(
+    'crawler_response_bytes_total', '爬虫下载的字节数', ('host',))
+CRAWL_INFLIGHT = global_registry.gauge(
+    'crawler_inflight_requests', '正在进行的爬虫请求数', ('source',))
+CRAWL_QUEUE_DEPTH = global_registry.gauge(
+    'crawl_queue_depth', '等待中的爬取任务数（合并中的加载、回填队列等）', ('queue',))
+
+# 缓存和解析
+CACHE_LOOKUPS = global_registry.counter(
+    'cache_lookups_total', '缓存查询次数，按是否命中', ('cache', 'result'))
+PARSE_DURATION = global_registry.histogram(
+    'parse_duration_seconds', '页面解析耗时（不含网络请求）', ('parser',), PARSE_BUCKETS)
+
+# 会话
+ACTIVE_SESSIONS = global_registry.gauge(
+    'app_active_sessions', '活跃会话数：页面会话为最近5分钟内有重跑的会话，推送为当前连接数', ('kind',))
+SCRIPT_RUNS = global_registry.counter(
+    'app_script_runs_total', '页面脚本的执行次数：script为整页重跑，其他为各fragment（局部重跑或随整页重跑执行）', ('part',))
+
+
+def host_of(url):
+    """URL的主机名（指标标签）"""
+    return urlsplit(url).hostname or ''
+
+
+class track_request:
+    """
+    记录一次网络请求尝试：请求数（按是否抛出异常区分成功失败）、耗时、下载字节数和进行中的请求数
+    with track_request('odds', url) as tracked: ...; tracked.add_bytes(len(content))
+    """
+    __slots__ = ('source', 'host', 'started', 'nbytes', 'failed')
+
+    def __init__(self, source, url):
+        self.source = source
+        self.host = host_of(url)
+        self.nbytes = 0
+        self.failed = False
+
+    def __enter__(self):
+        CRAWL_INFLIGHT.inc(source=self.source)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        CRAWL_DURATION.observe(time.perf_counter() - self.started, host=self.host)
+        CRAWL_INFLIGHT.dec(source=self.source)
+        CRAWL_REQUESTS.inc(host=self.host, source=self.source, outcome='error' if exc_type or self.failed else 'ok')
+        if self.nbytes:
+            CRAWL_BYTES.inc(self.nbytes, host=self.host)
+        return False
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def fail(self):
+        """请求没有抛出异常但结果无效（如状态码不是200）时记为失败"""
+        self.failed = True
+
+
+def observe_retry(source, exception):
+    """记录一次重试，exception为异常类型名（SSLError、Timeout、RequestException等）"""
+    CRAWL_RETRIES.inc(source=source, exception=exception)
+
+
+def observe_cache(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def observe_script_run(part):
+    """记录一次整页重跑（'script'）或一个fragment的执行，用于确认一次交互只重跑了预期的部分"""
+    SCRIPT_RUNS.inc(part=part)
+
+
+class SessionTracker:
+    """按最近一次活动时间统计活跃会话"""
+
+    def __init__(self, window=SESSION_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.last_seen: Dict[str, float] = {}
+
+    def touch(self, session_id):
+        with self.lock:
+            self.last_seen[session_id] = time.time()
+
+    def count(self):
+        cutoff = time.time() - self.window
+        with self.lock:
+            for session_id in [sid for sid, seen in self.last_seen.items() if seen < cutoff]:
+                del self.last_seen[session_id]
+            return len(self.last_seen)
+
+
+# 页面会话统计
+global_session_tracker = SessionTracker()
+ACTIVE_SESSIONS.set_function(global_session_tracker.count, kind='streamlit')
+
+
+def render_metrics():
+    """便捷函数：导出所有指标"""
+    return global_registry.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取很频繁，不输出访问日志
+        pass
+
+
+_server_lock = threading.Lock()
+_server = None
+
+
+def start_metrics_server(port=None, host='0.0.0.0'):
+    """
+    在后台线程中启动只提供/metrics的HTTP服务（一个进程只启动一次）
+    :param port: 端口，默认读取METRICS_PORT环境变量，没有设置时不启动
+    :return: 是否正在提供服务
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return True
+        port = port or os.environ.get(METRICS_PORT_ENV)
+        if not port:
+            return False
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except (OSError, ValueError) as e:
+            log.error('启动指标服务失败', port=port, error=e)
+            return False
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        log.info('指标服务已启动', address=f'{host}:{port}')
+        return True
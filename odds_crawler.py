@@ -3,8 +3,11 @@ import time
 import requests
 import random
 from bs4 import BeautifulSoup
-import traceback
 from data_cache import global_cache, get_cache_key
+from logger import get_logger, log_crawl
+from metrics import PARSE_DURATION, observe_retry, track_request
+from profiler import NETWORK, PARSE, add_bytes, timed
+from upstream import site_url
 
 # 配置参数
 MAX_RETRIES = 8
@@ -20,6 +23,8 @@ user_agents = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 ]
 
+log = get_logger(__name__)
+
 
 def keep_only_chinese(text):
     """
@@ -32,10 +37,12 @@ def keep_only_chinese(text):
     return ''.join(chinese_chars)
 
 
+@timed(NETWORK, '请求')
 def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECONDS, timeout=15):
     """
     带有重试机制的同步请求函数，优化生产环境部署。
     """
+    started = time.perf_counter()
     for attempt in range(retries):
         try:
             # 使用随机User-Agent和更完善的请求头
@@ -69,11 +76,15 @@ def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECOND
                 verify = False
                 timeout = 15
                 
-            response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
-            response.raise_for_status()
+            with track_request('odds', url) as tracked:
+                response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
+                response.raise_for_status()
+                tracked.add_bytes(len(response.content))
             
             # 读取内容并手动处理编码
             content = response.content
+            add_bytes(len(content))
+            log_crawl('odds', url, started, True, len(content), attempt + 1, status=response.status_code)
             try:
                 text = content.decode('gb18030')
             except UnicodeDecodeError:
@@ -85,190 +96,210 @@ def make_request_with_retries(url, retries=MAX_RETRIES, delay=RETRY_DELAY_SECOND
             
         except requests.exceptions.SSLError as e:
             if attempt < retries - 1:
-                print(f"SSL错误 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('odds', 'SSLError')
+                log.warning('SSL错误，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay * 2, error=e)
                 time.sleep(delay * 2)  # SSL错误时延长等待时间
             else:
-                print(f"SSL连接失败: {str(e)}")
+                log.error('SSL连接失败', url=url, error=e)
+                log_crawl('odds', url, started, False, attempts=retries, error=e)
                 return None
         except requests.exceptions.Timeout as e:
             if attempt < retries - 1:
-                print(f"请求超时 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('odds', 'Timeout')
+                log.warning('请求超时，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay, error=e)
                 time.sleep(delay)
             else:
-                print(f"请求超时: {str(e)}")
+                log.error('请求超时', url=url, error=e)
+                log_crawl('odds', url, started, False, attempts=retries, error=e)
                 return None
         except requests.RequestException as e:
             if attempt < retries - 1:
-                print(f"请求失败 (尝试 {attempt + 1}/{retries}): {str(e)}, 等待 {delay} 秒后重试")
+                observe_retry('odds', 'RequestException')
+                log.warning('请求失败，稍后重试', url=url, attempt=f'{attempt + 1}/{retries}', wait=delay, error=e)
                 time.sleep(delay + random.uniform(0, 1))  # 添加随机延迟
             else:
-                print(f"所有尝试都失败: {str(e)}")
+                log.error('所有尝试都失败', url=url, error=e)
+                log_crawl('odds', url, started, False, attempts=retries, error=e)
                 return None
     return None
 
 
-def fetch_oupei_data(match_id):
+@timed(PARSE, '解析欧赔')
+def fetch_oupei_data(match_id, use_cache=True, retries=MAX_RETRIES):
     """
     获取欧赔数据，带缓存机制。
+    use_cache为False时跳过缓存读取（定时抓取赔率快照时需要最新数据），结果仍然写入缓存。
+    retries为请求的最多尝试次数（批量回填时为1，由调用方控制请求速率）。
     """
     # 检查缓存
     cache_key = get_cache_key("oupei", match_id)
-    cached_data = global_cache.get(cache_key)
+    cached_data = global_cache.get(cache_key) if use_cache else None
     if cached_data:
         return cached_data
     
-    url = f'https://odds.500.com/fenxi/ouzhi-{match_id}.shtml'
-    res_text = make_request_with_retries(url)
+    url = site_url(f'https://odds.500.com/fenxi/ouzhi-{match_id}.shtml')
+    res_text = make_request_with_retries(url, retries)
     if not res_text or "百家欧赔" not in res_text:
-        print(f"欧赔数据获取失败: URL={url}, 响应为空或不包含预期内容")
+        log.warning('欧赔数据获取失败：响应为空或不包含预期内容', url=url)
         return None
 
-    try:
-        soup = BeautifulSoup(res_text, 'lxml')
-        data_table = soup.find('table', id='datatb')
-        if not data_table:
-            print(f"欧赔数据解析失败: 未找到数据表格, URL={url}")
-            return None
+    with PARSE_DURATION.time(parser='oupei'):
+        try:
+            soup = BeautifulSoup(res_text, 'lxml')
+            data_table = soup.find('table', id='datatb')
+            if not data_table:
+                log.warning('欧赔数据解析失败：未找到数据表格', url=url)
+                return None
 
-        extracted_data = {}
+            extracted_data = {}
 
-        company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
-        for row in company_rows:
-            company_td = row.find('td', class_='tb_plgs')
-            if not company_td or not company_td.has_attr('title'):
-                continue
-            # 直接使用网页中提取的公司名称，不再进行硬编码映射
-            clean_company_name = company_td['title']
-            odds_table = row.find('table', class_='pl_table_data')
-            if odds_table:
-                odds_rows = odds_table.find_all('tr')
-                if len(odds_rows) == 2:
-                    initial_tds = odds_rows[0].find_all('td')
-                    instant_tds = odds_rows[1].find_all('td')
-                    extracted_data[clean_company_name] = {
-                        'initial': [d.get_text(strip=True) for d in initial_tds],
-                        'instant': [d.get_text(strip=True) for d in instant_tds]
-                    }
-        if not extracted_data:
-            print(f"欧赔数据解析失败: 未提取到任何数据, URL={url}")
-            return None
+            company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
+            for row in company_rows:
+                company_td = row.find('td', class_='tb_plgs')
+                if not company_td or not company_td.has_attr('title'):
+                    continue
+                # 直接使用网页中提取的公司名称，不再进行硬编码映射
+                clean_company_name = company_td['title']
+                odds_table = row.find('table', class_='pl_table_data')
+                if odds_table:
+                    odds_rows = odds_table.find_all('tr')
+                    if len(odds_rows) == 2:
+                        initial_tds = odds_rows[0].find_all('td')
+                        instant_tds = odds_rows[1].find_all('td')
+                        extracted_data[clean_company_name] = {
+                            'initial': [d.get_text(strip=True) for d in initial_tds],
+                            'instant': [d.get_text(strip=True) for d in instant_tds]
+                        }
+            if not extracted_data:
+                log.warning('欧赔数据解析失败：未提取到任何数据', url=url)
+                return None
         
-        # 缓存数据
-        global_cache.set(cache_key, extracted_data)
-        return extracted_data
-    except Exception as e:
-        print(f"欧赔数据解析异常: URL={url}, 错误={traceback.format_exc()}")
-        return None
+            # 缓存数据
+            global_cache.set(cache_key, extracted_data)
+            return extracted_data
+        except Exception:
+            log.exception('欧赔数据解析异常', url=url)
+            return None
 
 
-def fetch_yapan_data(match_id):
+@timed(PARSE, '解析亚盘')
+def fetch_yapan_data(match_id, retries=MAX_RETRIES):
     """
     获取亚盘数据。
     """
-    url = f'https://odds.500.com/fenxi/yazhi-{match_id}.shtml'
-    res_text = make_request_with_retries(url)
+    url = site_url(f'https://odds.500.com/fenxi/yazhi-{match_id}.shtml')
+    res_text = make_request_with_retries(url, retries)
     if not res_text or "亚盘对比" not in res_text:
-        print(f"亚盘数据获取失败: URL={url}, 响应为空或不包含预期内容")
+        log.warning('亚盘数据获取失败：响应为空或不包含预期内容', url=url)
         return None
 
-    try:
-        soup = BeautifulSoup(res_text, 'lxml')
-        data_table = soup.find('table', id='datatb')
-        if not data_table:
-            print(f"亚盘数据解析失败: 未找到数据表格, URL={url}")
-            return None
+    with PARSE_DURATION.time(parser='yapan'):
+        try:
+            soup = BeautifulSoup(res_text, 'lxml')
+            data_table = soup.find('table', id='datatb')
+            if not data_table:
+                log.warning('亚盘数据解析失败：未找到数据表格', url=url)
+                return None
 
-        extracted_data = {}
+            extracted_data = {}
 
-        company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
-        for row in company_rows:
-            try:
-                all_tds = row.find_all('td', recursive=False)
-                if len(all_tds) < 6: continue
-                company_link = all_tds[1].find('a')
-                if not company_link or not company_link.has_attr('title'): continue
-                # 直接使用网页中提取的公司名称，不再进行硬编码映射
-                clean_company_name = company_link['title']
-                instant_table = all_tds[2].find('table')
-                initial_table = all_tds[4].find('table')
+            company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
+            for row in company_rows:
+                try:
+                    all_tds = row.find_all('td', recursive=False)
+                    if len(all_tds) < 6: continue
+                    company_link = all_tds[1].find('a')
+                    if not company_link or not company_link.has_attr('title'): continue
+                    # 直接使用网页中提取的公司名称，不再进行硬编码映射
+                    clean_company_name = company_link['title']
+                    instant_table = all_tds[2].find('table')
+                    initial_table = all_tds[4].find('table')
 
-                if instant_table and initial_table:
-                    instant_data = [d.get_text(strip=True) for d in instant_table.find_all('td')[:3]]
-                    initial_data = [d.get_text(strip=True) for d in initial_table.find_all('td')[:3]]
-                    if len(instant_data) == 3 and len(initial_data) == 3:
-                        extracted_data[clean_company_name] = {
-                            'initial': initial_data,
-                            'instant': instant_data
-                        }
-            except (AttributeError, IndexError) as e:
-                continue
-        if not extracted_data:
-            print(f"亚盘数据解析失败: 未提取到任何数据, URL={url}")
+                    if instant_table and initial_table:
+                        instant_data = [d.get_text(strip=True) for d in instant_table.find_all('td')[:3]]
+                        initial_data = [d.get_text(strip=True) for d in initial_table.find_all('td')[:3]]
+                        if len(instant_data) == 3 and len(initial_data) == 3:
+                            extracted_data[clean_company_name] = {
+                                'initial': initial_data,
+                                'instant': instant_data
+                            }
+                except (AttributeError, IndexError) as e:
+                    continue
+            if not extracted_data:
+                log.warning('亚盘数据解析失败：未提取到任何数据', url=url)
+                return None
+            return extracted_data
+        except Exception:
+            log.exception('亚盘数据解析异常', url=url)
             return None
-        return extracted_data
-    except Exception as e:
-        print(f"亚盘数据解析异常: URL={url}, 错误={traceback.format_exc()}")
-        return None
 
 
-def fetch_daxiao_data(match_id):
+@timed(PARSE, '解析大小球')
+def fetch_daxiao_data(match_id, retries=MAX_RETRIES):
     """
     获取大小球数据。
     """
-    url = f'https://odds.500.com/fenxi/daxiao-{match_id}.shtml'
-    res_text = make_request_with_retries(url)
+    url = site_url(f'https://odds.500.com/fenxi/daxiao-{match_id}.shtml')
+    res_text = make_request_with_retries(url, retries)
     if not res_text or "大小指数" not in res_text:
-        print(f"大小球数据获取失败: URL={url}, 响应为空或不包含预期内容")
+        log.warning('大小球数据获取失败：响应为空或不包含预期内容', url=url)
         return None
 
-    try:
-        soup = BeautifulSoup(res_text, 'lxml')
-        data_table = soup.find('table', id='datatb')
-        if not data_table:
-            print(f"大小球数据解析失败: 未找到数据表格, URL={url}")
-            return None
+    with PARSE_DURATION.time(parser='daxiao'):
+        try:
+            soup = BeautifulSoup(res_text, 'lxml')
+            data_table = soup.find('table', id='datatb')
+            if not data_table:
+                log.warning('大小球数据解析失败：未找到数据表格', url=url)
+                return None
 
-        extracted_data = {}
+            extracted_data = {}
 
-        company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
-        for row in company_rows:
-            try:
-                all_tds = row.find_all('td', recursive=False)
-                if len(all_tds) < 6: continue
-                company_link = all_tds[1].find('a')
-                if not company_link or not company_link.has_attr('title'): continue
-                # 直接使用网页中提取的公司名称，不再进行硬编码映射
-                clean_company_name = company_link['title']
-                instant_table = all_tds[2].find('table')
-                initial_table = all_tds[4].find('table')
+            company_rows = data_table.find_all('tr', id=re.compile(r'^\d+$'))
+            for row in company_rows:
+                try:
+                    all_tds = row.find_all('td', recursive=False)
+                    if len(all_tds) < 6: continue
+                    company_link = all_tds[1].find('a')
+                    if not company_link or not company_link.has_attr('title'): continue
+                    # 直接使用网页中提取的公司名称，不再进行硬编码映射
+                    clean_company_name = company_link['title']
+                    instant_table = all_tds[2].find('table')
+                    initial_table = all_tds[4].find('table')
 
-                if instant_table and initial_table:
-                    instant_data = [d.get_text(strip=True) for d in instant_table.find_all('td')[:3]]
-                    initial_data = [d.get_text(strip=True) for d in initial_table.find_all('td')[:3]]
-                    if len(instant_data) == 3 and len(initial_data) == 3:
-                        extracted_data[clean_company_name] = {
-                            'initial': initial_data,
-                            'instant': instant_data
-                        }
-            except (AttributeError, IndexError) as e:
-                continue
-        if not extracted_data:
-            print(f"大小球数据解析失败: 未提取到任何数据, URL={url}")
+                    if instant_table and initial_table:
+                        instant_data = [d.get_text(strip=True) for d in instant_table.find_all('td')[:3]]
+                        initial_data = [d.get_text(strip=True) for d in initial_table.find_all('td')[:3]]
+                        if len(instant_data) == 3 and len(initial_data) == 3:
+                            extracted_data[clean_company_name] = {
+                                'initial': initial_data,
+                                'instant': instant_data
+                            }
+                except (AttributeError, IndexError) as e:
+                    continue
+            if not extracted_data:
+                log.warning('大小球数据解析失败：未提取到任何数据', url=url)
+                return None
+            return extracted_data
+        except Exception:
+            log.exception('大小球数据解析异常', url=url)
             return None
-        return extracted_data
-    except Exception as e:
-        print(f"大小球数据解析异常: URL={url}, 错误={traceback.format_exc()}")
-        return None
 
 
-def fetch_all_odds_data(match_id):
+def has_odds_data(odds_data):
+    """判断赔率是否获取成功：欧赔、亚盘、大小球三个页面都失败时fetch_all_odds_data返回的各项都是None"""
+    return bool(odds_data) and any(odds_data.values())
+
+
+def fetch_all_odds_data(match_id, use_cache=True, retries=MAX_RETRIES):
     """
     为单个ID获取所有赔率数据。
+    :param retries: 每个页面请求的最多尝试次数
     """
     # 顺序获取所有赔率数据
-    oupei_data = fetch_oupei_data(match_id)
-    yapan_data = fetch_yapan_data(match_id)
-    daxiao_data = fetch_daxiao_data(match_id)
+    oupei_data = fetch_oupei_data(match_id, use_cache, retries)
+    yapan_data = fetch_yapan_data(match_id, retries)
+    daxiao_data = fetch_daxiao_data(match_id, retries)
 
     return {
         'oupei': oupei_data,
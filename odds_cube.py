@@ -0,0 +1,319 @@
+"""
+赔率立方体模块 - 把归档比赛的赔率存成列式的NumPy内存映射文件，用于跨比赛的赔率分析
+
+对几千场归档比赛做赔率分析时，逐个读取JSON缓存文件太慢。本模块把所有比赛的赔率写入一个
+形状为(比赛, 公司, 玩法, 结果, 阶段)的float32数组并用内存映射打开：
+- 玩法：欧赔、亚盘、大小球（MARKETS）
+- 结果：欧赔为(主胜, 平局, 客胜)，亚盘为(主队水位, 盘口, 客队水位)，大小球为(大球水位, 盘口, 小球水位)，
+  盘口按赔率表格的规则转换为数字（主队让球为负，受让为正）
+- 阶段：(初始, 即时)
+没有的数据为NaN。公司名称做字典编码，比赛按(联赛, 赛季sid, 日期)排序，
+同一联赛、同一赛季的比赛是连续的一段，按联赛/赛季/日期选择时都是切片，不会复制数据。
+
+构建：python odds_cube.py build
+查询：python odds_cube.py query --league 英超 --sid 1234 --company 平博 --market oupei
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+import numpy as np
+
+from card_templates import remove_arrows
+from markets import parse_line
+from match_archive import global_match_archive
+from odds_history import global_odds_history
+
+# 默认存储目录
+DEFAULT_CUBE_DIR = os.path.join('cache', 'odds_cube')
+
+MARKETS = ('oupei', 'yapan', 'daxiao')
+OUTCOMES = {
+    'oupei': ('主胜', '平局', '客胜'),
+    'yapan': ('主队水位', '盘口', '客队水位'),
+    'daxiao': ('大球水位', '盘口', '小球水位')
+}
+PHASES = ('initial', 'instant')
+
+# 亚盘和大小球的第二列是盘口文字，需要转换为数字
+LINE_COLUMN = 1
+
+# 每场比赛的元数据列，与立方体的第一维一一对应
+META_COLUMNS = ('fid', 'match_date', 'league', 'sid', 'home_team', 'away_team', 'score')
+
+
+@lru_cache(maxsize=4096)
+def parse_odds_value(market, column, text):
+    """把赔率表格中的一个单元格转换为数字，无法识别时返回NaN（赔率和盘口文字重复很多，按文字缓存）"""
+    if column == LINE_COLUMN and market != 'oupei':
+        value = parse_line(text)
+        return np.nan if value is None else value
+    try:
+        # 即时赔率带有变化方向的箭头
+        return float(remove_arrows(text))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def collect_odds(archive=None, history=None):
+    """
+    收集要写入立方体的比赛和赔率
+    优先使用回填保存在归档中的赔率，其余归档比赛使用赔率快照中的最新赔率
+    :return: [(比赛数据, 赔率数据)]
+    """
+    archive = archive or global_match_archive
+    history = history or global_odds_history
+    collected = {}
+    for match, odds_data in archive.iter_details('odds'):
+        collected[match['fid']] = (match, odds_data)
+
+    snapshot_fids = set(history.fids()) - set(collected)
+    if snapshot_fids:
+        for match in archive.query(include_date=True):
+            fid = match['fid']
+            if fid in snapshot_fids and fid not in collected:
+                odds_data = history.odds_at(fid)
+                if odds_data:
+                    collected[fid] = (match, odds_data)
+    return list(collected.values())
+
+
+class OddsCube:
+    """内存映射的赔率立方体（只读）"""
+
+    def __init__(self, path=DEFAULT_CUBE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.companies = meta['companies']
+        self.company_index = {company: i for i, company in enumerate(self.companies)}
+        self.meta = {name: meta['columns'][name] for name in META_COLUMNS}
+        self.fid_index = {fid: i for i, fid in enumerate(self.meta['fid'])}
+        # 联赛/赛季在立方体中的范围：{联赛: [起, 止)}，{联赛: {sid: [起, 止)}}
+        self.league_ranges = {league: tuple(bounds) for league, bounds in meta['league_ranges'].items()}
+        self.season_ranges = {league: {sid: tuple(bounds) for sid, bounds in seasons.items()}
+                              for league, seasons in meta['season_ranges'].items()}
+        self.data = np.load(os.path.join(path, 'cube.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @staticmethod
+    def build(matches_with_odds, path=DEFAULT_CUBE_DIR):
+        """
+        由比赛和赔率构建立方体并写入磁盘（先写临时目录再替换，读取方不会看到写了一半的文件）
+        :param matches_with_odds: [(比赛数据, 赔率数据)]，比赛数据需要包含match_date
+        :param path: 存储目录
+        :return: 打开的OddsCube
+        """
+        # 按(联赛, 赛季, 日期)排序，让同一联赛、同一赛季的比赛连续存放
+        rows = sorted(matches_with_odds, key=lambda item: (
+            item[0].get('league') or '', str(item[0].get('sid') or ''), item[0].get('match_date') or '', str(item[0].get('fid'))))
+
+        companies = []
+        company_index = {}
+        for _, odds_data in rows:
+            for market in MARKETS:
+                for company in (odds_data.get(market) or {}):
+                    if company not in company_index:
+                        company_index[company] = len(companies)
+                        companies.append(company)
+
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        shape = (len(rows), max(len(companies), 1), len(MARKETS), 3, len(PHASES))
+        cube = np.lib.format.open_memmap(os.path.join(tmp_path, 'cube.npy'), mode='w+', dtype=np.float32, shape=shape)
+        cube[:] = np.nan
+        for i, (_, odds_data) in enumerate(rows):
+            block = np.full(shape[1:], np.nan, dtype=np.float32)
+            for m, market in enumerate(MARKETS):
+                for company, odds in (odds_data.get(market) or {}).items():
+                    c = company_index[company]
+                    for p, phase in enumerate(PHASES):
+                        for column, text in enumerate((odds.get(phase) or [])[:3]):
+                            block[c, m, column, p] = parse_odds_value(market, column, text)
+            cube[i] = block
+        cube.flush()
+        del cube
+
+        columns = {name: [str(match.get(name) or '') for match, _ in rows] for name in META_COLUMNS}
+        league_ranges = {}
+        season_ranges = {}
+        for i, (league, sid) in enumerate(zip(columns['league'], columns['sid'])):
+            start = league_ranges.get(league, (i, i))[0]
+            league_ranges[league] = (start, i + 1)
+            seasons = season_ranges.setdefault(league, {})
+            seasons[sid] = (seasons.get(sid, (i, i))[0], i + 1)
+
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'companies': companies, 'columns': columns, 'league_ranges': league_ranges,
+                       'season_ranges': season_ranges, 'shape': shape}, f, ensure_ascii=False)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        return OddsCube(path)
+
+    def match_range(self, league=None, sid=None, date_from=None, date_to=None):
+        """
+        比赛维度的范围（切片），只能按联赛、赛季和日期选择
+        日期条件需要同时指定联赛和赛季（范围内按日期有序），否则返回None
+        """
+        if league is None:
+            if sid is not None or date_from or date_to:
+                return None
+            return slice(0, len(self))
+        if sid is None:
+            if date_from or date_to:
+                return None
+            start, stop = self.league_ranges.get(league, (0, 0))
+            return slice(start, stop)
+
+        start, stop = self.season_ranges.get(league, {}).get(str(sid), (0, 0))
+        dates = self.meta['match_date']
+        if date_from:
+            start = bisect_left(dates, date_from, start, stop)
+        if date_to:
+            stop = bisect_right(dates, date_to, start, stop)
+        return slice(start, stop)
+
+    def select(self, company=None, market='oupei', outcome=None, phase='instant',
+               league=None, sid=None, date_from=None, date_to=None, fids=None):
+        """
+        选择一块赔率数据
+        :param company: 公司名称，为None时返回所有公司
+        :param market: 玩法，'oupei'、'yapan'或'daxiao'，为None时返回所有玩法
+        :param outcome: 结果下标（0-2），为None时返回所有结果
+        :param phase: 'initial'或'instant'，为None时返回两个阶段
+        :param league: 联赛名称
+        :param sid: 赛季ID
+        :param date_from: 日期下限（含）
+        :param date_to: 日期上限（含）
+        :param fids: 指定的比赛fid列表（会复制数据）
+        :return: (比赛元数据, 赔率数组)；按联赛/赛季/日期选择时赔率数组是内存映射的视图，不复制数据
+        """
+        if company is not None and company not in self.company_index:
+            raise KeyError(f'未知的公司: {company}')
+
+        index = [slice(None)] * 5
+        if company is not None:
+            index[1] = self.company_index[company]
+        if market is not None:
+            index[2] = MARKETS.index(market)
+        if outcome is not None:
+            index[3] = outcome
+        if phase is not None:
+            index[4] = PHASES.index(phase)
+
+        if fids is not None:
+            rows = [self.fid_index[str(fid)] for fid in fids if str(fid) in self.fid_index]
+        else:
+            rows = self.match_range(league, sid, date_from, date_to)
+            if rows is None:
+                # 不是连续范围的条件退回到按元数据过滤（会复制数据）
+                rows = [i for i in range(len(self)) if self._matches(i, league, sid, date_from, date_to)]
+        index[0] = rows
+
+        if isinstance(rows, slice):
+            meta = {name: values[rows] for name, values in self.meta.items()}
+        else:
+            meta = {name: [values[i] for i in rows] for name, values in self.meta.items()}
+        return meta, self.data[tuple(index)]
+
+    def _matches(self, i, league, sid, date_from, date_to):
+        meta = self.meta
+        return ((league is None or meta['league'][i] == league)
+                and (sid is None or meta['sid'][i] == str(sid))
+                and (not date_from or meta['match_date'][i] >= date_from)
+                and (not date_to or meta['match_date'][i] <= date_to))
+
+    def seasons(self, league):
+        """
+        联赛的所有赛季
+        :return: [(sid, 第一场日期, 最后一场日期, 比赛数)]，按日期排列，最后一个即最近的赛季
+        """
+        dates = self.meta['match_date']
+        seasons = [(sid, dates[start], dates[stop - 1], stop - start)
+                   for sid, (start, stop) in self.season_ranges.get(league, {}).items() if stop > start]
+        return sorted(seasons, key=lambda season: (season[2], season[1]))
+
+    def odds(self, fid):
+        """一场比赛的全部赔率：形状(公司, 玩法, 结果, 阶段)的视图，没有该比赛时返回None"""
+        i = self.fid_index.get(str(fid))
+        return None if i is None else self.data[i]
+
+
+_global_cube = None
+
+
+def build_odds_cube(path=DEFAULT_CUBE_DIR):
+    """便捷函数：由比赛归档和赔率快照重新构建立方体"""
+    global _global_cube
+    _global_cube = OddsCube.build(collect_odds(), path)
+    return _global_cube
+
+
+def get_odds_cube(path=DEFAULT_CUBE_DIR):
+    """便捷函数：打开立方体（已打开时直接返回），还没有构建时返回None"""
+    global _global_cube
+    if _global_cube is None or _global_cube.path != path:
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        _global_cube = OddsCube(path)
+    return _global_cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description='赔率立方体：构建和查询')
+    parser.add_argument('command', choices=['build', 'query'], help='build构建，query查询')
+    parser.add_argument('--path', default=DEFAULT_CUBE_DIR, help='存储目录')
+    parser.add_argument('--league', help='联赛名称')
+    parser.add_argument('--sid', help='赛季ID，不指定时使用联赛最近的赛季')
+    parser.add_argument('--company', help='公司名称')
+    parser.add_argument('--market', default='oupei', choices=MARKETS, help='玩法')
+    parser.add_argument('--phase', default='instant', choices=PHASES, help='初始或即时')
+    parser.add_argument('--from', dest='date_from', help='日期下限（YYYY-MM-DD）')
+    parser.add_argument('--to', dest='date_to', help='日期上限（YYYY-MM-DD）')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        cube = build_odds_cube(args.path)
+        print(f"构建完成：{cube.data.shape[0]} 场比赛，{len(cube.companies)} 家公司，"
+              f"{cube.data.nbytes / 1024 / 1024:.1f} MB，耗时 {time.perf_counter() - started:.2f} 秒")
+        return 0
+
+    cube = get_odds_cube(args.path)
+    if cube is None:
+        print(f"赔率立方体不存在，请先运行: python odds_cube.py build --path {args.path}")
+        return 1
+    sid = args.sid
+    if args.league and sid is None:
+        seasons = cube.seasons(args.league)
+        sid = seasons[-1][0] if seasons else None
+
+    started = time.perf_counter()
+    meta, values = cube.select(company=args.company, market=args.market, phase=args.phase,
+                               league=args.league, sid=sid, date_from=args.date_from, date_to=args.date_to)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"选中 {len(meta['fid'])} 场比赛，数组形状 {values.shape}，"
+          f"{'视图（未复制）' if np.shares_memory(values, cube.data) else '副本'}，耗时 {elapsed:.2f} ms")
+    if args.company and len(meta['fid']):
+        outcomes = OUTCOMES[args.market]
+        for i in range(min(len(meta['fid']), 10)):
+            values_text = '  '.join(f'{name} {value:.2f}' for name, value in zip(outcomes, values[i]))
+            print(f"{meta['match_date'][i]} {meta['home_team'][i]} vs {meta['away_team'][i]} {meta['score'][i]}  {values_text}")
+        print(f"平均值: {'  '.join(f'{name} {value:.3f}' for name, value in zip(outcomes, np.nanmean(values, axis=0)))}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
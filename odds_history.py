@@ -0,0 +1,333 @@
+"""
+赔率时间序列模块 - 定时抓取欧赔、亚盘、大小球快照，只保存变化的赔率
+
+fetch_oupei_data的缓存只保留一份即时赔率，缓存过期后被覆盖，赔率的变化过程就丢失了。
+本模块把每次抓取到的赔率按(比赛, 玩法, 公司)做增量编码：与上一次保存的赔率相同时不写入，
+变化时才写入一行；公司从页面上消失时写入一行删除记录。任意时刻的赔率都可以由增量记录重建，
+赔率走势图和收盘赔率（开赛前最后一次快照）直接读取本地数据，不需要重新爬取。
+
+定时抓取：python odds_history.py [--interval 300] [--fids 1234567 ...] [--date YYYY-MM-DD]
+不指定--fids时跟踪比赛归档中该日期（默认今天）未开始的比赛，比赛开始后停止跟踪。
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from logger import get_logger
+from match_archive import global_match_archive
+from odds_crawler import fetch_all_odds_data
+
+log = get_logger(__name__)
+
+# 默认数据库路径（与比赛归档放在同一目录）
+DEFAULT_DB_PATH = os.path.join('cache', 'odds_history.db')
+
+# 记录的玩法，与fetch_all_odds_data的返回值一致
+MARKETS = ('oupei', 'yapan', 'daxiao')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS odds_changes (
+    fid TEXT NOT NULL,
+    market TEXT NOT NULL,
+    company TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    initial TEXT,
+    instant TEXT,
+    PRIMARY KEY (fid, market, company, captured_at)
+);
+CREATE TABLE IF NOT EXISTS odds_captures (
+    fid TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    changes INTEGER NOT NULL,
+    PRIMARY KEY (fid, captured_at)
+);
+"""
+
+
+def to_timestamp(value=None):
+    """把datetime、'YYYY-MM-DD HH:MM[:SS]'字符串或时间戳统一转换为时间戳，None表示现在"""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+            try:
+                return datetime.strptime(value, fmt).timestamp()
+            except ValueError:
+                continue
+        raise ValueError(f'无法识别的时间: {value}')
+    return float(value)
+
+
+class OddsHistory:
+    """赔率增量快照（SQLite），同一个实例可以在多个会话线程中共用"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_cached=1024):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            # WAL模式下读取不会被写入阻塞
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(SCHEMA)
+        # 每场比赛最新一次保存的赔率：fid -> {(玩法, 公司): (initial, instant)}，用于判断是否变化
+        self.max_cached = max_cached
+        self.latest = OrderedDict()
+        # 赔率变化的订阅者（推送接口等），每次保存到变化时以变化列表调用
+        self.subscribers = []
+
+    def _load_latest(self, fid):
+        """获取一场比赛最新保存的赔率状态（调用方持有锁）"""
+        state = self.latest.get(fid)
+        if state is None:
+            state = {}
+            rows = self.conn.execute(
+                'SELECT market, company, initial, instant FROM odds_changes WHERE fid = ? ORDER BY captured_at',
+                (fid,)).fetchall()
+            for row in rows:
+                if row['instant'] is None:
+                    state.pop((row['market'], row['company']), None)
+                else:
+                    state[(row['market'], row['company'])] = (row['initial'], row['instant'])
+            self.latest[fid] = state
+        self.latest.move_to_end(fid)
+        while len(self.latest) > self.max_cached:
+            self.latest.popitem(last=False)
+        return state
+
+    def record_snapshot(self, fid, odds_data, captured_at=None):
+        """
+        保存一次赔率快照，只写入与上一次相比发生变化的公司
+        :param fid: 比赛fid
+        :param odds_data: fetch_all_odds_data的返回值
+        :param captured_at: 抓取时间，默认为现在
+        :return: 写入的变化条数
+        """
+        if not odds_data:
+            return 0
+        fid = str(fid)
+        captured_at = to_timestamp(captured_at)
+        with self.lock, self.conn:
+            state = self._load_latest(fid)
+            rows = []
+            for market in MARKETS:
+                companies = odds_data.get(market)
+                # 某个玩法这次没有抓到（请求失败），不能当作所有公司都被删除
+                if not companies:
+                    continue
+                for position, (company, odds) in enumerate(companies.items()):
+                    initial = json.dumps(odds.get('initial', []), ensure_ascii=False)
+                    instant = json.dumps(odds.get('instant', []), ensure_ascii=False)
+                    if state.get((market, company)) != (initial, instant):
+                        state[(market, company)] = (initial, instant)
+                        rows.append((fid, market, company, captured_at, position, initial, instant))
+                # 页面上消失的公司写入删除记录
+                for key in [key for key in state if key[0] == market and key[1] not in companies]:
+                    del state[key]
+                    rows.append((fid, market, key[1], captured_at, 0, None, None))
+
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO odds_changes (fid, market, company, captured_at, position, initial, instant) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute('INSERT OR REPLACE INTO odds_captures (fid, captured_at, changes) VALUES (?, ?, ?)',
+                              (fid, captured_at, len(rows)))
+            subscribers = list(self.subscribers)
+
+        if rows and subscribers:
+            changes = [{
+                'fid': fid,
+                'market': market,
+                'company': company,
+                'captured_at': captured_at,
+                'initial': json.loads(initial) if initial is not None else None,
+                'instant': json.loads(instant) if instant is not None else None
+            } for fid, market, company, captured_at, _, initial, instant in rows]
+            for callback in subscribers:
+                try:
+                    callback(changes)
+                except Exception:
+                    log.exception('赔率变化订阅者处理失败')
+        return len(rows)
+
+    def subscribe(self, callback):
+        """订阅赔率变化：每次保存到变化时以变化列表调用callback（在保存快照的线程中执行）"""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def odds_at(self, fid, at=None):
+        """
+        重建某一时刻的赔率
+        :param fid: 比赛fid
+        :param at: 时刻（datetime、时间字符串或时间戳），默认为最新
+        :return: 与fetch_all_odds_data格式相同的字典，该时刻之前没有快照时返回None
+        """
+        at = to_timestamp(at)
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT market, company, position, initial, instant FROM odds_changes '
+                'WHERE fid = ? AND captured_at <= ? ORDER BY captured_at', (str(fid), at)).fetchall()
+        if not rows:
+            return None
+
+        states = {market: {} for market in MARKETS}
+        for row in rows:
+            companies = states[row['market']]
+            if row['instant'] is None:
+                companies.pop(row['company'], None)
+            else:
+                companies[row['company']] = (row['position'], json.loads(row['initial']), json.loads(row['instant']))
+
+        # 按最后一次出现时在页面上的顺序排列公司
+        return {
+            market: {company: {'initial': initial, 'instant': instant}
+                     for company, (_, initial, instant) in sorted(companies.items(), key=lambda item: item[1][0])} or None
+            for market, companies in states.items()
+        }
+
+    def closing_odds(self, fid, kickoff):
+        """收盘赔率：开赛前最后一次快照时的赔率"""
+        # 开赛时刻本身的快照已经可能是滚球赔率，取开赛前的最后一次
+        return self.odds_at(fid, to_timestamp(kickoff) - 1e-3)
+
+    def movement(self, fid, market, company=None):
+        """
+        赔率变化记录（只包含发生变化的时刻）
+        :param fid: 比赛fid
+        :param market: 'oupei'、'yapan'或'daxiao'
+        :param company: 公司名称，为None时返回所有公司
+        :return: [{'captured_at', 'company', 'initial', 'instant'}]，按时间排列，删除记录的initial/instant为None
+        """
+        sql = 'SELECT company, captured_at, initial, instant FROM odds_changes WHERE fid = ? AND market = ?'
+        params = [str(fid), market]
+        if company is not None:
+            sql += ' AND company = ?'
+            params.append(company)
+        sql += ' ORDER BY captured_at, position'
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{
+            'captured_at': row['captured_at'],
+            'company': row['company'],
+            'initial': json.loads(row['initial']) if row['initial'] is not None else None,
+            'instant': json.loads(row['instant']) if row['instant'] is not None else None
+        } for row in rows]
+
+    def fids(self):
+        """保存过赔率快照的所有比赛fid"""
+        with self.lock:
+            rows = self.conn.execute('SELECT DISTINCT fid FROM odds_captures').fetchall()
+        return [row['fid'] for row in rows]
+
+    def capture_times(self, fid):
+        """一场比赛所有快照的时间（包含没有变化的快照）"""
+        with self.lock:
+            rows = self.conn.execute('SELECT captured_at FROM odds_captures WHERE fid = ? ORDER BY captured_at',
+                                     (str(fid),)).fetchall()
+        return [row['captured_at'] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# 创建全局赔率快照实例
+global_odds_history = OddsHistory()
+
+
+def record_odds_snapshot(fid, odds_data, captured_at=None):
+    """便捷函数：保存一次赔率快照，保存失败时返回0"""
+    try:
+        return global_odds_history.record_snapshot(fid, odds_data, captured_at)
+    except sqlite3.Error as e:
+        log.error('保存赔率快照失败', fid=fid, error=e)
+        return 0
+
+
+def get_odds_at(fid, at=None):
+    """便捷函数：重建某一时刻的赔率，没有快照或读取失败时返回None"""
+    try:
+        return global_odds_history.odds_at(fid, at)
+    except sqlite3.Error as e:
+        log.error('读取赔率快照失败', fid=fid, error=e)
+        return None
+
+
+def get_odds_movement(fid, market, company=None):
+    """便捷函数：获取赔率变化记录，读取失败时返回空列表"""
+    try:
+        return global_odds_history.movement(fid, market, company)
+    except sqlite3.Error as e:
+        log.error('读取赔率变化失败', fid=fid, error=e)
+        return []
+
+
+def capture_odds(fid):
+    """抓取一场比赛的最新赔率（不使用文件缓存）并保存快照，返回写入的变化条数"""
+    odds_data = fetch_all_odds_data(fid, use_cache=False)
+    return record_odds_snapshot(fid, odds_data)
+
+
+def tracked_matches(match_date):
+    """比赛归档中该日期未开始的比赛：[(fid, 开赛时间戳)]"""
+    tracked = []
+    for match in global_match_archive.query(match_date=match_date):
+        if match.get('status') != '0' or not match.get('fid'):
+            continue
+        try:
+            # time字段为'MM-DD HH:MM'，年份取所属日期的年份
+            kickoff = to_timestamp(f"{match_date[:4]}-{match['time']}")
+        except ValueError:
+            continue
+        tracked.append((match['fid'], kickoff))
+    return tracked
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定时抓取赔率快照（只保存变化的赔率）')
+    parser.add_argument('--interval', type=float, default=300, help='两次抓取的间隔（秒）')
+    parser.add_argument('--fids', nargs='*', help='跟踪的比赛fid，不指定时跟踪比赛归档中未开始的比赛')
+    parser.add_argument('--date', default=time.strftime('%Y-%m-%d'), help='跟踪比赛归档中哪一天的比赛，默认今天')
+    parser.add_argument('--once', action='store_true', help='只抓取一次')
+    args = parser.parse_args()
+
+    while True:
+        now = time.time()
+        if args.fids:
+            fids = args.fids
+        else:
+            fids = [fid for fid, kickoff in tracked_matches(args.date) if kickoff > now]
+            if not fids:
+                print(f"{args.date} 没有需要跟踪的未开始比赛（请先在页面或backfill.py中爬取该日期的比赛）")
+                return 0
+
+        started = time.monotonic()
+        changes = 0
+        for fid in fids:
+            changes += capture_odds(fid)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 抓取 {len(fids)} 场比赛的赔率，"
+              f"变化 {changes} 条，耗时 {time.monotonic() - started:.1f} 秒")
+
+        if args.once:
+            return 0
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
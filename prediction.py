@@ -0,0 +1,535 @@
+"""
+预测模块 - 基于进攻力/防守力参数、贝叶斯修正xG和负二项分布的比赛预测
+
+不依赖Streamlit，可以在后台脚本中批量计算一整天的比赛（predict_slate），
+输入输出都是类型化的数据类，输入不可变，相同输入的预测结果会被缓存。
+"""
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+# 导入scipy.special用于对数伽马函数计算（对数空间计算，k+x较大时不会溢出）
+from scipy.special import gammaln
+
+from logger import get_logger
+from markets import MarketSet, derive_markets, match_outcome
+# 球队统计（MAX_GOALS同时是页面展示的进球数范围）
+from team_stats import MAX_GOALS, HeadToHeadStats, RecordStats, get_team_stats
+
+log = get_logger(__name__)
+
+# 比分矩阵默认的进球数上限：矩阵下标0到goal_cap-1为精确进球数，下标goal_cap为"goal_cap球及以上"的尾部概率
+DEFAULT_GOAL_CAP = 10
+
+# 常见比分
+COMMON_SCORES = ((0, 0), (1, 0), (0, 1), (1, 1), (2, 0), (0, 2), (2, 1), (1, 2), (2, 2))
+
+
+# ---------------------------------------------------------------------------
+# 输入数据
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class MatchInput:
+    """单场比赛的预测输入"""
+    match_id: str
+    home_team: str
+    away_team: str
+    # 联赛主场、客场场均进球数
+    league_home_avg_goals: float = 0
+    league_away_avg_goals: float = 0
+    # 历史交战统计
+    h2h: HeadToHeadStats = field(default_factory=HeadToHeadStats)
+    # 近期战绩（不区分主客场）
+    recent_home: RecordStats = field(default_factory=RecordStats)
+    recent_away: RecordStats = field(default_factory=RecordStats)
+    # 主队主场战绩、客队客场战绩，用于计算进攻力和防守力参数
+    home_at_home: RecordStats = field(default_factory=RecordStats)
+    away_at_away: RecordStats = field(default_factory=RecordStats)
+
+
+# ---------------------------------------------------------------------------
+# 输出数据
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True, eq=False)
+class ScoreDistribution:
+    """
+    由一对预期进球数得到的比分分布
+    matrix[i][j]为主队i球、客队j球的概率，最后一行/列为goal_cap球及以上的尾部概率，矩阵总和为1
+    """
+    home_xg: float
+    away_xg: float
+    matrix: np.ndarray
+    home_win: float
+    draw: float
+    away_win: float
+
+    @property
+    def goal_cap(self) -> int:
+        return self.matrix.shape[0] - 1
+
+    @property
+    def home_goals_probs(self) -> Dict[int, float]:
+        """主队进球数概率（键goal_cap为goal_cap球及以上）"""
+        return dict(enumerate(self.matrix.sum(axis=1).tolist()))
+
+    @property
+    def away_goals_probs(self) -> Dict[int, float]:
+        """客队进球数概率（键goal_cap为goal_cap球及以上）"""
+        return dict(enumerate(self.matrix.sum(axis=0).tolist()))
+
+    @property
+    def score_probs(self) -> Dict[Tuple[int, int], float]:
+        """常见比分概率"""
+        return {score: float(self.matrix[score]) for score in COMMON_SCORES}
+
+    @property
+    def tail_mass(self) -> float:
+        """任意一方进球数达到goal_cap及以上的概率"""
+        return float(self.matrix[-1, :].sum() + self.matrix[:-1, -1].sum())
+
+    @cached_property
+    def markets(self) -> MarketSet:
+        """由比分矩阵推导的全部玩法概率（胜平负、比分、大小球、亚盘、双方进球、半全场），首次访问时计算"""
+        return derive_markets(self.matrix)
+
+    def to_dict(self, include_markets=False) -> dict:
+        """可以序列化为JSON的字典，进球数概率合并为0到MAX_GOALS-1球和MAX_GOALS+球"""
+        data = {
+            'home_xg': float(self.home_xg),
+            'away_xg': float(self.away_xg),
+            'home_win': float(self.home_win),
+            'draw': float(self.draw),
+            'away_win': float(self.away_win),
+            'home_goals_probs': {str(goals): float(prob) for goals, prob in collapse_goals_probs(self.home_goals_probs).items()},
+            'away_goals_probs': {str(goals): float(prob) for goals, prob in collapse_goals_probs(self.away_goals_probs).items()},
+            'score_probs': {f'{home}-{away}': prob for (home, away), prob in self.score_probs.items()}
+        }
+        if include_markets:
+            data['markets'] = self.markets.to_dict()
+        return data
+
+
+@dataclass(frozen=True)
+class MatchPrediction:
+    """单场比赛的预测结果"""
+    match_id: str
+    home_team: str
+    away_team: str
+    home_attack: float
+    home_defense: float
+    away_attack: float
+    away_defense: float
+    # 原始xG预测
+    original: ScoreDistribution
+    # 贝叶斯修正xG预测
+    corrected: ScoreDistribution
+
+    @property
+    def pick(self) -> str:
+        """修正预测中概率最高的赛果"""
+        outcomes = {'主胜': self.corrected.home_win, '平局': self.corrected.draw, '客胜': self.corrected.away_win}
+        return max(outcomes, key=outcomes.get)
+
+    @property
+    def confidence(self) -> float:
+        """修正预测中最高赛果的概率"""
+        return max(self.corrected.home_win, self.corrected.draw, self.corrected.away_win)
+
+    def to_dict(self, include_markets=False) -> dict:
+        """可以序列化为JSON的字典"""
+        return {
+            'match_id': self.match_id,
+            'home_team': self.home_team,
+            'away_team': self.away_team,
+            'home_attack': float(self.home_attack),
+            'home_defense': float(self.home_defense),
+            'away_attack': float(self.away_attack),
+            'away_defense': float(self.away_defense),
+            'pick': self.pick,
+            'confidence': float(self.confidence),
+            'original': self.original.to_dict(include_markets),
+            'corrected': self.corrected.to_dict(include_markets)
+        }
+
+
+# ---------------------------------------------------------------------------
+# 从原始数据构建输入
+# ---------------------------------------------------------------------------
+
+def get_league_home_away_goals(league_data):
+    """
+    从联赛数据中提取主场和客场场均进球数
+    :param league_data: get_league_data的返回值
+    :return: (主场场均进球, 客场场均进球)，没有数据时为0
+    """
+    league_home_avg_goals = 0
+    league_away_avg_goals = 0
+    if league_data and league_data.get('average_data'):
+        home_away_goal = league_data['average_data'].get('home_away_average_goals', {})
+        for key, value in home_away_goal.items():
+            if '主场' in key:
+                league_home_avg_goals = float(value) if value and value != '暂无' else 0
+            elif '客场' in key:
+                league_away_avg_goals = float(value) if value and value != '暂无' else 0
+    return league_home_avg_goals, league_away_avg_goals
+
+
+def build_match_input(match, history_data, league_data) -> Optional[MatchInput]:
+    """
+    由比赛数据、历史数据（fetch_match_history）和联赛数据（get_league_data）构建预测输入
+    :return: MatchInput，缺少主客场战绩数据无法计算参数时返回None
+    """
+    if not history_data or 'recent_records_home_away' not in history_data:
+        return None
+
+    # 球队统计按fid缓存，与双方数据标签页共用
+    stats = get_team_stats(match.get('fid', ''), history_data)
+    league_home_avg_goals, league_away_avg_goals = get_league_home_away_goals(league_data)
+
+    return MatchInput(
+        match_id=str(match.get('match_id', '')),
+        home_team=stats.team_a_name or '主队',
+        away_team=stats.team_b_name or '客队',
+        league_home_avg_goals=league_home_avg_goals,
+        league_away_avg_goals=league_away_avg_goals,
+        h2h=stats.h2h,
+        recent_home=stats.recent_home,
+        recent_away=stats.recent_away,
+        home_at_home=stats.team_a_home,
+        away_at_away=stats.team_b_away
+    )
+
+
+# ---------------------------------------------------------------------------
+# 模型
+# ---------------------------------------------------------------------------
+
+def bayesian_xg_correction(original_xg, h2h_avg_goals, h2h_avg_conceded, h2h_win_rate, h2h_draw_rate, h2h_matches, league_avg_goals, h2h_goals_prob,
+                           recent_home_win_rate, recent_home_avg_goals, recent_home_avg_conceded,
+                           recent_away_win_rate, recent_away_avg_goals, recent_away_avg_conceded,
+                           is_home_team=True):
+    """
+    使用贝叶斯方法修正预期进球数
+    original_xg: 原始计算的预期进球数
+    h2h_avg_goals: 历史交战记录中的平均进球数
+    h2h_avg_conceded: 历史交战记录中的平均失球数
+    h2h_win_rate: 历史交战记录中的胜率
+    h2h_draw_rate: 历史交战记录中的平局率
+    h2h_matches: 历史交战记录的场次
+    league_avg_goals: 联赛平均进球数（先验的基准值）
+    h2h_goals_prob: 历史交战记录中的进球数分布概率
+    recent_home_win_rate: 主队近期胜率
+    recent_home_avg_goals: 主队近期场均进球
+    recent_home_avg_conceded: 主队近期场均失球
+    recent_away_win_rate: 客队近期胜率
+    recent_away_avg_goals: 客队近期场均进球
+    recent_away_avg_conceded: 客队近期场均失球
+    is_home_team: 是否为主队
+    返回：修正后的预期进球数
+    """
+    # 如果没有历史交战记录，返回原始xG
+    if h2h_matches == 0:
+        # 即使没有历史交战记录，也使用近期战绩进行修正
+        corrected_xg = original_xg
+    else:
+        # 计算权重：历史交战记录的权重基于场次，最多占50%
+        # 这样可以避免小样本的历史数据过度影响预测
+        h2h_weight = min(0.5, h2h_matches / 10)  # 最多50%权重，10场以上就达到最大权重
+        prior_weight = 1 - h2h_weight
+
+        # 先验分布：使用联赛平均进球数和原始xG的加权平均作为先验
+        prior = prior_weight * league_avg_goals + (1 - prior_weight) * original_xg
+
+        # 计算额外的修正因子：全面考虑胜平负率、进球数、丢球数等历史数据
+
+        # 1. 胜率因子：胜率越高，球队的进攻能力可能越强
+        win_rate_factor = 1.0 + (h2h_win_rate / 100) * 0.3  # 胜率每增加10%，进攻能力提升3%
+
+        # 2. 平局率因子：平局率反映了比赛的防守强度
+        # 平局率越高，比赛可能越保守，进球数可能越少
+        draw_factor = 1.0 - (h2h_draw_rate / 100) * 0.1  # 平局率每增加10%，进球预期减少1%
+
+        # 3. 对手防守因子：基于对手平均失球数
+        # 对手失球越多，说明其防守越弱，我方进球机会越多
+        opponent_defense_factor = h2h_avg_conceded / league_avg_goals if league_avg_goals > 0 else 1.0
+
+        # 4. 进球数分布因子：基于历史进球数分布的集中度
+        # 计算进球数分布的熵，熵越小说明分布越集中
+        entropy = -sum(p * math.log(p) if p > 0 else 0 for p in h2h_goals_prob)
+        distribution_factor = 1.0 + (1 - entropy / 2.5) * 0.1  # 熵越小，因子越大（最多增加10%）
+
+        # 结合所有因子计算修正后的历史交战平均进球数
+        adjusted_h2h_goals = h2h_avg_goals * win_rate_factor * draw_factor * opponent_defense_factor * distribution_factor
+
+        # 5. 额外考虑历史平均进球数与原始xG的差异
+        # 如果历史平均进球数与原始xG差异很大，适当调整权重
+        difference_factor = 1.0 - abs(h2h_avg_goals - original_xg) * 0.1  # 差异越大，权重略微降低
+        adjusted_h2h_weight = h2h_weight * difference_factor
+        adjusted_prior_weight = 1 - adjusted_h2h_weight
+
+        # 后验分布：结合先验和调整后的历史交战记录数据
+        corrected_xg = adjusted_prior_weight * prior + adjusted_h2h_weight * adjusted_h2h_goals
+
+    # 二次深度修正：结合近期战绩进行修正
+    # 1. 获取当前球队和对手的近期数据
+    if is_home_team:
+        team_recent_win_rate = recent_home_win_rate
+        team_recent_avg_goals = recent_home_avg_goals
+        opponent_recent_avg_conceded = recent_away_avg_conceded
+    else:
+        team_recent_win_rate = recent_away_win_rate
+        team_recent_avg_goals = recent_away_avg_goals
+        opponent_recent_avg_conceded = recent_home_avg_conceded
+
+    # 2. 近期战绩修正因子
+    # 近期胜率因子：近期表现越好，进攻能力越强
+    recent_win_factor = 1.0 + (team_recent_win_rate / 100) * 0.4  # 近期胜率每增加10%，进攻能力提升4%
+
+    # 3. 近期进球效率因子：近期进球越多，进攻状态越好
+    recent_goals_factor = team_recent_avg_goals / league_avg_goals if league_avg_goals > 0 else 1.0
+
+    # 4. 近期对手防守因子：对手近期失球越多，防守越弱
+    recent_opponent_defense_factor = opponent_recent_avg_conceded / league_avg_goals if league_avg_goals > 0 else 1.0
+
+    # 5. 综合近期战绩修正系数
+    recent_performance_factor = recent_win_factor * recent_goals_factor * recent_opponent_defense_factor
+
+    # 6. 应用近期战绩修正，给予20%的权重
+    final_corrected_xg = corrected_xg * 0.8 + corrected_xg * recent_performance_factor * 0.2
+
+    # 确保修正后的xG在合理范围内（0到5之间）
+    final_corrected_xg = max(0, min(5, final_corrected_xg))
+
+    return round(final_corrected_xg, 2)
+
+
+def negative_binomial_pmf(x, mean, k):
+    """
+    计算负二项分布的概率质量函数（对数空间计算，支持numpy数组广播）
+    x: 进球数
+    mean: 期望进球数（λ）
+    k: 离散参数
+    返回：x个进球的概率，输入均为标量时返回float
+    """
+    x = np.asarray(x, dtype=float)
+    mean = np.asarray(mean, dtype=float)
+    k = np.asarray(k, dtype=float)
+
+    # 期望或离散参数为0时退化为0球概率为1
+    degenerate = (mean == 0) | (k == 0)
+    safe_mean = np.where(degenerate, 1.0, mean)
+    safe_k = np.where(degenerate, 1.0, k)
+
+    # log PMF: lnΓ(x + k) - lnΓ(k) - lnΓ(x + 1) + k·ln(k/(k+λ)) + x·ln(λ/(k+λ))
+    log_pmf = (gammaln(x + safe_k) - gammaln(safe_k) - gammaln(x + 1)
+               + safe_k * np.log(safe_k / (safe_k + safe_mean))
+               + x * np.log(safe_mean / (safe_k + safe_mean)))
+    pmf = np.where(degenerate, (x == 0).astype(float), np.exp(log_pmf))
+
+    return float(pmf) if pmf.ndim == 0 else pmf
+
+
+def goal_probabilities(means, ks, goal_cap=DEFAULT_GOAL_CAP):
+    """
+    批量计算进球数概率分布
+    :param means: 期望进球数数组，形状(n,)
+    :param ks: 离散参数数组，形状(n,)
+    :param goal_cap: 进球数上限
+    :return: 形状(n, goal_cap + 1)的数组，最后一列为goal_cap球及以上的尾部概率，每行总和为1
+    """
+    goals = np.arange(goal_cap)
+    pmf = negative_binomial_pmf(goals[None, :], np.asarray(means, dtype=float)[:, None], np.asarray(ks, dtype=float)[:, None])
+    tail = np.clip(1.0 - pmf.sum(axis=1, keepdims=True), 0.0, None)
+    return np.hstack([pmf, tail])
+
+
+def score_matrices(home_means, away_means, home_ks, away_ks, goal_cap=DEFAULT_GOAL_CAP):
+    """
+    批量计算主客队比分概率矩阵（主客队进球数相互独立）
+    :return: 形状(n, goal_cap + 1, goal_cap + 1)的数组，matrices[m][i][j]为第m场主队i球、客队j球的概率
+    """
+    home_probs = goal_probabilities(home_means, home_ks, goal_cap)
+    away_probs = goal_probabilities(away_means, away_ks, goal_cap)
+    return home_probs[:, :, None] * away_probs[:, None, :]
+
+
+def collapse_goals_probs(goals_probs, max_goals=MAX_GOALS):
+    """
+    将进球数概率合并到0至max_goals球，最后一项为max_goals球及以上，用于页面展示
+    :return: {0: p0, ..., max_goals - 1: p, 'max_goals+': 尾部概率}
+    """
+    collapsed = {x: prob for x, prob in goals_probs.items() if x < max_goals}
+    collapsed[f'{max_goals}+'] = sum(prob for x, prob in goals_probs.items() if x >= max_goals)
+    return collapsed
+
+
+def _expected_goals(match_input: MatchInput):
+    """计算单场比赛的进攻力/防守力参数、原始xG、修正xG和负二项分布的离散参数"""
+    league_home = match_input.league_home_avg_goals
+    league_away = match_input.league_away_avg_goals
+    home_at_home = match_input.home_at_home
+    away_at_away = match_input.away_at_away
+
+    # 主队进攻力参数 = 主队主场场均进球 / 联赛主场场均进球；防守力参数 = 主队主场场均失球 / 联赛客场场均进球
+    home_attack = round(home_at_home.avg_goals_for / league_home, 2) if league_home > 0 else 0
+    home_defense = round(home_at_home.avg_goals_against / league_away, 2) if league_away > 0 else 0
+    # 客队进攻力参数 = 客队客场场均进球 / 联赛客场场均进球；防守力参数 = 客队客场场均失球 / 联赛主场场均进球
+    away_attack = round(away_at_away.avg_goals_for / league_away, 2) if league_away > 0 else 0
+    away_defense = round(away_at_away.avg_goals_against / league_home, 2) if league_home > 0 else 0
+
+    # 主队xG：主队进攻力参数 * 客队防守力参数 * 联赛主场场均进球数
+    home_xg = round(home_attack * away_defense * league_home, 2)
+    # 客队xG：客队进攻力参数 * 主队防守力参数 * 联赛客场场均进球数
+    away_xg = round(away_attack * home_defense * league_away, 2)
+
+    h2h = match_input.h2h
+    recent_home = match_input.recent_home
+    recent_away = match_input.recent_away
+    recent_args = (recent_home.win_rate, recent_home.avg_goals_for, recent_home.avg_goals_against,
+                   recent_away.win_rate, recent_away.avg_goals_for, recent_away.avg_goals_against)
+
+    # 主队xG修正：使用主队的胜率、平局率、进球分布和客队的平均失球数
+    corrected_home_xg = bayesian_xg_correction(home_xg, h2h.team_a_avg_goals, h2h.team_b_avg_conceded, h2h.team_a_win_rate, h2h.draw_rate,
+                                               h2h.matches, league_home, h2h.team_a_goals_prob, *recent_args, is_home_team=True)
+    # 客队xG修正：使用客队的胜率、平局率、进球分布和主队的平均失球数
+    corrected_away_xg = bayesian_xg_correction(away_xg, h2h.team_b_avg_goals, h2h.team_a_avg_conceded, h2h.team_b_win_rate, h2h.draw_rate,
+                                               h2h.matches, league_away, h2h.team_b_goals_prob, *recent_args, is_home_team=False)
+
+    # 离散参数：主队k为联赛主场场均进球数，客队k为联赛客场场均进球数（避免k为0）
+    home_k = max(0.1, league_home)
+    away_k = max(0.1, league_away)
+
+    return {
+        'params': (home_attack, home_defense, away_attack, away_defense),
+        'xg': (home_xg, away_xg, corrected_home_xg, corrected_away_xg),
+        'k': (home_k, away_k)
+    }
+
+
+def _build_predictions(inputs, goal_cap):
+    """
+    批量预测：先逐场计算xG，再一次性计算所有比赛原始和修正xG的比分矩阵
+    :return: 与输入顺序一致的列表，输入数据无效无法计算的比赛为None（不影响同一批次的其他比赛）
+    """
+    results = [None] * len(inputs)
+    valid = []
+    for position, match_input in enumerate(inputs):
+        try:
+            valid.append((position, match_input, _expected_goals(match_input)))
+        except (ArithmeticError, ValueError) as e:
+            log.warning('预测输入数据无效，跳过该场比赛', match_id=match_input.match_id, error=repr(e))
+    if not valid:
+        return results
+
+    expected = [item for _, _, item in valid]
+    count = len(expected)
+
+    # 前count行为原始xG，后count行为修正xG
+    home_means = [item['xg'][0] for item in expected] + [item['xg'][2] for item in expected]
+    away_means = [item['xg'][1] for item in expected] + [item['xg'][3] for item in expected]
+    home_ks = [item['k'][0] for item in expected] * 2
+    away_ks = [item['k'][1] for item in expected] * 2
+
+    matrices = score_matrices(home_means, away_means, home_ks, away_ks, goal_cap)
+    # 尾部格子按进球数等于goal_cap处理，goal_cap取默认值时尾部概率可以忽略不计
+    home_win, draw, away_win = match_outcome(matrices).T
+
+    def distribution(row):
+        return ScoreDistribution(home_means[row], away_means[row], matrices[row],
+                                 float(home_win[row]), float(draw[row]), float(away_win[row]))
+
+    for index, (position, match_input, item) in enumerate(valid):
+        home_attack, home_defense, away_attack, away_defense = item['params']
+        results[position] = MatchPrediction(
+            match_id=match_input.match_id,
+            home_team=match_input.home_team,
+            away_team=match_input.away_team,
+            home_attack=home_attack,
+            home_defense=home_defense,
+            away_attack=away_attack,
+            away_defense=away_defense,
+            original=distribution(index),
+            corrected=distribution(count + index)
+        )
+    return results
+
+
+class PredictionCache:
+    """预测结果缓存：以(MatchInput, goal_cap)为键，超过容量时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """获取缓存的预测结果，不存在时返回None"""
+        with self.lock:
+            prediction = self.cache.get(key)
+            if prediction is not None:
+                self.cache.move_to_end(key)
+            return prediction
+
+    def set(self, key, prediction):
+        """写入预测结果"""
+        with self.lock:
+            self.cache[key] = prediction
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.cache.clear()
+
+
+# 创建全局预测缓存实例
+global_prediction_cache = PredictionCache()
+
+
+# ---------------------------------------------------------------------------
+# 预测接口
+# ---------------------------------------------------------------------------
+
+def predict_slate(matches: Sequence[MatchInput], goal_cap: int = DEFAULT_GOAL_CAP) -> List[Optional[MatchPrediction]]:
+    """
+    批量预测一组比赛（例如一整天的赛事），未缓存的比赛一次性向量化计算
+    :param matches: MatchInput列表
+    :param goal_cap: 比分矩阵的进球数上限，超过部分计入尾部概率
+    :return: 与输入顺序一致的MatchPrediction列表，输入数据无效无法计算的比赛为None
+    """
+    predictions = [global_prediction_cache.get((match_input, goal_cap)) for match_input in matches]
+
+    # 只计算未缓存的比赛（同一批次中重复的输入只计算一次）
+    missing = list(dict.fromkeys(match_input for match_input, prediction in zip(matches, predictions) if prediction is None))
+    if missing:
+        computed = dict(zip(missing, _build_predictions(missing, goal_cap)))
+        for match_input, prediction in computed.items():
+            if prediction is not None:
+                global_prediction_cache.set((match_input, goal_cap), prediction)
+        predictions = [prediction if prediction is not None else computed[match_input]
+                       for match_input, prediction in zip(matches, predictions)]
+
+    return predictions
+
+
+def predict_match(match_input: MatchInput, goal_cap: int = DEFAULT_GOAL_CAP) -> Optional[MatchPrediction]:
+    """
+    预测单场比赛（输入不可变，相同输入直接返回缓存结果）
+    :param match_input: MatchInput
+    :param goal_cap: 比分矩阵的进球数上限
+    :return: MatchPrediction，输入数据无效时为None
+    """
+    return predict_slate([match_input], goal_cap)[0]
+
+
+def rank_predictions(predictions: Sequence[Optional[MatchPrediction]]) -> List[MatchPrediction]:
+    """按修正预测中最高赛果概率从高到低排序（跳过无法计算的比赛）"""
+    return sorted((prediction for prediction in predictions if prediction is not None), key=lambda prediction: prediction.confidence, reverse=True)
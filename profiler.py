@@ -0,0 +1,213 @@
+"""
+性能分析模块 - 在热点路径上记录耗时片段，按每次页面重跑汇总
+
+页面变慢时分不清是网络请求、BeautifulSoup解析、预测计算还是Streamlit渲染。爬虫、解析函数、文件缓存、
+预测和卡片渲染处用span()/timed()记录耗时片段，片段记到当前活动的Profile中；没有活动的Profile时
+span()直接返回一个空操作对象，只多一次ContextVar读取。
+
+片段可以嵌套：按类别汇总时使用独占时间（扣除子片段的时间），例如获取赔率的片段只统计解析时间，
+其中的网络请求和缓存读写计入各自的类别；最慢片段列表使用包含子片段的总时间。
+活动的Profile保存在ContextVar中，asyncio任务和asyncio.to_thread会继承，其他线程池中的代码不会记录。
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# 片段类别
+NETWORK = '网络请求'
+PARSE = 'HTML解析'
+CACHE = '文件缓存'
+PREDICTION = '预测计算'
+RENDER = '页面渲染'
+
+# 会话状态中保存本次整页重跑的Profile的键
+PROFILE_STATE_KEY = 'rerun_profile'
+
+_current_profile = contextvars.ContextVar('current_profile', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+@dataclass(frozen=True)
+class Span:
+    """一个已结束的耗时片段"""
+    category: str
+    name: str
+    # 包含子片段的总时间和扣除子片段后的独占时间（秒）
+    duration: float
+    exclusive: float
+    nbytes: int = 0
+
+
+class Profile:
+    """一次页面重跑中记录的所有耗时片段（可以在多个线程中同时记录）"""
+
+    def __init__(self, label=''):
+        self.label = label
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.bytes_fetched = 0
+        self.requests = 0
+        # 整页重跑结束时的总耗时，之后局部重跑记录的片段仍然计入
+        self.wall_time = None
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+            if span.category == NETWORK:
+                self.requests += 1
+                self.bytes_fetched += span.nbytes
+
+    @property
+    def elapsed(self) -> float:
+        """整页重跑的总耗时（秒），尚未结束时为到现在为止的时间"""
+        return self.wall_time if self.wall_time is not None else time.perf_counter() - self.started
+
+    def finish(self):
+        """整页重跑结束时记录总耗时"""
+        self.wall_time = time.perf_counter() - self.started
+
+    def totals(self) -> Dict[str, Tuple[int, float]]:
+        """按类别汇总：类别 -> (片段数, 独占时间)，按时间从多到少排列"""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            count, seconds = totals.get(span.category, (0, 0.0))
+            totals[span.category] = (count + 1, seconds + span.exclusive)
+        return dict(sorted(totals.items(), key=lambda item: item[1][1], reverse=True))
+
+    def slowest(self, limit=10) -> List[Span]:
+        """最慢的片段（按总时间）"""
+        with self.lock:
+            return sorted(self.spans, key=lambda span: span.duration, reverse=True)[:limit]
+
+
+class _ActiveSpan:
+    """正在计时的片段"""
+    __slots__ = ('profile', 'category', 'name', 'started', 'children', 'nbytes', 'token')
+
+    def __init__(self, profile, category, name):
+        self.profile = profile
+        self.category = category
+        self.name = name
+        self.children = 0.0
+        self.nbytes = 0
+
+    def __enter__(self):
+        self.token = _current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.started
+        _current_span.reset(self.token)
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children += duration
+        self.profile.add(Span(self.category, self.name, duration, max(0.0, duration - self.children), self.nbytes))
+        return False
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+
+class _NullSpan:
+    """没有活动的Profile时使用的空操作片段"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def add_bytes(self, nbytes):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(category, name=''):
+    """
+    记录一个耗时片段：with span(NETWORK, url) as s: ...; s.add_bytes(len(content))
+    没有活动的Profile时返回空操作对象
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return NULL_SPAN
+    return _ActiveSpan(profile, category, name)
+
+
+def add_bytes(nbytes):
+    """把下载的字节数记到当前片段上（没有活动的片段时忽略）"""
+    current = _current_span.get()
+    if current is not None:
+        current.add_bytes(nbytes)
+
+
+def timed(category, name=None):
+    """
+    装饰器：把函数的每次调用记录为一个片段（支持协程函数）
+    :param name: 片段名称，默认为函数名；第一个位置参数（URL、比赛ID等）会附在名称后面
+    """
+    def decorator(func):
+        label = name or func.__name__
+
+        def span_name(args):
+            return f'{label} {args[0]}' if args and isinstance(args[0], (str, int)) else label
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_profile.get() is None:
+                    return await func(*args, **kwargs)
+                with span(category, span_name(args)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_profile.get() is None:
+                return func(*args, **kwargs)
+            with span(category, span_name(args)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def activate_profile(profile):
+    """把profile设为当前上下文中活动的Profile（None表示停止记录）"""
+    _current_profile.set(profile)
+    return profile
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+def start_rerun_profile(session_state, enabled):
+    """
+    页面整页重跑开始时调用：开启分析时新建并激活本次重跑的Profile，关闭时停止记录
+    :param session_state: st.session_state
+    :return: Profile，未开启时返回None
+    """
+    if not enabled:
+        session_state.pop(PROFILE_STATE_KEY, None)
+        return activate_profile(None)
+    profile = Profile('整页重跑')
+    session_state[PROFILE_STATE_KEY] = profile
+    return activate_profile(profile)
+
+
+def resume_profile(session_state):
+    """局部重跑（fragment）开始时调用：把耗时记到本会话最近一次整页重跑的Profile中"""
+    profile = session_state.get(PROFILE_STATE_KEY)
+    if profile is not None and _current_profile.get() is not profile:
+        activate_profile(profile)
+    return profile
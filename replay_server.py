@@ -0,0 +1,296 @@
+"""
+离线回放服务 - 用录制的页面代替500.com，可以注入延迟、限流、错误和截断
+
+压测爬虫不能直接请求500.com。本服务基于aiohttp.web，按路径提供项目用到的所有页面：
+  /2h1.php                     即时比分（live）
+  /wanchang.php?e=YYYY-MM-DD   按日期的完场/赛程（wanchang）
+  /                            即时比分首页，用于竞彩标识（home）
+  /fenxi/ouzhi-{fid}.shtml     欧赔（ouzhi）
+  /fenxi/yazhi-{fid}.shtml     亚盘（yazhi）
+  /fenxi/daxiao-{fid}.shtml    大小球（daxiao）
+  /fenxi/shuju-{fid}.shtml     双方数据（shuju）
+  /zuqiu-{sid}/                联赛数据（liansai）
+录制的页面保存在页面目录（默认cache/replay）中，按原始字节返回：优先使用{类型}-{ID}.html
+（如ouzhi-1234567.html、wanchang-2024-05-01.html），没有时使用{类型}.html，所以一份页面可以代替任意比赛。
+
+爬虫设置CRAWLER_UPSTREAM=http://127.0.0.1:8765（或调用upstream.set_upstream）后所有请求都发到本服务。
+故障注入（可以对每种页面分别设置）：固定延迟加随机抖动、每秒请求数上限（超出的排队）、每个响应的带宽上限、
+按比例返回5xx错误、挂起（触发客户端超时）、断开连接、截断页面内容。/_replay/stats返回各页面的请求统计。
+
+用法：
+  python replay_server.py record --fid 1234567 [--sid 36] [--date 2024-05-01]   从500.com录制页面
+  python replay_server.py serve [--port 8765] [--latency 0.05] [--jitter 0.1] [--rate 50]
+                                [--error-rate 0.02] [--timeout-rate 0] [--reset-rate 0] [--truncate-rate 0]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from backfill import RateLimiter
+from logger import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_PAGES_DIR = os.path.join('cache', 'replay')
+DEFAULT_PORT = 8765
+
+# 页面类型 -> (路径, 录制时的真实地址模板)
+PAGE_ROUTES = {
+    'live': ('/2h1.php', 'https://live.500.com/2h1.php'),
+    'wanchang': ('/wanchang.php', 'https://live.500.com/wanchang.php?e={date}'),
+    'home': ('/', 'https://live.500.com/'),
+    'ouzhi': (r'/fenxi/ouzhi-{id:\d+}.shtml', 'https://odds.500.com/fenxi/ouzhi-{fid}.shtml'),
+    'yazhi': (r'/fenxi/yazhi-{id:\d+}.shtml', 'https://odds.500.com/fenxi/yazhi-{fid}.shtml'),
+    'daxiao': (r'/fenxi/daxiao-{id:\d+}.shtml', 'https://odds.500.com/fenxi/daxiao-{fid}.shtml'),
+    'shuju': (r'/fenxi/shuju-{id:\d+}.shtml', 'https://odds.500.com/fenxi/shuju-{fid}.shtml'),
+    'liansai': (r'/zuqiu-{id:\d+}/', 'https://liansai.500.com/zuqiu-{sid}/'),
+}
+
+# 注入错误时返回的状态码
+ERROR_STATUSES = (500, 502, 503)
+
+# 限速发送时每次写出的字节数
+CHUNK_SIZE = 4096
+
+
+@dataclass
+class FaultConfig:
+    """故障注入配置，比例都是0~1之间的概率"""
+    # 每个响应的固定延迟和额外随机延迟上限（秒）
+    latency: float = 0.0
+    jitter: float = 0.0
+    # 每秒最多处理的请求数，超出的请求排队等待（0表示不限）
+    rate: float = 0.0
+    # 每个响应每秒最多发送的字节数（0表示不限）
+    bandwidth: int = 0
+    # 返回5xx错误的比例
+    error_rate: float = 0.0
+    # 挂起hang_seconds秒后才响应的比例（用于触发客户端超时）
+    timeout_rate: float = 0.0
+    hang_seconds: float = 60.0
+    # 不响应直接断开连接的比例
+    reset_rate: float = 0.0
+    # 只返回页面前一部分内容的比例
+    truncate_rate: float = 0.0
+
+
+class PageStore:
+    """录制页面目录：按类型和ID查找页面，读取过的页面保存在内存中"""
+
+    def __init__(self, pages_dir=DEFAULT_PAGES_DIR):
+        self.pages_dir = pages_dir
+        self.pages: Dict[str, Optional[bytes]] = {}
+
+    def _read(self, name):
+        if name not in self.pages:
+            path = os.path.join(self.pages_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    self.pages[name] = f.read()
+            except OSError:
+                self.pages[name] = None
+        return self.pages[name]
+
+    def get(self, kind, key=None) -> Optional[bytes]:
+        """优先返回该ID的页面，没有时返回该类型的通用页面"""
+        if key:
+            body = self._read(f'{kind}-{key}.html')
+            if body is not None:
+                return body
+        return self._read(f'{kind}.html')
+
+    def save(self, kind, key, body):
+        """保存录制的页面：{类型}-{ID}.html，该类型还没有通用页面时同时作为通用页面"""
+        os.makedirs(self.pages_dir, exist_ok=True)
+        names = [f'{kind}-{key}.html' if key else f'{kind}.html']
+        if key and not os.path.exists(os.path.join(self.pages_dir, f'{kind}.html')):
+            names.append(f'{kind}.html')
+        for name in names:
+            with open(os.path.join(self.pages_dir, name), 'wb') as f:
+                f.write(body)
+            self.pages[name] = body
+        return names
+
+
+class ReplayServer:
+    """回放服务：按路径返回录制的页面，按故障注入配置模拟上游的各种异常"""
+
+    def __init__(self, pages_dir=DEFAULT_PAGES_DIR, faults=None, seed=None):
+        self.pages = PageStore(pages_dir)
+        self.faults = faults or FaultConfig()
+        # 按页面类型单独设置的故障注入配置
+        self.kind_faults: Dict[str, FaultConfig] = {}
+        self.random = random.Random(seed)
+        self.limiters = {}
+        # 页面类型 -> 结果 -> 次数
+        self.stats = defaultdict(Counter)
+        self.started_at = time.time()
+
+    def set_faults(self, faults, kind=None):
+        """修改故障注入配置（kind为None时修改默认配置）"""
+        if kind is None:
+            self.faults = faults
+        else:
+            self.kind_faults[kind] = faults
+        self.limiters.clear()
+
+    def faults_for(self, kind):
+        return self.kind_faults.get(kind, self.faults)
+
+    def _limiter(self, kind, faults):
+        """每个配置一个令牌桶：默认配置所有页面共用，单独配置的页面各自限流"""
+        if not faults.rate:
+            return None
+        key = kind if kind in self.kind_faults else None
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = self.limiters[key] = RateLimiter(faults.rate)
+        return limiter
+
+    def create_app(self):
+        app = web.Application()
+        for kind, (path, _) in PAGE_ROUTES.items():
+            app.router.add_get(path, self.serve, name=kind)
+        app.router.add_get('/_replay/stats', self.handle_stats)
+        return app
+
+    async def serve(self, request):
+        kind = request.match_info.route.name
+        key = request.match_info.get('id') or request.query.get('e')
+        body = self.pages.get(kind, key)
+        if body is None:
+            self.stats[kind]['missing'] += 1
+            return web.Response(status=404, text=f'没有录制的页面: {kind}')
+
+        faults = self.faults_for(kind)
+        limiter = self._limiter(kind, faults)
+        if limiter is not None:
+            await limiter.acquire()
+        await asyncio.sleep(faults.latency + self.random.uniform(0, faults.jitter))
+
+        roll = self.random.random()
+        if roll < faults.reset_rate:
+            self.stats[kind]['reset'] += 1
+            # 直接中断连接，客户端收到连接断开错误；之后的响应写不出去，会被aiohttp忽略
+            request.transport.abort()
+            return web.Response(status=499)
+        roll -= faults.reset_rate
+        if roll < faults.timeout_rate:
+            self.stats[kind]['hang'] += 1
+            await asyncio.sleep(faults.hang_seconds)
+        elif roll - faults.timeout_rate < faults.error_rate:
+            self.stats[kind]['error'] += 1
+            return web.Response(status=self.random.choice(ERROR_STATUSES), text='注入的服务端错误')
+        elif roll - faults.timeout_rate - faults.error_rate < faults.truncate_rate:
+            self.stats[kind]['truncated'] += 1
+            body = body[:int(len(body) * self.random.uniform(0.1, 0.9))]
+        else:
+            self.stats[kind]['ok'] += 1
+
+        if not faults.bandwidth:
+            return web.Response(body=body, content_type='text/html', charset='gbk')
+        # 限速发送：按带宽分块写出
+        response = web.StreamResponse(headers={'Content-Type': 'text/html; charset=gbk'})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            await response.write(chunk)
+            await asyncio.sleep(len(chunk) / faults.bandwidth)
+        await response.write_eof()
+        return response
+
+    async def handle_stats(self, request):
+        return web.json_response({
+            'uptime': round(time.time() - self.started_at, 1),
+            'faults': asdict(self.faults),
+            'kind_faults': {kind: asdict(faults) for kind, faults in self.kind_faults.items()},
+            'pages': {kind: dict(counts) for kind, counts in self.stats.items()}
+        })
+
+
+def record_pages(pages_dir, fid=None, sid=None, date_str=None, timeout=20):
+    """
+    从500.com录制页面到页面目录
+    :return: 保存的文件名列表
+    """
+    import requests
+    from history_crawler import user_agents
+
+    values = {'fid': fid, 'sid': sid, 'date': date_str}
+    keys = {'ouzhi': fid, 'yazhi': fid, 'daxiao': fid, 'shuju': fid, 'liansai': sid, 'wanchang': date_str}
+    store = PageStore(pages_dir)
+    saved = []
+    for kind, (_, template) in PAGE_ROUTES.items():
+        if kind in keys and not keys[kind]:
+            continue
+        url = template.format(**values)
+        try:
+            response = requests.get(url, headers={'User-Agent': random.choice(user_agents)},
+                                    timeout=timeout, verify=False)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            log.error('录制页面失败', url=url, error=e)
+            continue
+        saved.extend(store.save(kind, keys.get(kind), response.content))
+    return saved
+
+
+def add_fault_arguments(parser):
+    """故障注入的命令行参数（压测脚本共用）"""
+    parser.add_argument('--latency', type=float, default=0.0, help='每个响应的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外随机延迟的上限（秒）')
+    parser.add_argument('--rate', type=float, default=0.0, help='每秒最多处理的请求数，0表示不限')
+    parser.add_argument('--bandwidth', type=int, default=0, help='每个响应每秒最多发送的字节数，0表示不限')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回5xx错误的比例')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='挂起不响应的比例')
+    parser.add_argument('--hang-seconds', type=float, default=60.0, help='挂起的时间（秒）')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='断开连接的比例')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='截断页面内容的比例')
+
+
+def faults_from_args(args):
+    return FaultConfig(latency=args.latency, jitter=args.jitter, rate=args.rate, bandwidth=args.bandwidth,
+                       error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+                       reset_rate=args.reset_rate, truncate_rate=args.truncate_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='500.com页面离线回放服务')
+    parser.add_argument('--pages', default=DEFAULT_PAGES_DIR, help='录制页面目录')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='从500.com录制页面')
+    record.add_argument('--fid', help='比赛ID（录制欧赔、亚盘、大小球和双方数据页面）')
+    record.add_argument('--sid', help='联赛ID（录制联赛页面）')
+    record.add_argument('--date', help='日期YYYY-MM-DD（录制完场/赛程页面）')
+
+    serve = commands.add_parser('serve', help='启动回放服务')
+    serve.add_argument('--host', default='127.0.0.1', help='监听地址')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    serve.add_argument('--seed', type=int, help='故障注入的随机种子')
+    add_fault_arguments(serve)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        saved = record_pages(args.pages, args.fid, args.sid, args.date)
+        print(f"已保存 {len(saved)} 个页面到 {args.pages}: {', '.join(saved)}")
+        return 0 if saved else 1
+
+    server = ReplayServer(args.pages, faults_from_args(args), args.seed)
+    print(f"回放服务: http://{args.host}:{args.port}，页面目录 {args.pages}")
+    print(f"爬虫使用回放服务: CRAWLER_UPSTREAM=http://{args.host}:{args.port}")
+    web.run_app(server.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+会话数据存储 - 比赛详细数据（赔率、双方数据）放在所有会话共用的存储中，会话状态中只保存引用
+
+- SharedDataStore：进程内共用的存储，按(类别, 比赛ID)保存数据和估算的内存大小，记录被多少个会话引用；
+  没有会话引用的数据超过大小上限或过期时按最近使用淘汰
+- SessionDataCache：保存在会话状态中，只记录本会话最近打开的比赛ID（每个类别有数量上限，超出时释放最久未用的引用），
+  会话结束（会话状态被回收）时释放全部引用
+同一场比赛的数据在进程中只保存一份，会话打开的比赛再多，会话状态也不会一直增长。
+共用的数据可能被多个会话同时读取，调用方不能修改。获取失败时的空数据只保存在本会话中，不会共用。
+"""
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from data_cache import global_cache
+
+# 数据类别
+ODDS = 'odds'
+HISTORY = 'history'
+
+# 每个会话保留引用的最近打开比赛数
+SESSION_LIMITS = {ODDS: 30, HISTORY: 30}
+
+# 共用存储中没有会话引用的数据的总大小上限（字节）
+SHARED_MAX_BYTES = 64 * 1024 * 1024
+
+# 其他会话获取的数据在多长时间内可以直接使用（秒），与文件缓存的有效期一致：超过后再获取也只会重新请求
+SHARED_MAX_AGE = global_cache.cache_duration
+
+# 会话状态中的键
+SESSION_STATE_KEY = 'session_data'
+
+# 会话中表示数据在共用存储中
+_SHARED = object()
+
+
+def estimate_size(obj, seen=None):
+    """估算对象及其包含的字典、列表和字符串占用的内存（字节），共用的对象只计一次"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, seen) + estimate_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+
+@dataclass
+class SharedEntry:
+    """共用存储中的一项数据"""
+    data: Any
+    # 估算的内存大小（字节）
+    nbytes: int
+    stored_at: float
+    # 引用该数据的会话数
+    refs: int = 0
+
+
+class SharedDataStore:
+    """所有会话共用的比赛详细数据存储"""
+
+    def __init__(self, max_bytes=SHARED_MAX_BYTES, max_age=SHARED_MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # (类别, 比赛ID) -> 数据，按最近使用排序
+        self.entries: 'OrderedDict[Tuple[str, str], SharedEntry]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def acquire(self, kind, key):
+        """
+        增加一个会话对数据的引用
+        :return: (是否找到, 数据)；过期的数据视为没有找到
+        """
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry is None or time.time() - entry.stored_at > self.max_age:
+                return False, None
+            entry.refs += 1
+            self.entries.move_to_end((kind, key))
+            return True, entry.data
+
+    def read(self, kind, key):
+        """读取会话已经引用的数据（有引用的数据不会被淘汰）"""
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry is None:
+                return None
+            self.entries.move_to_end((kind, key))
+            return entry.data
+
+    def put(self, kind, key, data, acquire=True):
+        """
+        写入数据，已有的数据被替换（引用数不变）
+        :param acquire: 是否同时增加一个会话引用
+        """
+        entry = SharedEntry(data=data, nbytes=estimate_size(data), stored_at=time.time())
+        with self.lock:
+            previous = self.entries.pop((kind, key), None)
+            entry.refs = (previous.refs if previous else 0) + (1 if acquire else 0)
+            self.entries[(kind, key)] = entry
+            self._evict()
+
+    def release(self, kind, key):
+        """减少一个会话对数据的引用"""
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self):
+        """淘汰没有会话引用的过期数据，以及超过大小上限时最久未用的数据（调用方持有锁）"""
+        now = time.time()
+        unreferenced = sum(entry.nbytes for entry in self.entries.values() if not entry.refs)
+        for item_key, entry in list(self.entries.items()):
+            if entry.refs:
+                continue
+            if unreferenced <= self.max_bytes and now - entry.stored_at <= self.max_age:
+                continue
+            del self.entries[item_key]
+            unreferenced -= entry.nbytes
+
+    def stats(self):
+        """共用存储的统计：数据项数、总大小、被引用的项数和总大小"""
+        with self.lock:
+            entries = list(self.entries.values())
+        referenced = [entry for entry in entries if entry.refs]
+        return {
+            'entries': len(entries),
+            'bytes': sum(entry.nbytes for entry in entries),
+            'referenced': len(referenced),
+            'referenced_bytes': sum(entry.nbytes for entry in referenced),
+        }
+
+    def entry_size(self, kind, key):
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            return entry.nbytes if entry else 0
+
+    def clear(self):
+        """清空存储"""
+        with self.lock:
+            self.entries.clear()
+
+
+def _release_all(store, entries):
+    """会话结束时释放全部共用数据引用"""
+    for kind, items in entries.items():
+        for key, value in items.items():
+            if value is _SHARED:
+                store.release(kind, key)
+
+
+class SessionDataCache:
+    """会话中的比赛详细数据：只保存共用存储的引用，每个类别按最近使用保留有限数量"""
+
+    def __init__(self, store, limits=None):
+        self.store = store
+        self.limits = dict(SESSION_LIMITS, **(limits or {}))
+        # 类别 -> OrderedDict(比赛ID -> _SHARED或只在本会话中的数据)
+        self.entries: Dict[str, OrderedDict] = {kind: OrderedDict() for kind in self.limits}
+        # 会话状态被回收时释放引用，不依赖会话结束的回调
+        weakref.finalize(self, _release_all, store, self.entries)
+
+    def lookup(self, kind, key):
+        """
+        查找本会话或其他会话获取过的数据
+        :return: (是否找到, 数据)；没有找到时调用方获取数据后调用put
+        """
+        key = str(key)
+        items = self.entries[kind]
+        if key in items:
+            items.move_to_end(key)
+            value = items[key]
+            return True, self.store.read(kind, key) if value is _SHARED else value
+        found, data = self.store.acquire(kind, key)
+        if found:
+            self._add(kind, key, _SHARED)
+        return found, data
+
+    def get(self, kind, key, default=None):
+        """读取本会话中的数据（不会查找其他会话获取的数据）"""
+        key = str(key)
+        items = self.entries[kind]
+        if key not in items:
+            return default
+        value = items[key]
+        return self.store.read(kind, key) if value is _SHARED else value
+
+    def put(self, kind, key, data, share=True):
+        """
+        保存获取到的数据
+        :param share: 是否放入共用存储；获取失败时的空数据只保存在本会话中
+        """
+        key = str(key)
+        held = self.entries[kind].get(key) is _SHARED
+        if share and data is not None:
+            self.store.put(kind, key, data, acquire=not held)
+            self._add(kind, key, _SHARED)
+        else:
+            if held:
+                self.store.release(kind, key)
+            self._add(kind, key, data)
+
+    def _add(self, kind, key, value):
+        items = self.entries[kind]
+        items[key] = value
+        items.move_to_end(key)
+        while len(items) > self.limits[kind]:
+            old_key, old_value = items.popitem(last=False)
+            if old_value is _SHARED:
+                self.store.release(kind, old_key)
+
+    def stats(self):
+        """
+        本会话各类别的数据统计
+        :return: 类别 -> (场次, 上限, 引用的共用数据大小, 只在本会话中的数据大小)
+        """
+        result = {}
+        for kind, items in self.entries.items():
+            shared = sum(self.store.entry_size(kind, key) for key, value in items.items() if value is _SHARED)
+            local = sum(estimate_size(value) for value in items.values() if value is not _SHARED)
+            result[kind] = (len(items), self.limits[kind], shared, local)
+        return result
+
+
+# 创建全局共用存储实例
+global_shared_store = SharedDataStore()
+
+
+def get_session_data(session_state):
+    """
+    便捷函数：获取会话中的比赛详细数据缓存，第一次使用时创建
+    :param session_state: st.session_state
+    :return: SessionDataCache实例
+    """
+    session_data = session_state.get(SESSION_STATE_KEY)
+    if session_data is None:
+        session_data = SessionDataCache(global_shared_store)
+        session_state[SESSION_STATE_KEY] = session_data
+    return session_data
@@ -0,0 +1,267 @@
+"""
+球队索引模块 - 按球队ID索引归档的比赛，在本地计算历史交战和近期战绩
+
+每场比赛的双方数据原本都要请求一次shuju页面，即使归档中已经有这些比赛。本模块用爬虫提取的
+home_team_id/away_team_id建立 球队ID -> 比赛 的索引，由已完场的归档比赛生成与fetch_match_history
+格式相同的历史交战、近期战绩（不区分主客场）和主客场战绩，只有本地数据不够时才请求shuju页面。
+本地数据没有赛前积分排名和场均数据，这些仍然只能来自shuju页面。
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from history_crawler import fetch_match_history
+from match_archive import global_match_archive, infer_match_date
+
+# shuju页面每个列表展示的比赛数量，本地数据达到该数量才视为完整
+RECENT_LIMIT = 10
+HEAD_TO_HEAD_LIMIT = 10
+
+# 归档中的比分格式为'2-1'（个别页面为'2:1'）
+ARCHIVE_SCORE_PATTERN = re.compile(r'(\d+)\s*[-:]\s*(\d+)')
+
+# 已完场的比赛状态（status字段）
+FINISHED_STATUS = '4'
+
+# 两次同步归档之间的最短间隔（秒）
+REFRESH_INTERVAL = 10
+
+
+@dataclass(frozen=True)
+class IndexedMatch:
+    """索引中的一场已完场比赛"""
+    fid: str
+    match_date: str
+    league: str
+    home_team: str
+    home_team_id: str
+    away_team: str
+    away_team_id: str
+    home_goals: int
+    away_goals: int
+    half_score: str
+
+    def result_for(self, team_id) -> str:
+        """该队视角的赛果：胜/平/负"""
+        own, other = (self.home_goals, self.away_goals) if team_id == self.home_team_id else (self.away_goals, self.home_goals)
+        return '胜' if own > other else '平' if own == other else '负'
+
+    def to_record(self, home_name=None, away_name=None, result='') -> dict:
+        """转换为shuju页面战绩列表的格式（teams字段形如'主队 2:1 客队'）"""
+        half_score = self.half_score.replace('-', ':')
+        return {
+            'league': self.league,
+            'date': self.match_date,
+            'teams': f"{home_name or self.home_team} {self.home_goals}:{self.away_goals} {away_name or self.away_team}",
+            'half_score': f" {half_score} " if half_score else '',
+            'result': result
+        }
+
+
+def parse_archived_match(match) -> Optional[IndexedMatch]:
+    """把归档比赛转换为IndexedMatch，未完场、没有比分或缺少球队ID时返回None"""
+    if str(match.get('status')) != FINISHED_STATUS:
+        return None
+    score_match = ARCHIVE_SCORE_PATTERN.search(match.get('score') or '')
+    if not score_match or not match.get('home_team_id') or not match.get('away_team_id'):
+        return None
+    return IndexedMatch(
+        fid=match.get('fid') or '',
+        match_date=match.get('match_date') or '',
+        league=match.get('league') or '',
+        home_team=match.get('home_team') or '',
+        home_team_id=str(match['home_team_id']),
+        away_team=match.get('away_team') or '',
+        away_team_id=str(match['away_team_id']),
+        home_goals=int(score_match.group(1)),
+        away_goals=int(score_match.group(2)),
+        half_score=match.get('half_score') or ''
+    )
+
+
+class TeamIndex:
+    """
+    球队索引：按归档的更新时间增量同步
+
+    实时轮询大约每15秒就会归档一次进行中的比赛，归档内容几乎一直在变化，不能每次变化都重建整个索引。
+    索引记录已同步到的更新时间，每次只读取之后写入的比赛，只有已完场比赛发生变化的球队才重新排序；
+    两次同步之间至少间隔REFRESH_INTERVAL秒，查询时不会每次都访问数据库。
+    """
+
+    def __init__(self, archive=None, refresh_interval=None):
+        self.archive = archive or global_match_archive
+        self.refresh_interval = REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.lock = threading.Lock()
+        # 已同步到的归档更新时间，以及上次同步的时间（time.monotonic）
+        self.synced_until = None
+        self.checked_at = None
+        # match_id -> 已完场的比赛，用于判断比赛是否变化以及从球队列表中移除旧数据
+        self.indexed: Dict[str, IndexedMatch] = {}
+        # 球队ID -> 该队的比赛（按日期从早到晚），以及对应的日期列表（用于二分查找）
+        self.match_ids_by_team: Dict[str, set] = {}
+        self.by_team: Dict[str, List[IndexedMatch]] = {}
+        self.dates_by_team: Dict[str, List[str]] = {}
+        # 所有归档比赛（包括未完场的）的fid -> 比赛日期，页面上的比赛时间不带年份
+        self.match_dates: Dict[str, str] = {}
+
+    def refresh(self, force=False):
+        """
+        把上次同步之后归档的比赛合并到索引中
+        :param force: 为True时忽略同步间隔立即同步（例如刚刚回填了归档）
+        """
+        with self.lock:
+            now = time.monotonic()
+            if not force and self.checked_at is not None and now - self.checked_at < self.refresh_interval:
+                return
+            self.checked_at = now
+            changed = self.archive.query_updated_since(self.synced_until)
+
+            changed_teams = set()
+            for match in changed:
+                if match.get('fid'):
+                    self.match_dates[match['fid']] = match['match_date']
+                match_id = match['match_id']
+                indexed = parse_archived_match(match)
+                previous = self.indexed.get(match_id)
+                if indexed == previous:
+                    continue
+                if previous is not None:
+                    del self.indexed[match_id]
+                    for team_id in (previous.home_team_id, previous.away_team_id):
+                        self.match_ids_by_team[team_id].discard(match_id)
+                        changed_teams.add(team_id)
+                if indexed is not None:
+                    self.indexed[match_id] = indexed
+                    for team_id in (indexed.home_team_id, indexed.away_team_id):
+                        self.match_ids_by_team.setdefault(team_id, set()).add(match_id)
+                        changed_teams.add(team_id)
+            if changed:
+                self.synced_until = max(self.synced_until or '', changed[-1]['updated_at'] or '') or None
+
+            # 只重新排序有比赛变化的球队；替换列表而不是原地修改，查询时已经返回的切片不受影响。
+            # 同一天的比赛按fid排序（集合没有固定顺序），同步顺序不同时结果也一致
+            for team_id in changed_teams:
+                matches = sorted((self.indexed[match_id] for match_id in self.match_ids_by_team[team_id]),
+                                 key=lambda indexed: (indexed.match_date, indexed.fid))
+                self.by_team[team_id] = matches
+                self.dates_by_team[team_id] = [indexed.match_date for indexed in matches]
+
+    def match_date(self, match) -> str:
+        """比赛日期：优先使用比赛数据或归档中的日期，否则由比赛时间推断"""
+        self.refresh()
+        return (match.get('match_date') or self.match_dates.get(str(match.get('fid') or ''))
+                or infer_match_date(match.get('time', '')))
+
+    def team_matches(self, team_id, before=None) -> List[IndexedMatch]:
+        """
+        一支球队的已完场比赛，按日期从近到远
+        :param before: 只返回该日期（YYYY-MM-DD）之前的比赛
+        """
+        self.refresh()
+        team_id = str(team_id)
+        with self.lock:
+            matches = self.by_team.get(team_id, [])
+            stop = bisect_left(self.dates_by_team.get(team_id, []), before) if before else len(matches)
+            return matches[:stop][::-1]
+
+    def recent(self, team_id, before=None, limit=RECENT_LIMIT, venue=None) -> List[IndexedMatch]:
+        """
+        近期比赛
+        :param venue: 'home'只返回主场比赛，'away'只返回客场比赛，None不区分
+        """
+        team_id = str(team_id)
+        matches = self.team_matches(team_id, before)
+        if venue == 'home':
+            matches = [indexed for indexed in matches if indexed.home_team_id == team_id]
+        elif venue == 'away':
+            matches = [indexed for indexed in matches if indexed.away_team_id == team_id]
+        return matches[:limit]
+
+    def head_to_head(self, team_a_id, team_b_id, before=None, limit=HEAD_TO_HEAD_LIMIT) -> List[IndexedMatch]:
+        """双方的历史交战（不区分主客场），按日期从近到远"""
+        team_a_id, team_b_id = str(team_a_id), str(team_b_id)
+        matches = [indexed for indexed in self.team_matches(team_a_id, before)
+                   if team_b_id in (indexed.home_team_id, indexed.away_team_id)]
+        return matches[:limit]
+
+    def build_history(self, match, before=None) -> dict:
+        """
+        由本地数据生成一场比赛的双方数据，格式与fetch_match_history的返回值一致
+        :param match: 比赛数据（需要home_team_id/away_team_id）
+        :param before: 只使用该日期之前的比赛，默认为比赛日期
+        :return: 历史数据字典，'source'为'local'，'complete'表示各列表是否都达到shuju页面的数量
+        """
+        home_id, away_id = str(match.get('home_team_id') or ''), str(match.get('away_team_id') or '')
+        home_name, away_name = match.get('home_team') or '', match.get('away_team') or ''
+        before = before or self.match_date(match)
+
+        h2h = self.head_to_head(home_id, away_id, before) if home_id and away_id else []
+        # 历史交战用本场的队名，统计时按队名判断哪一方是本场主队
+        h2h_records = []
+        for indexed in h2h:
+            if indexed.home_team_id == home_id:
+                h2h_records.append(indexed.to_record(home_name, away_name, indexed.result_for(home_id)))
+            else:
+                h2h_records.append(indexed.to_record(away_name, home_name, indexed.result_for(home_id)))
+
+        recent_all = []
+        for team_id, team_type in ((home_id, '主队'), (away_id, '客队')):
+            for indexed in (self.recent(team_id, before) if team_id else []):
+                record = indexed.to_record(result=indexed.result_for(team_id))
+                record['team_type'] = team_type
+                recent_all.append(record)
+
+        home_away = {}
+        for key, team_id, venue in (('team_a_home', home_id, 'home'), ('team_a_away', home_id, 'away'),
+                                    ('team_b_home', away_id, 'home'), ('team_b_away', away_id, 'away')):
+            home_away[key] = [indexed.to_record(result=indexed.result_for(team_id))
+                              for indexed in (self.recent(team_id, before, venue=venue) if team_id else [])]
+
+        complete = (
+            len(h2h_records) >= HEAD_TO_HEAD_LIMIT
+            and sum(1 for record in recent_all if record['team_type'] == '主队') >= RECENT_LIMIT
+            and sum(1 for record in recent_all if record['team_type'] == '客队') >= RECENT_LIMIT
+            and all(len(records) >= RECENT_LIMIT for records in home_away.values())
+        )
+
+        return {
+            'match_info': '',
+            'stats': f'近{len(h2h_records)}次交战（本地数据）' if h2h_records else '',
+            'matches': h2h_records,
+            'average_data': {},
+            'pre_match_standings': {
+                'title': '',
+                # 队名用于历史交战统计时区分主客队
+                'team_a': {'name': home_name, 'rank': '', 'stats': {'总成绩': {}, '主场': {}, '客场': {}}},
+                'team_b': {'name': away_name, 'rank': '', 'stats': {'总成绩': {}, '主场': {}, '客场': {}}}
+            },
+            'recent_records_all': recent_all,
+            'recent_records_home_away': home_away,
+            'source': 'local',
+            'complete': complete
+        }
+
+
+# 创建全局球队索引实例
+global_team_index = TeamIndex()
+
+
+def build_local_history(match, before=None) -> dict:
+    """便捷函数：由本地归档生成一场比赛的双方数据"""
+    return global_team_index.build_history(match, before)
+
+
+def get_match_history(match, allow_partial=False) -> dict:
+    """
+    获取一场比赛的双方数据：本地归档的数据完整时直接使用，否则请求shuju页面
+    :param match: 比赛数据
+    :param allow_partial: 为True时只要本地有主客场战绩就使用本地数据（用于预测等不需要积分排名的场景）
+    """
+    local = build_local_history(match)
+    has_home_away = all(local['recent_records_home_away'].values())
+    if local['complete'] or (allow_partial and has_home_away):
+        return local
+    return fetch_match_history(match.get('fid', ''))
@@ -0,0 +1,287 @@
+"""
+球队统计模块 - 每份历史数据（fetch_match_history的返回值）只计算一次全部球队统计
+
+胜平负、进失球、胜平负率、场均进失球、主客场拆分和历史交战统计在一次遍历中算好，
+按比赛fid和参与统计的数据内容缓存，双方数据标签页和预测分析标签页共用同一份结果。
+缓存只保存统计结果，不引用历史数据本身，历史数据的内存由会话数据存储（session_store.py）管理。
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+# 历史交战进球数分布统计的最大进球数（0-5球，5表示5球及以上）
+MAX_GOALS = 5
+
+SCORE_PATTERN = re.compile(r'(\d+):(\d+)')
+
+
+@dataclass(frozen=True)
+class RecordStats:
+    """一组战绩的统计数据"""
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def win_rate(self) -> float:
+        return round(self.wins / self.total * 100, 1) if self.total > 0 else 0
+
+    @property
+    def draw_rate(self) -> float:
+        return round(self.draws / self.total * 100, 1) if self.total > 0 else 0
+
+    @property
+    def loss_rate(self) -> float:
+        return round(self.losses / self.total * 100, 1) if self.total > 0 else 0
+
+    @property
+    def avg_goals_for(self) -> float:
+        return round(self.goals_for / self.total, 2) if self.total > 0 else 0
+
+    @property
+    def avg_goals_against(self) -> float:
+        return round(self.goals_against / self.total, 2) if self.total > 0 else 0
+
+    def summary(self) -> tuple:
+        """(胜, 平, 负, 进球, 失球, 胜率, 平率, 负率, 场均进球, 场均失球)，用于页面展示"""
+        return (self.wins, self.draws, self.losses, self.goals_for, self.goals_against,
+                self.win_rate, self.draw_rate, self.loss_rate, self.avg_goals_for, self.avg_goals_against)
+
+
+@dataclass(frozen=True)
+class HeadToHeadStats:
+    """双方历史交战统计（team_a为本场主队，team_b为本场客队）"""
+    matches: int = 0
+    team_a_win_rate: float = 0
+    team_b_win_rate: float = 0
+    draw_rate: float = 0
+    team_a_avg_goals: float = 0
+    team_a_avg_conceded: float = 0
+    team_b_avg_goals: float = 0
+    team_b_avg_conceded: float = 0
+    # 进球数分布概率，下标为进球数（0-5球，5表示5球及以上）
+    team_a_goals_prob: Tuple[float, ...] = (0,) * (MAX_GOALS + 1)
+    team_b_goals_prob: Tuple[float, ...] = (0,) * (MAX_GOALS + 1)
+
+
+@dataclass(frozen=True, eq=False)
+class TeamStats:
+    """一场比赛双方的全部统计（team_a为本场主队，team_b为本场客队）"""
+    team_a_name: str = ''
+    team_b_name: str = ''
+    # 历史交战统计
+    h2h: HeadToHeadStats = field(default_factory=HeadToHeadStats)
+    # 近期战绩（不区分主客场）及对应的战绩列表
+    recent_home: RecordStats = field(default_factory=RecordStats)
+    recent_away: RecordStats = field(default_factory=RecordStats)
+    recent_home_records: List[dict] = field(default_factory=list)
+    recent_away_records: List[dict] = field(default_factory=list)
+    # 近期战绩（区分主客场）
+    team_a_home: RecordStats = field(default_factory=RecordStats)
+    team_a_away: RecordStats = field(default_factory=RecordStats)
+    team_b_home: RecordStats = field(default_factory=RecordStats)
+    team_b_away: RecordStats = field(default_factory=RecordStats)
+
+
+def calculate_record_stats(records, team_type):
+    """
+    根据近期战绩计算统计数据
+    :param records: 战绩列表（包含result和teams字段）
+    :param team_type: 'home'表示比分左侧为本队，'away'表示比分右侧为本队
+    :return: RecordStats
+    """
+    wins = draws = losses = goals_for = goals_against = 0
+    for record in records:
+        # 提取结果
+        result = record['result']
+        if result == '胜':
+            wins += 1
+        elif result == '平':
+            draws += 1
+        elif result == '负':
+            losses += 1
+
+        # 提取比分，判断是主队还是客队，调整进球统计
+        score_match = SCORE_PATTERN.search(record['teams'])
+        if score_match:
+            home_goals = int(score_match.group(1))
+            away_goals = int(score_match.group(2))
+            if team_type == 'home':
+                goals_for += home_goals
+                goals_against += away_goals
+            else:
+                goals_for += away_goals
+                goals_against += home_goals
+
+    return RecordStats(wins, draws, losses, goals_for, goals_against)
+
+
+def calculate_headtohead_stats(matches, team_a_name, team_b_name):
+    """
+    计算历史交战记录统计指标
+    :param matches: 历史交战记录（teams字段形如"主队 2:1 客队"）
+    :param team_a_name: 本场主队名称
+    :param team_b_name: 本场客队名称
+    :return: HeadToHeadStats
+    """
+    total_matches = len(matches)
+    team_a_wins = team_b_wins = draws = 0
+    team_a_goals = team_b_goals = 0
+
+    # 记录进球数分布
+    team_a_goals_dist = [0] * (MAX_GOALS + 1)
+    team_b_goals_dist = [0] * (MAX_GOALS + 1)
+
+    for match in matches:
+        score_match = SCORE_PATTERN.search(match['teams'])
+        if not score_match:
+            continue
+        home_goals = int(score_match.group(1))
+        away_goals = int(score_match.group(2))
+
+        # 判断哪一方是主队
+        if match['teams'].startswith(team_a_name):
+            a_goals, b_goals = home_goals, away_goals
+        elif match['teams'].startswith(team_b_name):
+            a_goals, b_goals = away_goals, home_goals
+        else:
+            continue
+
+        team_a_goals += a_goals
+        team_b_goals += b_goals
+        # 更新进球数分布（限制在0-5球）
+        team_a_goals_dist[min(a_goals, MAX_GOALS)] += 1
+        team_b_goals_dist[min(b_goals, MAX_GOALS)] += 1
+
+        if a_goals > b_goals:
+            team_a_wins += 1
+        elif b_goals > a_goals:
+            team_b_wins += 1
+        else:
+            draws += 1
+
+    if total_matches == 0:
+        return HeadToHeadStats()
+
+    return HeadToHeadStats(
+        matches=total_matches,
+        team_a_win_rate=round(team_a_wins / total_matches * 100, 1),
+        team_b_win_rate=round(team_b_wins / total_matches * 100, 1),
+        draw_rate=round(draws / total_matches * 100, 1),
+        team_a_avg_goals=round(team_a_goals / total_matches, 2),
+        team_a_avg_conceded=round(team_b_goals / total_matches, 2),
+        team_b_avg_goals=round(team_b_goals / total_matches, 2),
+        team_b_avg_conceded=round(team_a_goals / total_matches, 2),
+        team_a_goals_prob=tuple(count / total_matches for count in team_a_goals_dist),
+        team_b_goals_prob=tuple(count / total_matches for count in team_b_goals_dist)
+    )
+
+
+def compute_team_stats(history_data) -> TeamStats:
+    """
+    由历史数据计算双方的全部统计
+    :param history_data: fetch_match_history的返回值
+    :return: TeamStats，没有历史数据时返回空统计
+    """
+    if not history_data:
+        return TeamStats()
+
+    pre_match = history_data.get('pre_match_standings') or {}
+    team_a_name = pre_match['team_a']['name'] if pre_match.get('team_a') else ''
+    team_b_name = pre_match['team_b']['name'] if pre_match.get('team_b') else ''
+
+    # 近期战绩（不区分主客场）按主客队拆分
+    recent_records_all = history_data.get('recent_records_all', [])
+    home_records = [record for record in recent_records_all if record.get('team_type') == '主队']
+    away_records = [record for record in recent_records_all if record.get('team_type') == '客队']
+
+    recent_records_home_away = history_data.get('recent_records_home_away') or {}
+
+    return TeamStats(
+        team_a_name=team_a_name,
+        team_b_name=team_b_name,
+        h2h=calculate_headtohead_stats(history_data.get('matches', []), team_a_name, team_b_name),
+        recent_home=calculate_record_stats(home_records, 'home'),
+        recent_away=calculate_record_stats(away_records, 'away'),
+        recent_home_records=home_records,
+        recent_away_records=away_records,
+        team_a_home=calculate_record_stats(recent_records_home_away.get('team_a_home', []), 'home'),
+        team_a_away=calculate_record_stats(recent_records_home_away.get('team_a_away', []), 'away'),
+        team_b_home=calculate_record_stats(recent_records_home_away.get('team_b_home', []), 'home'),
+        team_b_away=calculate_record_stats(recent_records_home_away.get('team_b_away', []), 'away')
+    )
+
+
+def stats_fingerprint(history_data) -> str:
+    """历史数据中参与统计的部分（双方名称、历史交战和近期战绩）的内容摘要，其他字段变化不影响统计结果"""
+    if not history_data:
+        return ''
+    pre_match = history_data.get('pre_match_standings') or {}
+    inputs = [
+        [(pre_match.get(team) or {}).get('name', '') for team in ('team_a', 'team_b')],
+        history_data.get('matches', []),
+        history_data.get('recent_records_all', []),
+        history_data.get('recent_records_home_away') or {},
+    ]
+    encoded = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class TeamStatsEngine:
+    """球队统计引擎：按(fid, 内容摘要)缓存统计结果，历史数据的内容变化时重新计算"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.cache = OrderedDict()  # (fid, 内容摘要) -> TeamStats
+        self.lock = threading.Lock()
+
+    def get(self, fid, history_data) -> TeamStats:
+        """
+        获取一场比赛的球队统计
+        :param fid: 比赛fid
+        :param history_data: 该比赛的历史数据
+        :return: TeamStats
+        """
+        key = (str(fid), stats_fingerprint(history_data))
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached
+
+        stats = compute_team_stats(history_data)
+        with self.lock:
+            self.cache[key] = stats
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return stats
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.cache.clear()
+
+
+# 创建全局球队统计引擎实例
+global_team_stats_engine = TeamStatsEngine()
+
+
+def get_team_stats(fid, history_data) -> TeamStats:
+    """
+    便捷函数：获取一场比赛的球队统计（按fid和数据内容缓存）
+    :param fid: 比赛fid
+    :param history_data: 该比赛的历史数据
+    :return: TeamStats
+    """
+    return global_team_stats_engine.get(fid, history_data)
@@ -0,0 +1,13 @@
+"""
+测试配置：把项目根目录加入导入路径，测试中不写爬取事件日志
+
+运行：python -m pytest -q
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+os.environ.setdefault('CRAWL_EVENT_LOG', 'off')
@@ -0,0 +1,91 @@
+"""接口服务：结果缓存合并并发加载，缺少联赛场均进球的预测请求返回404，获取失败的双方数据不缓存"""
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+import api_server
+from api_server import ApiError, ApiServer, ResponseCache
+from prediction import get_league_home_away_goals
+from test_prediction import make_input
+
+
+def test_cache_coalesces_concurrent_loads():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'value': len(calls)}, 60
+
+    async def run():
+        cache = ResponseCache()
+        first, second = await asyncio.gather(cache.get('key', loader), cache.get('key', loader))
+        third = await cache.get('key', loader)
+        return cache, first, second, third
+
+    cache, first, second, third = asyncio.run(run())
+    assert len(calls) == 1
+    assert first is second is third
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_does_not_keep_errors():
+    attempts = []
+
+    async def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ApiError(502, '获取失败')
+        return {'ok': True}, 60
+
+    async def run():
+        cache = ResponseCache()
+        with pytest.raises(ApiError):
+            await cache.get('key', loader)
+        return await cache.get('key', loader)
+
+    entry = asyncio.run(run())
+    assert len(attempts) == 2 and entry.etag
+
+
+@pytest.mark.parametrize('league_data', [None, {'average_data': {'home_away_average_goals': {'主场场均进球': '0', '客场场均进球': '1.2'}}}])
+def test_api_prediction_without_league_average(monkeypatch, league_data):
+    """接口在缺少联赛场均进球时返回404，而不是在模型中出错"""
+    match = {'fid': '1000', 'match_id': 'a1', 'sid': '36', 'time': '10-19 20:00'}
+
+    def build_input(match, history_data, league_data):
+        league_home, league_away = get_league_home_away_goals(league_data)
+        return replace(make_input(), league_home_avg_goals=league_home, league_away_avg_goals=league_away)
+
+    monkeypatch.setattr(ApiServer, 'find_match', lambda self, fid: match)
+    monkeypatch.setattr(api_server, 'get_match_history', lambda match, local_only=False: {})
+    monkeypatch.setattr(api_server, 'get_league_data', lambda sid, match_date=None: league_data)
+    monkeypatch.setattr(api_server, 'build_match_input', build_input)
+
+    with pytest.raises(ApiError) as error:
+        asyncio.run(ApiServer().load_prediction('1000', False))
+    assert error.value.status == 404
+
+
+def test_failed_history_not_cached(monkeypatch):
+    """双方数据请求失败时返回502，不缓存空数据，下次请求重新获取"""
+    import history_crawler
+
+    monkeypatch.setattr(ApiServer, 'find_match', lambda self, fid: None)
+    monkeypatch.setattr(history_crawler, 'make_request_with_retries', lambda *args, **kwargs: None)
+    monkeypatch.setattr(history_crawler.global_cache, 'get', lambda key: None)
+    monkeypatch.setattr(history_crawler.time, 'sleep', lambda seconds: None)
+    server = ApiServer()
+
+    async def load():
+        return await server.cache.get(('history', '1000'), lambda: server.load_history('1000'))
+
+    with pytest.raises(ApiError) as error:
+        asyncio.run(load())
+    assert error.value.status == 502
+    assert ('history', '1000') not in server.cache.entries
+
+    data = {'matches': [{'score': '1-0'}], 'recent_records_all': [], 'recent_records_home_away': {}}
+    monkeypatch.setattr(api_server, 'fetch_match_history', lambda fid: data)
+    assert asyncio.run(load()) is server.cache.entries[('history', '1000')]
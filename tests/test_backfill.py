@@ -0,0 +1,73 @@
+"""历史比赛回填：获取失败的详细数据和日期不会被当作已完成"""
+import argparse
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import backfill
+import history_crawler
+import match_crawler
+from match_archive import MatchArchive
+from match_crawler import MatchCrawlError
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = MatchArchive(str(tmp_path / 'archive.db'))
+    monkeypatch.setattr(backfill, 'global_match_archive', archive)
+    return archive
+
+
+def test_failed_history_not_saved(archive, monkeypatch):
+    # shuju页面请求失败：fetch_match_history返回字段齐全的空结构
+    requests = []
+    sleeps = []
+    monkeypatch.setattr(history_crawler, 'make_request_with_retries', lambda url, retries, **kwargs: requests.append(retries))
+    monkeypatch.setattr(history_crawler.global_cache, 'get', lambda key: None)
+    monkeypatch.setattr(history_crawler.time, 'sleep', sleeps.append)
+    progress = backfill.Progress(1)
+
+    ok = asyncio.run(backfill.fetch_detail('1000', 'history', backfill.RateLimiter(100), progress))
+    assert not ok
+    assert progress.detail_failures == 1 and progress.histories == 0
+    # 只请求一次，不在令牌桶之外重试或等待
+    assert requests == [1] and sleeps == []
+    # 下次运行会重新拉取
+    assert not archive.has_detail('1000', 'history')
+
+
+def test_history_saved(archive, monkeypatch):
+    data = {'matches': [], 'recent_records_all': [{'score': '1-0'}], 'recent_records_home_away': {}}
+    monkeypatch.setattr(backfill, 'fetch_match_history', lambda fid, **kwargs: data)
+    progress = backfill.Progress(1)
+
+    assert asyncio.run(backfill.fetch_detail('1000', 'history', backfill.RateLimiter(100), progress))
+    assert archive.has_detail('1000', 'history') and progress.histories == 1
+
+
+def test_empty_past_date_not_completed(archive, monkeypatch):
+    async def crawl(date_str, session=None, delay=True):
+        return []
+
+    monkeypatch.setattr(backfill, 'crawl_matches_by_date', crawl)
+    args = argparse.Namespace(with_odds=False, with_history=False)
+    reason = asyncio.run(backfill.backfill_date('2020-01-01', None, backfill.RateLimiter(100), args, backfill.Progress(1)))
+    assert reason
+    # 没有标记为完整归档，下次运行重新爬取
+    assert not archive.is_archived('2020-01-01')
+
+
+def test_error_status_raises():
+    async def rate_limited(request):
+        return web.Response(status=403, text='<html></html>')
+
+    async def fetch():
+        app = web.Application()
+        app.router.add_get('/wanchang.php', rate_limited)
+        async with TestServer(app) as server:
+            await match_crawler.fetch_page(str(server.make_url('/wanchang.php')), delay=False)
+
+    with pytest.raises(MatchCrawlError, match='403'):
+        asyncio.run(fetch())
@@ -0,0 +1,87 @@
+"""HTML模板缓存：卡片按全部输入缓存，详细数据按fid缓存并以数据对象本身作为版本"""
+import pytest
+
+from card_templates import (HTMLCache, global_html_cache, render_card_html, render_head_to_head_html,
+                            render_odds_html, render_recent_records_html)
+
+
+@pytest.fixture(autouse=True)
+def clear_html_cache():
+    global_html_cache.clear()
+    yield
+    global_html_cache.clear()
+
+
+def make_row(**fields):
+    row = {'league': '英超', 'league_color': '#336699', 'round': '1', 'time': '10-19 20:00', 'home_team': '主队',
+           'home_team_id': '1', 'away_team': '客队', 'away_team_id': '2', 'score': '', 'half_score': ''}
+    row.update(fields)
+    return row
+
+
+def make_records(*teams):
+    return [{'league': '英超', 'date': '26-01-01', 'teams': text, 'half_score': '1:0', 'result': '胜'} for text in teams]
+
+
+def test_source_identity_decides_hit():
+    cache = HTMLCache()
+    renders = []
+
+    def render(inputs):
+        renders.append(inputs)
+        return f'<p>{len(inputs)}</p>'
+
+    data = [1, 2]
+    assert cache.get_or_render('kind', '1000', data, render, source=data) == '<p>2</p>'
+    assert cache.get_or_render('kind', '1000', data, render, source=data) == '<p>2</p>'
+    # 内容相同的新对象视为新版本，重新渲染并替换同一个键的结果
+    refreshed = [1, 2, 3]
+    assert cache.get_or_render('kind', '1000', refreshed, render, source=refreshed) == '<p>3</p>'
+    assert len(renders) == 2
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 2}
+
+
+def test_max_size_evicts_least_recently_used():
+    cache = HTMLCache(max_size=2)
+    for key in ('a', 'b'):
+        cache.get_or_render('kind', key, key, str.upper)
+    cache.get_or_render('kind', 'a', 'a', str.upper)
+    cache.get_or_render('kind', 'c', 'c', str.upper)
+    assert list(cache.cache) == [('kind', 'a'), ('kind', 'c')]
+
+
+def test_card_keyed_on_inputs():
+    html = render_card_html(make_row(), '未')
+    assert render_card_html(make_row(), '未') is html
+    updated = render_card_html(make_row(score='1-0'), '中')
+    assert updated is not html and '1-0' in updated
+    assert global_html_cache.stats()['hits'] == 1
+
+
+def test_odds_keyed_on_fid_and_data_object():
+    odds = {'oupei': {'威廉希尔': {'initial': ['2.10', '3.20', '3.40'], 'instant': ['2.05↓', '3.25', '3.50↑']}},
+            'yapan': None, 'daxiao': None}
+    html = render_odds_html('1000', odds)
+    assert '2.05' in html and '↓' not in html
+    assert render_odds_html('1000', odds) is html
+    assert render_odds_html('1000', dict(odds)) == html
+    assert global_html_cache.stats() == {'size': 1, 'hits': 1, 'misses': 2}
+
+
+def test_head_to_head_highlights_scores():
+    html = render_head_to_head_html('1000', make_records('主队 2:1 客队'))
+    assert '主队  <span style="color: #ef4444; font-weight: bold; font-size: 1.1em;">2:1</span>  客队' in html
+    assert html.count('<tr') == 2
+
+
+def test_recent_records_parts_cached_separately():
+    home = make_records('主队 2:0 甲', '乙 1:1 主队')
+    away = make_records('客队 0:1 丙')
+    home_html = render_recent_records_html('1000', 'home', home, '主队')
+    away_html = render_recent_records_html('1000', 'away', away, '客队', spaced=False)
+    assert 'margin-bottom: 15px' in home_html and 'margin-bottom' not in away_html
+    assert home_html.count('<tr') == 3 and away_html.count('<tr') == 2
+    assert '<span style="color: #ef4444; font-weight: bold; font-size: 1.1em;">1:0</span>' in away_html
+    assert render_recent_records_html('1000', 'home', home, '主队') is home_html
+    assert render_recent_records_html('1000', 'team_a_home', [], '主队') == (
+        "<div style='text-align: center; padding: 20px;'>主队暂无近期战绩数据</div>")
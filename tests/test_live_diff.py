@@ -0,0 +1,109 @@
+"""即时比分增量刷新：按match_id比较前后两次爬取结果，比赛存储按变化更新索引"""
+import pytest
+
+from live_diff import LiveChangeFeed, diff_matches
+from match_store import MatchStore
+
+
+def make_match(index, **fields):
+    match = {'match_id': f'm{index}', 'league': '英超', 'match_status': '未', 'score': '', 'half_score': '',
+             'status': '0', 'time': f'10-19 {18 + index}:00', 'jingcai_id': '', 'home_team_id': str(index),
+             'away_team_id': str(100 + index)}
+    match.update(fields)
+    return match
+
+
+def snapshot(store):
+    """比赛存储中的全部索引和筛选项统计，用于比较增量更新和重新构建的结果"""
+    return (store.matches, store.by_league, store.by_status, store.by_team, store.by_kickoff, store.jingcai,
+            store.kickoff_times, store.leagues, store.statuses, store.league_counts, store.status_counts)
+
+
+def test_diff_reuses_unchanged_matches():
+    old = [make_match(0), make_match(1), make_match(2)]
+    new = [make_match(0), make_match(1, score='1-0', match_status='中'), make_match(2)]
+    diff = diff_matches(old, new)
+
+    assert diff.same_order
+    assert [change.match_id for change in diff.changed] == ['m1']
+    assert diff.changed[0].changes == {'score': ('', '1-0'), 'match_status': ('未', '中')}
+    assert not diff.added and not diff.removed
+    # 没有变化的比赛沿用原来的字典对象，变化的比赛使用新数据
+    assert diff.matches[0] is old[0] and diff.matches[2] is old[2]
+    assert diff.matches[1] is new[1]
+    assert diff.summary() == '比分变化1场，状态变化1场'
+
+
+def test_diff_added_removed_and_reordered():
+    old = [make_match(0), make_match(1), make_match(2)]
+    new = [make_match(2), make_match(0), make_match(3)]
+    diff = diff_matches(old, new)
+
+    assert not diff.same_order
+    assert [(change.match_id, change.position) for change in diff.added] == [('m3', 2)]
+    assert [(change.match_id, change.position) for change in diff.removed] == [('m1', 1)]
+    assert not diff.changed
+    assert [match['match_id'] for match in diff.matches] == ['m2', 'm0', 'm3']
+    assert diff.summary() == '新增1场，移除1场'
+
+
+def test_no_changes():
+    old = [make_match(0), make_match(1)]
+    diff = diff_matches(old, [dict(match) for match in old])
+    assert not diff
+    assert diff.matches == old and all(a is b for a, b in zip(diff.matches, old))
+    assert diff.summary() == '没有变化'
+
+
+@pytest.mark.parametrize('changes', [
+    # 只有比分、状态和开赛时间变化：增量更新索引
+    {1: {'score': '2-1', 'match_status': '中'}, 3: {'time': '10-19 18:00', 'match_status': '完'}},
+    # 联赛或竞彩标识变化：重新构建
+    {0: {'league': '西甲'}},
+    {2: {'jingcai_id': '周日002'}, 3: {'score': '0-0'}},
+])
+def test_apply_diff_matches_rebuild(changes):
+    old = [make_match(index) for index in range(5)]
+    new = [make_match(index, **changes.get(index, {})) for index in range(5)]
+    store = MatchStore(old)
+
+    diff = diff_matches(old, new)
+    assert store.apply_diff(diff) is store
+    assert snapshot(store) == snapshot(MatchStore(diff.matches))
+    assert store.filter(status='中') == [match for match in diff.matches if match['match_status'] == '中']
+
+
+def test_apply_diff_with_added_match():
+    old = [make_match(index) for index in range(3)]
+    new = old[:1] + [make_match(5, league='德甲')] + old[1:]
+    store = MatchStore(old)
+    store.apply_diff(diff_matches(old, new))
+    assert snapshot(store) == snapshot(MatchStore(new))
+    assert store.filter(league='德甲') == [new[1]]
+
+
+def test_feed_events_since():
+    feed = LiveChangeFeed(max_events=3)
+    received = []
+    feed.subscribe(received.append)
+
+    feed.publish([make_match(0), make_match(1)])
+    sequence, events = feed.events_since(0)
+    assert sequence == 2 and [event['kind'] for event in events] == ['added', 'added']
+
+    feed.publish([make_match(0, score='1-0'), make_match(1)])
+    sequence, events = feed.events_since(2)
+    assert sequence == 3
+    assert [(event['seq'], event['match_id'], event['changes']) for event in events] == [(3, 'm0', {'score': ['', '1-0']})]
+    assert [len(events) for events in received] == [2, 1]
+
+    # 没有变化时不产生事件，也不通知订阅者
+    feed.publish([make_match(0, score='1-0'), make_match(1)])
+    assert feed.events_since(3) == (3, [])
+    assert len(received) == 2
+
+    # 超出保留数量后，太旧的序号需要用current()重新同步
+    feed.publish([make_match(0, score='2-0')])
+    assert feed.events_since(0) == (5, None)
+    sequence, matches = feed.current()
+    assert sequence == 5 and [match['score'] for match in matches] == ['2-0']
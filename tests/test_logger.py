@@ -0,0 +1,14 @@
+"""日志限流：每条消息在一个窗口内最多输出limit次，下一个窗口报告省略的条数"""
+from logger import RateLimiter
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(limit=2, window=10)
+    assert [limiter.allow('timeout', now=100 + i) for i in range(5)] == [0, 0, None, None, None]
+    # 其他消息单独计数
+    assert limiter.allow('parse', now=104) == 0
+    # 新窗口放行，并返回上一个窗口省略的条数
+    assert limiter.allow('timeout', now=110) == 3
+    assert limiter.allow('timeout', now=111) == 0
+    assert limiter.allow('timeout', now=112) is None
+    assert limiter.allow('timeout', now=125) == 1
@@ -0,0 +1,94 @@
+"""玩法推导：由一个比分矩阵推导的各玩法概率与逐个比分累加的结果一致"""
+import numpy as np
+import pytest
+
+from markets import derive_markets, half_time_matrices, parse_line
+
+# 进球数上限为3的比分矩阵（下标3为3球及以上），总和为1
+MATRIX = np.array([
+    [0.10, 0.08, 0.04, 0.01],
+    [0.12, 0.11, 0.05, 0.02],
+    [0.09, 0.08, 0.04, 0.02],
+    [0.06, 0.05, 0.02, 0.11],
+])
+
+
+def scores():
+    for home in range(4):
+        for away in range(4):
+            yield home, away, MATRIX[home, away]
+
+
+def settle(values, line):
+    """按单个盘口结算：(赢, 走水, 输)"""
+    win = sum(prob for value, prob in values if value + line > 0)
+    push = sum(prob for value, prob in values if value + line == 0)
+    return win, push, 1 - win - push
+
+
+def settle_line(values, line):
+    """四分之一盘拆成相邻两个盘口各半注结算，其他盘口按单个盘口结算"""
+    if line % 0.5:
+        lower, upper = settle(values, line - 0.25), settle(values, line + 0.25)
+        return [(a + b) / 2 for a, b in zip(lower, upper)]
+    return settle(values, line)
+
+
+@pytest.fixture(scope='module')
+def markets():
+    return derive_markets(MATRIX)
+
+
+def test_outcomes(markets):
+    assert markets.home_win == pytest.approx(sum(p for h, a, p in scores() if h > a))
+    assert markets.draw == pytest.approx(sum(p for h, a, p in scores() if h == a))
+    assert markets.away_win == pytest.approx(sum(p for h, a, p in scores() if h < a))
+    assert markets.btts == pytest.approx(sum(p for h, a, p in scores() if h and a))
+    assert markets.total_goals[0] == pytest.approx(0.10)
+    assert markets.total_goals['3+'] == pytest.approx(sum(p for h, a, p in scores() if h + a >= 3))
+    assert sum(markets.total_goals.values()) == pytest.approx(1.0)
+    assert markets.exact_scores[(1, 0)] == pytest.approx(0.12) and (3, 0) not in markets.exact_scores
+
+
+@pytest.mark.parametrize('line', [-1.5, -1.0, -0.5, 0.0, 0.5, 1.0])
+def test_asian_handicap(markets, line):
+    values = [(h - a, p) for h, a, p in scores()]
+    outcome = markets.handicap(line)
+    assert (outcome.win, outcome.push, outcome.lose) == pytest.approx(settle(values, line))
+
+
+def test_quarter_lines_split_stake(markets):
+    """四分之一盘按相邻两个盘口各半注结算"""
+    values = [(h - a, p) for h, a, p in scores()]
+    for line in (-0.75, 0.25):
+        outcome = markets.handicap(line)
+        assert (outcome.win, outcome.push, outcome.lose) == pytest.approx(settle_line(values, line))
+    assert markets.handicap('半球/一球').win == pytest.approx(markets.handicap(-0.75).win)
+
+
+@pytest.mark.parametrize('line', [1.5, 2.0, 2.5, 2.75])
+def test_over_under(markets, line):
+    outcome = markets.total(line)
+    # 总进球 - 盘口 > 0 为大球
+    values = [(-(h + a), p) for h, a, p in scores()]
+    lose, push, win = settle_line(values, line)
+    assert (outcome.win, outcome.push, outcome.lose) == pytest.approx((win, push, lose))
+    assert outcome.fair_odds == pytest.approx((1 - outcome.push) / outcome.win)
+
+
+def test_half_time_consistent_with_full_time(markets):
+    half_time = half_time_matrices(MATRIX)
+    assert half_time.sum() == pytest.approx(1.0)
+    assert sum(markets.half_full.values()) == pytest.approx(1.0)
+    # 半全场按全场结果合计等于全场胜平负，按半场结果合计等于半场胜平负
+    assert sum(prob for name, prob in markets.half_full.items() if name[1] == '胜') == pytest.approx(markets.home_win)
+    assert sum(prob for name, prob in markets.half_full.items() if name[0] == '平') == pytest.approx(markets.half_time_draw)
+    # 全场0:0时半场一定是0:0
+    assert half_time[0, 0] >= MATRIX[0, 0]
+
+
+@pytest.mark.parametrize('line, expected', [
+    (2.5, 2.5), ('2.5/3', 2.75), ('半球', -0.5), ('受半球', 0.5), ('↑半球/一球', -0.75), ('', None), ('未知', None),
+])
+def test_parse_line(line, expected):
+    assert parse_line(line) == expected
@@ -0,0 +1,62 @@
+"""比赛存储：倒排索引筛选与逐条过滤的结果一致，比赛数据变化时才重新构建"""
+import pytest
+
+from match_store import MatchStore, get_match_store
+
+
+def make_match(index, league='英超', status='未', jingcai='', time='10-19 20:00', home=None, away=None):
+    return {'match_id': f'm{index}', 'league': league, 'match_status': status, 'jingcai_id': jingcai, 'time': time,
+            'home_team_id': home or str(index), 'away_team_id': away or str(100 + index)}
+
+
+MATCHES = [
+    make_match(0, '英超', '未', '周日001', '10-19 20:00', home='1', away='2'),
+    make_match(1, '西甲', '完', '', '10-19 18:00', home='3', away='1'),
+    make_match(2, '英超', '完', '周日002', '10-19 22:00'),
+    make_match(3, '德甲', '未', '周日003', '10-20 01:30', home='2', away='4'),
+    make_match(4, '英超', '中', '', '10-19 20:00'),
+]
+
+
+def scan(matches, league=None, status=None, jingcai_only=False, team_id=None, kickoff_from=None, kickoff_to=None):
+    """逐条过滤，作为索引筛选的对照"""
+    return [match for match in matches
+            if (not league or league == '全部' or match['league'] == league)
+            and (not status or status == '全部' or match['match_status'] == status)
+            and (not jingcai_only or match['jingcai_id'])
+            and (not team_id or team_id in (match['home_team_id'], match['away_team_id']))
+            and (not kickoff_from or match['time'] >= kickoff_from)
+            and (not kickoff_to or match['time'] <= kickoff_to)]
+
+
+@pytest.mark.parametrize('conditions', [
+    {},
+    {'league': '全部', 'status': '全部'},
+    {'league': '英超'},
+    {'league': '英超', 'status': '未'},
+    {'status': '完', 'jingcai_only': True},
+    {'team_id': '1'},
+    {'team_id': '2', 'league': '德甲'},
+    {'kickoff_from': '10-19 20:00', 'kickoff_to': '10-19 22:00'},
+    {'kickoff_from': '10-19 21:00'},
+    {'league': '意甲'},
+])
+def test_filter_matches_scan(conditions):
+    assert MatchStore(MATCHES).filter(**conditions) == scan(MATCHES, **conditions)
+
+
+def test_facets():
+    store = MatchStore(MATCHES)
+    assert store.leagues == ['德甲', '英超', '西甲']
+    assert store.league_counts == {'英超': 3, '西甲': 1, '德甲': 1}
+    assert store.status_counts == {'未': 2, '完': 2, '中': 1}
+    assert store.jingcai_count == 3
+    assert len(store) == 5
+
+
+def test_session_store_rebuilt_only_when_matches_change():
+    session_state = {'matches': MATCHES}
+    store = get_match_store(session_state)
+    assert get_match_store(session_state) is store
+    session_state['matches'] = list(MATCHES)
+    assert get_match_store(session_state) is not store
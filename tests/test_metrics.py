@@ -0,0 +1,62 @@
+"""监控指标：按Prometheus文本格式导出计数器、仪表和直方图"""
+import pytest
+
+from metrics import MetricsRegistry
+
+
+def test_render_counter_and_gauge():
+    registry = MetricsRegistry()
+    requests = registry.counter('crawl_requests_total', '爬取请求数', ('source', 'outcome'))
+    inflight = registry.gauge('crawl_inflight', '进行中的请求数')
+    requests.inc(source='live', outcome='ok')
+    requests.inc(2, source='live', outcome='ok')
+    requests.inc(source='odds', outcome='error')
+    inflight.inc()
+    inflight.inc()
+    inflight.dec()
+
+    assert registry.render() == (
+        '# HELP crawl_requests_total 爬取请求数\n'
+        '# TYPE crawl_requests_total counter\n'
+        'crawl_requests_total{source="live",outcome="ok"} 3\n'
+        'crawl_requests_total{source="odds",outcome="error"} 1\n'
+        '# HELP crawl_inflight 进行中的请求数\n'
+        '# TYPE crawl_inflight gauge\n'
+        'crawl_inflight 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    duration = registry.histogram('parse_seconds', '解析耗时', ('parser',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        duration.observe(value, parser='oupei')
+
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'parse_seconds_bucket{parser="oupei",le="0.1"} 2',
+        'parse_seconds_bucket{parser="oupei",le="1"} 3',
+        'parse_seconds_bucket{parser="oupei",le="+Inf"} 4',
+        'parse_seconds_sum{parser="oupei"} 3.65',
+        'parse_seconds_count{parser="oupei"} 4',
+    ]
+
+
+def test_gauge_function_and_failures():
+    registry = MetricsRegistry()
+    depth = registry.gauge('queue_depth', '队列长度', ('queue',))
+    depth.set_function(lambda: 7, queue='api')
+    depth.set_function(lambda: 1 / 0, queue='broken')
+    # 读取失败的函数跳过，不影响其他指标
+    assert registry.render().splitlines()[2:] == ['queue_depth{queue="api"} 7']
+
+
+def test_labels_validated_and_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', '事件数', ('name',))
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+    with pytest.raises(ValueError):
+        registry.counter('events_total', '重复注册')
+    counter.inc(name='a"b\\c\nd')
+    assert registry.render().splitlines()[-1] == 'events_total{name="a\\"b\\\\c\\nd"} 1'
@@ -0,0 +1,76 @@
+"""赔率立方体：按联赛、赛季和日期连续存放，切片选择返回内存映射的视图"""
+import math
+
+import numpy as np
+import pytest
+
+from odds_cube import OddsCube
+
+
+def odds(initial, instant):
+    return {'initial': list(initial), 'instant': list(instant)}
+
+
+def make_match(fid, league, sid, match_date):
+    return {'fid': fid, 'league': league, 'sid': sid, 'match_date': match_date,
+            'home_team': f'主{fid}', 'away_team': f'客{fid}', 'score': '1-0'}
+
+
+MATCHES = [
+    (make_match('4', '英超', '36', '2025-05-01'), {'oupei': {'立博': odds(['2.0', '3.0', '4.0'], ['1.9', '3.1', '4.2'])}}),
+    (make_match('1', '英超', '40', '2026-01-02'), {
+        'oupei': {'威廉希尔': odds(['2.10', '3.20', '3.40'], ['2.05↓', '3.25', '3.50↑'])},
+        'yapan': {'澳门': odds(['0.90', '半球', '0.90'], ['0.88', '受半球', '0.92'])},
+    }),
+    (make_match('2', '英超', '40', '2026-01-01'), {'oupei': {'威廉希尔': odds(['1.50', '4.00', '6.00'], ['1.45', '4.10', '6.50'])},
+                                                 'daxiao': {'澳门': odds(['0.85', '2.5/3', '0.95'], ['0.90', '2.5', '0.90'])}}),
+    (make_match('3', '西甲', '41', '2026-01-01'), {'oupei': {'立博': odds(['2.5', '3.1', '2.8'], ['2.4', '3.2', '2.9'])}}),
+]
+
+
+@pytest.fixture
+def cube(tmp_path):
+    return OddsCube.build(MATCHES, str(tmp_path / 'odds_cube'))
+
+
+def test_layout_and_parsing(cube):
+    # 按(联赛, 赛季, 日期)排序
+    assert cube.meta['fid'] == ['4', '2', '1', '3']
+    assert cube.data.shape == (4, 3, 3, 3, 2)
+    assert cube.odds('1')[cube.company_index['威廉希尔'], 0, :, 1].tolist() == pytest.approx([2.05, 3.25, 3.5])
+    # 亚盘和大小球的盘口文字转换为数字
+    assert cube.odds('1')[cube.company_index['澳门'], 1, 1].tolist() == [-0.5, 0.5]
+    assert cube.odds('2')[cube.company_index['澳门'], 2, 1].tolist() == [2.75, 2.5]
+    # 比赛没有的公司为NaN
+    assert math.isnan(cube.odds('1')[cube.company_index['立博'], 0, 0, 0])
+    assert cube.odds('9') is None
+
+
+def test_select_by_league_and_season_is_view(cube):
+    meta, data = cube.select(company='威廉希尔', market='oupei', outcome=0, league='英超', sid=40)
+    assert meta['fid'] == ['2', '1']
+    assert data.tolist() == pytest.approx([1.45, 2.05])
+    assert np.shares_memory(data, cube.data)
+
+    meta, _ = cube.select(league='英超', sid='40', date_from='2026-01-02')
+    assert meta['fid'] == ['1']
+    meta, _ = cube.select(league='英超')
+    assert meta['fid'] == ['4', '2', '1']
+
+
+def test_select_non_contiguous(cube):
+    # 不指定赛季的日期条件按元数据过滤
+    meta, data = cube.select(company='立博', outcome=2, phase='initial', date_from='2026-01-01')
+    assert meta['fid'] == ['2', '1', '3']
+    assert data[-1] == pytest.approx(2.8)
+    meta, _ = cube.select(fids=['3', '4', '9'])
+    assert meta['fid'] == ['3', '4']
+    with pytest.raises(KeyError):
+        cube.select(company='未知公司')
+
+
+def test_seasons_and_reopen(cube, tmp_path):
+    assert cube.seasons('英超') == [('36', '2025-05-01', '2025-05-01', 1), ('40', '2026-01-01', '2026-01-02', 2)]
+    reopened = OddsCube(str(tmp_path / 'odds_cube'))
+    assert reopened.meta == cube.meta
+    assert np.array_equal(reopened.data, cube.data, equal_nan=True)
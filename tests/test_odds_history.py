@@ -0,0 +1,102 @@
+"""赔率增量快照：只保存变化的赔率，任意时刻的赔率可以由增量记录重建"""
+import pytest
+
+from odds_history import OddsHistory
+
+
+def odds(initial, instant):
+    return {'initial': list(initial), 'instant': list(instant)}
+
+
+FIRST = {
+    'oupei': {'威廉希尔': odds(['2.10', '3.20', '3.40'], ['2.05', '3.25', '3.50']),
+              '立博': odds(['2.15', '3.10', '3.30'], ['2.10', '3.20', '3.40'])},
+    'yapan': {'澳门': odds(['0.90', '半球', '0.90'], ['0.88', '半球', '0.92'])},
+    'daxiao': None,
+}
+
+# 威廉希尔即时赔率变化，立博从页面上消失，新增Bet365；亚盘不变
+SECOND = {
+    'oupei': {'Bet365': odds(['2.00', '3.30', '3.60'], ['2.00', '3.30', '3.60']),
+              '威廉希尔': odds(['2.10', '3.20', '3.40'], ['1.95', '3.30', '3.80'])},
+    'yapan': {'澳门': odds(['0.90', '半球', '0.90'], ['0.88', '半球', '0.92'])},
+    'daxiao': {'澳门': odds(['0.85', '2.5', '0.95'], ['0.90', '2.5', '0.90'])},
+}
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = OddsHistory(str(tmp_path / 'odds_history.db'))
+    yield history
+    history.close()
+
+
+def test_round_trip(history):
+    assert history.record_snapshot('1000', FIRST, captured_at=100) == 3
+    # 威廉希尔变化、立博删除、Bet365和大小球新增，亚盘没有变化
+    assert history.record_snapshot('1000', SECOND, captured_at=200) == 4
+    assert history.record_snapshot('1000', SECOND, captured_at=300) == 0
+
+    assert history.odds_at('1000', 50) is None
+    assert history.odds_at('1000', 100) == FIRST
+    assert history.odds_at('1000', 250) == SECOND
+    assert history.odds_at('1000') == SECOND
+    # 公司按最后一次出现时在页面上的顺序排列
+    assert list(history.odds_at('1000', 250)['oupei']) == ['Bet365', '威廉希尔']
+    assert history.capture_times('1000') == [100, 200, 300]
+
+
+def test_closing_odds_excludes_kickoff_snapshot(history):
+    history.record_snapshot('1000', FIRST, captured_at=100)
+    history.record_snapshot('1000', SECOND, captured_at=200)
+    assert history.closing_odds('1000', 200) == FIRST
+    assert history.closing_odds('1000', 201) == SECOND
+
+
+def test_failed_market_is_not_deleted(history):
+    """某个玩法这次没有抓到时不能当作所有公司都被删除"""
+    history.record_snapshot('1000', FIRST, captured_at=100)
+    assert history.record_snapshot('1000', dict(FIRST, yapan={}), captured_at=200) == 0
+    assert history.odds_at('1000', 200)['yapan'] == FIRST['yapan']
+
+
+def test_movement_records_deletions(history):
+    history.record_snapshot('1000', FIRST, captured_at=100)
+    history.record_snapshot('1000', SECOND, captured_at=200)
+    movement = history.movement('1000', 'oupei', '立博')
+    assert [(item['captured_at'], item['instant']) for item in movement] == [
+        (100, ['2.10', '3.20', '3.40']), (200, None)]
+    changes = [(item['captured_at'], item['company']) for item in history.movement('1000', 'oupei')]
+    assert sorted(changes) == [(100, '威廉希尔'), (100, '立博'), (200, 'Bet365'), (200, '威廉希尔'), (200, '立博')]
+    assert changes == sorted(changes, key=lambda change: change[0])
+
+
+def test_reopened_database_continues_deltas(tmp_path):
+    """重新打开数据库时从已有的增量记录恢复最新状态，相同的赔率不会重复写入"""
+    path = str(tmp_path / 'odds_history.db')
+    history = OddsHistory(path)
+    history.record_snapshot('1000', FIRST, captured_at=100)
+    history.record_snapshot('1000', SECOND, captured_at=200)
+    history.close()
+
+    reopened = OddsHistory(path)
+    try:
+        assert reopened.record_snapshot('1000', SECOND, captured_at=300) == 0
+        # 威廉希尔变化、立博重新出现、Bet365删除；这次没有大小球，保留原来的大小球赔率
+        assert reopened.record_snapshot('1000', FIRST, captured_at=400) == 3
+        assert reopened.odds_at('1000', 400) == dict(FIRST, daxiao=SECOND['daxiao'])
+        assert reopened.fids() == ['1000']
+    finally:
+        reopened.close()
+
+
+def test_subscribers_receive_changes(history):
+    received = []
+    history.subscribe(received.append)
+    history.record_snapshot('1000', FIRST, captured_at=100)
+    history.record_snapshot('1000', FIRST, captured_at=200)
+    history.unsubscribe(received.append)
+    history.record_snapshot('1000', SECOND, captured_at=300)
+    assert len(received) == 1
+    assert {(change['market'], change['company']) for change in received[0]} == {
+        ('oupei', '威廉希尔'), ('oupei', '立博'), ('yapan', '澳门')}
@@ -0,0 +1,92 @@
+"""预测模块：联赛场均进球缺失或为0时的预测，以及批量预测中单场比赛失败的隔离"""
+import pytest
+
+import prediction
+from prediction import MatchInput, get_league_home_away_goals, predict_match, predict_slate
+from team_stats import HeadToHeadStats, RecordStats
+
+
+@pytest.fixture(autouse=True)
+def clear_prediction_cache():
+    prediction.global_prediction_cache.clear()
+    yield
+    prediction.global_prediction_cache.clear()
+
+
+def make_input(match_id='m1', league_home=1.5, league_away=1.2, h2h_matches=4):
+    return MatchInput(
+        match_id=match_id,
+        home_team='主队',
+        away_team='客队',
+        league_home_avg_goals=league_home,
+        league_away_avg_goals=league_away,
+        h2h=HeadToHeadStats(matches=h2h_matches, team_a_win_rate=50, team_b_win_rate=25, draw_rate=25,
+                            team_a_avg_goals=1.5, team_a_avg_conceded=1.0, team_b_avg_goals=1.0, team_b_avg_conceded=1.5,
+                            team_a_goals_prob=(0.25, 0.25, 0.5, 0, 0, 0), team_b_goals_prob=(0.5, 0.25, 0.25, 0, 0, 0)),
+        recent_home=RecordStats(wins=5, draws=3, losses=2, goals_for=15, goals_against=10),
+        recent_away=RecordStats(wins=3, draws=3, losses=4, goals_for=11, goals_against=13),
+        home_at_home=RecordStats(wins=3, draws=1, losses=1, goals_for=9, goals_against=5),
+        away_at_away=RecordStats(wins=1, draws=2, losses=2, goals_for=5, goals_against=7),
+    )
+
+
+@pytest.mark.parametrize('league_data', [
+    None,
+    {'average_data': None, 'standings': []},
+    {'average_data': {'home_away_average_goals': {}}},
+    {'average_data': {'home_away_average_goals': {'主场场均进球': '暂无', '客场场均进球': ''}}},
+])
+def test_league_goals_missing(league_data):
+    assert get_league_home_away_goals(league_data) == (0, 0)
+
+
+def test_league_goals_parsed():
+    league_data = {'average_data': {'home_away_average_goals': {'主场场均进球': '1.55', '客场场均进球': '1.20'}}}
+    assert get_league_home_away_goals(league_data) == (1.55, 1.2)
+
+
+@pytest.mark.parametrize('league_home, league_away', [(0, 0), (0, 1.2), (1.5, 0)])
+def test_zero_league_average(league_home, league_away):
+    """联赛场均进球为0时（有历史交战记录）不会除以0，概率仍然是有效的分布"""
+    result = predict_match(make_input(league_home=league_home, league_away=league_away))
+    assert result is not None
+    corrected = result.corrected
+    assert corrected.home_win + corrected.draw + corrected.away_win == pytest.approx(1.0)
+    assert 0 <= corrected.home_xg <= 5 and 0 <= corrected.away_xg <= 5
+
+
+def test_zero_league_average_without_h2h():
+    result = predict_match(make_input(league_home=0, league_away=0, h2h_matches=0))
+    assert result is not None
+    # 没有联赛基准时进攻力和防守力参数都为0，原始xG为0
+    assert (result.home_attack, result.home_defense, result.away_attack, result.away_defense) == (0, 0, 0, 0)
+    assert result.original.home_xg == 0 and result.original.away_xg == 0
+
+
+def test_slate_isolates_invalid_match(monkeypatch):
+    """批量预测中一场比赛计算失败时只有这场为None，其他比赛正常预测"""
+    expected_goals = prediction._expected_goals
+
+    def failing(match_input):
+        if match_input.match_id == 'bad':
+            raise ZeroDivisionError('float division by zero')
+        return expected_goals(match_input)
+
+    monkeypatch.setattr(prediction, '_expected_goals', failing)
+    inputs = [make_input('m1'), make_input('bad', league_home=1.4), make_input('m2', league_home=1.3)]
+    results = predict_slate(inputs)
+    assert [result.match_id if result else None for result in results] == ['m1', None, 'm2']
+    # 失败的比赛不写入缓存，下次仍然重新计算
+    assert prediction.global_prediction_cache.get((inputs[1], prediction.DEFAULT_GOAL_CAP)) is None
+    assert prediction.global_prediction_cache.get((inputs[0], prediction.DEFAULT_GOAL_CAP)) is results[0]
+
+
+def test_slate_matches_single_predictions():
+    inputs = [make_input('m1'), make_input('m2', league_home=1.3, league_away=1.1)]
+    batch = predict_slate(inputs)
+    prediction.global_prediction_cache.clear()
+    for match_input, result in zip(inputs, batch):
+        single = predict_match(match_input)
+        assert single.corrected.home_win == pytest.approx(result.corrected.home_win)
+        assert single.corrected.away_xg == result.corrected.away_xg
+
@@ -0,0 +1,119 @@
+"""会话数据存储：会话只保存共用数据的引用，按数量上限释放，没有引用的数据按大小和有效期淘汰"""
+import gc
+
+from session_store import HISTORY, ODDS, SessionDataCache, SharedDataStore, estimate_size
+
+
+def refs(store, kind, key):
+    entry = store.entries.get((kind, key))
+    return entry.refs if entry else None
+
+
+def test_sessions_share_one_copy():
+    store = SharedDataStore()
+    first, second = SessionDataCache(store), SessionDataCache(store)
+    data = {'oupei': {'威廉希尔': {'initial': ['2.10'], 'instant': ['2.05']}}}
+
+    assert first.lookup(ODDS, 1000) == (False, None)
+    first.put(ODDS, 1000, data)
+    found, shared = second.lookup(ODDS, '1000')
+    assert found and shared is data
+    assert refs(store, ODDS, '1000') == 2
+    # 本会话已经引用的数据不会重复增加引用
+    assert first.lookup(ODDS, '1000') == (True, data)
+    assert refs(store, ODDS, '1000') == 2
+
+
+def test_session_limit_releases_oldest():
+    store = SharedDataStore()
+    session = SessionDataCache(store, limits={ODDS: 2})
+    for fid in ('1', '2', '3'):
+        session.put(ODDS, fid, {'fid': fid})
+
+    assert list(session.entries[ODDS]) == ['2', '3']
+    assert refs(store, ODDS, '1') == 0
+    assert session.get(ODDS, '1') is None
+    # 最近查找过的比赛移到最后，下次先释放更久没有使用的比赛
+    session.lookup(ODDS, '2')
+    session.put(ODDS, '4', {'fid': '4'})
+    assert list(session.entries[ODDS]) == ['2', '4']
+    assert refs(store, ODDS, '3') == 0
+
+
+def test_unreferenced_data_evicted_over_size_limit():
+    data = [{'fid': str(fid), 'payload': 'x' * 1000} for fid in range(3)]
+    store = SharedDataStore(max_bytes=int(estimate_size(data[0]) * 1.5))
+    session = SessionDataCache(store, limits={HISTORY: 1})
+
+    session.put(HISTORY, '0', data[0])
+    session.put(HISTORY, '1', data[1])
+    # 会话释放了0的引用，但0还在大小上限之内
+    assert ('history', '0') in store.entries
+    session.put(HISTORY, '2', data[2])
+    # 没有引用的0和1超过上限，淘汰最久未用的0；有引用的2不会被淘汰
+    assert ('history', '0') not in store.entries
+    assert ('history', '1') in store.entries and refs(store, HISTORY, '2') == 1
+    assert session.lookup(HISTORY, '2') == (True, data[2])
+
+
+def test_expired_data_not_shared():
+    store = SharedDataStore(max_age=60)
+    SessionDataCache(store).put(ODDS, '1000', {'fid': '1000'})
+    store.entries[(ODDS, '1000')].stored_at -= 120
+    assert SessionDataCache(store).lookup(ODDS, '1000') == (False, None)
+
+
+def test_failed_fetch_stays_in_session():
+    store = SharedDataStore()
+    session = SessionDataCache(store)
+    session.put(ODDS, '1000', {'fid': '1000'})
+    # 重新获取失败时，空数据只保存在本会话中，并释放共用数据的引用
+    session.put(ODDS, '1000', None, share=False)
+    assert session.lookup(ODDS, '1000') == (True, None)
+    assert refs(store, ODDS, '1000') == 0
+    assert SessionDataCache(store).lookup(ODDS, '1000') == (True, {'fid': '1000'})
+
+
+def test_collected_session_releases_references():
+    store = SharedDataStore()
+    session = SessionDataCache(store)
+    session.put(ODDS, '1000', {'fid': '1000'})
+    session.put(HISTORY, '1000', {'matches': []})
+    assert store.stats()['referenced'] == 2
+
+    del session
+    gc.collect()
+    assert store.stats()['referenced'] == 0
+    assert store.stats()['entries'] == 2
+
+
+def test_failed_crawl_not_shared(monkeypatch):
+    import history_crawler
+    import match_detail
+    import odds_crawler
+
+    # 网络请求全部失败：爬虫返回各项为None的赔率和字段齐全的空双方数据
+    for module in (odds_crawler, history_crawler):
+        monkeypatch.setattr(module, 'make_request_with_retries', lambda *args, **kwargs: None)
+        monkeypatch.setattr(module.global_cache, 'get', lambda key: None)
+    monkeypatch.setattr(history_crawler.time, 'sleep', lambda seconds: None)
+    snapshots = []
+    monkeypatch.setattr(match_detail, 'record_odds_snapshot', lambda fid, odds: snapshots.append(fid))
+
+    store = SharedDataStore()
+    session = SessionDataCache(store)
+    odds = match_detail.load_odds(session, '1000')
+    assert odds == {'oupei': None, 'yapan': None, 'daxiao': None}
+    assert session.lookup(ODDS, '1000') == (True, odds)
+    assert match_detail.load_history(session, '1000') is None
+    assert session.lookup(HISTORY, '1000') == (False, None)
+    # 其他会话打开时重新获取
+    assert SessionDataCache(store).lookup(ODDS, '1000') == (False, None)
+    assert store.stats()['entries'] == 0 and snapshots == []
+
+    # 获取成功后与其他会话共用
+    data = {'oupei': {'威廉希尔': {'initial': ['2.10'], 'instant': ['2.05']}}, 'yapan': None, 'daxiao': None}
+    monkeypatch.setattr(match_detail, 'fetch_all_odds_data', lambda fid: data)
+    match_detail.load_odds(SessionDataCache(store), '1000')
+    assert SessionDataCache(store).lookup(ODDS, '1000') == (True, data)
+    assert snapshots == ['1000']
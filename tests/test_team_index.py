@@ -0,0 +1,97 @@
+"""球队索引：按归档的更新时间增量同步，结果与重新构建的索引一致"""
+import pytest
+
+from match_archive import MatchArchive
+from team_index import TeamIndex
+
+
+def make_match(match_id, home, away, score, status='4', time='01-01 20:00'):
+    return {'match_id': match_id, 'fid': f'f{match_id}', 'status': status, 'score': score, 'half_score': '',
+            'league': '英超', 'time': time, 'home_team_id': home, 'away_team_id': away,
+            'home_team': f'T{home}', 'away_team': f'T{away}'}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MatchArchive(str(tmp_path / 'match_archive.db'))
+    archive.save_matches([make_match('1', 'a', 'b', '1-0'), make_match('2', 'b', 'a', '2-2')], '2026-01-01')
+    return archive
+
+
+def fids(matches):
+    return [indexed.fid for indexed in matches]
+
+
+def assert_same_as_rebuilt(index, archive):
+    rebuilt = TeamIndex(archive, refresh_interval=0)
+    rebuilt.refresh()
+    assert index.by_team == rebuilt.by_team
+    assert index.dates_by_team == rebuilt.dates_by_team
+    assert index.match_dates == rebuilt.match_dates
+
+
+def test_incremental_sync(archive):
+    index = TeamIndex(archive, refresh_interval=0)
+    assert fids(index.team_matches('a')) == ['f2', 'f1']
+
+    # 新的已完场比赛加入索引；未完场的比赛只记录日期
+    archive.save_matches([make_match('3', 'a', 'c', '0-1'), make_match('4', 'a', 'd', '', status='1')], '2026-01-02')
+    assert fids(index.team_matches('a')) == ['f3', 'f2', 'f1']
+    assert index.match_dates['f4'] == '2026-01-02'
+    assert index.match_date({'fid': 'f4', 'time': '01-02 20:00'}) == '2026-01-02'
+
+    # 比分更正替换原来的比赛，不会重复
+    archive.save_matches([make_match('3', 'a', 'c', '3-1')], '2026-01-02')
+    assert [(indexed.fid, indexed.home_goals) for indexed in index.team_matches('c')] == [('f3', 3)]
+    assert len(index.team_matches('a')) == 3
+    assert_same_as_rebuilt(index, archive)
+
+
+def test_only_changed_teams_resorted(archive):
+    index = TeamIndex(archive, refresh_interval=0)
+    index.refresh()
+    team_b = index.by_team['b']
+    team_a = index.by_team['a']
+    archive.save_matches([make_match('3', 'a', 'c', '0-1')], '2026-01-02')
+    index.refresh()
+    assert index.by_team['b'] is team_b
+    assert index.by_team['a'] is not team_a
+    # 已经返回的旧列表不受影响
+    assert fids(team_a) == ['f1', 'f2']
+
+
+def test_refresh_interval(archive):
+    index = TeamIndex(archive, refresh_interval=3600)
+    assert len(index.team_matches('a')) == 2
+    archive.save_matches([make_match('3', 'a', 'c', '0-1')], '2026-01-02')
+    assert len(index.team_matches('a')) == 2
+    index.refresh(force=True)
+    assert len(index.team_matches('a')) == 3
+
+
+def test_match_no_longer_finished_removed(archive):
+    index = TeamIndex(archive, refresh_interval=0)
+    index.refresh()
+    archive.save_matches([make_match('2', 'b', 'a', '', status='0')], '2026-01-01')
+    assert fids(index.team_matches('a')) == ['f1']
+    assert_same_as_rebuilt(index, archive)
+
+
+def test_queries(archive):
+    archive.save_matches([make_match('3', 'a', 'c', '0-1'), make_match('4', 'c', 'b', '2-0')], '2026-01-02')
+    archive.save_matches([make_match('5', 'b', 'a', '1-3')], '2026-01-03')
+    index = TeamIndex(archive, refresh_interval=0)
+
+    assert fids(index.team_matches('a', before='2026-01-03')) == ['f3', 'f2', 'f1']
+    assert fids(index.head_to_head('a', 'b')) == ['f5', 'f2', 'f1']
+    assert fids(index.recent('a', venue='home')) == ['f3', 'f1']
+    assert fids(index.recent('a', venue='away', limit=1)) == ['f5']
+    assert [indexed.result_for('a') for indexed in index.team_matches('a')] == ['胜', '负', '平', '胜']
+
+    history = index.build_history({'home_team_id': 'a', 'away_team_id': 'b', 'home_team': '甲', 'away_team': '乙',
+                                   'match_date': '2026-01-03'})
+    # 只使用比赛日期之前的比赛，历史交战以本场主队的视角记录赛果
+    assert [(record['teams'], record['result']) for record in history['matches']] == [
+        ('乙 2:2 甲', '平'), ('甲 1:0 乙', '胜')]
+    assert [record['teams'] for record in history['recent_records_home_away']['team_b_home']] == ['Tb 2:2 Ta']
+    assert history['source'] == 'local' and not history['complete']
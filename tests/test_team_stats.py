@@ -0,0 +1,44 @@
+"""球队统计：按fid和参与统计的数据内容缓存，缓存不引用历史数据本身"""
+import gc
+import weakref
+
+from team_stats import TeamStatsEngine
+
+
+class History(dict):
+    """可以弱引用的历史数据"""
+
+
+def make_history(score='2:1'):
+    return History({
+        'pre_match_standings': {'team_a': {'name': '阿森纳'}, 'team_b': {'name': '切尔西'}},
+        'matches': [{'teams': f'阿森纳 {score} 切尔西'}],
+        'recent_records_all': [{'team_type': '主队', 'result': '胜', 'teams': '阿森纳 1:0 热刺'}],
+        'recent_records_home_away': {'team_a_home': [{'result': '平', 'teams': '阿森纳 1:1 利物浦'}]},
+        'average_data': {'team_a': {'name': '阿森纳'}},
+    })
+
+
+def test_cached_by_content():
+    engine = TeamStatsEngine()
+    stats = engine.get('1000', make_history())
+    assert stats.h2h.matches == 1 and stats.h2h.team_a_win_rate == 100
+    assert stats.recent_home.wins == 1 and stats.team_a_home.draws == 1
+
+    # 重新获取的相同内容直接使用缓存，不参与统计的字段变化也不重新计算
+    again = make_history()
+    again['average_data'] = {}
+    assert engine.get('1000', again) is stats
+    # 历史交战变化时重新计算
+    changed = engine.get('1000', make_history('0:1'))
+    assert changed is not stats and changed.h2h.team_b_win_rate == 100
+
+
+def test_cache_does_not_keep_history():
+    engine = TeamStatsEngine()
+    history = make_history()
+    engine.get('1000', history)
+    ref = weakref.ref(history)
+    del history
+    gc.collect()
+    assert ref() is None
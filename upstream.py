@@ -0,0 +1,41 @@
+"""
+上游站点地址 - 爬虫请求的500.com地址可以整体改到本地回放服务
+
+爬虫中的地址都写成https://live.500.com/2h1.php这样的完整地址。设置环境变量CRAWLER_UPSTREAM
+（如http://127.0.0.1:8765）或调用set_upstream()后，site_url()把这些地址的协议和主机换成该地址，
+路径和参数不变；回放服务（replay_server.py）按路径区分页面，可以代替所有子站点。没有设置时原样返回。
+"""
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+UPSTREAM_ENV = 'CRAWLER_UPSTREAM'
+
+# 会被改写的站点域名
+SITE_DOMAIN = '500.com'
+
+_upstream = os.environ.get(UPSTREAM_ENV) or None
+
+
+def set_upstream(base_url):
+    """
+    设置上游地址（None表示恢复为真实站点）
+    :param base_url: 如'http://127.0.0.1:8765'
+    """
+    global _upstream
+    _upstream = base_url.rstrip('/') if base_url else None
+
+
+def get_upstream():
+    return _upstream
+
+
+def site_url(url):
+    """把500.com的地址改到上游地址（没有设置上游地址时原样返回）"""
+    if _upstream is None:
+        return url
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    if host != SITE_DOMAIN and not host.endswith('.' + SITE_DOMAIN):
+        return url
+    base = urlsplit(_upstream)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))